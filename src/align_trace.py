@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Align Trace — hizalama aşamaları için seviyeli izleme (off / summary / full).
+
+Eskiden align_ocr_to_tahkik_segment_dp her çalışmada büyük bir debug_log üretiyordu (sıralı
+kelime kümeleri, histogramlar, ilk 20 opcode, düşük skorlu satır örnekleri) ve bu liste her
+alignment.json'a yazılıyordu. Şimdi:
+  - off     : hiçbir şey kaydedilmez; stage() paylaşılan boş bir context döner, detay üretilmez.
+  - summary : aşama başına süre (ms), RSS farkı ve kısa bir özet satırı.
+  - full    : summary + tracemalloc tepe bellek + örnek veriler (eski debug_log içeriği).
+İz, alignment.json'un yanındaki ayrı bir dosyaya yazılır (trace_path_for).
+
+Kullanım:
+    trace = AlignTrace.from_config()
+    with trace.stage("opcodes", "Global edit distance") as st:
+        ...
+        if trace.enabled:
+            st.output = f"{n} opcode"
+        if trace.full:
+            st.data = {...}
+"""
+
+import json
+import os
+import time
+import tracemalloc
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.utils import write_json_atomic
+
+TRACE_OFF = "off"
+TRACE_SUMMARY = "summary"
+TRACE_FULL = "full"
+TRACE_LEVELS = (TRACE_OFF, TRACE_SUMMARY, TRACE_FULL)
+
+TRACE_VERSION = 1
+# append_to_sidecar: izde tutulan son kısmi çalışma sayısı
+SIDECAR_RUNS_KEEP = 20
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+
+def _rss_bytes() -> int:
+    """Anlık RSS (Linux'ta /proc, diğer sistemlerde tepe RSS yaklaşımı)."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except Exception:
+        pass
+    try:
+        import resource
+        return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss) * 1024
+    except Exception:
+        return 0
+
+
+def trace_path_for(alignment_path: Path) -> Path:
+    """alignment.json -> alignment.trace.json"""
+    alignment_path = Path(alignment_path)
+    return alignment_path.with_name(alignment_path.stem + ".trace.json")
+
+
+class TraceStage:
+    """Tek bir aşamanın kaydı; alanlar functions_executed şemasıyla uyumlu."""
+
+    __slots__ = ("name", "description", "output", "data", "wall_ms", "rss_delta_kb", "peak_kb")
+
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self.output = ""
+        self.data: Dict[str, Any] = {}
+        self.wall_ms = 0.0
+        self.rss_delta_kb = 0
+        self.peak_kb: Optional[int] = None
+
+    def to_json(self) -> Dict[str, Any]:
+        out = {
+            "name": self.name,
+            "description": self.description,
+            "output": self.output,
+            "data": self.data,
+            "wall_ms": round(self.wall_ms, 2),
+            "rss_delta_kb": self.rss_delta_kb,
+        }
+        if self.peak_kb is not None:
+            out["peak_kb"] = self.peak_kb
+        return out
+
+
+class _StageTimer:
+    def __init__(self, trace: "AlignTrace", stage: TraceStage):
+        self.trace = trace
+        self.stage = stage
+
+    def __enter__(self) -> TraceStage:
+        if self.trace.full:
+            self._own_tracemalloc = not tracemalloc.is_tracing()
+            if self._own_tracemalloc:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        self._rss0 = _rss_bytes()
+        self._t0 = time.perf_counter()
+        return self.stage
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        st = self.stage
+        st.wall_ms = (time.perf_counter() - self._t0) * 1000.0
+        st.rss_delta_kb = (_rss_bytes() - self._rss0) // 1024
+        if self.trace.full:
+            st.peak_kb = tracemalloc.get_traced_memory()[1] // 1024
+            if self._own_tracemalloc:
+                tracemalloc.stop()
+        self.trace.stages.append(st)
+        return False
+
+
+class _NullStage:
+    """off seviyesinde stage() tarafından döndürülen, atamaları yutan nesne."""
+
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+_NULL_CONTEXT = nullcontext(_NULL_STAGE)
+
+
+class AlignTrace:
+    def __init__(self, level: str = TRACE_OFF):
+        level = (level or TRACE_OFF).strip().lower()
+        if level not in TRACE_LEVELS:
+            print(f"[WARN] Bilinmeyen ALIGN_TRACE seviyesi '{level}', 'off' kullanılıyor.")
+            level = TRACE_OFF
+        self.level = level
+        self.enabled = level != TRACE_OFF
+        self.full = level == TRACE_FULL
+        self.stages: List[TraceStage] = []
+
+    @classmethod
+    def from_config(cls) -> "AlignTrace":
+        from src.config import ALIGN_TRACE_LEVEL
+        return cls(ALIGN_TRACE_LEVEL)
+
+    def stage(self, name: str, description: str = ""):
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return _StageTimer(self, TraceStage(name, description))
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "version": TRACE_VERSION,
+            "level": self.level,
+            "total_ms": round(sum(s.wall_ms for s in self.stages), 2),
+            "stages": [s.to_json() for s in self.stages],
+        }
+
+    def write_sidecar(self, alignment_path: Path) -> Optional[Path]:
+        """İzi alignment.json'un yanına yazar; off ise eski (bayat) izi siler."""
+        path = trace_path_for(alignment_path)
+        try:
+            if not self.enabled:
+                if path.exists():
+                    path.unlink()
+                return None
+            write_json_atomic(path, self.to_json())
+            return path
+        except Exception as e:
+            print(f"[WARN] Hizalama izi yazılamadı ({path.name}): {e}")
+            return None
+
+    def append_to_sidecar(self, alignment_path: Path, kind: str = "incremental") -> Optional[Path]:
+        """
+        Kısmi bir çalışmanın (ör. artımlı yeniden hizalama) aşamalarını mevcut izin "runs"
+        listesine ekler; son tam hizalamanın aşamalarına dokunmaz. off ise hiçbir şey yapmaz.
+        """
+        if not self.enabled or not self.stages:
+            return None
+        path = trace_path_for(alignment_path)
+        try:
+            data = None
+            if path.exists():
+                try:
+                    data = json.loads(path.read_text(encoding="utf-8"))
+                except Exception:
+                    data = None
+            if not isinstance(data, dict):
+                data = {"version": TRACE_VERSION, "level": self.level, "total_ms": 0.0, "stages": []}
+            run = {"kind": kind, "ts": time.time(), **{k: v for k, v in self.to_json().items() if k in ("level", "total_ms", "stages")}}
+            data["runs"] = ((data.get("runs") or []) + [run])[-SIDECAR_RUNS_KEEP:]
+            write_json_atomic(path, data)
+            return path
+        except Exception as e:
+            print(f"[WARN] Hizalama izi yazılamadı ({path.name}): {e}")
+            return None
+
+
+NULL_TRACE = AlignTrace(TRACE_OFF)
@@ -0,0 +1,424 @@
+# -*- coding: utf-8 -*-
+"""
+Alignment Store — bellek eşlemeli (mmap) sütunlu hizalama deposu.
+
+Bir projeyi açmak eskiden ya tüm alignment.json'un json.load'u ya da
+DatabaseManager.get_aligned_lines ile her satırın meta_json'unun çözülmesi demekti; tek bir
+sayfa göstermek için bile kitabın tamamı okunuyordu. Bu modül aynı satırları sabit genişlikli
+sütunlar halinde tek bir ikili dosyaya (alignment.col) yazar:
+
+  - sayısal sütunlar (int32): line_no, line_index, error_count, ocr_wc, seg_wc,
+    best.start_word, best.end_word, bbox x0/y0/x1/y1
+  - best.score (float64), is_empty_ocr (bit)
+  - page_name / page_image: string tablosuna indeks (sayfa başına bir kez saklanır)
+  - metin yığını: ocr_text, line_image, best.raw, best.html ve "extra" (sütunlara sığmayan her
+    şey, ör. bağlantı referansları, error_hits) için byte offset'leri (uint64)
+  - sayfa indeksi: sayfa -> satır numaraları (CSR)
+
+Satır başına bir "present" bit maskesi hangi alanların sütunda olduğunu tutar; tipi uymayan
+değerler (None, float line_index, eksik bbox ...) olduğu gibi extra JSON'a gider. Böylece
+okunan satır, yazılan dict ile birebir eşittir (JSON parity).
+
+Okuma tarafı dosyayı mmap ile açar ve sadece istenen satırları çözer: açılış ve tek sayfa
+okuma kitabın boyutundan bağımsız olarak birkaç milisaniyedir.
+
+Kullanım:
+    write_alignment_store(store_path_for(alignment_json), lines, stamp="db:12")
+    with AlignmentStore(path) as store:
+        store.slice_page("p001.png")
+        store.slice_lines(100, 140)
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+MAGIC = b"MKBCOL01"
+STORE_VERSION = 1
+
+_HEADER = struct.Struct("<8sIIIII")  # magic, version, flags, n_rows, n_strings, n_pages
+_SECTION = struct.Struct("<QQ")  # offset, nbytes
+
+FLAG_LITTLE_ENDIAN = 1 << 0
+FLAG_LINE_NO_SORTED = 1 << 1
+
+_INT32_MIN, _INT32_MAX = -(2 ** 31), 2 ** 31 - 1
+
+# (sütun adı, payload yolu)
+INT_COLUMNS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("line_no", ("line_no",)),
+    ("line_index", ("line_index",)),
+    ("error_count", ("error_count",)),
+    ("ocr_wc", ("ocr_wc",)),
+    ("seg_wc", ("seg_wc",)),
+    ("start_word", ("best", "start_word")),
+    ("end_word", ("best", "end_word")),
+)
+BBOX_COLUMNS = ("bbox_x0", "bbox_y0", "bbox_x1", "bbox_y1")
+TEXT_COLUMNS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("ocr_text", ("ocr_text",)),
+    ("line_image", ("line_image",)),
+    ("raw", ("best", "raw")),
+    ("html", ("best", "html")),
+)
+INTERN_COLUMNS = ("page_name", "page_image")
+_EXTRA = len(TEXT_COLUMNS)  # metin yığınındaki son sütun: extra JSON
+_N_TEXT = len(TEXT_COLUMNS) + 1
+
+# present bitleri
+_BIT: Dict[str, int] = {}
+for _i, _name in enumerate(
+    [c for c, _ in INT_COLUMNS] + ["bbox", "score", "score_int", "is_empty_ocr", "is_empty_ocr_val"]
+    + [c for c, _ in TEXT_COLUMNS] + list(INTERN_COLUMNS) + ["has_best", "cand_is_best"]
+):
+    _BIT[_name] = 1 << _i
+
+SECTIONS = (
+    ("stamp", "B"),
+    ("present", "I"),
+    *[(c, "i") for c, _ in INT_COLUMNS],
+    *[(c, "i") for c in BBOX_COLUMNS],
+    ("score", "d"),
+    *[(c, "i") for c in INTERN_COLUMNS],
+    ("text_offsets", "Q"),
+    ("text_heap", "B"),
+    ("str_offsets", "Q"),
+    ("str_heap", "B"),
+    ("page_ids", "i"),
+    ("page_row_offsets", "I"),
+    ("page_rows", "I"),
+)
+
+
+def store_path_for(alignment_path: Path) -> Path:
+    """alignment.json -> alignment.col"""
+    alignment_path = Path(alignment_path)
+    return alignment_path.with_name(alignment_path.stem + ".col")
+
+
+def _is_int32(v: Any) -> bool:
+    return isinstance(v, int) and not isinstance(v, bool) and _INT32_MIN <= v <= _INT32_MAX
+
+
+def _get_path(obj: Dict[str, Any], path: Tuple[str, ...]) -> Any:
+    for key in path[:-1]:
+        obj = obj.get(key) if isinstance(obj, dict) else None
+    if not isinstance(obj, dict):
+        return None
+    return obj.get(path[-1])
+
+
+def _delete_path(obj: Dict[str, Any], path: Tuple[str, ...]) -> None:
+    for key in path[:-1]:
+        obj = obj[key]
+    del obj[path[-1]]
+
+
+def write_alignment_store(path: Path, lines: List[Dict[str, Any]], stamp: str = "") -> Path:
+    """
+    Hizalama satırlarını (alignment.json "aligned" listesi / get_aligned_lines çıktısı)
+    sütunlu dosyaya yazar (atomik). stamp: kaynağın sürüm damgası (bayatlık kontrolü için).
+    """
+    path = Path(path)
+    n = len(lines)
+    present = array("I", bytes(4 * n))
+    ints = {c: array("i", bytes(4 * n)) for c, _ in INT_COLUMNS}
+    bbox = {c: array("i", bytes(4 * n)) for c in BBOX_COLUMNS}
+    score = array("d", bytes(8 * n))
+    interned = {c: array("i", [-1]) * n for c in INTERN_COLUMNS}
+    text_offsets = array("Q", [0])
+    text_heap = bytearray()
+
+    strings: Dict[str, int] = {}
+    page_rows: Dict[int, List[int]] = {}
+
+    def intern(s: str) -> int:
+        sid = strings.get(s)
+        if sid is None:
+            sid = strings[s] = len(strings)
+        return sid
+
+    for r, line in enumerate(lines):
+        rest = dict(line)
+        bits = 0
+        best = rest.get("best")
+        if isinstance(best, dict):
+            bits |= _BIT["has_best"]
+            if rest.get("candidates") == [best]:
+                bits |= _BIT["cand_is_best"]
+                del rest["candidates"]
+            rest["best"] = dict(best)
+
+        for c, p in INT_COLUMNS:
+            v = _get_path(rest, p)
+            if _is_int32(v):
+                ints[c][r] = v
+                bits |= _BIT[c]
+                _delete_path(rest, p)
+
+        bb = rest.get("bbox")
+        if isinstance(bb, list) and len(bb) == 4 and all(_is_int32(v) for v in bb):
+            for c, v in zip(BBOX_COLUMNS, bb):
+                bbox[c][r] = v
+            bits |= _BIT["bbox"]
+            del rest["bbox"]
+
+        sc = _get_path(rest, ("best", "score"))
+        if isinstance(sc, (int, float)) and not isinstance(sc, bool) and (not isinstance(sc, int) or abs(sc) < 2 ** 53):
+            score[r] = float(sc)
+            bits |= _BIT["score"] | (_BIT["score_int"] if isinstance(sc, int) else 0)
+            del rest["best"]["score"]
+
+        emp = rest.get("is_empty_ocr")
+        if isinstance(emp, bool):
+            bits |= _BIT["is_empty_ocr"] | (_BIT["is_empty_ocr_val"] if emp else 0)
+            del rest["is_empty_ocr"]
+
+        for c in INTERN_COLUMNS:
+            v = rest.get(c)
+            if isinstance(v, str):
+                interned[c][r] = intern(v)
+                bits |= _BIT[c]
+                del rest[c]
+        if bits & _BIT["page_name"]:
+            page_rows.setdefault(interned["page_name"][r], []).append(r)
+
+        for c, p in TEXT_COLUMNS:
+            v = _get_path(rest, p)
+            if isinstance(v, str):
+                text_heap += v.encode("utf-8")
+                bits |= _BIT[c]
+                _delete_path(rest, p)
+            text_offsets.append(len(text_heap))
+
+        if bits & _BIT["has_best"] and not rest["best"]:
+            del rest["best"]
+        if rest:
+            text_heap += json.dumps(rest, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        text_offsets.append(len(text_heap))
+        present[r] = bits
+
+    str_offsets = array("Q", [0])
+    str_heap = bytearray()
+    for s in strings:  # dict: ekleme sırası == id sırası
+        str_heap += s.encode("utf-8")
+        str_offsets.append(len(str_heap))
+
+    page_ids = array("i", page_rows.keys())
+    page_row_offsets = array("I", [0])
+    rows_flat = array("I")
+    for rows in page_rows.values():
+        rows_flat.extend(rows)
+        page_row_offsets.append(len(rows_flat))
+
+    line_nos = ints["line_no"]
+    sorted_ok = all(present[i] & _BIT["line_no"] for i in range(n)) and all(
+        line_nos[i] < line_nos[i + 1] for i in range(n - 1)
+    )
+    flags = (FLAG_LITTLE_ENDIAN if sys.byteorder == "little" else 0) | (FLAG_LINE_NO_SORTED if sorted_ok else 0)
+
+    blobs = {
+        "stamp": (stamp or "").encode("utf-8"),
+        "present": present.tobytes(),
+        **{c: a.tobytes() for c, a in ints.items()},
+        **{c: a.tobytes() for c, a in bbox.items()},
+        "score": score.tobytes(),
+        **{c: a.tobytes() for c, a in interned.items()},
+        "text_offsets": text_offsets.tobytes(),
+        "text_heap": bytes(text_heap),
+        "str_offsets": str_offsets.tobytes(),
+        "str_heap": bytes(str_heap),
+        "page_ids": page_ids.tobytes(),
+        "page_row_offsets": page_row_offsets.tobytes(),
+        "page_rows": rows_flat.tobytes(),
+    }
+
+    pos = _HEADER.size + _SECTION.size * len(SECTIONS)
+    table = []
+    for name, _ in SECTIONS:
+        pos = (pos + 7) & ~7  # 8-byte hizalı sütunlar
+        table.append((pos, len(blobs[name])))
+        pos += len(blobs[name])
+
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, STORE_VERSION, flags, n, len(strings), len(page_ids)))
+        for off, size in table:
+            f.write(_SECTION.pack(off, size))
+        for (name, _), (off, _) in zip(SECTIONS, table):
+            f.write(b"\0" * (off - f.tell()))
+            f.write(blobs[name])
+    os.replace(tmp, path)
+    return path
+
+
+class AlignmentStore:
+    """alignment.col okuyucusu: mmap + sütun memoryview'ları, satırlar ihtiyaç anında çözülür."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        try:
+            self._open()
+        except Exception:
+            self.close()
+            raise
+
+    def _open(self):
+        magic, version, flags, n, n_strings, n_pages = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != STORE_VERSION:
+            raise ValueError(f"{self.path.name}: unsupported alignment store ({magic!r} v{version})")
+        if bool(flags & FLAG_LITTLE_ENDIAN) != (sys.byteorder == "little"):
+            raise ValueError(f"{self.path.name}: byte order mismatch")
+        self.n_rows = n
+        self.n_pages = n_pages
+        self.line_no_sorted = bool(flags & FLAG_LINE_NO_SORTED)
+
+        buf = memoryview(self._mm)
+        self._views: List[memoryview] = [buf]
+        cols: Dict[str, memoryview] = {}
+        for i, (name, fmt) in enumerate(SECTIONS):
+            off, size = _SECTION.unpack_from(self._mm, _HEADER.size + i * _SECTION.size)
+            view = buf[off:off + size]
+            if fmt != "B":
+                view = view.cast(fmt)
+            self._views.append(view)
+            cols[name] = view
+        self._cols = cols
+        self.stamp = bytes(cols["stamp"]).decode("utf-8")
+        self._strings: Dict[int, str] = {}
+
+    def close(self):
+        for v in reversed(getattr(self, "_views", [])):
+            v.release()
+        self._views = []
+        mm = getattr(self, "_mm", None)
+        if mm is not None:
+            mm.close()
+            self._mm = None
+        self._file.close()
+
+    def __enter__(self) -> "AlignmentStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    # --- string helpers ---
+
+    def _string(self, sid: int) -> str:
+        s = self._strings.get(sid)
+        if s is None:
+            offs = self._cols["str_offsets"]
+            s = self._strings[sid] = bytes(self._cols["str_heap"][offs[sid]:offs[sid + 1]]).decode("utf-8")
+        return s
+
+    def _text(self, r: int, c: int) -> bytes:
+        offs = self._cols["text_offsets"]
+        i = r * _N_TEXT + c
+        return bytes(self._cols["text_heap"][offs[i]:offs[i + 1]])
+
+    # --- rows ---
+
+    def row(self, r: int) -> Dict[str, Any]:
+        """r. satırı v1 dict şekliyle döner (yazılan dict ile birebir eşit)."""
+        cols = self._cols
+        bits = cols["present"][r]
+        extra = self._text(r, _EXTRA)
+        line: Dict[str, Any] = json.loads(extra) if extra else {}
+        if bits & _BIT["has_best"]:
+            line["best"] = line.get("best") or {}
+
+        for c, p in INT_COLUMNS:
+            if bits & _BIT[c]:
+                _set_path(line, p, cols[c][r])
+        if bits & _BIT["bbox"]:
+            line["bbox"] = [cols[c][r] for c in BBOX_COLUMNS]
+        if bits & _BIT["score"]:
+            v = cols["score"][r]
+            line["best"]["score"] = int(v) if bits & _BIT["score_int"] else v
+        if bits & _BIT["is_empty_ocr"]:
+            line["is_empty_ocr"] = bool(bits & _BIT["is_empty_ocr_val"])
+        for c in INTERN_COLUMNS:
+            if bits & _BIT[c]:
+                line[c] = self._string(cols[c][r])
+        for i, (c, p) in enumerate(TEXT_COLUMNS):
+            if bits & _BIT[c]:
+                _set_path(line, p, self._text(r, i).decode("utf-8"))
+        if bits & _BIT["cand_is_best"]:
+            line["candidates"] = [dict(line["best"])]
+        return line
+
+    def rows(self, indices: Iterable[int]) -> List[Dict[str, Any]]:
+        return [self.row(r) for r in indices]
+
+    def to_lines(self) -> List[Dict[str, Any]]:
+        return self.rows(range(self.n_rows))
+
+    # --- slicing ---
+
+    def pages(self) -> List[Dict[str, Any]]:
+        """Sayfa adları (ilk görünüş sırasıyla) ve satır sayıları."""
+        ids = self._cols["page_ids"]
+        offs = self._cols["page_row_offsets"]
+        return [{"page_name": self._string(ids[p]), "lines": offs[p + 1] - offs[p]} for p in range(self.n_pages)]
+
+    def page_rows(self, page_name: str) -> List[int]:
+        ids = self._cols["page_ids"]
+        offs = self._cols["page_row_offsets"]
+        rows = self._cols["page_rows"]
+        for p in range(self.n_pages):
+            if self._string(ids[p]) == page_name:
+                return list(rows[offs[p]:offs[p + 1]])
+        return []
+
+    def line_rows(self, start: int, end: int) -> List[int]:
+        """line_no değeri [start, end) aralığında olan satırlar."""
+        line_nos = self._cols["line_no"]
+        if self.line_no_sorted:
+            return list(range(bisect_left(line_nos, start), bisect_left(line_nos, end)))
+        present = self._cols["present"]
+        bit = _BIT["line_no"]
+        return [r for r in range(self.n_rows) if present[r] & bit and start <= line_nos[r] < end]
+
+    def slice_page(self, page_name: str) -> List[Dict[str, Any]]:
+        return self.rows(self.page_rows(page_name))
+
+    def slice_lines(self, start: int, end: int) -> List[Dict[str, Any]]:
+        return self.rows(self.line_rows(start, end))
+
+
+def _set_path(obj: Dict[str, Any], path: Tuple[str, ...], value: Any) -> None:
+    for key in path[:-1]:
+        obj = obj.setdefault(key, {})
+    obj[path[-1]] = value
+
+
+def open_alignment_store(path: Path, stamp: Optional[str] = None) -> Optional[AlignmentStore]:
+    """Dosya yoksa, okunamıyorsa veya damgası stamp ile uyuşmuyorsa None."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        store = AlignmentStore(path)
+    except Exception as e:
+        print(f"[WARN] Alignment store açılamadı ({path.name}): {e}")
+        return None
+    if stamp is not None and store.stamp != stamp:
+        store.close()
+        return None
+    return store
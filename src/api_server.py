@@ -1,9 +1,10 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, BackgroundTasks, Form
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, UploadFile, File, BackgroundTasks, Form, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Dict, List, Optional
@@ -12,6 +13,7 @@ import os
 
 import json
 import re
+import time
 import shutil
 from pathlib import Path
 
@@ -21,27 +23,25 @@ os.environ["OMP_NUM_THREADS"] = "1"
 # New Architecture Services
 from src.services.project_manager import ProjectManager
 from src.config import BASE_DIR
-from src.services.manuscript_engine import ManuscriptEngine
+from src.services.manuscript_engine import ManuscriptEngine, kraken_pipeline_available
 from src.config import PROJECTS_DIR
 from src.services.alignment_service import AlignmentService
 from src.services.alignment_service import AlignmentService
-from src.services.tts_service import TTSService
+from src.services.tts_service import default_tts_service
+from src.services.audio_store import parse_range
+from src.services.spellcheck_jobs import SpellcheckJobs
+from src.services.tts_prerender import TTSPrerenderJobs
+from src.services.pipeline_jobs import PipelineJobs, RESOURCE_CPU, RESOURCE_IO
+from src.services.progress_events import default_progress_bus, format_sse
+from src.witnesses import witness_key, has_key
+from src.align_trace import trace_path_for
+from src.alignment_store import store_path_for
+from src.payload_v2 import FORMAT_VERSION
 from docx import Document
 from docx.shared import Pt
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from fastapi.responses import FileResponse
 
-# --- GLOBAL STATE ---
-# Track current job status
-GLOBAL_STATUS = {
-    "busy": False,
-    "project_id": None,
-    "nusha_index": None,
-    "step": "idle",
-    "message": "Sistem Hazır",
-    "progress": 0
-}
-
 app = FastAPI(title="Tahkik-Bot V2 API")
 
 # --- CORS ---
@@ -98,72 +98,95 @@ class TTSRequest(BaseModel):
 # --- SERVICES ---
 project_manager = ProjectManager()
 alignment_service = AlignmentService()
-tts_service = TTSService()
-
-
-# --- BACKGROUND WORKER ---
-def background_task_runner(project_id: str, step: str, nusha_index: int, dpi: int = 300):
-    global GLOBAL_STATUS
-    GLOBAL_STATUS.update({
-        "busy": True,
-        "project_id": project_id,
-        "nusha_index": nusha_index,
-        "step": step,
-        "message": f"{step.upper()} işlemi başlatılıyor...",
-        "progress": 5
-    })
-
+tts_service = default_tts_service()
+spellcheck_jobs = SpellcheckJobs(project_manager)
+progress_bus = default_progress_bus()
+prerender_jobs = TTSPrerenderJobs(project_manager, tts_service, bus=progress_bus)
+
+
+pipeline_jobs = PipelineJobs(project_manager.db, bus=progress_bus)
+
+# SSE: bu kadar saniye olay gelmezse yorum satırı (bağlantı / proxy canlı kalsın)
+EVENTS_HEARTBEAT_S = 15.0
+
+# Eski adım adları -> sırayla çalışacak iş türleri (zincir)
+# "full" (Google Vision): adımlar ayrı iş; Vision OCR io havuzunda çalışır, cpu işçisini
+# ağ beklerken tutmaz (tek "pipeline" işi tek cpu işçisinde bütün projeleri sıraya sokuyordu).
+STEP_CHAINS = {
+    "images": ["convert"],
+    "segmentation": ["segment"],
+    "ocr_only": ["ocr"],
+    "ocr": ["pipeline"],
+    "align": ["align"],
+    "full": ["convert", "segment", "ocr", "align"],
+}
+# Yerel Kraken OCR tek geçişte (sayfa başına segment + OCR) cpu işidir
+KRAKEN_FULL_CHAIN = ["pipeline", "align"]
+
+
+def step_chain(step: str) -> List[str]:
+    if step == "full" and kraken_pipeline_available():
+        return KRAKEN_FULL_CHAIN
+    return STEP_CHAINS[step]
+
+
+@app.on_event("startup")
+def _resume_background_jobs():
+    # Önceki süreçte yarım kalan ön-seslendirme ve pipeline işleri kaldığı yerden sürer
+    prerender_jobs.resume_interrupted()
+    pipeline_jobs.start()
+
+
+# --- BACKGROUND JOBS ---
+def _engine_job(method: str, with_dpi: bool = False, resumable: bool = False):
+    def handler(job: Dict, ctx) -> Dict:
+        engine = ManuscriptEngine(job["project_id"], on_progress=ctx.progress)
+        kwargs = {"dpi": int(job["options"].get("dpi", 300))} if with_dpi else {}
+        if resumable and job["options"].get("resume"):
+            # yalnızca aşama defterine göre yeniden çalışması gereken sayfalar
+            kwargs["resume"] = True
+        res = getattr(engine, method)(job["nusha_index"], **kwargs)
+        if not res.get("success"):
+            raise RuntimeError(res.get("error") or f"{method} başarısız")
+        return res
+    return handler
+
+
+def _spellcheck_job(job: Dict, ctx) -> Dict:
+    opts = job["options"]
+    started = spellcheck_jobs.start(
+        job["project_id"],
+        use_gemini=opts.get("use_gemini", True),
+        use_openai=opts.get("use_openai", True),
+        use_claude=opts.get("use_claude", False),
+    )
+    sc_job_id = started["job"]["job_id"]
+    while spellcheck_jobs.is_running(job["project_id"]):
+        if ctx.cancel_event.is_set():
+            spellcheck_jobs.cancel(job["project_id"])
+        spellcheck_jobs.wait(job["project_id"], timeout=1.0)
+    final = project_manager.db.get_spellcheck_job(sc_job_id) or {}
+    ctx.check_cancelled()
+    if final.get("status") != "completed":
+        raise RuntimeError(final.get("message") or f"Spellcheck {final.get('status')}")
+    return {"success": True, "spellcheck_job_id": sc_job_id}
+
+
+def _export_job(job: Dict, ctx) -> Dict:
     try:
-        engine = ManuscriptEngine(project_id)
-        
-        # 1. Pipeline Execution (PDF -> Segmentation -> OCR)
-        if step in ["ocr", "full"]:
-             # This runs convert_pdf_to_images, run_line_segmentation, and run_ocr in sequence
-             GLOBAL_STATUS["message"] = "Tam süreç başlatılıyor (PDF -> Segmentasyon -> OCR)..."
-             res = engine.run_full_pipeline(nusha_index, dpi=dpi)
-             if not res["success"]: raise RuntimeError(res.get("error"))
-
-        # (Existing logic for individual steps is now redundant for 'ocr' but kept if needed for granularity or specific 'images' requests)
-        elif step == "images":
-             GLOBAL_STATUS["message"] = "PDF -> Resim dönüştürülüyor..."
-             GLOBAL_STATUS["progress"] = 10
-             res = engine.convert_pdf_to_images(nusha_index, dpi=dpi)
-             if not res["success"]: raise RuntimeError(res.get("error"))
+        path = build_project_docx(job["project_id"])
+    except HTTPException as e:
+        raise RuntimeError(e.detail)
+    return {"success": True, "path": str(path), "filename": path.name}
 
-        elif step == "segmentation":
-             GLOBAL_STATUS["message"] = "Sayfa yapısı analiz ediliyor (Segmentasyon)..."
-             GLOBAL_STATUS["progress"] = 30
-             res = engine.run_line_segmentation(nusha_index)
-             if not res["success"]: raise RuntimeError(res.get("error"))
-
-        elif step == "ocr_only":
-             GLOBAL_STATUS["message"] = "Metin tanıma (OCR) yapılıyor..."
-             GLOBAL_STATUS["progress"] = 50
-             res = engine.run_ocr(nusha_index)
-             if not res["success"]: raise RuntimeError(res.get("error"))
-
-        # 4. Alignment
-        if step in ["align", "full"]:
-            GLOBAL_STATUS["message"] = "Metin hizalama (Alignment) yapılıyor..."
-            GLOBAL_STATUS["progress"] = 80
-            res = engine.align_manuscript(nusha_index)
-            if not res["success"]: raise RuntimeError(res.get("error"))
-
-        GLOBAL_STATUS.update({
-            "busy": False,
-            "step": "idle",
-            "message": "İşlem Başarıyla Tamamlandı",
-            "progress": 100
-        })
 
-    except Exception as e:
-        print(f"Background Task Error: {e}")
-        GLOBAL_STATUS.update({
-            "busy": False,
-            "step": "error",
-            "message": f"Hata oluştu: {str(e)}",
-            "progress": 0
-        })
+pipeline_jobs.register("convert", _engine_job("convert_pdf_to_images", with_dpi=True), RESOURCE_CPU)
+pipeline_jobs.register("segment", _engine_job("run_line_segmentation"), RESOURCE_CPU)
+pipeline_jobs.register("ocr", _engine_job("run_ocr", resumable=True), RESOURCE_IO)
+pipeline_jobs.register("pipeline", _engine_job("run_full_pipeline", with_dpi=True), RESOURCE_CPU)
+pipeline_jobs.register("align", _engine_job("align_manuscript"), RESOURCE_CPU)
+pipeline_jobs.register("spellcheck", _spellcheck_job, RESOURCE_IO)
+pipeline_jobs.register("export", _export_job, RESOURCE_IO)
 
 
 # --- ENDPOINTS ---
@@ -446,10 +469,10 @@ def add_footnote(run, text):
 
 
 
-@app.post("/api/projects/{project_id}/export/docx")
-def export_project_docx(project_id: str):
+def build_project_docx(project_id: str) -> Path:
     """
-    Exports the project text to a Word document (.docx) with RTL footnotes.
+    Writes the project text to a Word document (.docx) with RTL footnotes in the project
+    folder and returns its path (export endpoint and 'export' jobs).
     """
     try:
         # Get project info
@@ -588,9 +611,18 @@ def export_project_docx(project_id: str):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Dosya kaydedilirken hata oluştu: {str(e)}")
     
+    return output_path
+
+
+@app.post("/api/projects/{project_id}/export/docx")
+def export_project_docx(project_id: str):
+    """
+    Exports the project text to a Word document (.docx) with RTL footnotes.
+    """
+    output_path = build_project_docx(project_id)
     return FileResponse(
         path=output_path, 
-        filename=filename, 
+        filename=output_path.name, 
         media_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
     )
 
@@ -677,14 +709,48 @@ def update_project_order(project_id: str, req: UpdateOrderRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+class WordSpellcheckRequest(BaseModel):
+    use_gemini: bool = True
+    use_openai: bool = True
+    use_claude: bool = False
+
+def _pending_spellcheck_jobs(project_id: str) -> List[Dict]:
+    return [j for j in pipeline_jobs.history(project_id, statuses=["queued", "running"]) if j["kind"] == "spellcheck"]
+
 @app.post("/api/projects/{project_id}/word/spellcheck")
-def run_spellcheck(project_id: str):
+def run_spellcheck(project_id: str, req: Optional[WordSpellcheckRequest] = None):
+    """İmla işini proje kuyruğuna ekler (aynı projenin diğer adımlarıyla sırayla çalışır; iptal edilmiş /
+    yarım kalmış iş varsa kaldığı yerden devam eder). Kuyrukta / çalışan imla işi varsa onu döndürür."""
+    req = req or WordSpellcheckRequest()
     try:
-        result = project_manager.run_word_spellcheck(project_id)
-        return result
+        if not (project_manager.get_project_path(project_id) / "tahkik.docx").exists():
+            raise FileNotFoundError("Word dosyası bulunamadı.")
+        pending = _pending_spellcheck_jobs(project_id)
+        if pending:
+            return {"started": False, "job": pending[0]}
+        options = {"use_gemini": req.use_gemini, "use_openai": req.use_openai, "use_claude": req.use_claude}
+        return {"started": True, "job": pipeline_jobs.enqueue(project_id, "spellcheck", options=options)}
+    except FileNotFoundError as e:
+        return JSONResponse(status_code=404, content={"error": str(e)})
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
+@app.post("/api/projects/{project_id}/word/spellcheck/cancel")
+def cancel_spellcheck(project_id: str):
+    # kuyruktaki iş hemen düşer, çalışan iş imla iş parçacığını durdurur (_spellcheck_job)
+    cancelled = [pipeline_jobs.cancel(j["job_id"]) for j in _pending_spellcheck_jobs(project_id)]
+    return {"cancelled": any(cancelled) or spellcheck_jobs.cancel(project_id)}
+
+@app.get("/api/projects/{project_id}/word/spellcheck")
+def get_spellcheck_state(project_id: str):
+    """Son iş + kaydedilmiş tüm paragraf sonuçları (sayfa yenilemelerinde)."""
+    return spellcheck_jobs.state(project_id)
+
+@app.get("/api/projects/{project_id}/word/spellcheck/stream")
+def stream_spellcheck(project_id: str, after: int = 0):
+    """Paragraf sonuçları tamamlandıkça NDJSON; kopan bağlantı ?after=<son seq> ile devam eder."""
+    return StreamingResponse(spellcheck_jobs.stream(project_id, after=after), media_type="application/x-ndjson")
+
 @app.delete("/api/projects/{project_id}/files")
 def delete_project_file(project_id: str, file_type: str, nusha_index: int = 1):
     try:
@@ -726,6 +792,10 @@ async def upload_file(
             )
             saved_paths.append(str(file_path))
 
+            # Yeni tahkik.docx: mevcut hizalamaları baştan çalıştırmadan artımlı güncelle
+            if file_type == "docx":
+                background_tasks.add_task(project_manager.realign_after_reference_change, project_id)
+
             # If we are in "New Nusha" mode (index <= 0)
             if file_type != "docx" and nusha_index <= 0:
                  # The manager calculated a new index for us (used_index)
@@ -738,26 +808,18 @@ async def upload_file(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/projects/{project_id}/process")
-async def process_project(
-    project_id: str, 
-    req: ProcessRequest, 
-    background_tasks: BackgroundTasks
-):
-    if GLOBAL_STATUS["busy"]:
-         raise HTTPException(status_code=400, detail="Sistem şu an meşgul.")
-    
+async def process_project(project_id: str, req: ProcessRequest):
+    if req.step not in STEP_CHAINS:
+        raise HTTPException(status_code=400, detail=f"Invalid step. Must be one of: {list(STEP_CHAINS)}")
+
     # Pre-flight Check: Ensure tahkik.docx exists for alignment steps
     if req.step in ["align", "full"]:
-        try:
-             # project_id should be just the ID string here
-             tahkik_path = project_manager.projects_dir / project_id / "tahkik.docx"
-             if not tahkik_path.exists():
-                 raise HTTPException(status_code=400, detail="Önce Word dosyası (tahkik.docx) yüklemelisiniz.")
-        except Exception:
-             pass # Let the engine handle other errors or pass through check if path construction fails
+        tahkik_path = project_manager.projects_dir / project_id / "tahkik.docx"
+        if not tahkik_path.exists():
+            raise HTTPException(status_code=400, detail="Önce Word dosyası (tahkik.docx) yüklemelisiniz.")
 
-    background_tasks.add_task(background_task_runner, project_id, req.step, req.nusha_index, req.dpi)
-    return {"ok": True, "message": f"{req.step} işlemi kuyruğa alındı."}
+    jobs = pipeline_jobs.enqueue_chain(project_id, step_chain(req.step), req.nusha_index, {"dpi": req.dpi})
+    return {"ok": True, "message": f"{req.step} işlemi kuyruğa alındı.", "jobs": jobs}
 
 @app.get("/api/projects/{project_id}/status")
 def get_status(project_id: str):
@@ -767,24 +829,33 @@ def get_status(project_id: str):
     except Exception:
         file_status = {"has_tahkik": False, "nushas": {}}
 
-    # 2. Get Ephemeral Process Status (Global Variable)
+    # 2. Process Status from the job queue (çalışan / sıradaki iş, yoksa son iş hata verdiyse)
     process_status = {
         "busy": False,
         "step": "idle",
         "message": "Hazır",
         "progress": 0,
-        "active_nusha": None
+        "active_nusha": None,
+        "job": None
     }
-    
-    # If the global status is busy with THIS project, override process status
-    if GLOBAL_STATUS["project_id"] == project_id:
+    job = pipeline_jobs.active(project_id)
+    if job:
         process_status = {
-            "busy": GLOBAL_STATUS["busy"],
-            "step": GLOBAL_STATUS["step"],
-            "message": GLOBAL_STATUS["message"],
-            "progress": GLOBAL_STATUS["progress"],
-            "active_nusha": GLOBAL_STATUS["nusha_index"]
+            "busy": True,
+            "step": job["kind"],
+            "message": job["message"],
+            "progress": job["progress"],
+            "active_nusha": job["nusha_index"],
+            "job": job
         }
+    else:
+        # son istek (zincirse bütün adımları) başarısız olduysa hata gösterilir
+        recent = pipeline_jobs.history(project_id, limit=10)
+        head = recent[0] if recent else None
+        group = [j for j in recent if head.get("group_id") and j.get("group_id") == head["group_id"]] if head else []
+        failed = next((j for j in group or recent[:1] if j["status"] == "failed"), None)
+        if failed:
+            process_status.update({"step": "error", "message": failed["message"], "job": failed})
 
     # 3. Merge and Return
     return {
@@ -796,83 +867,45 @@ def get_status(project_id: str):
 def get_pipeline_status(project_id: str, nusha_index: int):
     """
     Returns the granular status of each pipeline step for a specific Nusha.
-    Detects completion based on filesystem checks.
+    Reads the stage ledger written by the pipeline stages (SQLite stage_ledger, one query);
+    klasörler taranmaz (defteri boş nüsha bir kez diskten uzlaştırılır).
     """
     try:
-        nusha_dir = project_manager.get_nusha_dir(project_id, nusha_index)
+        steps = project_manager.get_nusha_steps(project_id, nusha_index)
         
         # Check Word file for alignment prerequisite
         tahkik_path = project_manager.projects_dir / project_id / "tahkik.docx"
         has_reference = tahkik_path.exists()
-        
-        # Step 1: Pages (PDF → Images)
-        pages_dir = nusha_dir / "pages"
-        pages_completed = pages_dir.exists() and len(list(pages_dir.glob("*.png"))) > 0
-        pages_count = len(list(pages_dir.glob("*.png"))) if pages_completed else 0
-        
-        # Step 2: Segmentation (Lines Manifest)
-        manifest_path = nusha_dir / "lines_manifest.jsonl"
-        segmentation_completed = manifest_path.exists()
-        segmentation_count = 0
-        if segmentation_completed:
-            try:
-                with open(manifest_path, 'r', encoding='utf-8') as f:
-                    segmentation_count = sum(1 for _ in f)
-            except:
-                pass
-        
-        # Step 3: Text Recognition (Google Vision OCR Output)
-        ocr_dir = nusha_dir / "ocr"
-        text_recognition_completed = ocr_dir.exists() and len(list(ocr_dir.glob("*.json"))) > 0
-        text_recognition_count = 0
-        if text_recognition_completed:
-            text_recognition_count = len(list(ocr_dir.glob("*.json")))
 
-        # Step 4: Alignment
-        alignment_path = nusha_dir / "alignment.json"
-        alignment_completed = alignment_path.exists()
-        
-        # Fallback: Check DB if file missing
-        if not alignment_completed:
-            try:
-                # get_nusha_alignment checks DB first
-                lines = project_manager.get_nusha_alignment(project_id, nusha_index)
-                if lines and len(lines) > 0:
-                    alignment_completed = True
-            except: pass
-        
+        def completed(step):
+            return (steps.get(step) or {}).get("status") == "completed"
+
         # Determine step statuses
-        def get_step_status(completed, prerequisites_met):
-            if completed:
-                return "completed"
+        def get_step_status(step, prerequisites_met):
+            entry = steps.get(step) or {}
+            if entry.get("status") in ("completed", "running", "failed"):
+                return entry["status"]
             elif prerequisites_met:
                 return "pending"
             else:
                 return "not_started"
-        
-        pages_status = get_step_status(pages_completed, True)
-        segmentation_status = get_step_status(segmentation_completed, pages_completed)
-        text_recognition_status = get_step_status(text_recognition_completed, segmentation_completed)
-        alignment_status = get_step_status(alignment_completed, text_recognition_completed and has_reference)
-        
+
+        def step_info(step, prerequisites_met):
+            entry = steps.get(step) or {}
+            info = {"status": get_step_status(step, prerequisites_met), "count": entry.get("count") or 0}
+            for key in ("total", "error", "pages", "pages_failed", "updated_at"):
+                if entry.get(key) is not None:
+                    info[key] = entry[key]
+            return info
+
+        alignment = step_info("alignment", completed("text_recognition") and has_reference)
+        alignment["requires_reference"] = not has_reference
         return {
             "steps": {
-                "pages": {
-                    "status": pages_status,
-                    "count": pages_count
-                },
-                "segmentation": {
-                    "status": segmentation_status,
-                    "count": segmentation_count
-                },
-                "text_recognition": {
-                    "status": text_recognition_status,
-                    "count": text_recognition_count
-                },
-                "alignment": {
-                    "status": alignment_status,
-                    "requires_reference": not has_reference
-                }
+                "pages": step_info("pages", True),
+                "segmentation": step_info("segmentation", completed("pages")),
+                "text_recognition": step_info("text_recognition", completed("segmentation")),
+                "alignment": alignment,
             }
         }
         
@@ -880,6 +913,36 @@ def get_pipeline_status(project_id: str, nusha_index: int):
         print(f"Pipeline Status Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/projects/{project_id}/nusha/{nusha_index}/ledger")
+def get_stage_ledger(project_id: str, nusha_index: int, stage: Optional[str] = None):
+    """
+    Aşama defteri: aşama özetleri + neyin yeniden çalışması gerektiği (sayfa anahtarları).
+    stage verilirse o aşamanın sayfa satırları da döner.
+    """
+    try:
+        out = {
+            "steps": project_manager.get_nusha_steps(project_id, nusha_index),
+            "rerun": project_manager.get_nusha_rerun_plan(project_id, nusha_index),
+        }
+        if stage:
+            if stage not in project_manager.PIPELINE_STEPS:
+                raise HTTPException(status_code=400, detail=f"Invalid step: {stage}")
+            out["pages"] = project_manager.db.get_stage_units(project_id, nusha_index, stage)
+        return out
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Stage Ledger Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/projects/{project_id}/ledger/reconcile")
+def reconcile_stage_ledger(project_id: str, nusha_index: Optional[int] = None):
+    """Defteri diskten yeniden kurar (elle silinen / eklenen dosyalardan sonra)."""
+    try:
+        return {"nushas": project_manager.reconcile_ledger(project_id, nusha_index)}
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
 @app.get("/api/projects/{project_id}/nusha/{nusha_index}/pipeline/outputs")
 def get_pipeline_outputs(project_id: str, nusha_index: int):
     """
@@ -966,9 +1029,17 @@ def get_pipeline_outputs(project_id: str, nusha_index: int):
                         "line_image": item.get("line_image", ""),
                     })
 
-                # Use real debug_log from alignment if present (new runs),
-                # otherwise fall back to basic static info (old runs)
-                debug_log = alignment_data.get("debug_log", None)
+                # Stage trace from the alignment.trace.json sidecar (new runs), then the
+                # debug_log embedded by older versions, then basic static info
+                trace_data = None
+                trace_path = trace_path_for(alignment_path)
+                if trace_path.exists():
+                    try:
+                        with open(trace_path, "r", encoding="utf-8") as f:
+                            trace_data = json.load(f)
+                    except Exception as e:
+                        print(f"[WARN] Alignment trace okunamadı: {e}")
+                debug_log = (trace_data or {}).get("stages") or alignment_data.get("debug_log", None)
                 if not debug_log:
                     # Fallback for alignment.json files generated before instrumentation
                     avg_score = sum(l['score'] for l in line_details) / max(len(line_details), 1) if line_details else 0
@@ -982,6 +1053,7 @@ def get_pipeline_outputs(project_id: str, nusha_index: int):
                     "debug": debug_info,
                     "lines": line_details,
                     "functions_executed": debug_log,
+                    "trace": {k: v for k, v in trace_data.items() if k != "stages"} if trace_data else None,
                 }
             except Exception as e:
                 result["alignment"] = {"error": str(e)}
@@ -999,15 +1071,11 @@ async def execute_pipeline_step(
     project_id: str, 
     nusha_index: int, 
     step: str,
-    background_tasks: BackgroundTasks,
     dpi: int = 300
 ):
     """
     Execute a single pipeline step: pages, ocr, or alignment.
     """
-    if GLOBAL_STATUS["busy"]:
-        raise HTTPException(status_code=400, detail="Sistem şu an meşgul.")
-    
     valid_steps = ["pages", "segmentation", "text_recognition", "alignment", "full"]
     if step not in valid_steps:
         raise HTTPException(status_code=400, detail=f"Invalid step. Must be one of: {valid_steps}")
@@ -1029,9 +1097,94 @@ async def execute_pipeline_step(
         if not tahkik_path.exists():
             raise HTTPException(status_code=400, detail="Önce Word dosyası (tahkik.docx) yüklemelisiniz.")
     
-    # Queue the task
-    background_tasks.add_task(background_task_runner, project_id, backend_step, nusha_index, dpi)
-    return {"ok": True, "message": f"{step} adımı başlatıldı."}
+    # Queue the task (proje başına sıralı; başka projeler beklemez)
+    jobs = pipeline_jobs.enqueue_chain(project_id, step_chain(backend_step), nusha_index, {"dpi": dpi})
+    return {"ok": True, "message": f"{step} adımı kuyruğa alındı.", "jobs": jobs}
+
+class EnqueueJobRequest(BaseModel):
+    kinds: List[str]  # sırayla: ör. ["convert", "segment", "ocr", "align"]
+    nusha_index: int = 1
+    options: Optional[Dict] = None
+
+@app.post("/api/projects/{project_id}/jobs")
+def enqueue_project_jobs(project_id: str, req: EnqueueJobRequest):
+    """İşleri (zincir olarak) kalıcı kuyruğa ekler; proje başına sırayla çalışırlar."""
+    if not req.kinds:
+        raise HTTPException(status_code=400, detail="En az bir iş türü gerekli.")
+    try:
+        return {"jobs": pipeline_jobs.enqueue_chain(project_id, req.kinds, req.nusha_index, req.options)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/projects/{project_id}/jobs")
+def list_project_jobs(project_id: str, limit: int = 50, status: Optional[str] = None):
+    """İş geçmişi (en yeni önce): bekleme / çalışma süreleri, sonuç ve hata."""
+    statuses = status.split(",") if status else None
+    return {"active": pipeline_jobs.active(project_id), "jobs": pipeline_jobs.history(project_id, limit=limit, statuses=statuses)}
+
+@app.post("/api/projects/{project_id}/jobs/cancel")
+def cancel_project_jobs(project_id: str):
+    return {"cancelled": pipeline_jobs.cancel_project(project_id)}
+
+@app.get("/api/jobs")
+def list_jobs(limit: int = 50, status: Optional[str] = None):
+    statuses = status.split(",") if status else None
+    return {"jobs": pipeline_jobs.history(None, limit=limit, statuses=statuses)}
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str):
+    job = pipeline_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/api/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    """Kuyruktaki iş hemen, çalışan iş bir sonraki ilerleme adımında durur; zincirin kalanı iptal edilir."""
+    if not pipeline_jobs.get(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"cancelled": pipeline_jobs.cancel(job_id), "job": pipeline_jobs.get(job_id)}
+
+async def _event_stream(request: Request, project_id: Optional[str]):
+    """
+    SSE: önce anlık durum (snapshot), sonra iş / ilerleme / ön-seslendirme olayları.
+    Abone kuyruğu taşarsa (yavaş istemci) düşen olaylar yerine yeni bir snapshot gönderilir.
+    """
+    sub = progress_bus.subscribe(project_id)
+
+    async def snapshot():
+        if project_id:
+            data = await run_in_threadpool(get_status, project_id)
+        else:
+            data = {"active": await run_in_threadpool(pipeline_jobs.history, None, 200, ["queued", "running"])}
+        return format_sse({"type": "snapshot", "project_id": project_id, "ts": time.time(), **data})
+
+    try:
+        yield await snapshot()
+        dropped = 0
+        while not await request.is_disconnected():
+            event = await sub.aget(EVENTS_HEARTBEAT_S)
+            if sub.dropped != dropped:
+                dropped = sub.dropped
+                yield await snapshot()
+            if event is None:
+                yield ": ping\n\n"
+                continue
+            yield format_sse(event)
+    finally:
+        sub.close()
+
+@app.get("/api/projects/{project_id}/events")
+async def project_events(project_id: str, request: Request):
+    """Projenin ilerleme olayları (text/event-stream); arayüz durum yoklaması yerine abone olur."""
+    return StreamingResponse(_event_stream(request, project_id), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/api/events")
+async def all_events(request: Request):
+    """Bütün projelerin olayları (proje listesi)."""
+    return StreamingResponse(_event_stream(request, None), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.delete("/api/projects/{project_id}/nusha/{nusha_index}/pipeline/{step}")
 def delete_pipeline_step(project_id: str, nusha_index: int, step: str):
@@ -1072,6 +1225,9 @@ def delete_pipeline_step(project_id: str, nusha_index: int, step: str):
             alignment_path = nusha_dir / "alignment.json"
             if alignment_path.exists():
                 alignment_path.unlink()
+                trace_path_for(alignment_path).unlink(missing_ok=True)
+                project_manager.release_nusha_stores(project_id, nusha_index)
+                store_path_for(alignment_path).unlink(missing_ok=True)
                 deleted_items.append("alignment.json")
                 
         elif step == "segmentation":
@@ -1095,6 +1251,9 @@ def delete_pipeline_step(project_id: str, nusha_index: int, step: str):
             alignment_path = nusha_dir / "alignment.json"
             if alignment_path.exists():
                 alignment_path.unlink()
+                trace_path_for(alignment_path).unlink(missing_ok=True)
+                project_manager.release_nusha_stores(project_id, nusha_index)
+                store_path_for(alignment_path).unlink(missing_ok=True)
                 deleted_items.append("alignment.json")
 
         elif step == "text_recognition":
@@ -1108,6 +1267,9 @@ def delete_pipeline_step(project_id: str, nusha_index: int, step: str):
             alignment_path = nusha_dir / "alignment.json"
             if alignment_path.exists():
                 alignment_path.unlink()
+                trace_path_for(alignment_path).unlink(missing_ok=True)
+                project_manager.release_nusha_stores(project_id, nusha_index)
+                store_path_for(alignment_path).unlink(missing_ok=True)
                 deleted_items.append("alignment.json")
                 
         elif step == "alignment":
@@ -1115,9 +1277,15 @@ def delete_pipeline_step(project_id: str, nusha_index: int, step: str):
             alignment_path = nusha_dir / "alignment.json"
             if alignment_path.exists():
                 alignment_path.unlink()
+                trace_path_for(alignment_path).unlink(missing_ok=True)
+                project_manager.release_nusha_stores(project_id, nusha_index)
+                store_path_for(alignment_path).unlink(missing_ok=True)
                 deleted_items.append("alignment.json")
         else:
             raise HTTPException(status_code=400, detail=f"Invalid step: {step}")
+
+        steps = project_manager.PIPELINE_STEPS
+        project_manager.clear_nusha_steps(project_id, nusha_index, list(steps[steps.index(step):]))
         
         return {
             "ok": True,
@@ -1191,7 +1359,7 @@ def _backfill_from_manifest(lines_list: List[Dict], manifest_path: Path):
 @app.get("/api/projects/{project_id}/mukabele-data")
 def get_mukabele_data(project_id: str):
     try:
-        # Initialize structure
+        # Initialize structure (N2-N4 keys always present for older clients)
         final_data = {
             "aligned": [],
             "aligned_alt": [],
@@ -1214,41 +1382,6 @@ def get_mukabele_data(project_id: str):
         except:
             pass
 
-        # Helper to load from nusha dir without failing (now uses DB first)
-        def load_nusha(n_idx):
-            return project_manager.get_nusha_alignment(project_id, n_idx)
-
-        # Load N1 (Primary)
-        # Priority: DB -> Nusha 1 specific -> Legacy root alignment.json
-        n1_data = load_nusha(1)
-        if n1_data:
-            final_data["aligned"] = n1_data
-        
-        # Load others
-        final_data["aligned_alt"] = load_nusha(2)
-        final_data["aligned_alt3"] = load_nusha(3)
-        final_data["aligned_alt4"] = load_nusha(4)
-        
-        # --- FIX 1: Backfill BBox & Page Data from Manifest ---
-        # Only needed if direct alignment JSON is missing this info (it usually is)
-        
-        # Nusha 1
-        n1_manifest = project_manager.get_nusha_dir(project_id, 1) / "lines_manifest.jsonl"
-        _backfill_from_manifest(final_data["aligned"], n1_manifest)
-        
-        # Nusha 2
-        n2_manifest = project_manager.get_nusha_dir(project_id, 2) / "lines_manifest.jsonl"
-        _backfill_from_manifest(final_data["aligned_alt"], n2_manifest)
-        
-        # Nusha 3
-        n3_manifest = project_manager.get_nusha_dir(project_id, 3) / "lines_manifest.jsonl"
-        _backfill_from_manifest(final_data["aligned_alt3"], n3_manifest)
-        
-        # Nusha 4
-        n4_manifest = project_manager.get_nusha_dir(project_id, 4) / "lines_manifest.jsonl"
-        _backfill_from_manifest(final_data["aligned_alt4"], n4_manifest)
-
-        
         # FILTER OUT PREFACE LINES (GİRİŞ KISMI) FROM ALL ALIGNED DATA
         # These are lines marked as outside alignment scope
         def filter_preface(lines):
@@ -1257,16 +1390,29 @@ def get_mukabele_data(project_id: str):
                 line for line in lines 
                 if not (line.get('best', {}).get('raw', '').strip() == '--- [GİRİŞ KISMI / HİZALAMA DIŞI] ---')
             ]
-        
-        final_data["aligned"] = filter_preface(final_data["aligned"])
 
-        final_data["aligned_alt"] = filter_preface(final_data["aligned_alt"])
-        final_data["aligned_alt3"] = filter_preface(final_data["aligned_alt3"])
-        final_data["aligned_alt4"] = filter_preface(final_data["aligned_alt4"])
-        
-        final_data["has_alt"] = len(final_data["aligned_alt"]) > 0
-        final_data["has_alt3"] = len(final_data["aligned_alt3"]) > 0
-        final_data["has_alt4"] = len(final_data["aligned_alt4"]) > 0
+        # Load every nusha present in the project (DB first), N1 is the primary
+        witness_list = []
+        for n_idx in sorted(set(project_manager.list_nusha_indices(project_id)) | {1}):
+            lines = project_manager.get_nusha_alignment(project_id, n_idx) or []
+
+            # --- FIX 1: Backfill BBox & Page Data from Manifest ---
+            # Only needed if direct alignment JSON is missing this info (it usually is)
+            try:
+                manifest = project_manager.get_nusha_dir(project_id, n_idx) / "lines_manifest.jsonl"
+                _backfill_from_manifest(lines, manifest)
+            except FileNotFoundError:
+                pass
+
+            lines = filter_preface(lines)
+            final_data[witness_key(n_idx)] = lines
+            if n_idx > 1:
+                final_data[has_key(n_idx)] = len(lines) > 0
+            if lines or n_idx == 1:
+                witness_list.append(n_idx)
+        final_data["witness_indices"] = witness_list
+        # Link fields carry v2 references; see /nusha/{k}/lines/{line_no}/links
+        final_data["format_version"] = FORMAT_VERSION
 
         # Only fallback to mukabele.json if absolutely no data found in N1
         if not final_data["aligned"]:
@@ -1297,7 +1443,14 @@ def get_mukabele_data(project_id: str):
         # process_highlighting expects spellcheck data.
         # We need to find where spellcheck data is. Likely in Nusha 1 alignment or root.
         root_align = project_manager.projects_dir / project_id / "alignment.json"
-        if root_align.exists():
+        project_sc = project_manager.project_spellcheck_path(project_id)
+        if project_sc.exists():
+             # Proje bazlı (artımlı tazelenen) imla sonuçları
+             with open(project_sc, "r", encoding="utf-8") as f:
+                 sc = json.load(f)
+                 if isinstance(sc.get("per_paragraph"), list):
+                     final_data["spellcheck_per_paragraph"] = sc["per_paragraph"]
+        elif root_align.exists():
              with open(root_align, "r", encoding="utf-8") as f:
                  d = json.load(f)
                  if "spellcheck_per_paragraph" in d:
@@ -1355,8 +1508,65 @@ def get_pages(project_id: str, nusha_index: int = 1):
 
 # ... (API endpoints)
 
+@app.get("/api/projects/{project_id}/nusha/{nusha_index}/lines")
+def get_nusha_lines(project_id: str, nusha_index: int, page: Optional[str] = None, start: Optional[int] = None, end: Optional[int] = None):
+    """Lines of one page (page_name) or line_no range [start, end), served from the mmap'ed columnar store."""
+    try:
+        return project_manager.get_nusha_lines_slice(project_id, nusha_index, page=page, start=start, end=end)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        print(f"[API] Nusha Lines Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/projects/{project_id}/nusha/{nusha_index}/page-index")
+def get_nusha_page_index(project_id: str, nusha_index: int):
+    """Page names in reading order with their line counts (no line payloads)."""
+    try:
+        return {"pages": project_manager.get_nusha_page_index(project_id, nusha_index)}
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        print(f"[API] Page Index Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/projects/{project_id}/nusha/{nusha_index}/lines/overlap")
+def get_overlapping_lines(project_id: str, nusha_index: int, start: int, end: int, max_keep: Optional[int] = None):
+    """Lines of the given nusha whose reference token span overlaps [start, end)."""
+    try:
+        lines = project_manager.get_overlapping_lines(project_id, nusha_index, start, end, max_keep=max_keep)
+        return {"lines": lines}
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        print(f"[API] Overlap Lines Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/projects/{project_id}/witness-pairs/{nusha_a}/{nusha_b}")
+def get_witness_pair_links(project_id: str, nusha_a: int, nusha_b: int, max_keep: int = 6):
+    """Exact OCR↔OCR links and line skips between two nushas, computed on demand (pair-cached)."""
+    try:
+        return project_manager.get_witness_pair_links(project_id, nusha_a, nusha_b, max_keep=max_keep)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        print(f"[API] Witness Pair Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/projects/{project_id}/nusha/{nusha_index}/lines/{line_no}/links")
+def get_line_links(project_id: str, nusha_index: int, line_no: int):
+    """Cross-nusha links of one line with payload v2 references resolved lazily."""
+    try:
+        links = project_manager.get_line_links(project_id, nusha_index, line_no)
+    except Exception as e:
+        print(f"[API] Line Links Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if links is None:
+        raise HTTPException(status_code=404, detail="Line not found")
+    return {"nusha_index": nusha_index, "line_no": line_no, "links": links}
+
 @app.post("/api/projects/{project_id}/lines/update")
-def update_line(project_id: str, req: UpdateLineRequest):
+def update_line(project_id: str, req: UpdateLineRequest, background_tasks: BackgroundTasks):
     try:
         # If content_html is provided but new_text is missing/empty, derive text from HTML
         text_to_save = req.new_text
@@ -1373,6 +1583,9 @@ def update_line(project_id: str, req: UpdateLineRequest):
         )
         
         if success:
+            # Nusha 1 is the live reference of the other nushas
+            if req.nusha_index == 1:
+                background_tasks.add_task(project_manager.propagate_reference_edit, project_id)
             return {"ok": True}
         else:
             raise HTTPException(status_code=404, detail="Line not found or save failed")
@@ -1432,9 +1645,11 @@ class MergeLinesRequest(BaseModel):
     line_numbers: List[int]
 
 @app.post("/api/projects/{project_id}/lines/merge")
-def merge_lines(project_id: str, req: MergeLinesRequest):
+def merge_lines(project_id: str, req: MergeLinesRequest, background_tasks: BackgroundTasks):
     try:
         result = project_manager.merge_nusha_lines(project_id, req.nusha_index, req.line_numbers)
+        if req.nusha_index == 1:
+            background_tasks.add_task(project_manager.propagate_reference_edit, project_id)
         return {"ok": True, "lines": result.get("lines")}
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -1449,7 +1664,7 @@ class ShiftLineRequest(BaseModel):
     split_index: int # Index in the raw string to split at
 
 @app.post("/api/projects/{project_id}/lines/shift")
-def shift_line(project_id: str, req: ShiftLineRequest):
+def shift_line(project_id: str, req: ShiftLineRequest, background_tasks: BackgroundTasks):
     try:
         result = project_manager.shift_line_content(
             project_id, 
@@ -1459,6 +1674,8 @@ def shift_line(project_id: str, req: ShiftLineRequest):
             req.split_index
         )
         if result.get("success"):
+            if req.nusha_index == 1:
+                background_tasks.add_task(project_manager.propagate_reference_edit, project_id)
             return {"ok": True}
         else:
             raise HTTPException(status_code=400, detail=result.get("error"))
@@ -1487,6 +1704,75 @@ def tts_generate(req: TTSRequest):
         return JSONResponse(status_code=500, content={"error": str(e), "traceback": traceback.format_exc()})
 
 
+class TTSPrerenderRequest(BaseModel):
+    nusha_index: int = 1
+    speaking_rate: float = 1.0
+    focus_page: Optional[str] = None
+
+class TTSPrerenderFocusRequest(BaseModel):
+    page_key: Optional[str] = None
+
+@app.post("/api/projects/{project_id}/tts/prerender")
+def start_tts_prerender(project_id: str, req: Optional[TTSPrerenderRequest] = None):
+    """Projenin bütün sayfalarını arka planda seslendirir (hazır sayfalar atlanır)."""
+    req = req or TTSPrerenderRequest()
+    try:
+        return prerender_jobs.start(project_id, nusha_index=req.nusha_index, speaking_rate=req.speaking_rate, focus_page=req.focus_page)
+    except FileNotFoundError as e:
+        return JSONResponse(status_code=404, content={"error": str(e)})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+@app.post("/api/projects/{project_id}/tts/prerender/focus")
+def focus_tts_prerender(project_id: str, req: TTSPrerenderFocusRequest):
+    """Editörün açık sayfası: ön-seslendirme sırası bu sayfanın etrafından devam eder."""
+    prerender_jobs.focus(project_id, req.page_key)
+    return {"ok": True}
+
+@app.post("/api/projects/{project_id}/tts/prerender/cancel")
+def cancel_tts_prerender(project_id: str):
+    return {"cancelled": prerender_jobs.cancel(project_id)}
+
+@app.get("/api/projects/{project_id}/tts/prerender")
+def get_tts_prerender_state(project_id: str):
+    return prerender_jobs.state(project_id)
+
+
+@app.post("/api/tts/stream")
+def tts_stream(req: TTSRequest):
+    """Segmentler hazır oldukça NDJSON (ses URL'i + vurgulama için token aralığı)."""
+    return StreamingResponse(tts_service.stream_tts_request(req.model_dump()), media_type="application/x-ndjson")
+
+
+@app.get("/api/audio/{name}")
+def tts_audio(name: str, request: Request):
+    """İçerik adresli ses dosyası: ETag = özet (değişmez), Range destekli."""
+    digest = name.rsplit(".", 1)[0]
+    path = tts_service._get_audio_store().path_for(digest)
+    if path is None or not path.exists():
+        raise HTTPException(status_code=404, detail="Audio not found")
+    headers = {
+        "ETag": f'"{digest}"',
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "Accept-Ranges": "bytes",
+    }
+    inm = request.headers.get("if-none-match") or ""
+    if inm.strip() == "*" or f'"{digest}"' in [t.strip().removeprefix("W/") for t in inm.split(",")]:
+        return Response(status_code=304, headers=headers)
+    size = path.stat().st_size
+    try:
+        rng = parse_range(request.headers.get("range"), size)
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    if rng is None:
+        return Response(content=path.read_bytes(), media_type="audio/mpeg", headers=headers)
+    start, end = rng
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start + 1)
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return Response(content=data, status_code=206, media_type="audio/mpeg", headers=headers)
+
 
 if __name__ == "__main__":
     uvicorn.run("src.api_server:app", host="0.0.0.0", port=8000, reload=True)
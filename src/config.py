@@ -29,6 +29,8 @@ LEN_MAX_ABS = 36
 W_MAIN = 0.72
 W_PREFIX = 0.28
 PREFIX_WORDS = 4
+# Hizalama izi: off | summary | full (align_trace). İz alignment.trace.json'a yazılır.
+ALIGN_TRACE_LEVEL = (os.getenv("ALIGN_TRACE_LEVEL", "summary") or "summary").strip().lower()
 
 # --- AI & Spellcheck ---
 ENABLE_SPELLCHECK_DEFAULT = True
@@ -41,6 +43,28 @@ VERTEX_GEMINI_MODEL = (os.getenv("VERTEX_GEMINI_MODEL", "gemini-3-pro-preview")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
 CLAUDE_MODEL = os.getenv("CLAUDE_MODEL", "claude-3-5-sonnet-20240620")
 SPELLCHECK_MAX_PARAS = 999999
+# Eşzamanlı spellcheck (spellcheck_executor): sağlayıcı başına eşzamanlılık, dakikada istek/token (0 = sınırsız)
+SPELLCHECK_LIMITS = {
+    "gemini": {
+        "concurrency": int(os.getenv("SPELLCHECK_GEMINI_CONCURRENCY", "4") or "4"),
+        "rpm": int(os.getenv("SPELLCHECK_GEMINI_RPM", "60") or "60"),
+        "tpm": int(os.getenv("SPELLCHECK_GEMINI_TPM", "0") or "0"),
+    },
+    "openai": {
+        "concurrency": int(os.getenv("SPELLCHECK_OPENAI_CONCURRENCY", "4") or "4"),
+        "rpm": int(os.getenv("SPELLCHECK_OPENAI_RPM", "60") or "60"),
+        "tpm": int(os.getenv("SPELLCHECK_OPENAI_TPM", "0") or "0"),
+    },
+    "claude": {
+        "concurrency": int(os.getenv("SPELLCHECK_CLAUDE_CONCURRENCY", "2") or "2"),
+        "rpm": int(os.getenv("SPELLCHECK_CLAUDE_RPM", "50") or "50"),
+        "tpm": int(os.getenv("SPELLCHECK_CLAUDE_TPM", "0") or "0"),
+    },
+}
+SPELLCHECK_MAX_ATTEMPTS = int(os.getenv("SPELLCHECK_MAX_ATTEMPTS", "4") or "4")
+# Kısa paragrafları tek istekte toplama: paket başına paragraf metni token bütçesi (0 = kapalı)
+SPELLCHECK_BATCH_TOKENS = int(os.getenv("SPELLCHECK_BATCH_TOKENS", "1200") or "0")
+SPELLCHECK_BATCH_MAX_PARAS = int(os.getenv("SPELLCHECK_BATCH_MAX_PARAS", "12") or "1")
 
 # =========================
 # OUTPUT DIRECTORIES
@@ -50,6 +74,7 @@ PROJECTS_DIR = BASE_DIR / "tahkik_data" / "projects"
 OUT = BASE_DIR / "output_lines"
 
 # --- MAIN NUSHA (Nüsha 1) ---
+# (output_lines düzeni; proje bazlı çalıştırmalar project_context.ProjectContext kullanır)
 PAGES_DIR = OUT / "pages"
 LINES_DIR = OUT / "lines"
 OCR_DIR = OUT / "ocr"
@@ -65,7 +90,48 @@ INDEX_HTML = OUT / "index.html"
 
 SPELLCHECK_JSON = OUT / "spellcheck.json"
 SPELLCHECK_BACKUPS_DIR = OUT / "spellcheck_backups"
+# Çalışma sırasında paragraf paragraf yazılan ilerleme dosyası (çökme sonrası devam için)
+SPELLCHECK_PARTIAL_JSONL = OUT / "spellcheck.partial.jsonl"
 DOC_ARCHIVES_DIR = OUT / "doc_archives"
+# Nüsha çifti OCR↔OCR hizalama önbelleği (witness_pairs.WitnessPairCache); ilk yazımda oluşturulur
+PAIR_ALIGN_CACHE_DIR = OUT / "pair_alignments"
+# Bellekte tutulan çift sayısı (klasör başına, LRU) ve disk klasörü sınırları (0 = sınırsız)
+PAIR_ALIGN_CACHE_MEM_ENTRIES = int(os.getenv("PAIR_ALIGN_CACHE_MEM_ENTRIES", "64") or "64")
+PAIR_ALIGN_CACHE_MAX_MB = int(os.getenv("PAIR_ALIGN_CACHE_MAX_MB", "128") or "0")
+PAIR_ALIGN_CACHE_MAX_AGE_DAYS = float(os.getenv("PAIR_ALIGN_CACHE_MAX_AGE_DAYS", "30") or "0")
+# LLM imla cevap önbelleği (llm_cache.LLMResponseCache); projeler arasında ortak
+LLM_CACHE_DB = OUT / "llm_cache.sqlite"
+LLM_CACHE_ENABLED = (os.getenv("LLM_CACHE_ENABLED", "1") or "1").strip().lower() not in ("0", "false", "no")
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "256") or "256")
+# Sağlayıcı taşıyıcısı (llm_transport): live | record (kasete yazar) | replay (ağsız, kasetten)
+LLM_TRANSPORT_MODE = (os.getenv("LLM_TRANSPORT_MODE", "live") or "live").strip().lower()
+LLM_CASSETTE = Path(os.getenv("LLM_CASSETTE") or (OUT / "llm_cassette.jsonl"))
+LLM_REPLAY_LATENCY_MS = float(os.getenv("LLM_REPLAY_LATENCY_MS", "0") or "0")
+LLM_REPLAY_ERROR_RATE = float(os.getenv("LLM_REPLAY_ERROR_RATE", "0") or "0")
+LLM_REPLAY_RPM = int(os.getenv("LLM_REPLAY_RPM", "0") or "0")
+LLM_REPLAY_SEED = int(os.getenv("LLM_REPLAY_SEED", "0") or "0")
+# TTS boru hattı (services/tts_pipeline): sağlayıcı başına eşzamanlı çağrı sınırı (süreç geneli)
+TTS_VOCALIZE_CONCURRENCY = int(os.getenv("TTS_VOCALIZE_CONCURRENCY", "4") or "4")
+TTS_SYNTH_CONCURRENCY = int(os.getenv("TTS_SYNTH_CONCURRENCY", "4") or "4")
+# İçerik adresli ses deposu (services/audio_store): MP3 dosyaları + index.sqlite
+AUDIO_STORE_DIR = Path(os.getenv("AUDIO_STORE_DIR") or (OUT / "audio_store"))
+# Arka plan ön-seslendirme (services/tts_prerender): iş başına sağlayıcı bütçesi (sentezlenen
+# karakter, 0 = sınırsız) ve sağlayıcı başına eşzamanlı çağrı (etkileşimli isteklere yer kalsın)
+TTS_PRERENDER_CHAR_BUDGET = int(os.getenv("TTS_PRERENDER_CHAR_BUDGET", "500000") or "0")
+TTS_PRERENDER_CONCURRENCY = int(os.getenv("TTS_PRERENDER_CONCURRENCY", "1") or "1")
+# TTS harekeleme izleri (trace_sinks): varsayılan kapalı; "jsonl", "jsonl,html,docx" ...
+# Kayıtlar sınırlı kuyruktan arka plan thread'iyle yazılır (kuyruk dolarsa atılır)
+TTS_TRACE = (os.getenv("TTS_TRACE", "") or "").strip().lower()
+TTS_TRACE_DIR = Path(os.getenv("TTS_TRACE_DIR") or (OUT / "traces"))
+TTS_TRACE_QUEUE_SIZE = int(os.getenv("TTS_TRACE_QUEUE_SIZE", "1000") or "1000")
+# HTML / DOCX raporu her bu kadar kayıtta JSONL izinden yeniden üretilir (ayrıca flush/kapanışta)
+TTS_TRACE_REPORT_EVERY = int(os.getenv("TTS_TRACE_REPORT_EVERY", "200") or "0")
+# İş kuyruğu (services/pipeline_jobs): kaynak sınıfı başına işçi sayısı (cpu: PDF/Kraken/hizalama,
+# io: Vision OCR / LLM / dışa aktarma), başarısız iş için toplam deneme ve denemeler arası bekleme
+JOB_WORKERS_CPU = int(os.getenv("JOB_WORKERS_CPU", "1") or "1")
+JOB_WORKERS_IO = int(os.getenv("JOB_WORKERS_IO", "4") or "4")
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "2") or "2")
+JOB_RETRY_DELAY_S = float(os.getenv("JOB_RETRY_DELAY_S", "5") or "5")
 DOC_ARCHIVE_KEEP = int(os.getenv("DOC_ARCHIVE_KEEP", "15") or "15")
 
 # --- NUSHA 2 ---
@@ -89,28 +155,11 @@ NUSHA4_LINES_DIR = NUSHA4_OUT / "lines"
 NUSHA4_OCR_DIR = NUSHA4_OUT / "ocr"
 NUSHA4_LINES_MANIFEST = NUSHA4_OUT / "lines_manifest.jsonl"
 
-# Klasörleri Oluştur
-for p in [OUT, PAGES_DIR, LINES_DIR, OCR_DIR, AUDIO_DIR, SPELLCHECK_BACKUPS_DIR, DOC_ARCHIVES_DIR]:
-    p.mkdir(exist_ok=True)
-
-for p in [NUSHA2_OUT, NUSHA2_PAGES_DIR, NUSHA2_LINES_DIR, NUSHA2_OCR_DIR]:
-    p.mkdir(exist_ok=True)
-
-for p in [NUSHA3_OUT, NUSHA3_PAGES_DIR, NUSHA3_LINES_DIR, NUSHA3_OCR_DIR]:
-    p.mkdir(exist_ok=True)
-
-for p in [NUSHA4_OUT, NUSHA4_PAGES_DIR, NUSHA4_LINES_DIR, NUSHA4_OCR_DIR]:
-    p.mkdir(exist_ok=True)
-
-# =========================
-# HELPER: NUSHA MAP
-# =========================
-NUSHA_MAP = {
-    1: OUT,          # output_lines/
-    2: NUSHA2_OUT,   # output_lines/nusha2/
-    3: NUSHA3_OUT,   # output_lines/nusha3/
-    4: NUSHA4_OUT    # output_lines/nusha4/
-}
+# Masaüstü GUI / viewer için nüsha viewer sayfaları
+NUSHA2_VIEWER_HTML = NUSHA2_OUT / "viewer.html"
+NUSHA3_VIEWER_HTML = NUSHA3_OUT / "viewer.html"
+NUSHA4_VIEWER_HTML = NUSHA4_OUT / "viewer.html"
 
-def get_nusha_out_dir(nusha_index: int) -> Path:
-    return NUSHA_MAP.get(nusha_index, OUT)
\ No newline at end of file
+# Yukarıdaki yollar eski output_lines düzeninin (project_context.default_context) sabitleridir;
+# import sırasında klasör oluşturulmaz. Pipeline / hizalama / OCR / arşiv kodu yolları
+# project_context.ProjectContext'ten alır (klasörler ilk yazımda ya da ensure_dirs ile oluşur).
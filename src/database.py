@@ -1,9 +1,12 @@
 import sqlite3
 import json
 import logging
+import hashlib
+import time
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from src.config import PROJECTS_DIR
+from src.payload_v2 import compact_line
 
 logger = logging.getLogger(__name__)
 
@@ -123,6 +126,27 @@ class DatabaseManager:
             except Exception as e:
                 logger.error(f"Migration failed (content_html): {e}")
         
+        # 3b. Line revisions: bumped by triggers on every aligned_lines write, so derived
+        # caches (e.g. the columnar alignment store) can detect staleness with one lookup.
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS line_revisions (
+                project_id TEXT,
+                nusha_index INTEGER,
+                rev INTEGER DEFAULT 0,
+                PRIMARY KEY(project_id, nusha_index)
+            )
+        """)
+        for event, ref in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS aligned_lines_rev_{event.lower()}
+                AFTER {event} ON aligned_lines
+                BEGIN
+                    INSERT INTO line_revisions (project_id, nusha_index, rev)
+                    VALUES ({ref}.project_id, {ref}.nusha_index, 1)
+                    ON CONFLICT(project_id, nusha_index) DO UPDATE SET rev = rev + 1;
+                END
+            """)
+
         # 4. Footnotes
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS footnotes (
@@ -138,6 +162,95 @@ class DatabaseManager:
             )
         """)
         
+        # 5. Word spellcheck jobs + per-paragraph results (streamed, survive restarts)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS spellcheck_jobs (
+                job_id TEXT PRIMARY KEY,
+                project_id TEXT,
+                status TEXT, -- running | completed | cancelled | failed | interrupted
+                options_json TEXT,
+                total INTEGER DEFAULT 0,
+                done INTEGER DEFAULT 0,
+                message TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_spellcheck_jobs_project ON spellcheck_jobs(project_id, created_at)")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS spellcheck_paragraphs (
+                project_id TEXT,
+                paragraph_index INTEGER,
+                job_id TEXT,
+                seq INTEGER, -- per-project monotonic cursor for streaming
+                entry_json TEXT, -- per_paragraph entry (text, errors, fp, providers)
+                PRIMARY KEY(project_id, paragraph_index)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_spellcheck_paragraphs_seq ON spellcheck_paragraphs(project_id, seq)")
+
+        # 6. TTS pre-render jobs (page progress lives in the audio store's page index)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS tts_prerender_jobs (
+                job_id TEXT PRIMARY KEY,
+                project_id TEXT,
+                status TEXT, -- running | completed | cancelled | failed | interrupted | budget_exhausted
+                options_json TEXT,
+                total INTEGER DEFAULT 0,
+                done INTEGER DEFAULT 0,
+                message TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tts_prerender_jobs_project ON tts_prerender_jobs(project_id, created_at)")
+
+        # 7. Pipeline job queue (convert/segment/ocr/align/spellcheck/export; survives restarts)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS pipeline_jobs (
+                job_id TEXT PRIMARY KEY,
+                project_id TEXT,
+                kind TEXT,
+                resource TEXT, -- cpu | io (worker pool)
+                nusha_index INTEGER,
+                group_id TEXT, -- chained steps; a failed/cancelled step cancels the rest
+                status TEXT, -- queued | running | completed | failed | cancelled
+                options_json TEXT,
+                result_json TEXT,
+                attempts INTEGER DEFAULT 0,
+                max_attempts INTEGER DEFAULT 1,
+                progress INTEGER DEFAULT 0,
+                message TEXT,
+                error TEXT,
+                created_at REAL, -- epoch seconds (timings)
+                started_at REAL,
+                finished_at REAL,
+                not_before REAL DEFAULT 0 -- retry backoff
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_pipeline_jobs_project ON pipeline_jobs(project_id, created_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_pipeline_jobs_status ON pipeline_jobs(status, created_at)")
+
+        # 8. Stage-completion ledger (what each pipeline stage produced, per page; replaces directory scans)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS stage_ledger (
+                project_id TEXT,
+                nusha_index INTEGER,
+                stage TEXT, -- pages | segmentation | text_recognition | alignment
+                unit TEXT, -- page key (page image stem); '' = the stage run as a whole
+                status TEXT, -- running | completed | failed
+                output_count INTEGER, -- pages: 1, segmentation: lines, text_recognition: OCR'd lines, alignment: lines
+                total_count INTEGER,
+                settings_json TEXT, -- dpi / model / engine ... that produced the output
+                settings_hash TEXT, -- NULL = unknown (rebuilt from disk)
+                source TEXT, -- run | reconcile
+                error TEXT,
+                produced_at REAL, -- epoch seconds
+                PRIMARY KEY (project_id, nusha_index, stage, unit)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_stage_ledger_status ON stage_ledger(project_id, nusha_index, stage, status)")
+
         conn.commit()
         conn.close()
 
@@ -288,29 +401,7 @@ class DatabaseManager:
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """
             
-            params = []
-            for line in lines:
-                line_no = line.get("line_no")
-                ocr_text = line.get("ocr_text", "")
-                image_path = line.get("line_image", "")
-                
-                best = line.get("best", {})
-                ref_text = best.get("raw", "")
-                content_html = best.get("html", ref_text) # Default to ref_text if no html
-                
-                # Meta includes everything else
-                meta = {k: v for k, v in line.items() if k not in ["line_no", "ocr_text", "line_image"]}
-                
-                params.append((
-                    project_id, 
-                    nusha_index, 
-                    line_no, 
-                    ref_text,
-                    content_html, 
-                    ocr_text, 
-                    image_path, 
-                    json.dumps(meta, ensure_ascii=False)
-                ))
+            params = [self._line_to_params(project_id, nusha_index, line) for line in lines]
                 
             conn.executemany(sql, params)
             conn.commit()
@@ -320,6 +411,105 @@ class DatabaseManager:
         finally:
             conn.close()
 
+    def update_aligned_lines(self, project_id: str, nusha_index: int, lines: List[Dict]):
+        """
+        Upserts ONLY the given lines (by line_no), leaving every other row untouched.
+        Unlike upsert_lines_batch, soft-delete state of existing rows is preserved.
+        Used by incremental re-alignment and single-line edits.
+        """
+        if not lines:
+            return
+        conn = self.get_connection()
+        try:
+            conn.execute("BEGIN TRANSACTION")
+            sql = """
+                INSERT INTO aligned_lines (project_id, nusha_index, line_no, ref_text, content_html, ocr_text, image_path, meta_json)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(project_id, nusha_index, line_no) DO UPDATE SET
+                    ref_text=excluded.ref_text,
+                    content_html=excluded.content_html,
+                    ocr_text=excluded.ocr_text,
+                    image_path=excluded.image_path,
+                    meta_json=excluded.meta_json
+            """
+            params = [self._line_to_params(project_id, nusha_index, line) for line in lines]
+            conn.executemany(sql, params)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
+    def _line_to_params(self, project_id: str, nusha_index: int, line: Dict) -> tuple:
+        """
+        alignment.json line -> aligned_lines row params (INSERT column order).
+        """
+        best = line.get("best", {})
+        ref_text = best.get("raw", "")
+        content_html = best.get("html", ref_text) # Default to ref_text if no html
+        
+        # Meta includes everything else (cross-nusha links as v2 references, not copies)
+        meta = {k: v for k, v in compact_line(line, nusha_index).items() if k not in ["line_no", "ocr_text", "line_image"]}
+        
+        return (
+            project_id, 
+            nusha_index, 
+            line.get("line_no"), 
+            ref_text,
+            content_html, 
+            line.get("ocr_text", ""), 
+            line.get("line_image", ""), 
+            json.dumps(meta, ensure_ascii=False)
+        )
+
+    def compact_aligned_meta(self) -> Tuple[int, int, int]:
+        """
+        One-shot v1 -> v2 rewrite of aligned_lines.meta_json (cross-nusha link copies -> references).
+        Returns: (rewritten_rows, bytes_before, bytes_after)
+        """
+        conn = self.get_connection()
+        rewritten = before = after = 0
+        try:
+            rows = conn.execute(
+                "SELECT project_id, nusha_index, line_no, meta_json FROM aligned_lines"
+            ).fetchall()
+            conn.execute("BEGIN TRANSACTION")
+            for row in rows:
+                old = row["meta_json"] or ""
+                if not old:
+                    continue
+                new = json.dumps(compact_line(json.loads(old), row["nusha_index"]), ensure_ascii=False)
+                before += len(old.encode("utf-8"))
+                after += len(new.encode("utf-8"))
+                if new != old:
+                    conn.execute(
+                        "UPDATE aligned_lines SET meta_json=? WHERE project_id=? AND nusha_index=? AND line_no=?",
+                        (new, row["project_id"], row["nusha_index"], row["line_no"]),
+                    )
+                    rewritten += 1
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+        return rewritten, before, after
+
+    def get_lines_revision(self, project_id: str, nusha_index: int) -> Optional[int]:
+        """
+        Monotonic revision of a nusha's aligned_lines (None if never written to the DB).
+        """
+        conn = self.get_connection()
+        try:
+            row = conn.execute(
+                "SELECT rev FROM line_revisions WHERE project_id=? AND nusha_index=?",
+                (project_id, nusha_index),
+            ).fetchone()
+            return row["rev"] if row else None
+        finally:
+            conn.close()
+
     def get_aligned_lines(self, project_id: str, nusha_index: int) -> List[Dict]:
         """
         Reconstructs the alignment.json 'aligned' list from DB.
@@ -442,7 +632,449 @@ class DatabaseManager:
         conn = self.get_connection()
         try:
             conn.execute("DELETE FROM aligned_lines WHERE project_id=? AND nusha_index=?", (project_id, nusha_index))
+            conn.execute("DELETE FROM stage_ledger WHERE project_id=? AND nusha_index=?", (project_id, nusha_index))
             conn.execute("DELETE FROM nushas WHERE project_id=? AND nusha_index=?", (project_id, nusha_index))
             conn.commit()
         finally:
             conn.close()
+
+    # --- Background Jobs (spellcheck_jobs, tts_prerender_jobs: same columns) ---
+
+    _JOB_TABLES = ("spellcheck_jobs", "tts_prerender_jobs")
+
+    def _create_job(self, table: str, job_id: str, project_id: str, options: Dict):
+        assert table in self._JOB_TABLES
+        conn = self.get_connection()
+        try:
+            conn.execute(f"""
+                INSERT INTO {table} (job_id, project_id, status, options_json, message)
+                VALUES (?, ?, 'running', ?, '')
+            """, (job_id, project_id, json.dumps(options, ensure_ascii=False)))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _update_job(self, table: str, job_id: str, **fields):
+        assert table in self._JOB_TABLES
+        cols = [k for k in ("status", "total", "done", "message") if k in fields]
+        if not cols:
+            return
+        conn = self.get_connection()
+        try:
+            sets = ", ".join(f"{c}=?" for c in cols)
+            conn.execute(
+                f"UPDATE {table} SET {sets}, updated_at=CURRENT_TIMESTAMP WHERE job_id=?",
+                tuple(fields[c] for c in cols) + (job_id,),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _job_row_to_dict(self, row: sqlite3.Row) -> Dict:
+        return {
+            "job_id": row["job_id"],
+            "project_id": row["project_id"],
+            "status": row["status"],
+            "options": json.loads(row["options_json"]) if row["options_json"] else {},
+            "total": row["total"],
+            "done": row["done"],
+            "message": row["message"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+    def _get_job(self, table: str, job_id: str) -> Optional[Dict]:
+        assert table in self._JOB_TABLES
+        conn = self.get_connection()
+        try:
+            row = conn.execute(f"SELECT * FROM {table} WHERE job_id=?", (job_id,)).fetchone()
+            return self._job_row_to_dict(row) if row else None
+        finally:
+            conn.close()
+
+    def _get_latest_job(self, table: str, project_id: str) -> Optional[Dict]:
+        assert table in self._JOB_TABLES
+        conn = self.get_connection()
+        try:
+            row = conn.execute(f"""
+                SELECT * FROM {table} WHERE project_id=?
+                ORDER BY created_at DESC, rowid DESC LIMIT 1
+            """, (project_id,)).fetchone()
+            return self._job_row_to_dict(row) if row else None
+        finally:
+            conn.close()
+
+    def _mark_interrupted_jobs(self, table: str) -> List[Dict]:
+        """Marks jobs left 'running' by a previous process as 'interrupted' (resumable); returns them."""
+        assert table in self._JOB_TABLES
+        conn = self.get_connection()
+        try:
+            rows = conn.execute(f"SELECT * FROM {table} WHERE status='running'").fetchall()
+            conn.execute(f"""
+                UPDATE {table} SET status='interrupted', updated_at=CURRENT_TIMESTAMP
+                WHERE status='running'
+            """)
+            conn.commit()
+            return [dict(self._job_row_to_dict(r), status="interrupted") for r in rows]
+        finally:
+            conn.close()
+
+    # --- Spellcheck Jobs ---
+
+    def create_spellcheck_job(self, job_id: str, project_id: str, options: Dict):
+        self._create_job("spellcheck_jobs", job_id, project_id, options)
+
+    def update_spellcheck_job(self, job_id: str, **fields):
+        """fields: status, total, done, message"""
+        self._update_job("spellcheck_jobs", job_id, **fields)
+
+    def get_spellcheck_job(self, job_id: str) -> Optional[Dict]:
+        return self._get_job("spellcheck_jobs", job_id)
+
+    def get_latest_spellcheck_job(self, project_id: str) -> Optional[Dict]:
+        return self._get_latest_job("spellcheck_jobs", project_id)
+
+    def mark_interrupted_spellcheck_jobs(self) -> int:
+        """Marks jobs left 'running' by a previous process as 'interrupted' (resumable)."""
+        return len(self._mark_interrupted_jobs("spellcheck_jobs"))
+
+    # --- TTS Pre-render Jobs ---
+
+    def create_tts_prerender_job(self, job_id: str, project_id: str, options: Dict):
+        self._create_job("tts_prerender_jobs", job_id, project_id, options)
+
+    def update_tts_prerender_job(self, job_id: str, **fields):
+        """fields: status, total, done, message"""
+        self._update_job("tts_prerender_jobs", job_id, **fields)
+
+    def get_tts_prerender_job(self, job_id: str) -> Optional[Dict]:
+        return self._get_job("tts_prerender_jobs", job_id)
+
+    def get_latest_tts_prerender_job(self, project_id: str) -> Optional[Dict]:
+        return self._get_latest_job("tts_prerender_jobs", project_id)
+
+    def mark_interrupted_tts_prerender_jobs(self) -> List[Dict]:
+        """Running pre-render jobs of a previous process -> 'interrupted'; returned for auto-resume."""
+        return self._mark_interrupted_jobs("tts_prerender_jobs")
+
+    # --- Pipeline Job Queue ---
+
+    _PIPELINE_JOB_FIELDS = ("status", "result", "attempts", "progress", "message", "error", "started_at", "finished_at", "not_before")
+
+    def create_pipeline_job(self, job: Dict):
+        conn = self.get_connection()
+        try:
+            conn.execute("""
+                INSERT INTO pipeline_jobs (job_id, project_id, kind, resource, nusha_index, group_id, status,
+                                           options_json, attempts, max_attempts, progress, message, created_at, not_before)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?, 0)
+            """, (job["job_id"], job["project_id"], job["kind"], job["resource"], job.get("nusha_index"), job.get("group_id"),
+                  job.get("status", "queued"), json.dumps(job.get("options") or {}, ensure_ascii=False),
+                  job.get("attempts", 0), job.get("max_attempts", 1), job.get("message", ""), job["created_at"]))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def update_pipeline_job(self, job_id: str, **fields):
+        """fields: status, result, attempts, progress, message, error, started_at, finished_at, not_before"""
+        cols = [k for k in self._PIPELINE_JOB_FIELDS if k in fields]
+        if not cols:
+            return
+        values = [json.dumps(fields[c], ensure_ascii=False, default=str) if c == "result" else fields[c] for c in cols]
+        conn = self.get_connection()
+        try:
+            sets = ", ".join(("result_json" if c == "result" else c) + "=?" for c in cols)
+            conn.execute(f"UPDATE pipeline_jobs SET {sets} WHERE job_id=?", tuple(values) + (job_id,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _pipeline_job_to_dict(self, row: sqlite3.Row) -> Dict:
+        d = {k: row[k] for k in row.keys() if k not in ("options_json", "result_json")}
+        d["options"] = json.loads(row["options_json"]) if row["options_json"] else {}
+        d["result"] = json.loads(row["result_json"]) if row["result_json"] else None
+        start, end = d.get("started_at"), d.get("finished_at")
+        d["wait_ms"] = round((start - d["created_at"]) * 1000, 1) if start and d.get("created_at") else None
+        d["run_ms"] = round((end - start) * 1000, 1) if start and end else None
+        return d
+
+    def get_pipeline_job(self, job_id: str) -> Optional[Dict]:
+        conn = self.get_connection()
+        try:
+            row = conn.execute("SELECT * FROM pipeline_jobs WHERE job_id=?", (job_id,)).fetchone()
+            return self._pipeline_job_to_dict(row) if row else None
+        finally:
+            conn.close()
+
+    def list_pipeline_jobs(self, project_id: Optional[str] = None, statuses: Optional[List[str]] = None, limit: int = 50) -> List[Dict]:
+        """Newest first (job history with timings)."""
+        where, params = [], []
+        if project_id:
+            where.append("project_id=?")
+            params.append(project_id)
+        if statuses:
+            where.append(f"status IN ({', '.join('?' for _ in statuses)})")
+            params.extend(statuses)
+        sql = "SELECT * FROM pipeline_jobs" + (f" WHERE {' AND '.join(where)}" if where else "")
+        sql += " ORDER BY created_at DESC, rowid DESC LIMIT ?"
+        conn = self.get_connection()
+        try:
+            return [self._pipeline_job_to_dict(r) for r in conn.execute(sql, tuple(params) + (int(limit),)).fetchall()]
+        finally:
+            conn.close()
+
+    def requeue_interrupted_pipeline_jobs(self) -> List[Dict]:
+        """
+        Jobs left 'running' by a previous process go back to 'queued'; returns every queued job
+        (oldest first) so the scheduler can reload its queue after a restart.
+        The interrupted run counts as an attempt (attempts is written when a run starts): a job that
+        already used max_attempts is marked failed and the rest of its chain is cancelled, so a job
+        that crashes the process is not retried forever.
+        """
+        now = time.time()
+        conn = self.get_connection()
+        try:
+            groups = [r[0] for r in conn.execute("""
+                SELECT DISTINCT group_id FROM pipeline_jobs
+                WHERE status='running' AND attempts >= max_attempts AND group_id IS NOT NULL
+            """).fetchall()]
+            conn.execute("""
+                UPDATE pipeline_jobs SET status='failed', finished_at=?, error='Süreç iş çalışırken kapandı',
+                       message='Hata: süreç iş çalışırken kapandı (deneme hakkı bitti)'
+                WHERE status='running' AND attempts >= max_attempts
+            """, (now,))
+            if groups:
+                conn.execute(f"""
+                    UPDATE pipeline_jobs SET status='cancelled', finished_at=?, message='Zincirdeki önceki adım başarısız'
+                    WHERE status='queued' AND group_id IN ({', '.join('?' for _ in groups)})
+                """, (now, *groups))
+            conn.execute("""
+                UPDATE pipeline_jobs SET status='queued', started_at=NULL, progress=0,
+                       message='Süreç yeniden başladı; iş tekrar kuyrukta'
+                WHERE status='running'
+            """)
+            conn.commit()
+            rows = conn.execute("SELECT * FROM pipeline_jobs WHERE status='queued' ORDER BY created_at, rowid").fetchall()
+            return [self._pipeline_job_to_dict(r) for r in rows]
+        finally:
+            conn.close()
+
+    # --- Stage Ledger ---
+
+    @staticmethod
+    def settings_hash(settings: Optional[Dict]) -> Optional[str]:
+        """Stable short hash of the settings that produced a stage output (None = unknown)."""
+        if settings is None:
+            return None
+        blob = json.dumps(settings, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:16]
+
+    def _upsert_stage_rows(self, conn: sqlite3.Connection, project_id: str, nusha_index: int, rows: List[Dict], source: str):
+        now = time.time()
+        params = []
+        for r in rows:
+            settings = r.get("settings")
+            params.append((
+                project_id, nusha_index, r["stage"], r.get("unit") or "", r["status"],
+                r.get("count"), r.get("total"),
+                json.dumps(settings, ensure_ascii=False, default=str) if settings is not None else None,
+                self.settings_hash(settings), source, r.get("error"), r.get("produced_at") or now,
+            ))
+        conn.executemany("""
+            INSERT INTO stage_ledger (project_id, nusha_index, stage, unit, status, output_count, total_count,
+                                      settings_json, settings_hash, source, error, produced_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(project_id, nusha_index, stage, unit) DO UPDATE SET
+                status=excluded.status,
+                output_count=excluded.output_count,
+                total_count=excluded.total_count,
+                settings_json=excluded.settings_json,
+                settings_hash=excluded.settings_hash,
+                source=excluded.source,
+                error=excluded.error,
+                produced_at=excluded.produced_at
+        """, params)
+
+    def record_stage_rows(self, project_id: str, nusha_index: int, stage: str, rows: List[Dict], reset: bool = False):
+        """
+        rows: [{unit ('' = stage run), status, count, total, settings, error, produced_at}].
+        reset=True first drops the stage's page rows (a full re-run replaces them).
+        """
+        conn = self.get_connection()
+        try:
+            if reset:
+                conn.execute("DELETE FROM stage_ledger WHERE project_id=? AND nusha_index=? AND stage=? AND unit<>''",
+                             (project_id, nusha_index, stage))
+            self._upsert_stage_rows(conn, project_id, nusha_index, [dict(r, stage=stage) for r in rows], "run")
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
+    def replace_nusha_stages(self, project_id: str, nusha_index: int, rows: List[Dict]) -> int:
+        """Reconcile: the nusha's ledger becomes exactly rows ({stage, unit, ...}); one transaction."""
+        conn = self.get_connection()
+        try:
+            conn.execute("DELETE FROM stage_ledger WHERE project_id=? AND nusha_index=?", (project_id, nusha_index))
+            self._upsert_stage_rows(conn, project_id, nusha_index, rows, "reconcile")
+            conn.commit()
+            return len(rows)
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
+    def clear_stages(self, project_id: str, nusha_index: int, stages: Optional[List[str]] = None):
+        conn = self.get_connection()
+        try:
+            if stages is None:
+                conn.execute("DELETE FROM stage_ledger WHERE project_id=? AND nusha_index=?", (project_id, nusha_index))
+            else:
+                conn.execute(f"""
+                    DELETE FROM stage_ledger WHERE project_id=? AND nusha_index=? AND stage IN ({', '.join('?' for _ in stages)})
+                """, (project_id, nusha_index, *stages))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_stage_summary(self, project_id: str, nusha_index: int) -> Dict[str, Dict]:
+        """
+        One grouped query per nusha: the stage-run row (unit='') and page-row aggregates per stage.
+        """
+        conn = self.get_connection()
+        try:
+            rows = conn.execute("""
+                SELECT stage,
+                       MAX(CASE WHEN unit='' THEN status END) AS run_status,
+                       MAX(CASE WHEN unit='' THEN output_count END) AS run_count,
+                       MAX(CASE WHEN unit='' THEN total_count END) AS run_total,
+                       MAX(CASE WHEN unit='' THEN error END) AS run_error,
+                       MAX(CASE WHEN unit='' THEN settings_json END) AS run_settings,
+                       SUM(unit<>'') AS units,
+                       SUM(unit<>'' AND status='completed') AS units_completed,
+                       SUM(unit<>'' AND status='failed') AS units_failed,
+                       SUM(CASE WHEN unit<>'' THEN output_count ELSE 0 END) AS unit_count,
+                       SUM(CASE WHEN unit<>'' THEN total_count END) AS unit_total,
+                       MAX(CASE WHEN unit<>'' AND status='failed' THEN error END) AS unit_error,
+                       MAX(produced_at) AS updated_at
+                FROM stage_ledger
+                WHERE project_id=? AND nusha_index=?
+                GROUP BY stage
+            """, (project_id, nusha_index)).fetchall()
+            out = {}
+            for r in rows:
+                d = {k: r[k] for k in r.keys() if k not in ("stage", "run_settings")}
+                d["settings"] = json.loads(r["run_settings"]) if r["run_settings"] else {}
+                out[r["stage"]] = d
+            return out
+        finally:
+            conn.close()
+
+    def get_stage_units(self, project_id: str, nusha_index: int, stage: str, status: Optional[str] = None) -> List[Dict]:
+        sql = "SELECT * FROM stage_ledger WHERE project_id=? AND nusha_index=? AND stage=? AND unit<>''"
+        params = [project_id, nusha_index, stage]
+        if status:
+            sql += " AND status=?"
+            params.append(status)
+        conn = self.get_connection()
+        try:
+            out = []
+            for r in conn.execute(sql + " ORDER BY unit", tuple(params)).fetchall():
+                d = {k: r[k] for k in r.keys() if k != "settings_json"}
+                d["settings"] = json.loads(r["settings_json"]) if r["settings_json"] else None
+                out.append(d)
+            return out
+        finally:
+            conn.close()
+
+    def units_needing_run(self, project_id: str, nusha_index: int, stage: str, upstream: str,
+                          settings: Optional[Dict] = None) -> List[str]:
+        """
+        Pages whose upstream output is complete but whose own output is missing, failed, older than
+        the upstream output, or produced with different settings (unknown settings count as matching).
+        """
+        current = self.settings_hash(settings)
+        conn = self.get_connection()
+        try:
+            rows = conn.execute("""
+                SELECT u.unit FROM stage_ledger u
+                LEFT JOIN stage_ledger d
+                       ON d.project_id=u.project_id AND d.nusha_index=u.nusha_index AND d.stage=? AND d.unit=u.unit
+                WHERE u.project_id=? AND u.nusha_index=? AND u.stage=? AND u.unit<>'' AND u.status='completed'
+                  AND (d.unit IS NULL OR d.status<>'completed' OR d.produced_at < u.produced_at
+                       OR (? IS NOT NULL AND d.settings_hash IS NOT NULL AND d.settings_hash<>?))
+                ORDER BY u.unit
+            """, (stage, project_id, nusha_index, upstream, current, current)).fetchall()
+            return [r["unit"] for r in rows]
+        finally:
+            conn.close()
+
+    def stage_is_stale(self, project_id: str, nusha_index: int, stage: str, upstream: str) -> bool:
+        """Whole-nusha stages (alignment): no completed run, or upstream output newer than it."""
+        conn = self.get_connection()
+        try:
+            row = conn.execute("""
+                SELECT d.status, d.produced_at,
+                       (SELECT MAX(produced_at) FROM stage_ledger
+                        WHERE project_id=? AND nusha_index=? AND stage=? AND status='completed') AS upstream_at
+                FROM (SELECT 1) LEFT JOIN stage_ledger d
+                     ON d.project_id=? AND d.nusha_index=? AND d.stage=? AND d.unit=''
+            """, (project_id, nusha_index, upstream, project_id, nusha_index, stage)).fetchone()
+            if row["status"] != "completed":
+                return True
+            return row["upstream_at"] is not None and row["upstream_at"] > row["produced_at"]
+        finally:
+            conn.close()
+
+    def upsert_spellcheck_paragraph(self, project_id: str, job_id: str, entry: Dict) -> int:
+        """Stores one per_paragraph entry; returns its stream cursor (seq)."""
+        conn = self.get_connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) AS s FROM spellcheck_paragraphs WHERE project_id=?", (project_id,)
+            ).fetchone()
+            seq = int(row["s"]) + 1
+            conn.execute("""
+                INSERT INTO spellcheck_paragraphs (project_id, paragraph_index, job_id, seq, entry_json)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(project_id, paragraph_index) DO UPDATE SET
+                    job_id=excluded.job_id,
+                    seq=excluded.seq,
+                    entry_json=excluded.entry_json
+            """, (project_id, int(entry["paragraph_index"]), job_id, seq, json.dumps(entry, ensure_ascii=False)))
+            conn.commit()
+            return seq
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
+    def get_spellcheck_paragraphs(self, project_id: str, after_seq: int = 0) -> List[Dict]:
+        """[{seq, entry}] ordered by seq (after_seq=0: all, for page reloads)."""
+        conn = self.get_connection()
+        try:
+            rows = conn.execute("""
+                SELECT seq, entry_json FROM spellcheck_paragraphs
+                WHERE project_id=? AND seq>?
+                ORDER BY seq ASC
+            """, (project_id, int(after_seq))).fetchall()
+            return [{"seq": r["seq"], "entry": json.loads(r["entry_json"])} for r in rows]
+        finally:
+            conn.close()
+
+    def prune_spellcheck_paragraphs(self, project_id: str, job_id: str) -> int:
+        """After a completed job: drops results of paragraphs that no longer exist."""
+        conn = self.get_connection()
+        try:
+            cur = conn.execute(
+                "DELETE FROM spellcheck_paragraphs WHERE project_id=? AND job_id<>?", (project_id, job_id)
+            )
+            conn.commit()
+            return cur.rowcount
+        finally:
+            conn.close()
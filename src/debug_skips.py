@@ -14,6 +14,7 @@ sys.path.append(str(Path(__file__).resolve().parent.parent))
 
 from src.config import ALIGNMENT_JSON, OUT
 from src.utils import normalize_ar
+from src.witness_pairs import WitnessPairCache, WitnessTokens, default_pair_cache
 
 def get_missing_words(ref_text, cand_text):
     """
@@ -68,7 +69,36 @@ def visualize_anchors(ref_text, cand_text):
             
     return " ".join(parts)
 
-def generate_full_matrix(data, target_out):
+def _line_match_flags(aligned, pair_cache=None):
+    """
+    Dizgi (best.raw) ↔ Nüsha 1 (ocr_text) hizalamasını paylaşılan çift önbelleğinden alır.
+    Returns: {(line_idx, word_idx): matched} — sadece normalize edilince boş olmayan dizgi kelimeleri.
+    """
+    cache = pair_cache if pair_cache is not None else default_pair_cache()
+    ref = WitnessTokens(aligned, "ref_text")
+    ocr = WitnessTokens(aligned, "ocr_text")
+    matched = cache.get(ref, ocr).matched_src()
+    return {(ref.line_of[k], ref.word_of[k]): m for k, m in enumerate(matched)}
+
+def render_line_anchors(line_idx, ref_text, match_flags):
+    """
+    visualize_anchors + get_missing_words, ama global çift hizalamasından.
+    Returns: (dizgi_html, missing_words)
+    """
+    parts = []
+    missing = []
+    for wi, tok in enumerate(ref_text.split()):
+        m = match_flags.get((line_idx, wi))
+        if m is None:
+            parts.append(tok)
+        elif m:
+            parts.append(f'<span class="anchor">{tok}</span>')
+        else:
+            parts.append(f'<span class="miss">{tok}</span>')
+            missing.append(tok)
+    return " ".join(parts), missing
+
+def generate_full_matrix(data, target_out, pair_cache: WitnessPairCache = None):
     # --- LOAD MANIFEST IF AVAILABLE ---
     manifest_map = {}
     manifest_path = target_out / "lines_manifest.jsonl"
@@ -97,6 +127,9 @@ def generate_full_matrix(data, target_out):
         
     headers = ["No", "Dizgi (Hizalama ve Kancalar)", "Nüsha 1 (OCR)", "Eksik Kelimeler"]
     
+    # Tek global hizalama (Dizgi ↔ Nüsha 1), satır başına ayrı opcodes yerine
+    match_flags = _line_match_flags(aligned, pair_cache)
+    
     rows_html = []
     
     missing_images_count = 0
@@ -160,9 +193,7 @@ def generate_full_matrix(data, target_out):
         
         # Visualize Anchors on Dizgi Column
         # This shows both the text AND the alignment logic (Blue=Hook, Red=Gap)
-        dizgi_html = visualize_anchors(dizgi_text, n1_text)
-        
-        missing = get_missing_words(dizgi_text, n1_text)
+        dizgi_html, missing = render_line_anchors(i, dizgi_text, match_flags)
         missing_html = " ".join(f'<span class="miss-tag">{w}</span>' for w in missing) if missing else '<span class="ok">Tam Eşleşme</span>'
         
         cols = []
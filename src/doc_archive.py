@@ -18,33 +18,10 @@ import time
 from pathlib import Path
 from typing import Optional, Callable
 
-from src.config import (
-    OUT,
-    ALIGNMENT_JSON,
-    VIEWER_HTML,
-    VIEWER_DUAL_HTML,
-    SPELLCHECK_JSON,
-    LINES_DIR,
-    LINES_MANIFEST,
-    PAGES_DIR,
-    NUSHA2_OUT,
-    NUSHA2_PAGES_DIR,
-    NUSHA2_LINES_DIR,
-    NUSHA2_OCR_DIR,
-    NUSHA2_LINES_MANIFEST,
-    NUSHA2_VIEWER_HTML,
-    NUSHA3_OUT,
-    NUSHA3_PAGES_DIR,
-    NUSHA3_LINES_DIR,
-    NUSHA3_OCR_DIR,
-    NUSHA3_LINES_MANIFEST,
-    NUSHA3_VIEWER_HTML,
-    DOC_ARCHIVES_DIR,
-    DOC_ARCHIVES_DIR,
-    DOC_ARCHIVE_KEEP,
-    AUDIO_DIR,
-    AUDIO_MANIFEST,
-)
+from src.project_context import ProjectContext, default_context
+
+# Arşivlenen ek nüshalar (arşiv içinde nusha{k}/ altında)
+ARCHIVED_WITNESSES = (2, 3, 4)
 
 
 def _safe_stem(s: str) -> str:
@@ -67,13 +44,16 @@ def _safe_stem(s: str) -> str:
 def archive_current_outputs(
     docx_path: Optional[Path] = None,
     status_callback: Optional[Callable[[str, str], None]] = None,
+    ctx: Optional[ProjectContext] = None,
 ) -> Optional[Path]:
     """
-    Create a snapshot directory under output_lines/doc_archives/ and copy critical files.
-    Returns archive directory path (or None on failure).
+    Create a snapshot directory under <ctx root>/doc_archives/ (default output_lines) and copy
+    critical files. Returns archive directory path (or None on failure).
     """
+    ctx = ctx or default_context()
+    archives_dir = ctx.doc_archives_dir
     try:
-        DOC_ARCHIVES_DIR.mkdir(exist_ok=True)
+        archives_dir.mkdir(parents=True, exist_ok=True)
     except Exception:
         pass
 
@@ -81,7 +61,7 @@ def archive_current_outputs(
     docx = Path(docx_path) if docx_path else None
     stem = _safe_stem(docx.stem if docx else "")
     ts = time.strftime("%Y%m%d_%H%M%S")
-    dest = DOC_ARCHIVES_DIR / f"{ts}__{stem}"
+    dest = archives_dir / f"{ts}__{stem}"
 
     try:
         dest.mkdir(parents=True, exist_ok=False)
@@ -112,44 +92,30 @@ def archive_current_outputs(
                 status_callback(f"ARŞİV: Klasör kopyalanamadı: {src.name} ({e})", "WARNING")
 
     # Copy critical artifacts
-    _copy_file(ALIGNMENT_JSON, "alignment.json")
-    _copy_file(VIEWER_HTML, "viewer.html")
-    _copy_file(VIEWER_DUAL_HTML, "viewer_dual.html")
-    _copy_file(SPELLCHECK_JSON, "spellcheck.json")
-    _copy_file(LINES_MANIFEST, "lines_manifest.jsonl")
-    _copy_dir(LINES_DIR, "lines")
-    _copy_dir(PAGES_DIR, "pages")
-    _copy_dir(AUDIO_DIR, "audio")
-    _copy_file(AUDIO_MANIFEST, "audio_manifest.json")
+    _copy_file(ctx.alignment_json(), "alignment.json")
+    _copy_file(ctx.viewer_html(), "viewer.html")
+    _copy_file(ctx.viewer_dual_html, "viewer_dual.html")
+    _copy_file(ctx.spellcheck_json, "spellcheck.json")
+    _copy_file(ctx.lines_manifest(), "lines_manifest.jsonl")
+    _copy_dir(ctx.lines_dir(), "lines")
+    _copy_dir(ctx.pages_dir(), "pages")
+    _copy_dir(ctx.audio_dir, "audio")
+    _copy_file(ctx.audio_manifest(), "audio_manifest.json")
     # Copy optional audio manifests for other nushas if present
-    try:
-        for i in range(2, 5):
-            am = AUDIO_MANIFEST.parent / f"audio_manifest_n{i}.json"
-            _copy_file(am, f"audio_manifest_n{i}.json")
-    except Exception:
-        pass
-
-    # Optional: 2. nüsha snapshot (so old comparisons keep working)
-    try:
-        if NUSHA2_OUT.exists():
-            _copy_file(NUSHA2_LINES_MANIFEST, "nusha2/lines_manifest.jsonl")
-            _copy_dir(NUSHA2_LINES_DIR, "nusha2/lines")
-            _copy_dir(NUSHA2_OCR_DIR, "nusha2/ocr")
-            _copy_file(NUSHA2_VIEWER_HTML, "nusha2/viewer.html")
-            _copy_dir(NUSHA2_PAGES_DIR, "nusha2/pages")
-    except Exception:
-        pass
+    for k in ARCHIVED_WITNESSES:
+        _copy_file(ctx.audio_manifest(k), f"audio_manifest_n{k}.json")
 
-    # Optional: 3. nüsha snapshot
-    try:
-        if NUSHA3_OUT.exists():
-            _copy_file(NUSHA3_LINES_MANIFEST, "nusha3/lines_manifest.jsonl")
-            _copy_dir(NUSHA3_LINES_DIR, "nusha3/lines")
-            _copy_dir(NUSHA3_OCR_DIR, "nusha3/ocr")
-            _copy_file(NUSHA3_VIEWER_HTML, "nusha3/viewer.html")
-            _copy_dir(NUSHA3_PAGES_DIR, "nusha3/pages")
-    except Exception:
-        pass
+    # Optional: other nüsha snapshots (so old comparisons keep working)
+    for k in ARCHIVED_WITNESSES:
+        try:
+            if ctx.nusha_dir(k).exists():
+                _copy_file(ctx.lines_manifest(k), f"nusha{k}/lines_manifest.jsonl")
+                _copy_dir(ctx.lines_dir(k), f"nusha{k}/lines")
+                _copy_dir(ctx.ocr_dir(k), f"nusha{k}/ocr")
+                _copy_file(ctx.viewer_html(k), f"nusha{k}/viewer.html")
+                _copy_dir(ctx.pages_dir(k), f"nusha{k}/pages")
+        except Exception:
+            pass
 
     # Add metadata
     try:
@@ -181,11 +147,11 @@ def archive_current_outputs(
 
     # Retention: keep newest N archives
     try:
-        keep = max(1, int(DOC_ARCHIVE_KEEP))
+        keep = max(1, int(ctx.doc_archive_keep))
     except Exception:
         keep = 15
     try:
-        dirs = sorted([p for p in DOC_ARCHIVES_DIR.iterdir() if p.is_dir()], key=lambda p: p.name, reverse=True)
+        dirs = sorted([p for p in archives_dir.iterdir() if p.is_dir()], key=lambda p: p.name, reverse=True)
         for p in dirs[keep:]:
             try:
                 shutil.rmtree(p)
@@ -202,12 +168,14 @@ def archive_current_outputs(
 def restore_archive_to_outputs(
     archive_dir: Path,
     status_callback: Optional[Callable[[str, str], None]] = None,
+    ctx: Optional[ProjectContext] = None,
 ) -> bool:
     """
-    Restore an archived snapshot back to output_lines/ (so user can continue working on it).
-    Copies files from archive_dir back to their original locations.
+    Restore an archived snapshot back to the ctx outputs (default output_lines/) so the user can
+    continue working on it. Copies files from archive_dir back to their original locations.
     Returns True on success, False on failure.
     """
+    ctx = ctx or default_context()
     if not archive_dir or not archive_dir.exists() or not archive_dir.is_dir():
         if status_callback:
             status_callback(f"GERİ YÜKLEME: Arşiv klasörü bulunamadı: {archive_dir}", "ERROR")
@@ -237,33 +205,25 @@ def restore_archive_to_outputs(
                 status_callback(f"GERİ YÜKLEME: {src.name}/ kopyalanamadı: {e}", "WARNING")
 
     # Restore primary outputs
-    _restore_file(archive_dir / "alignment.json", ALIGNMENT_JSON)
-    _restore_file(archive_dir / "viewer.html", VIEWER_HTML)
-    _restore_file(archive_dir / "viewer_dual.html", VIEWER_DUAL_HTML)
-    _restore_file(archive_dir / "spellcheck.json", SPELLCHECK_JSON)
-    _restore_file(archive_dir / "lines_manifest.jsonl", LINES_MANIFEST)
-    _restore_dir(archive_dir / "lines", LINES_DIR)
-    _restore_dir(archive_dir / "pages", PAGES_DIR)
-    _restore_dir(archive_dir / "audio", AUDIO_DIR)
-    _restore_file(archive_dir / "audio_manifest.json", AUDIO_MANIFEST)
-
-    # Restore nusha2 if exists
-    n2_manifest_src = archive_dir / "nusha2" / "lines_manifest.jsonl"
-    if n2_manifest_src.exists():
-        _restore_file(n2_manifest_src, NUSHA2_LINES_MANIFEST)
-        _restore_dir(archive_dir / "nusha2" / "lines", NUSHA2_LINES_DIR)
-        _restore_dir(archive_dir / "nusha2" / "ocr", NUSHA2_OCR_DIR)
-        _restore_file(archive_dir / "nusha2" / "viewer.html", NUSHA2_VIEWER_HTML)
-        _restore_dir(archive_dir / "nusha2" / "pages", NUSHA2_PAGES_DIR)
-
-    # Restore nusha3 if exists
-    n3_manifest_src = archive_dir / "nusha3" / "lines_manifest.jsonl"
-    if n3_manifest_src.exists():
-        _restore_file(n3_manifest_src, NUSHA3_LINES_MANIFEST)
-        _restore_dir(archive_dir / "nusha3" / "lines", NUSHA3_LINES_DIR)
-        _restore_dir(archive_dir / "nusha3" / "ocr", NUSHA3_OCR_DIR)
-        _restore_file(archive_dir / "nusha3" / "viewer.html", NUSHA3_VIEWER_HTML)
-        _restore_dir(archive_dir / "nusha3" / "pages", NUSHA3_PAGES_DIR)
+    _restore_file(archive_dir / "alignment.json", ctx.alignment_json())
+    _restore_file(archive_dir / "viewer.html", ctx.viewer_html())
+    _restore_file(archive_dir / "viewer_dual.html", ctx.viewer_dual_html)
+    _restore_file(archive_dir / "spellcheck.json", ctx.spellcheck_json)
+    _restore_file(archive_dir / "lines_manifest.jsonl", ctx.lines_manifest())
+    _restore_dir(archive_dir / "lines", ctx.lines_dir())
+    _restore_dir(archive_dir / "pages", ctx.pages_dir())
+    _restore_dir(archive_dir / "audio", ctx.audio_dir)
+    _restore_file(archive_dir / "audio_manifest.json", ctx.audio_manifest())
+
+    # Restore other nüshas if present
+    for k in ARCHIVED_WITNESSES:
+        src_dir = archive_dir / f"nusha{k}"
+        if (src_dir / "lines_manifest.jsonl").exists():
+            _restore_file(src_dir / "lines_manifest.jsonl", ctx.lines_manifest(k))
+            _restore_dir(src_dir / "lines", ctx.lines_dir(k))
+            _restore_dir(src_dir / "ocr", ctx.ocr_dir(k))
+            _restore_file(src_dir / "viewer.html", ctx.viewer_html(k))
+            _restore_dir(src_dir / "pages", ctx.pages_dir(k))
 
     if status_callback:
         status_callback(f"GERİ YÜKLEME: Arşiv geri yüklendi: {archive_dir.name}", "INFO")
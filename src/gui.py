@@ -2475,7 +2475,8 @@ def start_gui():
             # persist back to alignment.json so viewers can use it
             try:
                 from src.config import ALIGNMENT_JSON
-                ALIGNMENT_JSON.write_text(json.dumps(payload2, ensure_ascii=False, indent=2), encoding="utf-8")
+                from src.payload_v2 import compact_payload
+                ALIGNMENT_JSON.write_text(json.dumps(compact_payload(payload2), ensure_ascii=False, indent=2), encoding="utf-8")
             except Exception:
                 pass
             messagebox.showinfo("OCR↔OCR", "OCR↔OCR eşleştirme tamamlandı. Viewer/Çift Nüsha Viewer açabilirsiniz.")
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""
+Artımlı (incremental) yeniden hizalama.
+
+Referans metin (tahkik.docx veya Nüsha 1'in canlı DB metni) değiştiğinde tüm nüshayı
+baştan hizalamak yerine:
+  1) Eski ve yeni referans token dizileri arasındaki farkı (diff) bulur,
+  2) Değişmeyen satırların best.start_word/end_word değerlerini kaydırarak yeniden eşler,
+  3) Hizalamayı yalnızca değişikliklerin etrafındaki küçük pencerelerde tekrar çalıştırır,
+  4) Hangi satırların gerçekten değiştiğini döner (DB'de sadece bu satırlar güncellenir).
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+from rapidfuzz.distance import Levenshtein
+
+from src.alignment import (
+    _align_line_bounds,
+    _build_aligned_item,
+    _build_err_map,
+    _encode_word_streams,
+)
+from src.align_trace import NULL_TRACE, AlignTrace
+from src.document import tokenize_text
+from src.utils import normalize_ar
+
+# Değişen satırların her iki yanına eklenecek bağlam satırı sayısı
+DEFAULT_WINDOW_LINES = 2
+
+# Satır öğesinde OCR'ye ait (hizalamadan bağımsız) alanlar
+_OCR_ITEM_KEYS = ("ocr_text", "line_image", "page_image", "page_name", "bbox", "line_index")
+
+
+def reference_text_from_lines(lines: List[Dict[str, Any]]) -> str:
+    """
+    DB/alignment satırlarından canlı referans metnini üretir (Nüsha 1 -> diğer nüshalar).
+    Boş satırlar atlanır; satırlar line_no sırasında olmalıdır.
+    """
+    parts = []
+    for l in lines:
+        t = (l.get("best") or {}).get("raw", "")
+        if t:
+            parts.append(t)
+    return " ".join(parts)
+
+
+def diff_token_streams(old_norms: List[str], new_norms: List[str]) -> List[Tuple[str, int, int, int, int]]:
+    """
+    İki normalize token dizisi arasındaki değişen bölgeleri döner: [(tag, i1, i2, j1, j2), ...]
+    Sadece 'equal' OLMAYAN opcode'lar döner. Ortak önek/sonek önce kırpılır, böylece tipik
+    bir düzenlemede Levenshtein yalnızca değişen ortadaki küçük parça üzerinde çalışır.
+    """
+    n_old, n_new = len(old_norms), len(new_norms)
+
+    pre = 0
+    lim = min(n_old, n_new)
+    while pre < lim and old_norms[pre] == new_norms[pre]:
+        pre += 1
+
+    suf = 0
+    lim -= pre
+    while suf < lim and old_norms[n_old - 1 - suf] == new_norms[n_new - 1 - suf]:
+        suf += 1
+
+    old_mid = old_norms[pre:n_old - suf]
+    new_mid = new_norms[pre:n_new - suf]
+    if not old_mid and not new_mid:
+        return []
+    if not old_mid:
+        return [("insert", pre, pre, pre, pre + len(new_mid))]
+    if not new_mid:
+        return [("delete", pre, pre + len(old_mid), pre, pre)]
+
+    a_str, b_str, _ = _encode_word_streams(old_mid, new_mid)
+    changes = []
+    for tag, i1, i2, j1, j2 in Levenshtein.opcodes(a_str, b_str):
+        if tag != "equal":
+            changes.append((tag, i1 + pre, i2 + pre, j1 + pre, j2 + pre))
+    return changes
+
+
+class _BoundaryMap:
+    """
+    Eski token sınırlarını (0..M_old) yeni dizideki karşılığına eşler.
+    Bir sınır, değişen bir bölgenin içinde kalıyorsa 'kararsız'dır (None döner).
+    """
+
+    def __init__(self, changes: List[Tuple[str, int, int, int, int]]):
+        self.changes = changes
+        self._starts = [c[1] for c in changes]
+        # Her değişiklikten SONRA geçerli olan kayma miktarı (j2 - i2)
+        self._shift_after = [c[4] - c[2] for c in changes]
+
+    def map(self, b: int) -> Optional[int]:
+        # b'den önce ya da b'de başlayan son değişiklik
+        k = bisect_right(self._starts, b) - 1
+        if k < 0:
+            return b
+        _, i1, i2, j1, j2 = self.changes[k]
+        if b == i1 and i1 == i2:
+            # Tam bu sınıra ekleme yapılmış: hangi satıra ait olduğu belirsiz
+            return None
+        if b < i2:
+            # Değişen bölgenin başı sabittir, içi belirsizdir
+            return j1 if b == i1 else None
+        return b + self._shift_after[k]
+
+    def touches(self, s: int, e: int) -> bool:
+        """[s, e) aralığı (veya boş aralığın konumu) bir değişiklikle kesişiyor mu?"""
+        if not self.changes:
+            return False
+        lo = bisect_left(self._starts, s) - 1
+        hi = bisect_right(self._starts, e)
+        for k in range(max(0, lo), min(hi, len(self.changes))):
+            _, i1, i2, _, _ = self.changes[k]
+            if i1 == i2:
+                # Ekleme: satırın içinde veya kenarındaysa dokunur
+                if s <= i1 <= e:
+                    return True
+            elif s < i2 and i1 < e:
+                return True
+            elif s == e and i1 < s < i2:
+                return True
+        return False
+
+
+def _line_span(item: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+    best = item.get("best") or {}
+    s, e = best.get("start_word"), best.get("end_word")
+    if s is None or e is None:
+        return None
+    return int(s), int(max(s, e))
+
+
+def _raw_diff_range(old_tokens: List[str], new_tokens: List[str]) -> Tuple[int, int]:
+    """Ham token dizilerinde ortak önek/sonek dışında kalan [lo, hi) aralığı (eski dizi üzerinde)."""
+    n_old, n_new = len(old_tokens), len(new_tokens)
+    lo = 0
+    lim = min(n_old, n_new)
+    while lo < lim and old_tokens[lo] == new_tokens[lo]:
+        lo += 1
+    suf = 0
+    lim -= lo
+    while suf < lim and old_tokens[n_old - 1 - suf] == new_tokens[n_new - 1 - suf]:
+        suf += 1
+    return lo, n_old - suf
+
+
+def tokens_join(tokens: List[str], s: int, e: int) -> str:
+    return " ".join(tokens[s:e]) if s < e else ""
+
+
+def _dirty_windows(dirty: List[bool], window_lines: int) -> List[Tuple[int, int]]:
+    """Kirli satırları bağlam payıyla genişletip birleşik [a, b] pencerelerine çevirir."""
+    N = len(dirty)
+    windows: List[Tuple[int, int]] = []
+    for i, d in enumerate(dirty):
+        if not d:
+            continue
+        a = max(0, i - window_lines)
+        b = min(N - 1, i + window_lines)
+        if windows and a <= windows[-1][1] + 1:
+            windows[-1] = (windows[-1][0], max(windows[-1][1], b))
+        else:
+            windows.append((a, b))
+    return windows
+
+
+def incremental_realign(
+    payload: Dict[str, Any],
+    new_reference_text: str,
+    spellcheck_payload: Optional[Dict[str, Any]] = None,
+    window_lines: int = DEFAULT_WINDOW_LINES,
+    trace: Optional[AlignTrace] = None,
+) -> Optional[Tuple[Dict[str, Any], List[int]]]:
+    """
+    Mevcut alignment payload'ını yeni referans metne göre artımlı günceller.
+
+    Returns: (new_payload, changed_line_nos) veya None (artımlı güncelleme mümkün değilse;
+    çağıran tam hizalamaya düşmelidir — ör. eski payload'da tahkik_tokens yoksa).
+    trace verilirse tek bir "incremental_realign" aşaması kaydedilir.
+    """
+    trace = trace or NULL_TRACE
+    with trace.stage("incremental_realign", "Referans metin değişikliğinden sonra artımlı yeniden hizalama") as st:
+        result = _incremental_realign(payload, new_reference_text, spellcheck_payload, window_lines)
+        if result is None:
+            return None
+        new_payload, changed_line_nos, stats = result
+        if trace.enabled and stats:
+            st.output = f"{stats['change_count']} değişiklik | {len(stats['windows'])} pencere | {stats['realigned_lines']}/{len(payload.get('aligned') or [])} satır yeniden hizalandı | {len(changed_line_nos)} satır güncellendi"
+        if trace.full and stats:
+            st.data = dict(stats, windows=stats["windows"][:50], changed_lines=len(changed_line_nos))
+    return new_payload, changed_line_nos
+
+
+def _incremental_realign(
+    payload: Dict[str, Any],
+    new_reference_text: str,
+    spellcheck_payload: Optional[Dict[str, Any]],
+    window_lines: int,
+) -> Optional[Tuple[Dict[str, Any], List[int], Dict[str, Any]]]:
+    old_tokens = payload.get("tahkik_tokens")
+    aligned = payload.get("aligned") or []
+    if old_tokens is None or not aligned:
+        return None
+
+    new_tokens = tokenize_text(new_reference_text or "")
+
+    # Ham token önek/sonekleri aynı olan kısım hiç normalize edilmez/diff'lenmez.
+    # Normalize eşit olsa bile ham token değişmiş olabilir (hareke, noktalama vb.);
+    # bu bölge [raw_lo, raw_hi) dışındaki satırların metni kesinlikle aynıdır.
+    raw_lo, raw_hi = _raw_diff_range(old_tokens, new_tokens)
+    if raw_lo >= raw_hi and len(old_tokens) == len(new_tokens):
+        return payload, [], {}
+
+    new_raw_hi = raw_hi + (len(new_tokens) - len(old_tokens))
+    changes = [
+        (tag, i1 + raw_lo, i2 + raw_lo, j1 + raw_lo, j2 + raw_lo)
+        for tag, i1, i2, j1, j2 in diff_token_streams(
+            [normalize_ar(t) for t in old_tokens[raw_lo:raw_hi]],
+            [normalize_ar(t) for t in new_tokens[raw_lo:new_raw_hi]],
+        )
+    ]
+
+    bmap = _BoundaryMap(changes)
+    N = len(aligned)
+    M_new = len(new_tokens)
+
+    spans = [_line_span(it) for it in aligned]
+    dirty = [False] * N
+    mapped: List[Optional[Tuple[int, int]]] = [None] * N
+    for i, span in enumerate(spans):
+        if span is None:
+            dirty[i] = True
+            continue
+        s, e = span
+        if bmap.touches(s, e):
+            dirty[i] = True
+            continue
+        ns, ne = bmap.map(s), bmap.map(e)
+        if ns is None or ne is None:
+            dirty[i] = True
+            continue
+        mapped[i] = (ns, ne)
+
+    windows = _dirty_windows(dirty, window_lines)
+    new_bounds: List[Optional[Tuple[int, int]]] = list(mapped)
+
+    realigned_lines = 0
+    for a, b in windows:
+        lo = mapped[a - 1][1] if a > 0 and mapped[a - 1] else 0
+        hi = mapped[b + 1][0] if b + 1 < N and mapped[b + 1] else M_new
+        if hi < lo:
+            hi = lo
+        ocr_window = [{k: aligned[i].get(k) for k in _OCR_ITEM_KEYS} for i in range(a, b + 1)]
+        local = _align_line_bounds([normalize_ar(t) for t in new_tokens[lo:hi]], ocr_window)
+        for off, (ls, le) in enumerate(local):
+            new_bounds[a + off] = (lo + ls, lo + le)
+        realigned_lines += (b - a + 1)
+
+    spell_errors = (spellcheck_payload or {}).get("errors_merged", []) if spellcheck_payload else payload.get("spellcheck") or []
+    err_map = _build_err_map(spell_errors)
+
+    in_window = [False] * N
+    for a, b in windows:
+        for i in range(a, b + 1):
+            in_window[i] = True
+
+    new_aligned: List[Dict[str, Any]] = []
+    changed_line_nos: List[int] = []
+    for i, old_item in enumerate(aligned):
+        s, e = new_bounds[i]
+        old_best = old_item.get("best") or {}
+        rebuild = in_window[i]
+        if not rebuild and spans[i] and spans[i][0] < raw_hi and raw_lo < spans[i][1]:
+            os_, oe_ = spans[i]
+            rebuild = tokens_join(old_tokens, os_, oe_) != tokens_join(new_tokens, s, e)
+        if rebuild:
+            fresh = _build_aligned_item(old_item.get("line_no", i + 1), old_item, s, e, new_tokens, err_map)
+            item = dict(old_item)
+            for k in ("best", "candidates", "error_hits", "error_count", "seg_wc"):
+                item[k] = fresh[k]
+            if "html" in old_best and fresh["best"]["raw"] == old_best.get("raw"):
+                item["best"]["html"] = old_best["html"]
+        else:
+            # Değişmeyen satır: sadece indeksleri kaydır, metin ve skor aynen kalır
+            if old_best.get("start_word") == s and old_best.get("end_word") == e:
+                new_aligned.append(old_item)
+                continue
+            item = dict(old_item)
+            item["best"] = dict(old_best, start_word=s, end_word=e)
+            cands = old_item.get("candidates") or []
+            if len(cands) == 1:
+                item["candidates"] = [item["best"]]
+
+        if item.get("best") != old_best:
+            changed_line_nos.append(item.get("line_no", i + 1))
+        new_aligned.append(item)
+
+    new_payload = dict(payload)
+    new_payload["tahkik_tokens"] = new_tokens
+    new_payload["tahkik_word_count"] = M_new
+    new_payload["aligned"] = new_aligned
+
+    # Eski sürümlerin payload içine gömdüğü debug_log artık alignment.trace.json'da
+    new_payload.pop("debug_log", None)
+    stats = {
+        "change_count": len(changes),
+        "windows": windows,
+        "realigned_lines": realigned_lines,
+        "old_token_count": len(old_tokens),
+        "new_token_count": M_new,
+    }
+    return new_payload, changed_line_nos, stats
+
@@ -6,16 +6,18 @@ BLLA (Baseline Layout Analyzer) kullanarak satır kesme
 
 from PIL import Image
 from pathlib import Path
-from typing import List, Dict, Any
-from src.config import LINES_DIR, LINES_MANIFEST
+from typing import List, Dict, Any, Optional
+from src.project_context import default_context
 import json
 
 
-def split_page_to_lines(page_png: Path, lines_dir: Path = LINES_DIR) -> List[Dict[str, Any]]:
+def split_page_to_lines(page_png: Path, lines_dir: Optional[Path] = None) -> List[Dict[str, Any]]:
     """
     BLLA (Baseline Layout Analyzer) kullanarak sayfayı satırlara böler.
     satir_kes.py algoritmasıyla aynı yaklaşım.
+    lines_dir verilmezse eski output_lines/lines (çağıranlar ProjectContext.lines_dir verir).
     """
+    lines_dir = lines_dir or default_context().lines_dir()
     img = Image.open(page_png).convert("RGB")
 
     # Lazy import: kraken pulls heavy deps (numpy/scipy); keep module import lightweight for GUI/viewer.
@@ -84,7 +86,8 @@ def split_page_to_lines(page_png: Path, lines_dir: Path = LINES_DIR) -> List[Dic
 # =========================
 # Order lines by (page_name, y0)
 # =========================
-def load_line_records_ordered(manifest_path: Path = LINES_MANIFEST) -> List[Dict[str, Any]]:
+def load_line_records_ordered(manifest_path: Optional[Path] = None) -> List[Dict[str, Any]]:
+    manifest_path = manifest_path or default_context().lines_manifest()
     recs: List[Dict[str, Any]] = []
     if manifest_path.exists():
         for ln in manifest_path.read_text(encoding="utf-8").splitlines():
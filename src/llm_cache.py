@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+LLM Response Cache — imla kontrolü sağlayıcı cevaplarının kalıcı (SQLite) önbelleği.
+
+Yarım kalan bir çalışmayı tekrarlamak, başka bir projede aynı kalıp paragrafları (besmele,
+hamdele, bab başlıkları...) kontrol etmek veya sadece bir sağlayıcının prompt'unu değiştirmek
+eskiden tüm LLM çağrılarını yeniden ödetiyordu. Anahtar:
+
+    sha256(provider | model | prompt_version | normalize_paragraph(text))
+
+prompt_version, prompt şablonunun özetidir (prompt_version()); şablon değişince o sağlayıcının
+eski kayıtları kendiliğinden geçersiz olur. Sadece hatasız cevaplar saklanır. Toplam boyut
+max_bytes'ı aşınca en uzun süredir kullanılmayan kayıtlar silinir (LRU).
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+_ZW = re.compile(r"[\u200b-\u200f\u202a-\u202e\u2066-\u2069\ufeff]")
+_WS = re.compile(r"\s+")
+
+# Eviction, sınır aşılınca bu orana kadar iner (her yazımda silme yapmamak için)
+EVICT_TARGET = 0.9
+
+
+def normalize_paragraph(text: str) -> str:
+    """
+    Önbellek anahtarı için metin: NFC, görünmez yön/sıfır genişlik karakterleri atılır, boşluklar
+    tekilleştirilir. Harf ve harekeler korunur (cevaptaki "wrong" kelimeleri metinle eşleşmeli).
+    """
+    t = unicodedata.normalize("NFC", text or "")
+    t = _ZW.sub("", t)
+    return _WS.sub(" ", t).strip()
+
+
+def prompt_version(build_prompt: Callable[[str], str]) -> str:
+    """Prompt şablonunun kısa özeti (paragraf yerine sabit bir işaretçi konarak)."""
+    return hashlib.sha1(build_prompt("\x00PARAGRAPH\x00").encode("utf-8")).hexdigest()[:12]
+
+
+def cache_key(provider: str, model: str, version: str, text: str) -> str:
+    raw = "\x1f".join([provider or "", model or "", version or "", normalize_paragraph(text)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    path None ise ":memory:" kullanılır (testler). max_bytes <= 0: sınırsız.
+    Thread-safe (tek bağlantı + kilit); stats: hits / misses / writes / evictions.
+    """
+
+    def __init__(self, path: Optional[Path] = None, max_bytes: int = 256 * 1024 * 1024):
+        self.path = Path(path) if path else None
+        self.max_bytes = int(max_bytes or 0)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path) if self.path else ":memory:", check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                provider TEXT,
+                model TEXT,
+                prompt_version TEXT,
+                value TEXT,
+                size INTEGER,
+                created_at REAL,
+                last_used REAL,
+                hit_count INTEGER DEFAULT 0
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_lru ON llm_cache(last_used)")
+        self._conn.commit()
+        self._total = int(self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0])
+
+    def get(self, provider: str, model: str, version: str, text: str) -> Optional[List[Dict[str, Any]]]:
+        key = cache_key(provider, model, version, text)
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            self._conn.execute(
+                "UPDATE llm_cache SET last_used = ?, hit_count = hit_count + 1 WHERE key = ?",
+                (time.time(), key),
+            )
+            self._conn.commit()
+        try:
+            return json.loads(row[0])
+        except Exception:
+            return None
+
+    def put(self, provider: str, model: str, version: str, text: str, errors: List[Dict[str, Any]]) -> None:
+        key = cache_key(provider, model, version, text)
+        value = json.dumps(errors or [], ensure_ascii=False)
+        size = len(value.encode("utf-8")) + len(key)
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, provider, model, prompt_version, value, size, created_at, last_used, hit_count) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (key, provider, model, version, value, size, now, now),
+            )
+            self._total += size - (old[0] if old else 0)
+            self.stats["writes"] += 1
+            if self.max_bytes > 0 and self._total > self.max_bytes:
+                self._evict_locked(int(self.max_bytes * EVICT_TARGET))
+            self._conn.commit()
+
+    def _evict_locked(self, target: int) -> None:
+        cur = self._conn.execute("SELECT key, size FROM llm_cache ORDER BY last_used ASC")
+        drop = []
+        total = self._total
+        for key, size in cur:
+            if total <= target:
+                break
+            drop.append((key,))
+            total -= size
+        cur.close()
+        self._conn.executemany("DELETE FROM llm_cache WHERE key = ?", drop)
+        self._total = total
+        self.stats["evictions"] += len(drop)
+
+    def size_bytes(self) -> int:
+        return self._total
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+            self._total = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_default_cache: Optional[LLMResponseCache] = None
+_default_lock = threading.Lock()
+
+
+def default_llm_cache() -> Optional[LLMResponseCache]:
+    """Süreç genelinde paylaşılan önbellek (config.LLM_CACHE_DB); LLM_CACHE_ENABLED=0 ise None."""
+    global _default_cache
+    from src.config import LLM_CACHE_DB, LLM_CACHE_ENABLED, LLM_CACHE_MAX_MB
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _default_lock:
+        # eşzamanlı ilk çağrılar aynı dosyaya iki bağlantı açmasın
+        if _default_cache is None:
+            try:
+                _default_cache = LLMResponseCache(LLM_CACHE_DB, max_bytes=LLM_CACHE_MAX_MB * 1024 * 1024)
+            except Exception as e:
+                print(f"[WARN] LLM önbelleği açılamadı ({LLM_CACHE_DB}): {e}")
+                return None
+        return _default_cache
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+LLM Transport — sağlayıcı HTTP çağrıları için takılabilir taşıyıcı (live / record / replay).
+
+İmla kontrolü (Gemini / OpenAI / Claude) ve TTS seslendirmesi (OpenAI) eskiden doğrudan canlı
+uç noktalara gidiyordu; tekrarlanabilir doğruluk / performans testi yapılamıyordu. Tüm bu
+çağrılar artık get_transport().post(...) üzerinden geçer:
+
+  - live   : doğrudan requests.post (varsayılan, davranış değişmez),
+  - record : canlı çağrı yapar ve istek/cevap çiftini kasete (JSONL) ekler,
+  - replay : ağa hiç çıkmadan kasetten cevap verir; gecikme, hata enjeksiyonu (5xx) ve
+             dakika başına istek sınırı (429 + Retry-After) simüle edilebilir.
+
+Kaset anahtarı: URL (sorgu dizesi hariç) + kanonik JSON gövde. Başlıklar (API anahtarları)
+anahtara girmez ve kasete yazılmaz. Aynı anahtar birden çok kez kaydedildiyse cevaplar kayıt
+sırasıyla verilir, sonuncusu tekrarlanır (ör. 503 -> 200 yeniden deneme dizisi aynen oynar).
+
+Hata enjeksiyonu (anahtar, tekrar sayısı, seed) üzerinden hash ile belirlenir: thread sırası
+değişse de aynı istek aynı denemede aynı hatayı alır. virtual_time=True ile sleep/clock sanal
+saati ilerletir; SpellcheckExecutor bu saati kullanınca geri çekilmeler testte anında biter.
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+
+MODES = ("live", "record", "replay")
+
+
+class CassetteMiss(RuntimeError):
+    """Replay modunda kasette karşılığı olmayan istek."""
+
+
+class TransportResponse:
+    """requests.Response'un kullandığımız alt kümesi: status_code, text, headers, json()."""
+
+    def __init__(self, status_code: int, text: str = "", headers: Optional[Dict[str, str]] = None):
+        self.status_code = int(status_code)
+        self.text = text or ""
+        self.headers = dict(headers or {})
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+
+def request_key(url: str, body: Any) -> str:
+    parts = urlsplit(url)
+    bare = urlunsplit((parts.scheme, parts.netloc, parts.path, "", ""))
+    canon = json.dumps({"url": bare, "body": body}, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(canon.encode("utf-8")).hexdigest()
+
+
+class VirtualClock:
+    """Thread-safe sanal saat: sleep(s) beklemez, saati s kadar ilerletir."""
+
+    def __init__(self, start: float = 0.0):
+        self._now = start
+        self._lock = threading.Lock()
+
+    def clock(self) -> float:
+        with self._lock:
+            return self._now
+
+    def sleep(self, seconds: float) -> None:
+        with self._lock:
+            self._now += max(0.0, float(seconds or 0.0))
+
+
+class LLMTransport:
+    def __init__(
+        self,
+        mode: str = "live",
+        cassette: Optional[Path] = None,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        rpm: int = 0,
+        seed: int = 0,
+        virtual_time: bool = False,
+        live_post: Optional[Callable[..., Any]] = None,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"LLM transport mode must be one of {MODES}, got {mode!r}")
+        if mode != "live" and cassette is None:
+            raise ValueError(f"LLM transport mode {mode!r} needs a cassette path")
+        self.mode = mode
+        self.cassette = Path(cassette) if cassette is not None else None
+        self.latency_ms = float(latency_ms)
+        self.jitter_ms = float(jitter_ms)
+        self.error_rate = float(error_rate)
+        self.error_status = int(error_status)
+        self.rpm = int(rpm)
+        self.seed = int(seed)
+        self._live_post = live_post or requests.post
+        self._lock = threading.Lock()
+        self._tapes: Dict[str, List[Dict[str, Any]]] = {}
+        self._served: Dict[str, int] = {}
+        self._window: Deque[float] = deque()
+        self._rng = random.Random(seed)
+        self.stats = {"requests": 0, "recorded": 0, "replayed": 0, "misses": 0, "injected_errors": 0, "rate_limited": 0}
+
+        if virtual_time:
+            vc = VirtualClock()
+            self.clock: Callable[[], float] = vc.clock
+            self.sleep: Callable[[float], None] = vc.sleep
+        else:
+            self.clock = time.monotonic
+            self.sleep = time.sleep
+
+        if mode == "replay":
+            self._load()
+
+    @property
+    def offline(self) -> bool:
+        """Replay modunda API anahtarı gerekmez."""
+        return self.mode == "replay"
+
+    # ---- kaset ----
+    def _load(self) -> None:
+        if not self.cassette.exists():
+            raise FileNotFoundError(f"LLM cassette not found: {self.cassette}")
+        with open(self.cassette, "r", encoding="utf-8") as f:
+            for ln in f:
+                ln = ln.strip()
+                if not ln:
+                    continue
+                try:
+                    rec = json.loads(ln)
+                except Exception:
+                    break  # yarım yazılmış son satır
+                self._tapes.setdefault(rec["key"], []).append(rec)
+
+    def _record(self, key: str, url: str, body: Any, resp: Any, elapsed: float) -> None:
+        rec = {
+            "key": key,
+            "url": urlunsplit(urlsplit(url)[:3] + ("", "")),
+            "request": body,
+            "status": int(resp.status_code),
+            "headers": {k: v for k, v in (resp.headers or {}).items() if k.lower() in ("retry-after", "content-type")},
+            "text": resp.text or "",
+            "elapsed_ms": round(elapsed * 1000.0, 1),
+        }
+        with self._lock:
+            self.cassette.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.cassette, "a", encoding="utf-8") as f:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            self._tapes.setdefault(key, []).append(rec)
+            self.stats["recorded"] += 1
+
+    # ---- simülasyon ----
+    def _inject_error(self, key: str, n: int) -> bool:
+        if self.error_rate <= 0:
+            return False
+        h = hashlib.sha1(f"{self.seed}:{key}:{n}".encode("utf-8")).hexdigest()
+        return int(h[:8], 16) / 0xFFFFFFFF < self.error_rate
+
+    def _rate_limited(self) -> Optional[float]:
+        """Kayan 60 sn pencerede rpm aşıldıysa pencerenin açılmasına kalan süre."""
+        if not self.rpm:
+            return None
+        now = self.clock()
+        while self._window and now - self._window[0] >= 60.0:
+            self._window.popleft()
+        if len(self._window) >= self.rpm:
+            return 60.0 - (now - self._window[0])
+        self._window.append(now)
+        return None
+
+    def _replay(self, key: str, url: str) -> TransportResponse:
+        with self._lock:
+            n = self._served.get(key, 0)
+            self._served[key] = n + 1
+            tape = self._tapes.get(key)
+            if not tape:
+                self.stats["misses"] += 1
+                raise CassetteMiss(f"LLM cassette miss: {url} ({key[:12]})")
+            wait = self._rate_limited()
+            if wait is not None:
+                self.stats["rate_limited"] += 1
+                return TransportResponse(
+                    429,
+                    json.dumps({"error": {"message": "Rate limit reached (simulated)", "code": 429}}),
+                    {"Retry-After": f"{max(1.0, wait):.0f}"},
+                )
+            if self._inject_error(key, n):
+                self.stats["injected_errors"] += 1
+                return TransportResponse(self.error_status, json.dumps({"error": {"message": "injected error"}}))
+            delay = self.latency_ms + (self._rng.random() * self.jitter_ms if self.jitter_ms else 0.0)
+            rec = tape[min(n, len(tape) - 1)]
+            self.stats["replayed"] += 1
+        if delay > 0:
+            self.sleep(delay / 1000.0)
+        return TransportResponse(rec["status"], rec.get("text") or "", rec.get("headers"))
+
+    # ---- genel arayüz ----
+    def post(self, url: str, headers: Optional[Dict[str, str]] = None, json: Any = None, timeout: Any = None) -> Any:
+        with self._lock:
+            self.stats["requests"] += 1
+        if self.mode == "live":
+            return self._live_post(url, headers=headers, json=json, timeout=timeout)
+        key = request_key(url, json)
+        if self.mode == "replay":
+            return self._replay(key, url)
+        t0 = time.monotonic()
+        resp = self._live_post(url, headers=headers, json=json, timeout=timeout)
+        self._record(key, url, json, resp, time.monotonic() - t0)
+        return resp
+
+
+_default_transport: Optional[LLMTransport] = None
+_default_lock = threading.Lock()
+
+
+def get_transport() -> LLMTransport:
+    """Süreç genelindeki taşıyıcı (config.LLM_TRANSPORT_MODE ve LLM_REPLAY_* ayarlarından)."""
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            from src.config import (
+                LLM_CASSETTE, LLM_TRANSPORT_MODE, LLM_REPLAY_ERROR_RATE, LLM_REPLAY_LATENCY_MS,
+                LLM_REPLAY_RPM, LLM_REPLAY_SEED,
+            )
+            try:
+                _default_transport = LLMTransport(
+                    LLM_TRANSPORT_MODE,
+                    cassette=LLM_CASSETTE,
+                    latency_ms=LLM_REPLAY_LATENCY_MS,
+                    error_rate=LLM_REPLAY_ERROR_RATE,
+                    rpm=LLM_REPLAY_RPM,
+                    seed=LLM_REPLAY_SEED,
+                )
+            except Exception as e:
+                print(f"[WARN] LLM transport ({LLM_TRANSPORT_MODE}) kurulamadı, canlı moda dönülüyor: {e}")
+                _default_transport = LLMTransport("live")
+        return _default_transport
+
+
+def set_transport(transport: Optional[LLMTransport]) -> Optional[LLMTransport]:
+    """Taşıyıcıyı değiştirir (testler / benchmark'lar); öncekini döner. None: config'ten yeniden kur."""
+    global _default_transport
+    with _default_lock:
+        prev = _default_transport
+        _default_transport = transport
+    return prev
+
+
+OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
+
+
+def openai_chat_text(messages: List[Dict[str, str]], model: str, api_key: Optional[str], temperature: float = 0) -> str:
+    """
+    Chat Completions çağrısı (TTS seslendirmesi) taşıyıcı üzerinden; model metnini döner.
+    HTTP hatasında 'OpenAI HTTP <kod>: ...' mesajlı RuntimeError fırlatır.
+    """
+    headers = {"Authorization": f"Bearer {api_key or ''}", "Content-Type": "application/json"}
+    body = {"model": model, "messages": messages, "temperature": temperature}
+    r = get_transport().post(OPENAI_CHAT_URL, headers=headers, json=body, timeout=(20, 240))
+    if r.status_code != 200:
+        raise RuntimeError(f"OpenAI HTTP {r.status_code}: {(r.text or '')[:500]}")
+    data = r.json()
+    choices = data.get("choices") or []
+    if not choices:
+        return ""
+    return ((choices[0].get("message") or {}).get("content")) or ""
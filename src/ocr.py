@@ -13,11 +13,8 @@ from typing import List, Tuple, Optional, Callable, Dict, Any
 from PIL import Image
 import requests
 from requests.exceptions import ReadTimeout, ConnectTimeout, ConnectionError
-from src.config import (
-    VISION_TIMEOUT, VISION_RETRIES, VISION_BACKOFF_BASE,
-    VISION_MAX_DIM, VISION_JPEG_QUALITY, OCR_DIR, LINES_MANIFEST
-)
 from src.kraken_processor import load_line_records_ordered
+from src.project_context import ProjectContext, default_context
 
 
 VISION_ENDPOINT_TPL = "https://vision.googleapis.com/v1/images:annotate?key={api_key}"
@@ -42,15 +39,34 @@ def _b64_bytes(b: bytes) -> str:
 def ocr_lines_with_google_vision_api(
     ordered_line_paths: List[Path],
     api_key: str,
-    timeout: Tuple[int, int] = VISION_TIMEOUT,
-    retries: int = VISION_RETRIES,
-    backoff_base: float = VISION_BACKOFF_BASE,
-    max_dim: int = VISION_MAX_DIM,
-    jpeg_quality: int = VISION_JPEG_QUALITY,
+    timeout: Optional[Tuple[int, int]] = None,
+    retries: Optional[int] = None,
+    backoff_base: Optional[float] = None,
+    max_dim: Optional[int] = None,
+    jpeg_quality: Optional[int] = None,
     sleep_s: float = 0.10,
     status_callback: Optional[Callable[[str, str], None]] = None,
-    ocr_dir: Path = OCR_DIR,
+    ocr_dir: Optional[Path] = None,
+    ctx: Optional[ProjectContext] = None,
+    nusha_index: int = 1,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    line_callback: Optional[Callable[[Path, Optional[str]], None]] = None,
 ) -> Tuple[int, int]:
+    """
+    Verilmeyen Vision ayarları ve ocr_dir ctx'ten (ProjectContext) gelir; ctx de yoksa
+    config varsayılanları ve eski output_lines/ocr.
+    progress_callback(done, total): her satırdan sonra (başarılı veya hatalı).
+    line_callback(line_path, error): her satırdan sonra; error None ise okundu (aşama defteri için).
+    """
+    ctx = ctx or default_context()
+    settings = ctx.vision_kwargs()
+    timeout = timeout if timeout is not None else settings["timeout"]
+    retries = retries if retries is not None else settings["retries"]
+    backoff_base = backoff_base if backoff_base is not None else settings["backoff_base"]
+    max_dim = max_dim if max_dim is not None else settings["max_dim"]
+    jpeg_quality = jpeg_quality if jpeg_quality is not None else settings["jpeg_quality"]
+    ocr_dir = ocr_dir or ctx.ocr_dir(nusha_index)
+
     api_key = (api_key or "").strip()
     if not api_key:
         raise ValueError("Google Vision API Key bulunamadı.")
@@ -115,14 +131,18 @@ def ocr_lines_with_google_vision_api(
         if last_err is not None or data is None:
             out_json.write_text(json.dumps({"error": str(last_err)}, ensure_ascii=False, indent=2), encoding="utf-8")
             out_txt.write_text("", encoding="utf-8")
-            continue
-
-        out_json.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
-        text = parse_text(data)
-        out_txt.write_text(text, encoding="utf-8")
-        ok += 1
-
-        time.sleep(sleep_s)
+        else:
+            out_json.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+            text = parse_text(data)
+            out_txt.write_text(text, encoding="utf-8")
+            ok += 1
+
+        if line_callback:
+            line_callback(lp, None if last_err is None and data is not None else str(last_err))
+        if progress_callback:
+            progress_callback(idx + 1, total)
+        if last_err is None and data is not None:
+            time.sleep(sleep_s)
 
     return ok, total
 
@@ -131,9 +151,15 @@ def ocr_lines_with_google_vision_api(
 # Load OCR lines in manifest order
 # =========================
 def load_ocr_lines_ordered(
-    manifest_path: Path = LINES_MANIFEST,
-    ocr_dir: Path = OCR_DIR
+    manifest_path: Optional[Path] = None,
+    ocr_dir: Optional[Path] = None,
+    ctx: Optional[ProjectContext] = None,
+    nusha_index: int = 1,
 ) -> List[Dict[str, Any]]:
+    """Verilmeyen yollar ctx'in (yoksa output_lines) nusha_index. nüshasından."""
+    ctx = ctx or default_context()
+    manifest_path = manifest_path or ctx.lines_manifest(nusha_index)
+    ocr_dir = ocr_dir or ctx.ocr_dir(nusha_index)
     recs = load_line_records_ordered(manifest_path=manifest_path)
     out: List[Dict[str, Any]] = []
     for r in recs:
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+OCR Noise — hizalama benchmark'ı için sentetik nüsha üretimi (bilinen doğru satır sınırlarıyla).
+
+Referans metinden (docx / düz metin / sentetik) satır ve sayfalara bölünmüş bir "nüsha"
+üretir ve üzerine Arap yazısına özgü OCR gürültüsü ekler:
+  - harf karışıklıkları (ب/ت/ث/ن/ي, ج/ح/خ, د/ذ, ر/ز, س/ش, ص/ض, ط/ظ, ع/غ, ف/ق, ه/ة, ا/أ/إ/آ)
+  - noktaların düşmesi (ب -> ٮ, ف -> ڡ, ق -> ٯ, ن -> ں ...)
+  - kelime birleşmesi / bölünmesi
+  - atlanan ve tekrarlanan satırlar
+  - sayfa sonları (sayfa başına değişken satır sayısı, isteğe bağlı sayfa başlığı satırı)
+
+Her üretilen satır, referans token aralığını ("gt": [start, end)) taşır; başlık satırlarında
+gt None'dır. line_boundary_accuracy, hizalayıcının best.start_word/end_word çıktısını bu
+aralıklarla karşılaştırır.
+"""
+
+import random
+from typing import Any, Dict, List, Optional, Tuple
+
+# Noktalı harf -> aynı iskeletteki diğer harfler (OCR'ın en sık karıştırdıkları)
+CONFUSABLE_GROUPS = (
+    "بتثني", "جحخ", "دذ", "رز", "سش", "صض", "طظ", "عغ", "فق", "هة", "اأإآ", "ىي", "وؤ",
+)
+_CONFUSABLE: Dict[str, str] = {}
+for _g in CONFUSABLE_GROUPS:
+    for _ch in _g:
+        _CONFUSABLE[_ch] = _g.replace(_ch, "")
+
+# Noktalar düştüğünde kalan iskelet harfler
+DOTLESS = {
+    "ب": "ٮ", "ت": "ٮ", "ث": "ٮ", "ن": "ں", "ي": "ى", "ج": "ح", "خ": "ح", "ذ": "د",
+    "ز": "ر", "ش": "س", "ض": "ص", "ظ": "ط", "غ": "ع", "ف": "ڡ", "ق": "ٯ", "ة": "ه",
+}
+
+SYNTH_VOCAB = (
+    "كتاب", "الله", "قال", "في", "من", "على", "الحمد", "رب", "العالمين", "محمد", "العلم", "نور",
+    "هذا", "ذلك", "الذي", "التي", "عن", "إلى", "بن", "أبو", "الشيخ", "رحمه", "تعالى", "فصل", "باب",
+    "المسألة", "الأصل", "قلت", "قوله", "يعني", "والجواب", "فإن", "قيل", "لأن", "بخلاف", "وهو",
+)
+
+
+class NoiseProfile:
+    """Gürültü oranları (kelime / satır / sayfa başına olasılıklar)."""
+
+    def __init__(
+        self,
+        char_sub: float = 0.0,
+        dot_drop: float = 0.0,
+        word_merge: float = 0.0,
+        word_split: float = 0.0,
+        line_skip: float = 0.0,
+        line_dup: float = 0.0,
+        page_header: float = 0.0,
+        words_per_line: Tuple[int, int] = (8, 14),
+        lines_per_page: Tuple[int, int] = (17, 25),
+    ):
+        self.char_sub = char_sub
+        self.dot_drop = dot_drop
+        self.word_merge = word_merge
+        self.word_split = word_split
+        self.line_skip = line_skip
+        self.line_dup = line_dup
+        self.page_header = page_header
+        self.words_per_line = words_per_line
+        self.lines_per_page = lines_per_page
+
+    def to_json(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+
+PROFILES = {
+    "clean": NoiseProfile(),
+    "light": NoiseProfile(char_sub=0.03, dot_drop=0.03, word_merge=0.01, word_split=0.01,
+                          line_skip=0.002, line_dup=0.002, page_header=0.2),
+    "medium": NoiseProfile(char_sub=0.08, dot_drop=0.08, word_merge=0.03, word_split=0.03,
+                           line_skip=0.01, line_dup=0.005, page_header=0.5),
+    "heavy": NoiseProfile(char_sub=0.15, dot_drop=0.2, word_merge=0.06, word_split=0.06,
+                          line_skip=0.03, line_dup=0.01, page_header=1.0),
+}
+
+
+def synthetic_reference(n_words: int, seed: int = 0) -> List[str]:
+    rnd = random.Random(seed)
+    return [rnd.choice(SYNTH_VOCAB) for _ in range(n_words)]
+
+
+def scale_reference(tokens: List[str], n_words: int) -> List[str]:
+    """Referansı n_words'e keser veya döngüsel olarak uzatır."""
+    if not tokens:
+        return synthetic_reference(n_words)
+    reps = -(-n_words // len(tokens))
+    return (tokens * reps)[:n_words]
+
+
+def _noisy_word(word: str, p: NoiseProfile, rnd: random.Random) -> str:
+    if p.char_sub <= 0 and p.dot_drop <= 0:
+        return word
+    out = []
+    for ch in word:
+        alts = _CONFUSABLE.get(ch)
+        if alts and rnd.random() < p.char_sub:
+            ch = rnd.choice(alts)
+        elif ch in DOTLESS and rnd.random() < p.dot_drop:
+            ch = DOTLESS[ch]
+        out.append(ch)
+    return "".join(out)
+
+
+def _noisy_line(words: List[str], p: NoiseProfile, rnd: random.Random) -> str:
+    words = [_noisy_word(w, p, rnd) for w in words]
+    out: List[str] = []
+    i = 0
+    while i < len(words):
+        w = words[i]
+        if i + 1 < len(words) and rnd.random() < p.word_merge:
+            out.append(w + words[i + 1])
+            i += 2
+            continue
+        if len(w) >= 4 and rnd.random() < p.word_split:
+            cut = rnd.randint(1, len(w) - 1)
+            out.extend([w[:cut], w[cut:]])
+        else:
+            out.append(w)
+        i += 1
+    return " ".join(out)
+
+
+def make_witness(
+    tokens: List[str],
+    profile: NoiseProfile,
+    seed: int = 0,
+    tag: str = "syn",
+) -> List[Dict[str, Any]]:
+    """
+    Referans tokenlarından gürültülü bir OCR satır listesi üretir (lines_manifest + ocr şekli).
+    Her satır "gt" alanında doğru referans aralığını taşır (başlık satırlarında None).
+    """
+    rnd = random.Random(seed)
+    lines: List[Dict[str, Any]] = []
+    page_no = 0
+    left_on_page = 0
+    y = 0
+
+    def emit(text: str, gt: Optional[List[int]]):
+        nonlocal left_on_page, y, page_no
+        if left_on_page <= 0:
+            page_no += 1
+            left_on_page = rnd.randint(*profile.lines_per_page)
+            y = 0
+            if rnd.random() < profile.page_header:
+                # sayfa başlığı / sayfa numarası: referansta karşılığı yok
+                _append(f"{tag} {page_no}", None)
+        _append(text, gt)
+        left_on_page -= 1
+
+    def _append(text: str, gt: Optional[List[int]]):
+        nonlocal y
+        idx = len(lines)
+        page = f"{tag}_p{page_no:04d}"
+        lines.append({
+            "ocr_text": text,
+            "line_image": f"{page}_line_{idx:06d}.png",
+            "page_image": f"{page}.png",
+            "page_name": f"{page}.png",
+            "bbox": [40, y, 1200, y + 48],
+            "line_index": idx,
+            "gt": gt,
+        })
+        y += 56
+
+    i = 0
+    while i < len(tokens):
+        n = rnd.randint(*profile.words_per_line)
+        start, end = i, min(i + n, len(tokens))
+        i = end
+        if rnd.random() < profile.line_skip:
+            continue
+        text = _noisy_line(tokens[start:end], profile, rnd)
+        emit(text, [start, end])
+        if rnd.random() < profile.line_dup:
+            emit(_noisy_line(tokens[start:end], profile, rnd), [start, end])
+    return lines
+
+
+def line_boundary_accuracy(
+    witness: List[Dict[str, Any]],
+    aligned: List[Dict[str, Any]],
+    tolerance: int = 1,
+) -> Dict[str, Any]:
+    """
+    Hizalanan satırların best.start_word/end_word değerlerini gt ile karşılaştırır.
+      exact      : iki sınır da birebir doğru olan satır oranı
+      within_tol : iki sınır da ±tolerance içinde olan satır oranı
+      mean_abs   : ortalama sınır hatası (kelime)
+    """
+    n = exact = within = 0
+    err_sum = 0
+    for src, item in zip(witness, aligned):
+        gt = src.get("gt")
+        if not gt:
+            continue
+        best = item.get("best") or {}
+        s, e = best.get("start_word"), best.get("end_word")
+        if not isinstance(s, int) or not isinstance(e, int):
+            s, e = -10 ** 9, -10 ** 9
+        ds, de = abs(s - gt[0]), abs(e - gt[1])
+        n += 1
+        exact += ds == 0 and de == 0
+        within += ds <= tolerance and de <= tolerance
+        err_sum += min(ds, 10 ** 6) + min(de, 10 ** 6)
+    return {
+        "lines": n,
+        "exact": round(exact / n, 4) if n else 0.0,
+        "within_tol": round(within / n, 4) if n else 0.0,
+        "mean_abs": round(err_sum / (2 * n), 3) if n else 0.0,
+        "tolerance": tolerance,
+    }
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Alignment payload v2 — nüshalar arası bağlantılar kopya yerine referans olarak saklanır.
+
+v1'de her satır, diğer nüshalardaki eşleşen satırların TAM kopyalarını taşır (alt, alt_list,
+alt3_list, ocr_alt_list, ocr_alt_best ...): OCR metni, referans metin, görsel yolu ve skorlar.
+4 nüshalı bir kitapta alignment.json onlarca MB'a çıkar ve büyük kısmı aynı dosyadaki
+verinin tekrarıdır.
+
+v2'de her satır nüsha başına bir kez saklanır; bağlantı alanlarının adı aynı kalır ama
+değerleri referanstır:
+    {"n": hedef_nüsha, "l": hedef_line_no, "s": start_word, "e": end_word, "ov": overlap}
+  - l : hedef nüshadaki line_no (API'nin satırları adreslediği kalıcı anahtar)
+  - s/e: hedef satırın tahkik token aralığı (varsa), ov: çakışma (liste öğelerinde)
+
+Okuyucular referansları LinkResolver ile ihtiyaç anında çözer; çözülmüş değer v1 şekliyle
+birebir aynıdır. Karışık (bir kısmı v1 kopyası) payload'lar da sorunsuz okunur.
+"""
+
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+from src.witnesses import witness_indices, witness_key
+
+FORMAT_VERSION = 2
+
+# alt, alt2, alt3_list, ocr_alt_list, ocr_alt4_best ...
+_LINK_FIELD_RE = re.compile(r"^(ocr_)?alt(\d*)(_list|_best)?$")
+
+
+def link_target(src: int, field: str) -> Optional[int]:
+    """witnesses.link_field'in tersi: src nüshasındaki alanın gösterdiği hedef nüsha."""
+    m = _LINK_FIELD_RE.match(field)
+    if not m:
+        return None
+    digits = m.group(2)
+    if not digits:
+        return 2 if src == 1 else 1
+    return int(digits)
+
+
+def is_link_field(field: str) -> bool:
+    return bool(_LINK_FIELD_RE.match(field))
+
+
+def is_ref(x: Any) -> bool:
+    return isinstance(x, dict) and "n" in x and "l" in x
+
+
+def _to_ref(tgt: int, entry: Any) -> Any:
+    if not isinstance(entry, dict) or is_ref(entry) or entry.get("line_no") is None:
+        return entry
+    ref: Dict[str, Any] = {"n": tgt, "l": entry["line_no"]}
+    best = entry.get("best")
+    if isinstance(best, dict) and isinstance(best.get("start_word"), int):
+        ref["s"] = best["start_word"]
+        ref["e"] = best.get("end_word")
+    if "overlap" in entry:
+        ref["ov"] = entry["overlap"]
+    return ref
+
+
+def compact_line(item: Dict[str, Any], src: int) -> Dict[str, Any]:
+    """Bir satırın bağlantı alanlarını referanslara çevirir (yeni dict döner)."""
+    if not isinstance(item, dict):
+        return item
+    out = dict(item)
+    for field, val in item.items():
+        tgt = link_target(src, field)
+        if tgt is None or val is None:
+            continue
+        if isinstance(val, list):
+            out[field] = [_to_ref(tgt, e) for e in val]
+        else:
+            out[field] = _to_ref(tgt, val)
+    return out
+
+
+def compact_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """v1 -> v2 dönüştürücü (v2 girdi için de güvenli, idempotent)."""
+    out = dict(payload)
+    for k in witness_indices(payload):
+        lines = payload.get(witness_key(k))
+        if isinstance(lines, list):
+            out[witness_key(k)] = [compact_line(it, k) for it in lines]
+    out["format_version"] = FORMAT_VERSION
+    return out
+
+
+class LinkResolver:
+    """
+    Referansları v1 şekline çözer. Hedef nüsha satırları ilk ihtiyaçta bir kez indekslenir.
+      - payload verilirse satırlar payload'dan,
+      - loader verilirse (ör. ProjectManager.get_nusha_alignment) nüsha başına ondan okunur.
+    """
+
+    def __init__(
+        self,
+        payload: Optional[Dict[str, Any]] = None,
+        loader: Optional[Callable[[int], List[Dict[str, Any]]]] = None,
+    ):
+        self.payload = payload
+        self.loader = loader
+        self._by_line_no: Dict[int, Dict[Any, Dict[str, Any]]] = {}
+
+    def _index(self, n: int) -> Dict[Any, Dict[str, Any]]:
+        idx = self._by_line_no.get(n)
+        if idx is None:
+            if self.payload is not None:
+                lines = self.payload.get(witness_key(n)) or []
+            elif self.loader is not None:
+                lines = self.loader(n) or []
+            else:
+                lines = []
+            idx = {it.get("line_no"): it for it in lines if isinstance(it, dict)}
+            self._by_line_no[n] = idx
+        return idx
+
+    def resolve(self, ref: Any, ocr: bool = False) -> Optional[Dict[str, Any]]:
+        if not is_ref(ref):
+            return ref
+        t = self._index(ref["n"]).get(ref["l"])
+        if t is None:
+            return None
+        out: Dict[str, Any] = {
+            "line_no": t.get("line_no"),
+            "line_image": t.get("line_image", "") or "",
+            "ocr_text": t.get("ocr_text", "") or "",
+        }
+        if not ocr:
+            out["best"] = t.get("best", {})
+        if "ov" in ref:
+            out["overlap"] = ref["ov"]
+        return out
+
+    def resolve_field(self, item: Dict[str, Any], field: str) -> Any:
+        val = item.get(field) if isinstance(item, dict) else None
+        ocr = field.startswith("ocr_")
+        if isinstance(val, list):
+            return [r for r in (self.resolve(e, ocr) for e in val) if r is not None]
+        return self.resolve(val, ocr)
+
+    def expand_line(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        if not isinstance(item, dict):
+            return item
+        out = dict(item)
+        for field in item:
+            if is_link_field(field):
+                out[field] = self.resolve_field(item, field)
+        return out
+
+
+def expand_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """v2 -> v1 (tüm referanslar çözülmüş kopya); eski tüketiciler için."""
+    resolver = LinkResolver(payload)
+    out = dict(payload)
+    for k in witness_indices(payload):
+        lines = payload.get(witness_key(k))
+        if isinstance(lines, list):
+            out[witness_key(k)] = [resolver.expand_line(it) for it in lines]
+    out.pop("format_version", None)
+    return out
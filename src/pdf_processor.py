@@ -5,8 +5,9 @@ PDF processing: PDF to PNG conversion and spread splitting
 """
 
 from pathlib import Path
-from typing import List, Tuple, TYPE_CHECKING
-from src.config import PAGES_DIR, SPREAD_RATIO
+from typing import Callable, List, Optional, Tuple, TYPE_CHECKING
+from src.config import SPREAD_RATIO
+from src.project_context import ProjectContext, default_context
 
 if TYPE_CHECKING:
     # Only for type hints; imported lazily at runtime in _render_page_to_pil.
@@ -33,9 +34,9 @@ def _render_page_to_pil(page, scale: float) -> Image.Image:
         return r
     raise RuntimeError("PDF render output could not be converted to PIL. Update pypdfium2: pip install -U pypdfium2")
 
-def _is_spread(img: Image.Image) -> bool:
+def _is_spread(img: Image.Image, ratio: float = SPREAD_RATIO) -> bool:
     w, h = img.size
-    return (w / float(max(1, h))) > SPREAD_RATIO
+    return (w / float(max(1, h))) > ratio
 
 def _split_spread(img: Image.Image) -> Tuple[Image.Image, Image.Image]:
     w, h = img.size
@@ -44,7 +45,22 @@ def _split_spread(img: Image.Image) -> Tuple[Image.Image, Image.Image]:
     left = img.crop((0, 0, mid, h))
     return right, left
 
-def pdf_to_page_pngs(pdf_path: Path, dpi: int, pages_dir: Path = PAGES_DIR) -> List[Path]:
+def pdf_to_page_pngs(
+    pdf_path: Path,
+    dpi: Optional[int] = None,
+    pages_dir: Optional[Path] = None,
+    ctx: Optional[ProjectContext] = None,
+    nusha_index: int = 1,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+) -> List[Path]:
+    """
+    ctx: çıktı klasörü (pages_dir verilmezse ctx.pages_dir(nusha_index)), DPI ve spread oranı.
+    Bağlam verilmezse eski output_lines düzeni kullanılır.
+    progress_callback(done, total): her PDF sayfasından sonra.
+    """
+    ctx = ctx or default_context()
+    dpi = dpi or ctx.dpi
+    pages_dir = pages_dir or ctx.pages_dir(nusha_index)
     try:
         import pypdfium2 as pdfium  # type: ignore
     except Exception as e:
@@ -70,7 +86,7 @@ def pdf_to_page_pngs(pdf_path: Path, dpi: int, pages_dir: Path = PAGES_DIR) -> L
                 except Exception:
                     pass
 
-            if _is_spread(img):
+            if _is_spread(img, ctx.spread_ratio):
                 right, left = _split_spread(img)
 
                 pages_dir.mkdir(parents=True, exist_ok=True)
@@ -87,6 +103,9 @@ def pdf_to_page_pngs(pdf_path: Path, dpi: int, pages_dir: Path = PAGES_DIR) -> L
                 out_path = pages_dir / f"page_{i+1:04d}.png"
                 img.save(out_path)
                 page_paths.append(out_path)
+
+            if progress_callback:
+                progress_callback(i + 1, len(pdf))
     finally:
         try:
             pdf.close()
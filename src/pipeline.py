@@ -7,14 +7,7 @@ import json
 import shutil
 from pathlib import Path
 from typing import List, Optional, Callable
-from src.config import (
-    DPI_DEFAULT, VISION_TIMEOUT, VISION_RETRIES, VISION_BACKOFF_BASE,
-    VISION_MAX_DIM, VISION_JPEG_QUALITY, 
-    PAGES_DIR as DEFAULT_PAGES_DIR,
-    LINES_DIR as DEFAULT_LINES_DIR,
-    OCR_DIR as DEFAULT_OCR_DIR,
-    LINES_MANIFEST as DEFAULT_LINES_MANIFEST
-)
+from src.project_context import ProjectContext, default_context
 from src.utils import hard_cleanup_output
 from src.pdf_processor import pdf_to_page_pngs
 from src.kraken_processor import split_page_to_lines, load_line_records_ordered
@@ -42,6 +35,7 @@ def run_segmentation(
         status_callback("Sayfalar satırlara bölünüyor (Kraken)...", "INFO")
 
     # Initialize manifest
+    lines_manifest.parent.mkdir(parents=True, exist_ok=True)
     with lines_manifest.open("w", encoding="utf-8") as mf:
         pass # Create/Clear file
 
@@ -67,11 +61,13 @@ def run_segmentation(
 def run_ocr(
     lines_manifest: Path,
     ocr_dir: Path,
-    status_callback: Optional[Callable[[str, str], None]] = None
+    status_callback: Optional[Callable[[str, str], None]] = None,
+    ctx: Optional[ProjectContext] = None,
 ):
     """
     Step 3: Text Recognition (Google Vision).
     Reads line images from lines_manifest, performs OCR, and saves results to ocr_dir.
+    Vision ayarları ctx'ten (varsayılan: config).
     """
     ordered_recs = load_line_records_ordered(manifest_path=lines_manifest)
     ordered_line_paths = [Path(r["line_image"]) for r in ordered_recs]
@@ -88,14 +84,10 @@ def run_ocr(
     ocr_ok, total = ocr_lines_with_google_vision_api(
         ordered_line_paths,
         api_key=vkey,
-        timeout=VISION_TIMEOUT,
-        retries=VISION_RETRIES,
-        backoff_base=VISION_BACKOFF_BASE,
-        max_dim=VISION_MAX_DIM,
-        jpeg_quality=VISION_JPEG_QUALITY,
         sleep_s=0.10,
         status_callback=status_callback,
-        ocr_dir=ocr_dir
+        ocr_dir=ocr_dir,
+        ctx=ctx,
     )
     
     if status_callback:
@@ -109,17 +101,22 @@ def run_ocr(
 # =========================
 def run_pipeline(
     pdf_path: Path, 
-    dpi: int = 300, 
+    dpi: Optional[int] = None, 
     do_ocr: bool = True, 
     status_callback: Optional[Callable[[str, str], None]] = None,
-    output_dir: Optional[Path] = None
+    output_dir: Optional[Path] = None,
+    ctx: Optional[ProjectContext] = None,
+    nusha_index: int = 1,
 ):
     """
     Run the full pipeline: PDF -> Pages -> Lines -> OCR.
+    Paths and settings come from ctx (ProjectContext) for the given nusha; without ctx the
+    legacy output_lines layout is used (Nusha 1 at the root).
     If output_dir is provided (e.g. for Nusha 2), it uses that directory structure.
-    Otherwise uses default constants from config (Nusha 1).
     """
-    
+    ctx = ctx or default_context()
+    dpi = dpi or ctx.dpi
+
     # 1. Determine Paths & Cleanup
     if output_dir:
         # Custom Output Directory (Multi-View)
@@ -145,21 +142,22 @@ def run_pipeline(
         ocr_dir.mkdir(parents=True, exist_ok=True)
         
     else:
-        # Default Output Directory (Main / Nusha 1)
+        # Context Output Directory (default: output_lines / Nusha 1)
         if status_callback:
-            status_callback("Eski çıktılar (output_lines) temizleniyor...", "INFO")
-        hard_cleanup_output()
+            status_callback(f"Eski çıktılar ({ctx.nusha_dir(nusha_index).name}) temizleniyor...", "INFO")
+        hard_cleanup_output(ctx, nusha_index)
+        ctx.ensure_dirs([nusha_index])
         
-        pages_dir = DEFAULT_PAGES_DIR
-        lines_dir = DEFAULT_LINES_DIR
-        ocr_dir = DEFAULT_OCR_DIR
-        lines_manifest = DEFAULT_LINES_MANIFEST
+        pages_dir = ctx.pages_dir(nusha_index)
+        lines_dir = ctx.lines_dir(nusha_index)
+        ocr_dir = ctx.ocr_dir(nusha_index)
+        lines_manifest = ctx.lines_manifest(nusha_index)
 
     if status_callback:
         status_callback(f"PDF işleniyor: {pdf_path.name} (DPI: {dpi})...", "INFO")
         
     # 2. PDF -> Pages
-    pages = pdf_to_page_pngs(pdf_path, dpi=dpi, pages_dir=pages_dir)
+    pages = pdf_to_page_pngs(pdf_path, dpi=dpi, pages_dir=pages_dir, ctx=ctx)
     
     if status_callback:
         status_callback(f"✓ {len(pages)} sayfa PNG'e dönüştürüldü", "INFO")
@@ -170,6 +168,6 @@ def run_pipeline(
     # Step 3: OCR
     ocr_ok = 0
     if do_ocr:
-        ocr_ok = run_ocr(lines_manifest, ocr_dir, status_callback)
+        ocr_ok = run_ocr(lines_manifest, ocr_dir, status_callback, ctx=ctx)
 
     return len(pages), total_lines, ocr_ok
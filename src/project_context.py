@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Proje çalışma bağlamı (ProjectContext): bir çalıştırmanın bütün çıktı yolları ve ayarları.
+
+Eskiden pipeline / hizalama / OCR / arşiv kodu config.py'deki modül sabitlerine
+(OUTPUT_LINES altındaki PAGES_DIR, NUSHA2_*..., ALIGNMENT_JSON ...) yazıyordu; aynı süreçte iki
+proje işlenince birbirinin çıktısını eziyordu ve klasörler import sırasında oluşturuluyordu.
+Artık bu fonksiyonlar bir ProjectContext alır; verilmezse default_context() (eski output_lines
+düzeni) kullanılır, böylece masaüstü GUI / viewer / betikler aynen çalışır.
+
+İki düzen:
+  - legacy : output_lines — nüsha 1 kökte (pages/, lines/, ocr/), k >= 2 için nusha{k}/;
+             alignment.json / spellcheck.json / doc_archives kökte
+  - project: tahkik_data/projects/<id> — her nüsha nusha_{k}/ altında, alignment.json nüsha başına
+
+Bağlam oluşturulduktan sonra değiştirilmez (with_settings yeni bağlam döner); thread'ler
+arasında paylaşılabilir. Klasörler yalnızca
+ensure_dirs() ile (veya yazan fonksiyon tarafından) ilk yazımda oluşturulur.
+"""
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.config import (
+    ALIGN_TRACE_LEVEL,
+    DOC_ARCHIVE_KEEP,
+    DPI_DEFAULT,
+    OUT,
+    SPREAD_RATIO,
+    VISION_BACKOFF_BASE,
+    VISION_JPEG_QUALITY,
+    VISION_MAX_DIM,
+    VISION_RETRIES,
+    VISION_TIMEOUT,
+)
+
+LAYOUT_LEGACY = "legacy"
+LAYOUT_PROJECT = "project"
+
+
+_SETTINGS = {
+    "dpi": DPI_DEFAULT,
+    "spread_ratio": SPREAD_RATIO,
+    "vision_timeout": VISION_TIMEOUT,
+    "vision_retries": VISION_RETRIES,
+    "vision_backoff_base": VISION_BACKOFF_BASE,
+    "vision_max_dim": VISION_MAX_DIM,
+    "vision_jpeg_quality": VISION_JPEG_QUALITY,
+    "align_trace_level": ALIGN_TRACE_LEVEL,
+    "doc_archive_keep": DOC_ARCHIVE_KEEP,
+}
+
+
+class ProjectContext:
+    """Ayarlar (_SETTINGS anahtarları) anahtar kelimeyle verilir; verilmeyenler config.py'den gelir."""
+
+    def __init__(self, root: Path, layout: str = LAYOUT_LEGACY, project_id: Optional[str] = None, **settings):
+        if layout not in (LAYOUT_LEGACY, LAYOUT_PROJECT):
+            raise ValueError(f"Unknown context layout: {layout}")
+        unknown = set(settings) - set(_SETTINGS)
+        if unknown:
+            raise ValueError(f"Unknown context settings: {', '.join(sorted(unknown))}")
+        self.root = Path(root)
+        self.layout = layout
+        self.project_id = project_id
+        for key, default in _SETTINGS.items():
+            setattr(self, key, settings.get(key, default))
+
+    def __repr__(self) -> str:
+        return f"ProjectContext(root={str(self.root)!r}, layout={self.layout!r}, project_id={self.project_id!r})"
+
+    # --- oluşturucular ---
+    @classmethod
+    def legacy(cls, root: Optional[Path] = None, **settings) -> "ProjectContext":
+        """output_lines düzeni (masaüstü GUI / viewer); root verilirse onun altında."""
+        return cls(Path(root) if root is not None else OUT, LAYOUT_LEGACY, **settings)
+
+    @classmethod
+    def for_project(cls, project_dir: Path, project_id: Optional[str] = None, **settings) -> "ProjectContext":
+        """tahkik_data/projects/<id> düzeni (API / ManuscriptEngine)."""
+        project_dir = Path(project_dir)
+        return cls(project_dir, LAYOUT_PROJECT, project_id or project_dir.name, **settings)
+
+    def with_settings(self, **settings) -> "ProjectContext":
+        current = {key: getattr(self, key) for key in _SETTINGS}
+        return ProjectContext(self.root, self.layout, self.project_id, **{**current, **settings})
+
+    # --- nüsha yolları ---
+    def nusha_dir(self, nusha_index: int = 1) -> Path:
+        k = int(nusha_index or 1)
+        if self.layout == LAYOUT_PROJECT:
+            return self.root / f"nusha_{k}"
+        return self.root if k <= 1 else self.root / f"nusha{k}"
+
+    def pages_dir(self, nusha_index: int = 1) -> Path:
+        return self.nusha_dir(nusha_index) / "pages"
+
+    def lines_dir(self, nusha_index: int = 1) -> Path:
+        return self.nusha_dir(nusha_index) / "lines"
+
+    def ocr_dir(self, nusha_index: int = 1) -> Path:
+        return self.nusha_dir(nusha_index) / "ocr"
+
+    def lines_manifest(self, nusha_index: int = 1) -> Path:
+        return self.nusha_dir(nusha_index) / "lines_manifest.jsonl"
+
+    def viewer_html(self, nusha_index: int = 1) -> Path:
+        return self.nusha_dir(nusha_index) / "viewer.html"
+
+    def alignment_json(self, nusha_index: int = 1) -> Path:
+        """legacy: tek (çok nüshalı) alignment.json kökte; project: nüsha başına."""
+        if self.layout == LAYOUT_PROJECT:
+            return self.nusha_dir(nusha_index) / "alignment.json"
+        return self.root / "alignment.json"
+
+    def nusha_paths(self, nusha_index: int = 1) -> Dict[str, Path]:
+        return {
+            "root": self.nusha_dir(nusha_index),
+            "pages": self.pages_dir(nusha_index),
+            "lines": self.lines_dir(nusha_index),
+            "ocr": self.ocr_dir(nusha_index),
+            "manifest": self.lines_manifest(nusha_index),
+            "alignment": self.alignment_json(nusha_index),
+        }
+
+    def discover_nusha_indices(self) -> List[int]:
+        """Satır manifesti olan ek nüshalar (k >= 2), sıralı."""
+        prefix = "nusha_" if self.layout == LAYOUT_PROJECT else "nusha"
+        found = []
+        if self.root.exists():
+            for p in self.root.glob(f"{prefix}*"):
+                suffix = p.name[len(prefix):]
+                if suffix.isdigit() and int(suffix) >= 2 and (p / "lines_manifest.jsonl").exists():
+                    found.append(int(suffix))
+        return sorted(found)
+
+    # --- proje geneli dosyalar ---
+    @property
+    def viewer_dual_html(self) -> Path:
+        return self.root / "viewer_dual.html"
+
+    @property
+    def index_html(self) -> Path:
+        return self.root / "index.html"
+
+    @property
+    def spellcheck_json(self) -> Path:
+        return self.root / "spellcheck.json"
+
+    @property
+    def spellcheck_backups_dir(self) -> Path:
+        return self.root / "spellcheck_backups"
+
+    @property
+    def spellcheck_partial_jsonl(self) -> Path:
+        return self.root / "spellcheck.partial.jsonl"
+
+    @property
+    def doc_archives_dir(self) -> Path:
+        return self.root / "doc_archives"
+
+    @property
+    def pair_cache_dir(self) -> Path:
+        return self.root / "pair_alignments"
+
+    @property
+    def audio_dir(self) -> Path:
+        return self.root / "audio"
+
+    def audio_manifest(self, nusha_index: int = 1) -> Path:
+        k = int(nusha_index or 1)
+        return self.root / ("audio_manifest.json" if k <= 1 else f"audio_manifest_n{k}.json")
+
+    # --- ayar yardımcıları ---
+    def vision_kwargs(self) -> Dict[str, Any]:
+        """ocr_lines_with_google_vision_api için ayarlar."""
+        return {
+            "timeout": self.vision_timeout,
+            "retries": self.vision_retries,
+            "backoff_base": self.vision_backoff_base,
+            "max_dim": self.vision_max_dim,
+            "jpeg_quality": self.vision_jpeg_quality,
+        }
+
+    def ensure_dirs(self, nusha_indices: Iterable[int] = (1,)) -> "ProjectContext":
+        """Çıktı klasörlerini oluşturur (eskiden config import'unda yapılırdı)."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        for k in nusha_indices:
+            for p in (self.pages_dir(k), self.lines_dir(k), self.ocr_dir(k)):
+                p.mkdir(parents=True, exist_ok=True)
+        return self
+
+
+def default_context() -> ProjectContext:
+    """Bağlam verilmeyen çağrılar için eski output_lines düzeni (klasör oluşturmaz)."""
+    return ProjectContext.legacy()
@@ -0,0 +1,131 @@
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from pathlib import Path
+
+# Add repo root to path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.align_trace import NULL_TRACE
+from src.alignment import align_ocr_to_tahkik_segment_dp
+from src.document import tokenize_text
+from src.ocr_noise import PROFILES, line_boundary_accuracy, make_witness, scale_reference, synthetic_reference
+
+DEFAULT_SIZES = (1000, 10000, 50000, 200000)
+
+
+def load_reference(docx: str = None, text: str = None) -> list:
+    if docx:
+        from src.document import read_docx_text
+        return tokenize_text(read_docx_text(Path(docx)))
+    if text:
+        return tokenize_text(Path(text).read_text(encoding="utf-8"))
+    return synthetic_reference(max(DEFAULT_SIZES))
+
+
+def _align(tokens, witness):
+    return align_ocr_to_tahkik_segment_dp(
+        "bench.docx",
+        ocr_lines_override=witness,
+        write_json=False,
+        reference_text_override=" ".join(tokens),
+        trace=NULL_TRACE,
+    )["aligned"]
+
+
+def run_case(tokens, n_words: int, profile: str, seed: int = 0, measure_memory: bool = True) -> dict:
+    ref = scale_reference(tokens, n_words)
+    witness = make_witness(ref, PROFILES[profile], seed=seed)
+
+    t0 = time.perf_counter()
+    aligned = _align(ref, witness)
+    wall = time.perf_counter() - t0
+
+    peak_mb = None
+    if measure_memory:
+        # ayrı çalıştırma: tracemalloc hizalamayı yavaşlatır, süre ölçümünü bozmasın
+        tracemalloc.start()
+        _align(ref, witness)
+        peak_mb = round(tracemalloc.get_traced_memory()[1] / 1e6, 1)
+        tracemalloc.stop()
+
+    return {
+        "words": n_words,
+        "profile": profile,
+        "ocr_lines": len(witness),
+        "wall_s": round(wall, 3),
+        "peak_mb": peak_mb,
+        "accuracy": line_boundary_accuracy(witness, aligned),
+    }
+
+
+def check_gate(results: list, baseline: list, max_slowdown: float, max_accuracy_drop: float) -> list:
+    """Baseline'a göre gerilemeler (boş liste = geçti)."""
+    base = {(r["words"], r["profile"]): r for r in baseline}
+    failures = []
+    for r in results:
+        b = base.get((r["words"], r["profile"]))
+        if not b:
+            continue
+        if r["wall_s"] > b["wall_s"] * max_slowdown:
+            failures.append(f"{r['profile']}/{r['words']}: wall {r['wall_s']}s > {b['wall_s']}s x {max_slowdown}")
+        drop = b["accuracy"]["within_tol"] - r["accuracy"]["within_tol"]
+        if drop > max_accuracy_drop:
+            failures.append(
+                f"{r['profile']}/{r['words']}: accuracy {r['accuracy']['within_tol']} < {b['accuracy']['within_tol']} - {max_accuracy_drop}"
+            )
+    return failures
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Synthetic OCR-noise alignment benchmark (speed, memory, line-boundary accuracy).")
+    src = ap.add_mutually_exclusive_group()
+    src.add_argument("--docx", help="Reference .docx (default: synthetic text)")
+    src.add_argument("--text", help="Reference plain text file")
+    ap.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES), help="Comma-separated word counts")
+    ap.add_argument("--profiles", default="light,medium", help=f"Comma-separated noise profiles ({', '.join(PROFILES)})")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc peak-memory run")
+    ap.add_argument("--out", help="Write results JSON here")
+    ap.add_argument("--baseline", help="Results JSON to gate against (exit 1 on regression)")
+    ap.add_argument("--max-slowdown", type=float, default=1.25)
+    ap.add_argument("--max-accuracy-drop", type=float, default=0.01)
+    args = ap.parse_args()
+
+    tokens = load_reference(args.docx, args.text)
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    profiles = [p.strip() for p in args.profiles.split(",") if p.strip()]
+    for p in profiles:
+        if p not in PROFILES:
+            ap.error(f"unknown profile: {p}")
+
+    print(f"{'profile':8} {'words':>8} {'lines':>7} {'wall_s':>8} {'peak_mb':>8} {'exact':>7} {'±1':>7} {'mean_abs':>9}")
+    results = []
+    for profile in profiles:
+        for n in sizes:
+            r = run_case(tokens, n, profile, seed=args.seed, measure_memory=not args.no_memory)
+            acc = r["accuracy"]
+            print(
+                f"{profile:8} {n:>8} {r['ocr_lines']:>7} {r['wall_s']:>8.2f} {str(r['peak_mb']):>8} "
+                f"{acc['exact']:>7.3f} {acc['within_tol']:>7.3f} {acc['mean_abs']:>9.2f}"
+            )
+            results.append(r)
+
+    if args.out:
+        Path(args.out).write_text(json.dumps({"results": results}, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Results written: {args.out}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))["results"]
+        failures = check_gate(results, baseline, args.max_slowdown, args.max_accuracy_drop)
+        for f in failures:
+            print(f"[FAIL] {f}")
+        if failures:
+            sys.exit(1)
+        print("Gate passed.")
+
+
+if __name__ == "__main__":
+    main()
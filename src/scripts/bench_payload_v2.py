@@ -0,0 +1,78 @@
+import sys
+import json
+import time
+import random
+import argparse
+from pathlib import Path
+
+# Add repo root to path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.alignment import align_ocr_to_tahkik_segment_dp, attach_exact_pair_links, attach_ocr_to_ocr_links, attach_span_links
+from src.payload_v2 import LinkResolver, compact_payload, expand_payload
+from src.witness_pairs import WitnessPairCache
+from src.witnesses import witness_key
+
+VOCAB = ["كتاب", "الله", "قال", "في", "من", "على", "الحمد", "رب", "العالمين", "محمد", "العلم", "نور", "هذا", "ذلك"]
+
+
+def build_book(n_words: int, n_witnesses: int = 4):
+    """Sentetik N nüshalı kitap: tüm çiftler için span + kesin OCR bağlantıları (en ağır v1 hali)."""
+    rnd = random.Random(1)
+    tokens = [rnd.choice(VOCAB) + str(rnd.randint(0, 99)) for _ in range(n_words)]
+    payload = {}
+    for k in range(1, n_witnesses + 1):
+        r = random.Random(k)
+        lines = []
+        i = 0
+        while i < len(tokens):
+            n = r.randint(7, 12)
+            seg = [w for w in tokens[i:i + n] if r.random() > 0.05]
+            lines.append({"ocr_text": " ".join(seg), "line_image": f"lines/n{k}/line_{len(lines):05d}.png", "line_index": len(lines)})
+            i += n
+        payload[witness_key(k)] = align_ocr_to_tahkik_segment_dp(
+            "bench.docx", ocr_lines_override=lines, write_json=False, reference_text_override=" ".join(tokens)
+        )["aligned"]
+    attach_span_links(payload)
+    cache = WitnessPairCache()
+    attach_ocr_to_ocr_links(payload, pair_cache=cache)
+    for a in range(2, n_witnesses + 1):
+        for b in range(a + 1, n_witnesses + 1):
+            attach_exact_pair_links(payload, a, b, pair_cache=cache)
+    return payload
+
+
+def _timed(fn, repeat=3):
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000.0, out
+
+
+def bench(n_words: int):
+    v1 = build_book(n_words)
+    v2 = compact_payload(v1)
+    s1 = json.dumps(v1, ensure_ascii=False)
+    s2 = json.dumps(v2, ensure_ascii=False)
+    load1, _ = _timed(lambda: json.loads(s1))
+    load2, loaded2 = _timed(lambda: json.loads(s2))
+
+    line = loaded2["aligned_alt3"][len(loaded2["aligned_alt3"]) // 2]
+    lazy, _ = _timed(lambda: LinkResolver(loaded2).expand_line(line))
+    full, _ = _timed(lambda: expand_payload(loaded2))
+
+    print(f"--- payload v1 vs v2 ({n_words:,} words, 4 nushas, all pairs linked) ---")
+    print(f"size      v1 {len(s1.encode('utf-8')) / 1e6:8.2f} MB   v2 {len(s2.encode('utf-8')) / 1e6:8.2f} MB")
+    print(f"json load v1 {load1:8.1f} ms   v2 {load2:8.1f} ms")
+    print(f"v2 resolve one line (cold index) {lazy:8.1f} ms")
+    print(f"v2 expand whole payload          {full:8.1f} ms")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Alignment payload v1/v2 size & latency comparison.")
+    ap.add_argument("--words", type=int, default=20000)
+    args = ap.parse_args()
+    bench(args.words)
@@ -0,0 +1,87 @@
+import sys
+import json
+import argparse
+from pathlib import Path
+
+# Add repo root to path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.config import ALIGNMENT_JSON, DOC_ARCHIVES_DIR, PROJECTS_DIR
+from src.database import DatabaseManager
+from src.payload_v2 import FORMAT_VERSION, compact_line, compact_payload
+from src.utils import write_json_atomic
+
+
+def _size(obj) -> int:
+    return len(json.dumps(obj, ensure_ascii=False).encode("utf-8"))
+
+
+def _convert_file(path: Path, nusha_index: int = None, dry_run: bool = False):
+    """
+    alignment.json -> v2. nusha_index verilirse dosya tek nüshalıktır (proje nusha_<k>/alignment.json,
+    satırlar "aligned" altında ama kaynak nüsha k); verilmezse legacy çok nüshalı payload.
+    """
+    before = path.stat().st_size
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        print(f"  [SKIP] {path}: beklenmeyen format")
+        return before, before
+
+    if nusha_index is None or nusha_index == 1:
+        new = compact_payload(data)
+    else:
+        new = dict(data)
+        new["aligned"] = [compact_line(it, nusha_index) for it in data.get("aligned") or []]
+        new["format_version"] = FORMAT_VERSION
+
+    after = _size(new)
+    print(f"  {path}: {before:,} -> {after:,} bytes")
+    if not dry_run:
+        write_json_atomic(path, new)
+    return before, after
+
+
+def convert_all(dry_run: bool = False):
+    print("--- CONVERT START: alignment payload v1 -> v2 ---")
+    if dry_run:
+        print("(dry run: nothing will be written)")
+
+    targets = []
+    if ALIGNMENT_JSON.exists():
+        targets.append((ALIGNMENT_JSON, None))
+    if DOC_ARCHIVES_DIR.exists():
+        targets += [(p, None) for p in sorted(DOC_ARCHIVES_DIR.glob("*/alignment.json"))]
+    if PROJECTS_DIR.exists():
+        for p in sorted(PROJECTS_DIR.glob("*/nusha_*/alignment.json")):
+            suffix = p.parent.name.split("_", 1)[1]
+            if suffix.isdigit():
+                targets.append((p, int(suffix)))
+
+    total_before = total_after = 0
+    failed = 0
+    for path, idx in targets:
+        try:
+            b, a = _convert_file(path, idx, dry_run=dry_run)
+            total_before += b
+            total_after += a
+        except Exception as e:
+            print(f"  FAILED {path}: {e}")
+            failed += 1
+    print(f"Files: {len(targets)} ({failed} failed), {total_before:,} -> {total_after:,} bytes")
+
+    if dry_run:
+        print("Database: skipped")
+    else:
+        db = DatabaseManager()
+        rows, b, a = db.compact_aligned_meta()
+        print(f"Database: {db.db_path}: {rows} rows rewritten, meta_json {b:,} -> {a:,} bytes")
+
+    print("--- CONVERT COMPLETED ---")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="One-shot converter: alignment payload v1 -> v2 (references instead of copies).")
+    ap.add_argument("--dry-run", action="store_true", help="Only report sizes, do not write anything.")
+    args = ap.parse_args()
+    convert_all(dry_run=args.dry_run)
@@ -0,0 +1,40 @@
+import sys
+import argparse
+from pathlib import Path
+
+# Add repo root to path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.config import PROJECTS_DIR
+from src.database import DatabaseManager
+from src.services.stage_ledger import nusha_dirs, reconcile_project
+
+
+def reconcile_all(project_ids=None):
+    print("--- RECONCILE START: disk -> stage_ledger ---")
+    db = DatabaseManager()
+    if not project_ids:
+        project_ids = sorted(p.name for p in PROJECTS_DIR.glob("*") if p.is_dir() and nusha_dirs(p))
+
+    failed = 0
+    for project_id in project_ids:
+        project_dir = PROJECTS_DIR / project_id
+        if not project_dir.exists():
+            print(f"  [SKIP] {project_id}: klasör yok")
+            continue
+        try:
+            for k, counts in reconcile_project(db, project_id, project_dir).items():
+                summary = ", ".join(f"{stage}={n}" for stage, n in counts.items()) or "boş"
+                print(f"  {project_id}/nusha_{k}: {summary}")
+        except Exception as e:
+            print(f"  FAILED {project_id}: {e}")
+            failed += 1
+    print(f"Projects: {len(project_ids)} ({failed} failed)")
+    print("--- RECONCILE COMPLETED ---")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Rebuilds the stage-completion ledger from the files on disk.")
+    ap.add_argument("project_ids", nargs="*", help="Project ids (default: every project).")
+    args = ap.parse_args()
+    reconcile_all(args.project_ids)
@@ -3,8 +3,9 @@ import threading
 import json
 from pathlib import Path
 from typing import Dict, Any, List, Optional, Tuple
-from src.config import ALIGNMENT_JSON
+from src.project_context import ProjectContext, default_context
 from src.utils import normalize_ar
+from src.witnesses import witness_indices, witness_key
 
 # =============================================================================
 # Highlighting Logic Ported from viewer.py
@@ -145,12 +146,14 @@ def _inject_line_marks(alignment: Dict[str, Any], per_paragraph: List[Dict[str,
 # =============================================================================
 
 class AlignmentService:
-    def __init__(self):
+    def __init__(self, ctx: Optional[ProjectContext] = None):
+        # file_path verilmeyen çağrılar ctx'in alignment.json'unu kullanır (varsayılan output_lines)
+        self.ctx = ctx or default_context()
         self.lock = threading.Lock()
 
     def _load_data(self, file_path=None):
         try:
-            target_path = file_path if file_path else ALIGNMENT_JSON
+            target_path = file_path if file_path else self.ctx.alignment_json()
             if isinstance(target_path, str): target_path = Path(target_path)
 
             if not target_path.exists():
@@ -189,7 +192,7 @@ class AlignmentService:
                 return False
 
             try:
-                target_path = file_path if file_path else ALIGNMENT_JSON
+                target_path = file_path if file_path else self.ctx.alignment_json()
                 if isinstance(target_path, str): target_path = Path(target_path)
                 
                 with target_path.open("w", encoding="utf-8") as f:
@@ -216,8 +219,8 @@ class AlignmentService:
             if "aligned" in alignment_data:
                 _inject_line_marks(alignment_data, pp_data, aligned_override=alignment_data["aligned"])
             
-            # Alt alignments (Nusha 2, 3, 4)
-            for key in ["aligned_alt", "aligned_alt3", "aligned_alt4"]:
+            # Alt alignments (Nusha 2..N)
+            for key in [witness_key(k) for k in witness_indices(alignment_data) if k != 1]:
                 if key in alignment_data and isinstance(alignment_data[key], list):
                     _inject_line_marks(alignment_data, pp_data, aligned_override=alignment_data[key])
                     
@@ -318,7 +321,7 @@ class AlignmentService:
             return highlights
 
         # Process lists
-        for list_key in ["aligned", "aligned_alt", "aligned_alt3", "aligned_alt4"]:
+        for list_key in [witness_key(k) for k in witness_indices(alignment_data)]:
             if list_key not in alignment_data or not isinstance(alignment_data[list_key], list):
                 continue
                 
@@ -372,7 +375,7 @@ class AlignmentService:
 
             updated = False
             # Check all possible keys
-            keys = ["aligned", "aligned_alt", "aligned_alt3", "aligned_alt4"]
+            keys = [witness_key(k) for k in witness_indices(data)]
             
             for key in keys:
                 if key in data and isinstance(data[key], list):
@@ -416,7 +419,7 @@ class AlignmentService:
                 data = json.load(f)
 
             deleted = False
-            keys = ["aligned", "aligned_alt", "aligned_alt3", "aligned_alt4"]
+            keys = [witness_key(k) for k in witness_indices(data)]
 
             for key in keys:
                 if key in data and isinstance(data[key], list):
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+Audio Store — sentezlenmiş MP3'ler için içerik adresli disk deposu (SQLite dizinli).
+
+TTS cevapları eskiden MP3'ü base64 olarak JSON'a gömüyordu (yük ~%33 büyür, Range / HTTP önbelleği
+yok, tarayıcı büyük dizgeleri çözmek zorunda) ve arşiv bakışı her istekte bütün audio_manifest.json'ı
+okuyordu. Burada:
+
+  - her segmentin sesi sha256(SSML (harekeli metin + işaretler) | ses | dil | hız) özetiyle
+    root/ab/<özet>.mp3 olarak bir kez yazılır; aynı segment tekrar sentezlenmez,
+  - dizin (audio_store.sqlite): özet -> dosya, boyut, timepoints; sayfa -> sıralı özetler
+    (batch_save / arşiv bakışı manifest JSON'u yerine buradan),
+  - cevaplar url döner (/api/audio/<özet>.mp3); api_server ETag, Cache-Control ve Range ile sunar,
+  - eski audio_manifest*.json dosyaları ilk bakışta bir kez içeri alınır (mtime değişmedikçe
+    tekrar okunmaz).
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+AUDIO_URL_PREFIX = "/api/audio/"
+_DIGEST = re.compile(r"^[0-9a-f]{64}$")
+
+
+def audio_key(ssml: str, voice: str, language_code: str, speaking_rate: float, encoding: str = "MP3") -> str:
+    raw = "\x1f".join([ssml or "", voice or "", language_code or "", f"{float(speaking_rate or 1.0):.3f}", encoding])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def page_text_digest(tokens: List[str]) -> str:
+    """Sayfa metninin özeti: metin değişince kayıtlı sayfa sesi geçersiz olur."""
+    return hashlib.sha256(" ".join(str(t).strip() for t in tokens if str(t).strip()).encode("utf-8")).hexdigest()
+
+
+def audio_url(digest: str) -> str:
+    return f"{AUDIO_URL_PREFIX}{digest}.mp3"
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    "bytes=a-b" / "bytes=a-" / "bytes=-n" -> (start, end) (end dahil). Başlık yoksa veya
+    çoklu aralıksa None (tam dosya). Karşılanamayan aralıkta ValueError (416).
+    """
+    if not header:
+        return None
+    m = re.fullmatch(r"\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*", header)
+    if not m:
+        return None
+    a, b = m.group(1), m.group(2)
+    if not a and not b:
+        raise ValueError("empty range")
+    if not a:
+        n = int(b)
+        if n <= 0 or size <= 0:
+            raise ValueError("unsatisfiable range")
+        return max(0, size - n), size - 1
+    start = int(a)
+    end = min(int(b), size - 1) if b else size - 1
+    if start >= size or end < start:
+        raise ValueError("unsatisfiable range")
+    return start, end
+
+
+class AudioStore:
+    """
+    root: MP3 dosyaları; db_path None ise root/index.sqlite. Thread-safe (tek bağlantı + kilit);
+    stats: hits / misses / writes.
+    """
+
+    def __init__(self, root: Path, db_path: Optional[Path] = None):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.db_path = Path(db_path) if db_path else self.root / "index.sqlite"
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "writes": 0}
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS audio_blobs (
+                digest TEXT PRIMARY KEY,
+                size INTEGER,
+                voice TEXT,
+                speaking_rate REAL,
+                timepoints_json TEXT,
+                created_at REAL,
+                last_used REAL,
+                hit_count INTEGER DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS audio_pages (
+                scope TEXT,
+                nusha_id INTEGER,
+                page_key TEXT,
+                digests_json TEXT,
+                text_digest TEXT,
+                updated_at REAL,
+                PRIMARY KEY (scope, nusha_id, page_key)
+            );
+            CREATE TABLE IF NOT EXISTS audio_manifest_imports (
+                path TEXT PRIMARY KEY,
+                mtime REAL
+            );
+        """)
+        cols = {r[1] for r in self._conn.execute("PRAGMA table_info(audio_pages)")}
+        if "text_digest" not in cols:
+            self._conn.execute("ALTER TABLE audio_pages ADD COLUMN text_digest TEXT")
+        self._conn.commit()
+
+    # --- blobs ---
+    def path_for(self, digest: str) -> Optional[Path]:
+        if not _DIGEST.match(digest or ""):
+            return None
+        return self.root / digest[:2] / f"{digest}.mp3"
+
+    def _entry(self, digest: str, timepoints_json: Optional[str]) -> Dict[str, Any]:
+        try:
+            tps = json.loads(timepoints_json or "[]")
+        except Exception:
+            tps = []
+        return {"audio_url": audio_url(digest), "audio_hash": digest, "timepoints": tps}
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        path = self.path_for(digest)
+        with self._lock:
+            row = self._conn.execute("SELECT timepoints_json FROM audio_blobs WHERE digest = ?", (digest,)).fetchone()
+            if row is None or path is None or not path.exists():
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            self._conn.execute(
+                "UPDATE audio_blobs SET last_used = ?, hit_count = hit_count + 1 WHERE digest = ?", (time.time(), digest)
+            )
+            self._conn.commit()
+        return self._entry(digest, row[0])
+
+    def put(self, digest: str, audio: bytes, timepoints: List[Dict[str, Any]], voice: str = "", speaking_rate: float = 1.0) -> Dict[str, Any]:
+        path = self.path_for(digest)
+        if path is None:
+            raise ValueError(f"invalid audio digest: {digest!r}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if not path.exists():
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(audio or b"")
+            os.replace(tmp, path)
+        tps_json = json.dumps(timepoints or [], ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO audio_blobs (digest, size, voice, speaking_rate, timepoints_json, created_at, last_used, hit_count) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                (digest, len(audio or b""), voice or "", float(speaking_rate or 1.0), tps_json, now, now),
+            )
+            self._conn.commit()
+            self.stats["writes"] += 1
+        return self._entry(digest, tps_json)
+
+    # --- pages (batch_save / arşiv bakışı) ---
+    def set_page(self, scope: str, nusha_id: int, page_key: str, digests: List[str], text_digest: Optional[str] = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO audio_pages (scope, nusha_id, page_key, digests_json, text_digest, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (scope or "", int(nusha_id or 1), page_key, json.dumps(list(digests)), text_digest, time.time()),
+            )
+            self._conn.commit()
+
+    def get_page(self, scope: str, nusha_id: int, page_key: str, text_digest: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Sayfanın kayıtlı segmentleri (sırayla); kayıt yoksa, bir dosya eksikse veya text_digest
+        verilip kayıtlı metin özetiyle uyuşmuyorsa (sayfa düzenlenmiş) None. Özetsiz eski
+        (manifestten alınmış) kayıtlar metinden bağımsız kabul edilir.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digests_json, text_digest FROM audio_pages WHERE scope = ? AND nusha_id = ? AND page_key = ?",
+                (scope or "", int(nusha_id or 1), page_key),
+            ).fetchone()
+        if row is None or (text_digest and row[1] and row[1] != text_digest):
+            return None
+        out = []
+        for digest in json.loads(row[0] or "[]"):
+            entry = self.get(digest)
+            if entry is None:
+                return None
+            out.append(entry)
+        return out or None
+
+    def import_manifest(self, scope: str, nusha_id: int, manifest_path: Path) -> int:
+        """
+        Eski audio_manifest*.json -> depo + sayfa dizini. mtime değişmedikçe tekrar okunmaz.
+        Döner: içeri alınan sayfa sayısı.
+        """
+        manifest_path = Path(manifest_path)
+        try:
+            mtime = manifest_path.stat().st_mtime
+        except OSError:
+            return 0
+        key = str(manifest_path.resolve())
+        with self._lock:
+            row = self._conn.execute("SELECT mtime FROM audio_manifest_imports WHERE path = ?", (key,)).fetchone()
+        if row is not None and row[0] == mtime:
+            return 0
+        try:
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        except Exception as e:
+            print(f"[WARN] Ses manifesti okunamadı ({manifest_path}): {e}")
+            manifest = {}
+        pages = 0
+        for page_key, chunks in (manifest.items() if isinstance(manifest, dict) else []):
+            digests = []
+            for c in chunks or []:
+                rel = (c or {}).get("audio_path")
+                full = manifest_path.parent / rel if rel else None
+                if not full or not full.exists():
+                    digests = []
+                    break
+                data = full.read_bytes()
+                digest = hashlib.sha256(data).hexdigest()
+                if self.get(digest) is None:
+                    self.put(digest, data, c.get("timepoints") or [])
+                digests.append(digest)
+            if digests:
+                self.set_page(scope, nusha_id, page_key, digests)
+                pages += 1
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO audio_manifest_imports (path, mtime) VALUES (?, ?)", (key, mtime))
+            self._conn.commit()
+        return pages
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_default_store: Optional[AudioStore] = None
+_default_lock = threading.Lock()
+
+
+def default_audio_store() -> AudioStore:
+    """Süreç genelinde paylaşılan depo (config.AUDIO_STORE_DIR)."""
+    global _default_store
+    from src.config import AUDIO_STORE_DIR
+    with _default_lock:
+        if _default_store is None:
+            _default_store = AudioStore(AUDIO_STORE_DIR)
+        return _default_store
@@ -7,15 +7,20 @@ import os
 import stat
 import gc
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional
+from src.services.pipeline_jobs import JobCancelled
 from src.services.project_manager import ProjectManager
+from src.services.stage_ledger import page_unit
 from src.database import DatabaseManager
 from src.pdf_processor import pdf_to_page_pngs
 from src.kraken_processor import split_page_to_lines, load_line_records_ordered
 from src.ocr import ocr_lines_with_google_vision_api, load_ocr_lines_ordered
 from src.alignment import align_ocr_to_tahkik_segment_dp
+from src.align_trace import AlignTrace
+from src.incremental_alignment import reference_text_from_lines
 from src.keys import get_google_vision_api_key
 from src.config import BASE_DIR
+from src.project_context import ProjectContext
 from src.utils import write_json_atomic
 
 # Kraken importlarını try-except içine al ki çökerse bile loglayabilelim
@@ -35,6 +40,13 @@ except OSError as e:
 # Configure logging
 logger = logging.getLogger(__name__)
 
+KRAKEN_MODEL_PATH = BASE_DIR / "tahkik_data" / "models" / "default.mlmodel"
+
+
+def kraken_pipeline_available() -> bool:
+    """run_full_pipeline yerel Kraken OCR'ı mı kullanır (yoksa Google Vision: convert -> segment -> ocr)."""
+    return KRAKEN_AVAILABLE and KRAKEN_MODEL_PATH.exists()
+
 
 def remove_readonly(func, path, excinfo):
     """Windows salt okunur dosyaları silmek için yardımcı fonksiyon"""
@@ -47,17 +59,27 @@ class ManuscriptEngine:
     Handles PDF conversion, line segmentation, OCR, and text alignment.
     """
 
-    def __init__(self, project_id: str):
+    def __init__(self, project_id: str, on_progress: Optional[Callable[..., None]] = None,
+                 pm: Optional[ProjectManager] = None):
+        """
+        on_progress(percent, message, stage=..., done=..., total=...): iş kuyruğu ilerlemesi
+        (olay olarak yayınlanır); iptal edilen işte JobCancelled atar.
+        pm: verilmezse varsayılan proje klasörü / global DB.
+        """
         self.project_id = project_id
-        self.pm = ProjectManager()
-        self.db = DatabaseManager() # DB Connection
+        self.on_progress = on_progress
+        self.pm = pm or ProjectManager()
+        self.db = self.pm.db if pm is not None else DatabaseManager() # DB Connection
         self.project_dir = self.pm.get_project_path(project_id)
         
         if not self.project_dir.exists():
             raise FileNotFoundError(f"Project directory not found: {self.project_dir}")
+        # Bütün çıktı yolları / ayarlar bu projenin bağlamından (config globalleri değil)
+        self.ctx = ProjectContext.for_project(self.project_dir, project_id)
 
-    def update_progress(self, nusha_index: int, percent: int, message: str, status: str = "processing"):
-        """İlerleme durumunu diske yazar."""
+    def update_progress(self, nusha_index: int, percent: int, message: str, status: str = "processing",
+                        stage: Optional[str] = None, done: Optional[int] = None, total: Optional[int] = None):
+        """İlerleme durumunu diske yazar. stage: pages | segmentation | text_recognition | alignment."""
         nusha_path = self.pm.get_nusha_dir(self.project_id, nusha_index)
         status_file = nusha_path / "status.json"
         
@@ -65,6 +87,7 @@ class ManuscriptEngine:
             "status": status,      # processing, completed, failed
             "percent": percent,    # 0-100
             "message": message,    #String message
+            "stage": stage,
             "updated_at": str(time.time())
         }
         
@@ -73,20 +96,29 @@ class ManuscriptEngine:
                 json.dump(data, f, ensure_ascii=False)
         except Exception as e:
             print(f"[ENGINE] Progress update failed: {e}")
+        if self.on_progress is not None:
+            self.on_progress(percent, message, stage=stage, done=done, total=total)
+
+    def _record_step(self, nusha_index: int, step: str, status: str, count: Optional[int] = None, **extra):
+        """Aşama defteri (stage_ledger); durum uçları klasör taramak yerine bunu okur."""
+        try:
+            self.pm.record_nusha_step(self.project_id, nusha_index, step, status, count, **extra)
+        except Exception as e:
+            print(f"[ENGINE] Step record failed ({step}): {e}")
+
+    def _record_pages(self, nusha_index: int, step: str, pages: List[Dict[str, Any]], settings: Optional[Dict] = None):
+        """Sayfa başına defter satırları: [{unit, status, count, total, error}]."""
+        try:
+            self.pm.record_nusha_pages(self.project_id, nusha_index, step, pages, settings=settings)
+        except Exception as e:
+            print(f"[ENGINE] Page record failed ({step}): {e}")
 
     def _get_nusha_paths(self, nusha_index: int) -> Dict[str, Path]:
         """
         Helper to get all relevant paths for a specific nusha (nusha_1, nusha_2, etc.)
         """
-        nusha_root = self.pm.get_nusha_dir(self.project_id, nusha_index)
-        return {
-            "root": nusha_root,
-            "pages": nusha_root / "pages",
-            "lines": nusha_root / "lines",
-            "ocr": nusha_root / "ocr",
-            "manifest": nusha_root / "lines_manifest.jsonl",
-            "alignment": nusha_root / "alignment.json"
-        }
+        self.pm.get_nusha_dir(self.project_id, nusha_index)  # klasörü oluşturur
+        return self.ctx.nusha_paths(nusha_index)
 
     def convert_pdf_to_images(self, nusha_index: int, dpi: int = 300) -> Dict[str, Any]:
         """
@@ -104,7 +136,8 @@ class ManuscriptEngine:
         start_time = time.time()
         
         paths = self._get_nusha_paths(nusha_index)
-        self.update_progress(nusha_index, 0, "PDF -> Resim dönüştürme başlatılıyor...")
+        self.update_progress(nusha_index, 0, "PDF -> Resim dönüştürme başlatılıyor...", stage="pages")
+        self._record_step(nusha_index, "pages", "running", reset=True, dpi=final_dpi)
         
         # Locate PDF: Checks nusha folder first
         # Dynamic search for any .pdf file
@@ -114,7 +147,8 @@ class ManuscriptEngine:
              # Fallback: check legacy source.pdf in root if absolutely necessary, or just fail
              msg = f"PDF source not found in {paths['root']}"
              print(f"[ENGINE] ERROR: {msg}")
-             self.update_progress(nusha_index, 0, f"Hata: {msg}", status="failed")
+             self.update_progress(nusha_index, 0, f"Hata: {msg}", status="failed", stage="pages")
+             self._record_step(nusha_index, "pages", "failed", error=msg)
              return {"success": False, "error": msg}
              
         pdf_path = pdf_files[0]
@@ -137,9 +171,16 @@ class ManuscriptEngine:
             logger.info(f"Converting PDF to images: {pdf_path}")
             print(f"[ENGINE] Processing PDF: {pdf_path}")
             
-            page_paths = pdf_to_page_pngs(pdf_path, dpi=final_dpi, pages_dir=paths["pages"])
+            page_paths = pdf_to_page_pngs(
+                pdf_path, dpi=final_dpi, pages_dir=paths["pages"], ctx=self.ctx,
+                progress_callback=lambda done, total: self.update_progress(
+                    nusha_index, int(done / total * 100), f"PDF -> Resim: {done}/{total}", stage="pages", done=done, total=total),
+            )
             
-            self.update_progress(nusha_index, 100, "PDF dönüştürme tamamlandı.", status="completed")
+            self._record_pages(nusha_index, "pages", [{"unit": Path(pp).stem, "status": "completed", "count": 1} for pp in page_paths],
+                               settings={"dpi": final_dpi})
+            self._record_step(nusha_index, "pages", "completed", len(page_paths), dpi=final_dpi)
+            self.update_progress(nusha_index, 100, "PDF dönüştürme tamamlandı.", status="completed", stage="pages")
             
             elapsed = time.time() - start_time
             print(f"[ENGINE] PDF conversion finished. {len(page_paths)} pages created in {elapsed:.2f}s.")
@@ -149,11 +190,16 @@ class ManuscriptEngine:
                 "page_count": len(page_paths),
                 "pages_dir": str(paths["pages"])
             }
+        except JobCancelled:
+            # iptal hata değil: defterde "cancelled", sayfalar sonraki çalıştırmada yeniden üretilir
+            self._record_step(nusha_index, "pages", "cancelled")
+            raise
         except Exception as e:
             print(f"[ENGINE] CRITICAL ERROR in convert_pdf_to_images: {e}")
             traceback.print_exc()
             logger.error(f"PDF conversion failed: {e}")
-            self.update_progress(nusha_index, 0, f"Hata: {str(e)}", status="failed")
+            self._record_step(nusha_index, "pages", "failed", error=str(e))
+            self.update_progress(nusha_index, 0, f"Hata: {str(e)}", status="failed", stage="pages")
             return {"success": False, "error": str(e)}
 
     def run_line_segmentation(self, nusha_index: int) -> Dict[str, Any]:
@@ -209,12 +255,15 @@ class ManuscriptEngine:
                 print("[WARN] DİKKAT: Hiçbir segmentasyon modeli bulunamadı! İşlem başarısız olabilir.")
                 # Yine de şansımızı deneyelim (ama muhtemelen çöker)
             # ---------------------------------------
+            seg_settings = {"model": m_path.name if seg_model is not None else None}
+            self._record_step(nusha_index, "segmentation", "running", reset=True, **seg_settings)
             
             print(f"[ENGINE] Processing {len(page_images)} pages with Kraken...")
             
             with paths["manifest"].open("a", encoding="utf-8") as mf:
                 for idx, page_img_path in enumerate(page_images):
-                    self.update_progress(nusha_index, int((idx / len(page_images)) * 100), f"Segmentasyon: {idx+1}/{len(page_images)}")
+                    self.update_progress(nusha_index, int((idx / len(page_images)) * 100), f"Segmentasyon: {idx+1}/{len(page_images)}",
+                                         stage="segmentation", done=idx, total=len(page_images))
 
                     try:
                         print(f"[ENGINE] Segmenting Page {idx+1}: {page_img_path.name}")
@@ -226,6 +275,7 @@ class ManuscriptEngine:
                         
                         lines = getattr(res, "lines", [])
                         lines.sort(key=lambda x: min([p[1] for p in x.boundary]))
+                        page_lines = 0
                         
                         for line_idx, line in enumerate(lines):
                             boundary = line.boundary
@@ -250,16 +300,24 @@ class ManuscriptEngine:
                             }
                             mf.write(json.dumps(rec, ensure_ascii=False) + "\n")
                             total_lines += 1
+                            page_lines += 1
                         
+                        mf.flush()
+                        self._record_pages(nusha_index, "segmentation", [{"unit": page_img_path.stem, "status": "completed", "count": page_lines}],
+                                           settings=seg_settings)
                     except Exception as inner_e:
                         print(f"[ENGINE] WARN: Page {page_img_path.name} failed: {inner_e}")
                         traceback.print_exc()
+                        self._record_pages(nusha_index, "segmentation", [{"unit": page_img_path.stem, "status": "failed", "count": 0, "error": str(inner_e)}],
+                                           settings=seg_settings)
                     
                     gc.collect()
 
             elapsed = time.time() - start_time
             print(f"[ENGINE] Segmentation finished. {total_lines} lines created.")
-            self.update_progress(nusha_index, 100, "Segmentasyon tamamlandı.", status="completed")
+            self._record_step(nusha_index, "segmentation", "completed", total_lines, **seg_settings)
+            self.update_progress(nusha_index, 100, "Segmentasyon tamamlandı.", status="completed",
+                                 stage="segmentation", done=len(page_images), total=len(page_images))
             
             return {
                 "success": True,
@@ -268,13 +326,19 @@ class ManuscriptEngine:
                 "manifest_path": str(paths["manifest"])
             }
 
+        except JobCancelled:
+            self._record_step(nusha_index, "segmentation", "cancelled")
+            raise
         except Exception as e:
              print(f"[ENGINE] CRITICAL ERROR: {e}")
+             self._record_step(nusha_index, "segmentation", "failed", error=str(e))
              return {"success": False, "error": str(e)}
 
-    def run_ocr(self, nusha_index: int) -> Dict[str, Any]:
+    def run_ocr(self, nusha_index: int, resume: bool = False) -> Dict[str, Any]:
         """
         Runs Google Vision OCR on the segmented lines.
+        resume=True: yalnızca defterde OCR'ı eksik / hatalı / segmentasyondan eski / farklı ayarla
+        okunmuş sayfalar gönderilir; diğer sayfaların OCR çıktısı korunur.
         """
         print(f"[ENGINE] OCR (Google Vision) started for Nusha {nusha_index}...")
         start_time = time.time()
@@ -289,18 +353,30 @@ class ManuscriptEngine:
         try:
             # Load ordered lines from the project-specific manifest
             ordered_recs = load_line_records_ordered(manifest_path=paths["manifest"])
-            ordered_line_paths = [Path(r["line_image"]) for r in ordered_recs]
             
-            if not ordered_line_paths:
+            if not ordered_recs:
                 return {"success": False, "error": "No lines found in manifest."}
 
+            manifest_lines = len(ordered_recs)  # resume'da da aşama toplamı bütün nüshadır
+            vision = self.ctx.vision_kwargs()
+            ocr_settings = {"engine": "google_vision", "max_dim": vision["max_dim"], "jpeg_quality": vision["jpeg_quality"]}
+            if resume:
+                todo = set(self.pm.get_nusha_rerun_plan(self.project_id, nusha_index,
+                                                        settings={"text_recognition": ocr_settings})["text_recognition"])
+                ordered_recs = [r for r in ordered_recs if page_unit(r) in todo]
+                if not ordered_recs:
+                    self.update_progress(nusha_index, 100, "OCR güncel; yeniden okunacak sayfa yok.", status="completed", stage="text_recognition")
+                    return {"success": True, "total_lines": 0, "successful_ocr": 0, "pages": 0, "ocr_dir": str(paths["ocr"])}
+                print(f"[ENGINE] OCR resume: {len(todo)} sayfa, {len(ordered_recs)} satır")
+            ordered_line_paths = [Path(r["line_image"]) for r in ordered_recs]
+
             # Authenticate
             api_key = get_google_vision_api_key()
             if not api_key:
                 print("[ENGINE] ERROR: API Key missing.")
                 return {"success": False, "error": "Google Vision API Key invalid or missing."}
 
-            if paths["ocr"].exists():
+            if paths["ocr"].exists() and not resume:
                 print(f"[ENGINE] Cleaning old OCR data at {paths['ocr']}")
                 for i in range(3):
                     try:
@@ -315,16 +391,50 @@ class ManuscriptEngine:
             count = len(ordered_line_paths)
             logger.info(f"Starting OCR for {count} lines.")
             print(f"[ENGINE] Sending {count} lines to Google Vision API...")
-            self.update_progress(nusha_index, 10, f"OCR Başlatılıyor ({count} satır)...")
-            
+            self.update_progress(nusha_index, 10, f"OCR Başlatılıyor ({count} satır)...", stage="text_recognition", done=0, total=count)
+            self._record_step(nusha_index, "text_recognition", "running", total=manifest_lines, reset=not resume, **ocr_settings)
+
+            def on_lines(done, total):
+                # her 10 satırda bir (ve sonda) olay; satır başına status.json yazılmaz
+                if done % 10 == 0 or done == total:
+                    self.update_progress(nusha_index, 10 + int(done / total * 90), f"OCR: {done}/{total} satır",
+                                         stage="text_recognition", done=done, total=total)
+
+            # sayfa son satırı okununca defter satırı yazılır (yarıda kesilen çalıştırma bitmiş sayfaları korur)
+            line_page = {Path(r["line_image"]).stem: page_unit(r) for r in ordered_recs}
+            remaining: Dict[str, int] = {}
+            for unit in line_page.values():
+                remaining[unit] = remaining.get(unit, 0) + 1
+            page_lines = dict(remaining)
+            page_ok: Dict[str, int] = {}
+            page_err: Dict[str, str] = {}
+
+            def on_line(line_path: Path, error: Optional[str]):
+                unit = line_page.get(line_path.stem, "")
+                if error is None:
+                    page_ok[unit] = page_ok.get(unit, 0) + 1
+                else:
+                    page_err.setdefault(unit, error)
+                remaining[unit] -= 1
+                if remaining[unit] == 0:
+                    err = page_err.get(unit)
+                    self._record_pages(nusha_index, "text_recognition", [{
+                        "unit": unit, "status": "failed" if err else "completed", "count": page_ok.get(unit, 0),
+                        "total": page_lines[unit], "error": err,
+                    }], settings=ocr_settings)
+
             # Note: ocr_lines_with_google_vision_api should handle individual retries
             ok_count, total_count = ocr_lines_with_google_vision_api(
                 ordered_line_paths=ordered_line_paths,
                 api_key=api_key,
                 ocr_dir=paths["ocr"],
+                ctx=self.ctx,
+                progress_callback=on_lines,
+                line_callback=on_line,
             )
             
-            self.update_progress(nusha_index, 100, "OCR İşlemi Tamamlandı.", status="completed")
+            self._record_step(nusha_index, "text_recognition", "completed", ok_count, total=manifest_lines, **ocr_settings)
+            self.update_progress(nusha_index, 100, "OCR İşlemi Tamamlandı.", status="completed", stage="text_recognition")
             
             elapsed = time.time() - start_time
             print(f"[ENGINE] OCR finished. {ok_count}/{total_count} lines successful in {elapsed:.2f}s.")
@@ -333,13 +443,18 @@ class ManuscriptEngine:
                 "success": True,
                 "total_lines": total_count,
                 "successful_ocr": ok_count,
+                "pages": len(page_lines),
                 "ocr_dir": str(paths["ocr"])
             }
+        except JobCancelled:
+            self._record_step(nusha_index, "text_recognition", "cancelled")
+            raise
         except Exception as e:
             print(f"[ENGINE] CRITICAL ERROR in run_ocr: {e}")
             traceback.print_exc()
             logger.error(f"OCR failed: {e}")
-            self.update_progress(nusha_index, 0, f"OCR Hatası: {str(e)}", status="failed")
+            self._record_step(nusha_index, "text_recognition", "failed", error=str(e))
+            self.update_progress(nusha_index, 0, f"OCR Hatası: {str(e)}", status="failed", stage="text_recognition")
             return {"success": False, "error": str(e)}
 
     def align_manuscript(self, nusha_index: int) -> Dict[str, Any]:
@@ -376,6 +491,8 @@ class ManuscriptEngine:
 
             logger.info("Starting alignment...")
             print(f"[ENGINE] Aligning {len(ocr_lines)} OCR lines with Word doc...")
+            self._record_step(nusha_index, "alignment", "running")
+            self.update_progress(nusha_index, 50, f"Hizalama: {len(ocr_lines)} satır", stage="alignment")
             
             # Live Reference Logic: Fetch Nusha 1 (Asıl) text from DB if aligning secondary nusha
             reference_text_override = None
@@ -385,30 +502,33 @@ class ManuscriptEngine:
                     lines = self.db.get_aligned_lines(self.project_id, 1)
                     if lines:
                         # Join text (lines are sorted by line_no)
-                        full_text = []
-                        for l in lines:
-                             t = l.get("best", {}).get("raw", "")
-                             if t: full_text.append(t)
+                        full_text = reference_text_from_lines(lines)
                         
                         if full_text:
-                            reference_text_override = " ".join(full_text)
-                            print(f"[ENGINE] Alignment using Live Reference from Nusha 1 DB ({len(full_text)} lines)")
-                            self.update_progress(nusha_index, 85, f"Canlı Referans Metni (Nüsha 1) Kullanılıyor...")
+                            reference_text_override = full_text
+                            print(f"[ENGINE] Alignment using Live Reference from Nusha 1 DB ({len(lines)} lines)")
+                            self.update_progress(nusha_index, 85, f"Canlı Referans Metni (Nüsha 1) Kullanılıyor...", stage="alignment")
+                except JobCancelled:
+                    raise
                 except Exception as e:
                     print(f"[ENGINE] WARN: Live Reference retrieval failed: {e}")
 
-            # We use write_json=False because align_ocr_to_tahkik_segment_dp writes 
-            # to the global ALIGNMENT_JSON by default if True. We want to save to project.
+            # write_json=False: projenin alignment.json'u aşağıda yazılır, ardından DB senkronu
+            trace = AlignTrace(self.ctx.align_trace_level)
             alignment_payload = align_ocr_to_tahkik_segment_dp(
                 docx_path=docx_path,
                 ocr_lines_override=ocr_lines,
                 write_json=False,
-                reference_text_override=reference_text_override
+                reference_text_override=reference_text_override,
+                trace=trace,
+                ctx=self.ctx,
+                nusha_index=nusha_index,
             )
             
-            # Save to project-specific alignment.json
+            # Save to project-specific alignment.json (+ alignment.trace.json sidecar)
             with paths["alignment"].open("w", encoding="utf-8") as f:
                 json.dump(alignment_payload, f, ensure_ascii=False, indent=2)
+            trace.write_sidecar(paths["alignment"])
 
             # DB Sync (Dual-Write)
             try:
@@ -420,6 +540,8 @@ class ManuscriptEngine:
 
             elapsed = time.time() - start_time
             print(f"[ENGINE] Alignment finished in {elapsed:.2f}s. Saved to {paths['alignment']}")
+            self._record_step(nusha_index, "alignment", "completed", alignment_payload.get("lines_count", 0),
+                              live_reference=reference_text_override is not None)
 
             return {
                 "success": True,
@@ -427,11 +549,15 @@ class ManuscriptEngine:
                 "lines_aligned": alignment_payload.get("lines_count", 0)
             }
 
+        except JobCancelled:
+            self._record_step(nusha_index, "alignment", "cancelled")
+            raise
         except Exception as e:
             print(f"[ENGINE] CRITICAL ERROR in align_manuscript: {e}")
             traceback.print_exc()
             logger.error(f"Alignment failed: {e}")
-            self.update_progress(nusha_index, 0, f"Hizalama Hatası: {str(e)}", status="failed")
+            self._record_step(nusha_index, "alignment", "failed", error=str(e))
+            self.update_progress(nusha_index, 0, f"Hizalama Hatası: {str(e)}", status="failed", stage="alignment")
             return {"success": False, "error": str(e)}
 
     def _run_ocr_on_page(self, image_path: Path, nusha_dir: Path, page_num: int) -> List[Dict[str, Any]]:
@@ -510,8 +636,8 @@ class ManuscriptEngine:
         print(f"[ENGINE] FULL PIPELINE started for Nusha {nusha_index} (DPI={dpi})...")
         
         # Check for Kraken Model
-        kraken_model_path = BASE_DIR / "tahkik_data" / "models" / "default.mlmodel"
-        use_kraken = KRAKEN_AVAILABLE and kraken_model_path.exists()
+        kraken_model_path = KRAKEN_MODEL_PATH
+        use_kraken = kraken_pipeline_available()
         
         if use_kraken:
              print("[ENGINE] KRAKEN OCR MODU AKTİF (Local OCR)")
@@ -525,13 +651,19 @@ class ManuscriptEngine:
              page_images = sorted(list(paths["pages"].glob("*.png")))
              
              all_segments = []
-             
+             self._record_step(nusha_index, "segmentation", "running", reset=True, model=kraken_model_path.name)
+             self._record_step(nusha_index, "text_recognition", "running", reset=True, engine="kraken", model=kraken_model_path.name)
+
              # 2. Run OCR Page by Page
              for idx, page_img in enumerate(page_images):
                  percent = 10 + int((idx / len(page_images)) * 80)
-                 self.update_progress(nusha_index, percent, f"OCR İşleniyor: Sayfa {idx+1}/{len(page_images)}")
+                 self.update_progress(nusha_index, percent, f"OCR İşleniyor: Sayfa {idx+1}/{len(page_images)}",
+                                      stage="text_recognition", done=idx, total=len(page_images))
                  
                  page_results = self._run_ocr_on_page(page_img, paths["root"], idx+1)
+                 kraken_page = [{"unit": page_img.stem, "status": "completed", "count": len(page_results), "total": len(page_results)}]
+                 self._record_pages(nusha_index, "segmentation", kraken_page, settings={"model": kraken_model_path.name})
+                 self._record_pages(nusha_index, "text_recognition", kraken_page, settings={"engine": "kraken", "model": kraken_model_path.name})
                  
                  # Add to total segments
                  for res in page_results:
@@ -557,7 +689,10 @@ class ManuscriptEngine:
              output_path = paths["root"].parent / "mukabele.json"
              with open(output_path, "w", encoding="utf-8") as f:
                  json.dump({"segments": all_segments}, f, ensure_ascii=False, indent=2)
-                 
+
+             self._record_step(nusha_index, "segmentation", "completed", len(all_segments), model=kraken_model_path.name)
+             self._record_step(nusha_index, "text_recognition", "completed", len(all_segments), total=len(all_segments),
+                               engine="kraken", model=kraken_model_path.name)
              self.update_progress(nusha_index, 100, "Tüm İşlemler Tamamlandı (Kraken)", status="completed")
              return {"success": True, "mode": "kraken", "segments_count": len(all_segments)}
 
@@ -602,6 +737,8 @@ class ManuscriptEngine:
                     "alignment": res_align
                 }
                 
+            except JobCancelled:
+                raise
             except Exception as e:
                  print(f"[ENGINE] Critical Pipeline Error: {e}")
                  traceback.print_exc()
@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+"""
+Pipeline iş kuyruğu — SQLite'ta kalıcı, kaynak sınıflı işçi havuzları.
+
+Eskiden uzun işlemler tek bir süreç geneli GLOBAL_STATUS "meşgul" bayrağı ve FastAPI
+BackgroundTasks ile korunuyordu: aynı anda sadece bir proje bir aşama çalıştırabiliyordu,
+işler yeniden başlatmada kayboluyordu ve hiçbir şey iptal edilemiyordu. Burada:
+
+  - iş türleri (convert / segment / ocr / align / pipeline / spellcheck / export) bir
+    kaynak sınıfına bağlıdır; her sınıfın kendi işçi havuzu vardır (cpu: PDF, Kraken,
+    hizalama; io: Vision OCR, LLM, dışa aktarma) — bir projenin OCR'ı başka projenin
+    hizalamasını bekletmez,
+  - proje başına sıralı: bir projenin aynı anda en fazla bir işi çalışır ve işleri kuyruğa
+    giriş sırasıyla başlar (zincir: convert -> segment -> ocr -> align),
+  - iptal: kuyruktaki iş hemen 'cancelled' olur; çalışan işe cancel_event verilir
+    (JobContext.progress her çağrıda kontrol eder) ve zincirin kalanı iptal edilir,
+  - yeniden deneme: hata veren iş max_attempts'a kadar retry_delay * deneme sonra tekrar
+    kuyruğa girer; son deneme de başarısızsa zincirin kalanı iptal edilir,
+  - geçmiş: created / started / finished zamanları (wait_ms, run_ms), sonuç ve hata,
+  - yeniden başlatma: 'queued' işler tablodan geri yüklenir; 'running' kalanlar (yarıda kalan
+    çalışma bir deneme sayılır) deneme hakkı varsa tekrar kuyruğa, yoksa 'failed' + zincir iptal,
+  - olaylar: bus (progress_events.ProgressBus) verilirse durum değişiklikleri 'job', ilerleme
+    'progress' olayı olarak yayınlanır (aşama, sayılar, ETA) — arayüz yoklamak yerine abone olur.
+
+Handler imzası: handler(job: dict, ctx: JobContext) -> dict (sonuç). {"success": False}
+dönen veya istisna atan iş başarısız sayılır. İlerleme: ctx.progress(percent, message,
+stage=..., done=..., total=...).
+"""
+
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.config import JOB_MAX_ATTEMPTS, JOB_RETRY_DELAY_S, JOB_WORKERS_CPU, JOB_WORKERS_IO
+from src.services.progress_events import ProgressBus, eta_seconds
+
+RESOURCE_CPU = "cpu"
+RESOURCE_IO = "io"
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class JobCancelled(Exception):
+    """Çalışan iş iptal edildi (JobContext.progress / check_cancelled atar)."""
+
+
+class JobContext:
+    def __init__(self, jobs: "PipelineJobs", job: Dict[str, Any], cancel_event: threading.Event):
+        self._jobs = jobs
+        self.job = job
+        self.cancel_event = cancel_event
+
+    def check_cancelled(self) -> None:
+        if self.cancel_event.is_set():
+            raise JobCancelled(self.job["job_id"])
+
+    def progress(self, percent: int, message: str = "", stage: Optional[str] = None,
+                 done: Optional[int] = None, total: Optional[int] = None) -> None:
+        """stage / done / total verilirse olayda sayılar ve ETA da yayınlanır."""
+        self.check_cancelled()
+        self._jobs._set_progress(self.job, percent, message, stage, done, total)
+
+
+class PipelineJobs:
+    def __init__(
+        self,
+        db,
+        workers: Optional[Dict[str, int]] = None,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        retry_delay: float = JOB_RETRY_DELAY_S,
+        bus: Optional[ProgressBus] = None,
+    ):
+        self.db = db
+        self.bus = bus
+        self.workers = workers or {RESOURCE_CPU: JOB_WORKERS_CPU, RESOURCE_IO: JOB_WORKERS_IO}
+        self.max_attempts = max(1, int(max_attempts or 1))
+        self.retry_delay = float(retry_delay or 0)
+        self._handlers: Dict[str, Tuple[Callable[[Dict[str, Any], JobContext], Dict[str, Any]], str]] = {}
+        self._cond = threading.Condition()
+        self._queue: List[Dict[str, Any]] = []  # kuyruk sırasıyla
+        # project_id -> (job, cancel_event)
+        self._running: Dict[str, Tuple[Dict[str, Any], threading.Event]] = {}
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+
+    # --- kayıt / başlatma ---
+    def register(self, kind: str, handler: Callable[[Dict[str, Any], JobContext], Dict[str, Any]], resource: str = RESOURCE_CPU) -> None:
+        if resource not in self.workers:
+            raise ValueError(f"Unknown resource class: {resource}")
+        self._handlers[kind] = (handler, resource)
+
+    def kinds(self) -> List[str]:
+        return list(self._handlers)
+
+    def start(self) -> None:
+        """Kalıcı kuyruğu yükler ve işçileri başlatır (süreç açılışında bir kez)."""
+        if self._threads:
+            return
+        try:
+            restored = self.db.requeue_interrupted_pipeline_jobs()
+        except Exception as e:
+            print(f"[WARN] İş kuyruğu okunamadı: {e}")
+            restored = []
+        with self._cond:
+            self._queue = restored + [j for j in self._queue if j["job_id"] not in {r["job_id"] for r in restored}]
+        if restored:
+            print(f"[PipelineJobs] {len(restored)} iş kuyruğa geri yüklendi.")
+        for resource, n in self.workers.items():
+            for i in range(max(1, int(n or 1))):
+                t = threading.Thread(target=self._worker, args=(resource,), name=f"jobs-{resource}-{i}", daemon=True)
+                self._threads.append(t)
+                t.start()
+
+    def shutdown(self, timeout: Optional[float] = 5.0) -> None:
+        with self._cond:
+            self._stopping = True
+            for _, cancel in self._running.values():
+                cancel.set()
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    # --- kuyruk ---
+    def enqueue(self, project_id: str, kind: str, nusha_index: int = 1, options: Optional[Dict[str, Any]] = None,
+                group_id: Optional[str] = None, max_attempts: Optional[int] = None) -> Dict[str, Any]:
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind} (valid: {', '.join(self._handlers)})")
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "project_id": project_id,
+            "kind": kind,
+            "resource": self._handlers[kind][1],
+            "nusha_index": int(nusha_index or 1),
+            "group_id": group_id,
+            "status": "queued",
+            "options": dict(options or {}),
+            "attempts": 0,
+            "max_attempts": int(max_attempts or self.max_attempts),
+            "progress": 0,
+            "message": "Kuyrukta",
+            "created_at": time.time(),
+            "not_before": 0,
+        }
+        with self._cond:
+            self.db.create_pipeline_job(job)
+            self._queue.append(job)
+            self._emit(job, "queued", job["message"])
+            self._cond.notify_all()
+        return self.get(job["job_id"])
+
+    def enqueue_chain(self, project_id: str, kinds: List[str], nusha_index: int = 1, options: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Sırayla çalışacak adımlar; biri başarısız olur / iptal edilirse kalanlar iptal edilir."""
+        unknown = [k for k in kinds if k not in self._handlers]
+        if unknown:
+            raise ValueError(f"Unknown job kind: {', '.join(unknown)}")
+        group_id = uuid.uuid4().hex if len(kinds) > 1 else None
+        # zincir tek seferde kuyruğa girer: ilk adım, kalanlar eklenmeden bitip başarısız olamaz
+        with self._cond:
+            return [self.enqueue(project_id, k, nusha_index, options, group_id=group_id) for k in kinds]
+
+    def cancel(self, job_id: str) -> bool:
+        with self._cond:
+            for job in list(self._queue):
+                if job["job_id"] == job_id:
+                    self._cancel_queued(job, "İptal edildi")
+                    self._cancel_group(job, "Zincirdeki bir adım iptal edildi")
+                    self._cond.notify_all()
+                    return True
+            for job, cancel in self._running.values():
+                if job["job_id"] == job_id:
+                    cancel.set()
+                    self._cancel_group(job, "Zincirdeki bir adım iptal edildi")
+                    return True
+        return False
+
+    def cancel_project(self, project_id: str) -> int:
+        with self._cond:
+            ids = [j["job_id"] for j in self._queue if j["project_id"] == project_id]
+            cur = self._running.get(project_id)
+        if cur:
+            ids.insert(0, cur[0]["job_id"])
+        return sum(1 for jid in ids if self.cancel(jid))
+
+    def _cancel_queued(self, job: Dict[str, Any], message: str) -> None:
+        self._queue.remove(job)
+        self.db.update_pipeline_job(job["job_id"], status="cancelled", message=message, finished_at=time.time())
+        self._emit(job, "cancelled", message)
+
+    def _cancel_group(self, job: Dict[str, Any], message: str) -> None:
+        if not job.get("group_id"):
+            return
+        for other in [j for j in self._queue if j.get("group_id") == job["group_id"]]:
+            self._cancel_queued(other, message)
+
+    # --- okuma ---
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.db.get_pipeline_job(job_id)
+
+    def history(self, project_id: Optional[str] = None, limit: int = 50, statuses: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        return self.db.list_pipeline_jobs(project_id, statuses=statuses, limit=limit)
+
+    def active(self, project_id: str) -> Optional[Dict[str, Any]]:
+        """Projenin çalışan işi, yoksa sıradaki kuyruk işi."""
+        with self._cond:
+            cur = self._running.get(project_id)
+            job_id = cur[0]["job_id"] if cur else next((j["job_id"] for j in self._queue if j["project_id"] == project_id), None)
+        return self.get(job_id) if job_id else None
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """İş kuyruktan ve çalışanlardan çıkana kadar bekler (testler)."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while any(j["job_id"] == job_id for j in self._queue) or any(j["job_id"] == job_id for j, _ in self._running.values()):
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._cond.wait(remaining if remaining is not None else 0.5)
+        return self.get(job_id)
+
+    # --- işçiler ---
+    def _pick(self, resource: str, now: float) -> Tuple[Optional[Dict[str, Any]], Optional[float]]:
+        """Boştaki projelerin ilk işlerinden bu kaynağa ait, zamanı gelmiş en eskisi; yoksa sonraki uyanma."""
+        seen = set()
+        wake = None
+        for job in self._queue:
+            pid = job["project_id"]
+            if pid in seen or pid in self._running:
+                seen.add(pid)
+                continue
+            seen.add(pid)
+            if job["resource"] != resource:
+                continue
+            if job.get("not_before", 0) > now:
+                wake = min(wake or job["not_before"], job["not_before"])
+                continue
+            return job, None
+        return None, wake
+
+    def _worker(self, resource: str) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopping:
+                        return
+                    job, wake = self._pick(resource, time.time())
+                    if job is not None:
+                        break
+                    self._cond.wait(max(0.01, wake - time.time()) if wake else None)
+                self._queue.remove(job)
+                cancel = threading.Event()
+                job["attempts"] += 1
+                job["started_at"] = time.time()
+                self._running[job["project_id"]] = (job, cancel)
+                job["stage"] = None
+                self.db.update_pipeline_job(job["job_id"], status="running", attempts=job["attempts"], started_at=job["started_at"],
+                                            progress=0, message=f"{job['kind']} çalışıyor", error=None)
+                self._emit(job, "running", f"{job['kind']} çalışıyor")
+            try:
+                self._execute(job, cancel)
+            finally:
+                with self._cond:
+                    cur = self._running.get(job["project_id"])
+                    if cur and cur[0] is job:
+                        del self._running[job["project_id"]]
+                    self._cond.notify_all()
+
+    def _execute(self, job: Dict[str, Any], cancel: threading.Event) -> None:
+        handler = self._handlers.get(job["kind"], (None, None))[0]
+        ctx = JobContext(self, job, cancel)
+        error = None
+        result = None
+        try:
+            if handler is None:
+                # tablodan geri yüklenen ama bu süreçte kayıtlı olmayan tür: tekrar denemenin anlamı yok
+                job["attempts"] = job["max_attempts"]
+                raise ValueError(f"Unknown job kind: {job['kind']}")
+            result = handler(job, ctx)
+            if isinstance(result, dict) and result.get("success") is False:
+                error = str(result.get("error") or "failed")
+        except JobCancelled:
+            pass
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            print(f"[PipelineJobs] {job['kind']} ({job['project_id']}) hata: {error}")
+
+        now = time.time()
+        upd = lambda **kw: self.db.update_pipeline_job(job["job_id"], **kw)
+        with self._cond:
+            if cancel.is_set():
+                upd(status="cancelled", message="İptal edildi", finished_at=now, result=result)
+                self._emit(job, "cancelled", "İptal edildi")
+                self._cancel_group(job, "Zincirdeki bir adım iptal edildi")
+            elif error is None:
+                upd(status="completed", progress=100, message="Tamamlandı", finished_at=now, result=result)
+                self._emit(job, "completed", "Tamamlandı", progress=100, run_ms=int((now - job["started_at"]) * 1000))
+            elif job["attempts"] < job["max_attempts"]:
+                # tekrar kuyruğa, zincir sırası korunur (grubun başına)
+                job["not_before"] = now + self.retry_delay * job["attempts"]
+                message = f"Yeniden denenecek ({job['attempts']}/{job['max_attempts']}): {error}"
+                upd(status="queued", message=message, error=error, not_before=job["not_before"], started_at=None)
+                self._emit(job, "retry", message, error=error)
+                self._queue.insert(self._requeue_index(job), job)
+            else:
+                upd(status="failed", message=f"Hata: {error}", error=error, finished_at=now, result=result)
+                self._emit(job, "failed", f"Hata: {error}", error=error)
+                self._cancel_group(job, "Zincirdeki önceki adım başarısız")
+
+    def _requeue_index(self, job: Dict[str, Any]) -> int:
+        """Aynı projenin kuyruktaki ilk işinin önü (proje sırası bozulmasın)."""
+        for i, other in enumerate(self._queue):
+            if other["project_id"] == job["project_id"]:
+                return i
+        return len(self._queue)
+
+    def _set_progress(self, job: Dict[str, Any], percent: int, message: str, stage: Optional[str] = None,
+                      done: Optional[int] = None, total: Optional[int] = None) -> None:
+        job["progress"] = int(percent)
+        message = message or job.get("message", "")
+        self.db.update_pipeline_job(job["job_id"], progress=int(percent), message=message)
+        if self.bus is None:
+            return
+        stage = stage or job.get("stage") or job["kind"]
+        if stage != job.get("stage"):
+            # ETA aşama başına: yeni aşamanın sayacı sıfırdan başlar
+            job["stage"], job["stage_started_at"] = stage, time.time()
+        self.bus.publish(job["project_id"], "progress", job_id=job["job_id"], kind=job["kind"], nusha_index=job["nusha_index"],
+                         stage=stage, percent=int(percent), message=message, done=done, total=total,
+                         eta_s=eta_seconds(job.get("stage_started_at"), done, total))
+
+    def _emit(self, job: Dict[str, Any], status: str, message: str, **extra) -> None:
+        if self.bus is None:
+            return
+        self.bus.publish(job["project_id"], "job", job_id=job["job_id"], kind=job["kind"], nusha_index=job["nusha_index"],
+                         group_id=job.get("group_id"), status=status, message=message, attempts=job.get("attempts", 0),
+                         error=extra.pop("error", None), **extra)
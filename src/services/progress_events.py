@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+İlerleme olayları (push) — iş kuyruğundan ve pipeline aşamalarından arayüze.
+
+Arayüz eskiden durum uçlarını setInterval ile yokluyordu; her yoklama sayfa / satır / OCR
+klasörlerini tarıyordu (1000 sayfalık projede yoklama başına binlerce stat, açık sekme başına).
+Burada:
+
+  - publish  : işçi thread'leri yapılandırılmış olay yayınlar; asla bloklamaz (abone kuyruğu
+               doluysa en eski olay düşer ve abonenin dropped sayacı artar),
+  - subscribe: proje (veya project_id=None ile bütün projeler) aboneliği; senkron get() veya
+               asyncio'da aget() (SSE ucu) ile okunur,
+  - olay     : {"seq", "ts", "project_id", "type", ...}; type:
+                 job      -> iş durumu değişti (queued / running / retry / completed / failed / cancelled)
+                 progress -> aşama ilerlemesi (stage, percent, message, done, total, eta_s)
+                 prerender-> TTS ön-seslendirme (status, done, total, eta_s)
+  - eta      : aşama başlangıcından beri geçen süre / biten * kalan (eta_seconds).
+
+Olaylar kalıcı değildir; bağlanan istemci önce anlık durumu (snapshot) alır, sonra olayları.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+def eta_seconds(started_at: Optional[float], done: Optional[int], total: Optional[int], now: Optional[float] = None) -> Optional[float]:
+    """Doğrusal tahmin; hesaplanamıyorsa None."""
+    if not started_at or not total or not done or done <= 0:
+        return None
+    if done >= total:
+        return 0.0
+    elapsed = (now or time.time()) - started_at
+    return round(elapsed / done * (total - done), 1)
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """text/event-stream çerçevesi (event: <type>, id: <seq>)."""
+    data = json.dumps(event, ensure_ascii=False, default=str)
+    head = f"event: {event.get('type', 'message')}\n"
+    if event.get("seq") is not None:
+        head += f"id: {event['seq']}\n"
+    return f"{head}data: {data}\n\n"
+
+
+class Subscription:
+    def __init__(self, bus: "ProgressBus", project_id: Optional[str], maxsize: int):
+        self._bus = bus
+        self.project_id = project_id
+        self._events: deque = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.dropped = 0
+        self.closed = False
+
+    def _push(self, event: Dict[str, Any]) -> None:
+        with self._cond:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+            self._events.append(event)
+            self._cond.notify_all()
+            loop, wakeup = self._loop, self._wakeup
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                pass  # döngü kapanmış (istemci gitti)
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Sıradaki olay; timeout dolarsa None."""
+        with self._cond:
+            if not self._events:
+                self._cond.wait(timeout)
+            return self._events.popleft() if self._events else None
+
+    async def aget(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """asyncio karşılığı (SSE): işçi thread'leri call_soon_threadsafe ile uyandırır."""
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+        with self._cond:
+            if self._events:
+                return self._events.popleft()
+            self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        with self._cond:
+            return self._events.popleft() if self._events else None
+
+    def close(self) -> None:
+        self._bus.unsubscribe(self)
+
+
+class ProgressBus:
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subs: List[Subscription] = []
+        self._seq = 0
+
+    def publish(self, project_id: str, event_type: str, **data) -> Dict[str, Any]:
+        with self._lock:
+            self._seq += 1
+            event = {"seq": self._seq, "ts": time.time(), "project_id": project_id, "type": event_type, **data}
+            targets = [s for s in self._subs if s.project_id is None or s.project_id == project_id]
+        for sub in targets:
+            sub._push(event)
+        return event
+
+    def subscribe(self, project_id: Optional[str] = None) -> Subscription:
+        sub = Subscription(self, project_id, self.queue_size)
+        with self._lock:
+            self._subs.append(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            if sub in self._subs:
+                self._subs.remove(sub)
+        sub.closed = True
+
+    def subscriber_count(self, project_id: Optional[str] = None) -> int:
+        with self._lock:
+            return sum(1 for s in self._subs if project_id is None or s.project_id == project_id)
+
+
+_default_bus: Optional[ProgressBus] = None
+_default_bus_lock = threading.Lock()
+
+
+def default_progress_bus() -> ProgressBus:
+    """Süreç genelinde paylaşılan olay yolu (API, iş kuyruğu, ön-seslendirme)."""
+    global _default_bus
+    with _default_bus_lock:
+        if _default_bus is None:
+            _default_bus = ProgressBus()
+    return _default_bus
@@ -1,12 +1,22 @@
 import uuid
 import json
 import shutil
+import threading
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from fastapi import UploadFile
 from src.config import PROJECTS_DIR
 from src.utils import write_json_atomic
 from src.database import DatabaseManager
+from src.document import read_docx_paragraphs, read_docx_text
+from src.align_trace import AlignTrace
+from src.alignment_store import AlignmentStore, open_alignment_store, store_path_for, write_alignment_store
+from src.incremental_alignment import incremental_realign, reference_text_from_lines
+from src.span_index import SpanIndex
+from src.witnesses import witness_key, skips_key, link_field
+from src.payload_v2 import LinkResolver, is_link_field
+from src.spellcheck_incremental import apply_line_edits
+from src.services import stage_ledger
 
 class ProjectManager:
     """
@@ -14,11 +24,17 @@ class ProjectManager:
     Uses SQLite for metadata storage with file system fallback/sync.
     """
 
-    def __init__(self):
-        # Ensure base projects directory exists
-        self.projects_dir = PROJECTS_DIR
+    def __init__(self, projects_dir: Optional[Path] = None, db: Optional[DatabaseManager] = None):
+        # Ensure base projects directory exists (projects_dir/db: testler geçici klasör verir)
+        self.projects_dir = Path(projects_dir) if projects_dir is not None else PROJECTS_DIR
         self.projects_dir.mkdir(parents=True, exist_ok=True)
-        self.db = DatabaseManager()
+        if db is None:
+            db = DatabaseManager() if projects_dir is None else DatabaseManager(self.projects_dir / "tahkik_global.db")
+        self.db = db
+        # (project_id, nusha_index) -> open AlignmentStore (mmap); guarded by _store_lock
+        self._stores: Dict[tuple, AlignmentStore] = {}
+        self._store_lock = threading.Lock()
+        self._steps_lock = threading.Lock()
 
     def create_project(self, name: str, authors: List[str] = [], language: str = "Ottoman Turkish", subject: str = "Islamic Studies", description: str = "") -> str:
         """
@@ -26,7 +42,7 @@ class ProjectManager:
         Writes to both File System (JSON) and SQLite DB.
         """
         project_id = str(uuid.uuid4())
-        project_path = PROJECTS_DIR / project_id
+        project_path = self.projects_dir / project_id
         
         # Create project directory
         project_path.mkdir(exist_ok=True)
@@ -61,7 +77,7 @@ class ProjectManager:
         """
         Returns the absolute path to the project directory.
         """
-        return PROJECTS_DIR / project_id
+        return self.projects_dir / project_id
 
     def get_nusha_dir(self, project_id: str, nusha_index: int) -> Path:
         """
@@ -107,10 +123,10 @@ class ProjectManager:
         # Fallback to FS
         print("[INFO] Fallback to FileSystem for list_projects")
         projects = []
-        if not PROJECTS_DIR.exists():
+        if not self.projects_dir.exists():
             return projects
 
-        for item in PROJECTS_DIR.iterdir():
+        for item in self.projects_dir.iterdir():
             if item.is_dir():
                 metadata_path = item / "metadata.json"
                 if metadata_path.exists():
@@ -296,8 +312,9 @@ class ProjectManager:
             
             filename = pdf_files[0].name if pdf_files else None
             
-            # İşlem durumunu kontrol et (lines klasörü varsa OCR yapılmış demektir)
-            lines_exists = (n_path / "lines").exists()
+            # İşlem durumu aşama defterinden (segmentasyon tamamsa satırlar var demektir)
+            steps = self.get_nusha_steps(project_id, i)
+            lines_exists = (steps.get("segmentation") or {}).get("status") == "completed"
             
             # İlerleme Durumunu Oku
             progress_data = None
@@ -331,6 +348,89 @@ class ProjectManager:
             "nushas": nushas_status
         }
 
+    # --- Pipeline stage ledger (SQLite stage_ledger; src/services/stage_ledger.py) ---
+    # Aşamalar ne ürettiklerini (sayfa başına) deftere yazar; durum uçları klasör taramak yerine bunu okur.
+    PIPELINE_STEPS = stage_ledger.PIPELINE_STEPS
+
+    def record_nusha_step(self, project_id: str, nusha_index: int, step: str, status: str, count: Optional[int] = None,
+                          reset: bool = False, **extra) -> Dict:
+        """
+        Aşama çalıştırmasının satırı (unit=''). status: running | completed | failed | cancelled.
+        extra: total, error; geri kalanı çıktıyı üreten ayarlar (dpi, model, engine...).
+        reset=True: aşamanın sayfa satırları silinir (baştan çalıştırma).
+        """
+        stage_ledger.upstream_of(step)  # bilinmeyen aşama -> ValueError
+        total, error = extra.pop("total", None), extra.pop("error", None)
+        row = {"unit": "", "status": status, "count": count, "total": total, "error": error, "settings": extra}
+        self.db.record_stage_rows(project_id, nusha_index, step, [row], reset=reset)
+        return row
+
+    def record_nusha_pages(self, project_id: str, nusha_index: int, step: str, pages: List[Dict],
+                           settings: Optional[Dict] = None) -> None:
+        """Sayfa satırları: [{unit, status, count, total, error}] (settings hepsine aynı)."""
+        stage_ledger.upstream_of(step)
+        self.db.record_stage_rows(project_id, nusha_index, step, [dict(p, settings=settings) for p in pages])
+
+    def clear_nusha_steps(self, project_id: str, nusha_index: int, steps: List[str]) -> None:
+        """Çıktısı silinen aşamaların defter satırlarını kaldırır."""
+        self.db.clear_stages(project_id, nusha_index, list(steps))
+
+    def get_nusha_steps(self, project_id: str, nusha_index: int) -> Dict[str, Dict]:
+        """
+        Aşama özetleri (tek sorgu). Defterde hiç satırı olmayan nüsha (defter öncesi proje)
+        bir kez diskten uzlaştırılır.
+        """
+        with self._steps_lock:
+            summary = self.db.get_stage_summary(project_id, nusha_index)
+            if not summary:
+                nusha_dir = self.get_project_path(project_id) / f"nusha_{nusha_index}"
+                if nusha_dir.exists():
+                    stage_ledger.reconcile_nusha(self.db, project_id, nusha_index, nusha_dir)
+                    summary = self.db.get_stage_summary(project_id, nusha_index)
+        steps = {}
+        for step in self.PIPELINE_STEPS:
+            agg = summary.get(step)
+            if not agg:
+                continue
+            units = agg["units"] or 0
+            status = agg["run_status"] or ("failed" if not agg["units_completed"] else "completed")
+            entry = {
+                **agg["settings"],
+                "status": status,
+                "count": agg["unit_count"] if units else agg["run_count"],
+                "total": agg["run_total"] if agg["run_total"] is not None else agg["unit_total"],
+                "error": agg["run_error"] or agg["unit_error"],
+                "pages": units,
+                "pages_failed": agg["units_failed"] or 0,
+                "updated_at": agg["updated_at"],
+            }
+            steps[step] = entry
+        return steps
+
+    def get_nusha_rerun_plan(self, project_id: str, nusha_index: int, settings: Optional[Dict[str, Dict]] = None) -> Dict:
+        """
+        Ne yeniden çalışmalı: sayfa aşamaları için sayfa anahtarları, hizalama için bool.
+        settings: {step: mevcut ayarlar}; farklı ayarla üretilmiş sayfalar da listelenir.
+        """
+        settings = settings or {}
+        plan: Dict = {}
+        for step in ("segmentation", "text_recognition"):
+            plan[step] = self.db.units_needing_run(project_id, nusha_index, step, stage_ledger.upstream_of(step),
+                                                   settings=settings.get(step))
+        plan["alignment"] = self.db.stage_is_stale(project_id, nusha_index, "alignment", "text_recognition")
+        return plan
+
+    def reconcile_ledger(self, project_id: str, nusha_index: Optional[int] = None) -> Dict[int, Dict[str, int]]:
+        """Defteri diskten yeniden kurar (tek nüsha veya bütün proje)."""
+        project_dir = self.get_project_path(project_id)
+        if not project_dir.exists():
+            raise FileNotFoundError(f"Project {project_id} not found")
+        with self._steps_lock:
+            if nusha_index is None:
+                return stage_ledger.reconcile_project(self.db, project_id, project_dir)
+            return {nusha_index: stage_ledger.reconcile_nusha(self.db, project_id, nusha_index,
+                                                              project_dir / f"nusha_{nusha_index}")}
+
     def save_uploaded_file(self, project_id: str, file_content: bytes, file_type: str, nusha_index: int = 1, filename: str = "file"):
         """
         Dosyayı projenin uygun klasörüne kaydeder.
@@ -402,8 +502,10 @@ class ProjectManager:
             nusha_dir = project_path / f"nusha_{nusha_index}"
             if nusha_dir.exists():
                 import shutil
+                self.release_nusha_stores(project_id, nusha_index)
                 shutil.rmtree(nusha_dir)
                 print(f"[DELETE] Nüsha klasörü silindi: {nusha_dir}")
+            self.clear_nusha_steps(project_id, nusha_index, list(self.PIPELINE_STEPS))
 
     def update_nusha_order(self, project_id: str, new_order: List[int]):
         """
@@ -451,6 +553,7 @@ class ProjectManager:
             raise FileNotFoundError(f"Project directory not found: {project_path}")
         
         # Use shutil to remove the directory and all its contents
+        self.release_nusha_stores(project_id)
         shutil.rmtree(project_path)
         
         # DB Delete
@@ -459,6 +562,7 @@ class ProjectManager:
             conn.execute("DELETE FROM projects WHERE id=?", (project_id,))
             conn.execute("DELETE FROM aligned_lines WHERE project_id=?", (project_id,))
             conn.execute("DELETE FROM nushas WHERE project_id=?", (project_id,))
+            conn.execute("DELETE FROM stage_ledger WHERE project_id=?", (project_id,))
             conn.commit()
             conn.close()
         except Exception as e:
@@ -498,22 +602,132 @@ class ProjectManager:
         self._save_metadata(project_id, meta)
         return sigla
 
-    def run_word_spellcheck(self, project_id: str):
-        """Word dosyası üzerinde temel imla/format kontrolü yapar (Simülasyon)."""
-        # Burada ileride gerçek NLP/Normalization kodları çalışacak
-        # Şimdilik dosyanın varlığını ve okunabilirliğini test edip onay veriyoruz.
-        tahkik_path = self.projects_dir / project_id / "tahkik.docx"
-        if not tahkik_path.exists():
-             # project_id might be just the folder name if using self.projects_dir / project_id
-             # let's use get_project_path to be safe or just adhere to self.projects_dir usage
-             tahkik_path = self.get_project_path(project_id) / "tahkik.docx"
-
-        if not tahkik_path.exists():
+    def project_spellcheck_path(self, project_id: str) -> Path:
+        return self.get_project_path(project_id) / "spellcheck.json"
+
+    def _spellcheck_paragraphs(self, project_id: str, status_callback=None) -> Tuple[Path, List[str]]:
+        """tahkik.docx paragrafları + Nüsha 1 satır düzenlemeleri (imla kontrolünün gördüğü canlı metin)."""
+        docx_path = self.get_project_path(project_id) / "tahkik.docx"
+        if not docx_path.exists():
             raise FileNotFoundError("Word dosyası bulunamadı.")
-        
-        import time
-        time.sleep(2) # İşlem simülasyonu
-        return {"status": "success", "message": "İmla denetimi tamamlandı. Metin hizalamaya uygun."}
+
+        paras = read_docx_paragraphs(docx_path)
+        paras, n_edits = apply_line_edits(paras, self.get_nusha_alignment(project_id, 1))
+        if n_edits and status_callback:
+            status_callback(f"SPELLCHECK: Nüsha 1'deki {n_edits} satır düzenlemesi metne uygulandı.", "INFO")
+        return docx_path, paras
+
+    def run_incremental_spellcheck(
+        self,
+        project_id: str,
+        use_gemini: bool = True,
+        use_openai: bool = True,
+        use_claude: bool = False,
+        status_callback=None,
+        on_paragraph=None,
+        cancel_event=None,
+        paragraphs: Optional[List[str]] = None,
+    ) -> Dict:
+        """
+        Projenin imla sonuçlarını (spellcheck.json) artımlı tazeler: Word paragraflarına Nüsha 1
+        satır düzenlemeleri uygulanır, sadece yeni/değişmiş paragraflar sağlayıcılara gider.
+        """
+        from src.spellcheck import spellcheck_tahkik_paragraphs
+
+        if paragraphs is None:
+            docx_path, paragraphs = self._spellcheck_paragraphs(project_id, status_callback=status_callback)
+        else:
+            docx_path = self.get_project_path(project_id) / "tahkik.docx"
+
+        return spellcheck_tahkik_paragraphs(
+            docx_path,
+            use_gemini=use_gemini,
+            use_openai=use_openai,
+            use_claude=use_claude,
+            status_callback=status_callback,
+            incremental=True,
+            paragraphs=paragraphs,
+            output_json=self.project_spellcheck_path(project_id),
+            on_paragraph=on_paragraph,
+            cancel_event=cancel_event,
+        )
+
+    def run_word_spellcheck(
+        self,
+        project_id: str,
+        use_gemini: bool = True,
+        use_openai: bool = True,
+        use_claude: bool = False,
+        job_id: Optional[str] = None,
+        cancel_event=None,
+        status_callback=None,
+    ) -> Dict:
+        """
+        Word dosyası (tahkik.docx) üzerinde imla denetimi. Artımlı çalışır: iptal edilen / yarım
+        kalan bir işten sonra yeniden çağrılınca kalan paragraflardan devam eder. Tamamlanan her
+        paragrafın sonucu hemen DB'ye (spellcheck_paragraphs) yazılır; ilerleme spellcheck_jobs'ta.
+        """
+        from src.config import SPELLCHECK_MAX_PARAS
+
+        job_id = job_id or uuid.uuid4().hex
+        if self.db.get_spellcheck_job(job_id) is None:
+            self.db.create_spellcheck_job(job_id, project_id, {
+                "use_gemini": use_gemini, "use_openai": use_openai, "use_claude": use_claude,
+            })
+
+        def _status(msg: str, level: str = "INFO"):
+            if level in ("WARNING", "ERROR") or msg.startswith("SPELLCHECK"):
+                try:
+                    self.db.update_spellcheck_job(job_id, message=msg[:500])
+                except Exception as e:
+                    print(f"[WARN] Spellcheck job status yazılamadı: {e}")
+            if status_callback:
+                status_callback(msg, level)
+
+        progress = {"done": 0}
+
+        def _on_paragraph(entry: Dict):
+            self.db.upsert_spellcheck_paragraph(project_id, job_id, entry)
+            progress["done"] += 1
+            self.db.update_spellcheck_job(job_id, done=progress["done"])
+
+        try:
+            _, paras = self._spellcheck_paragraphs(project_id, status_callback=_status)
+            total = min(len([p for p in paras if p.strip()]), SPELLCHECK_MAX_PARAS)
+            self.db.update_spellcheck_job(job_id, total=total)
+            payload = self.run_incremental_spellcheck(
+                project_id,
+                use_gemini=use_gemini,
+                use_openai=use_openai,
+                use_claude=use_claude,
+                status_callback=_status,
+                on_paragraph=_on_paragraph,
+                cancel_event=cancel_event,
+                paragraphs=paras,
+            )
+        except Exception as e:
+            self.db.update_spellcheck_job(job_id, status="failed", message=str(e)[:500])
+            raise
+
+        n_errors = len(payload.get("errors_merged") or [])
+        n_call_errors = len(payload.get("call_errors") or [])
+        if payload.get("cancelled"):
+            status = "cancelled"
+            message = f"İmla denetimi iptal edildi ({progress['done']}/{total} paragraf). Devam ettirilebilir."
+        else:
+            status = "completed"
+            # Word'den silinmiş paragrafların eski sonuçları
+            self.db.prune_spellcheck_paragraphs(project_id, job_id)
+            message = f"İmla denetimi tamamlandı: {n_errors} olası hata, {n_call_errors} API hatası."
+        self.db.update_spellcheck_job(job_id, status=status, done=progress["done"], message=message)
+        return {
+            "status": status,
+            "job_id": job_id,
+            "message": message,
+            "paragraphs": total,
+            "errors": n_errors,
+            "call_errors": n_call_errors,
+        }
 
     def merge_nusha_lines(self, project_id: str, nusha_index: int, line_numbers: List[int]):
         """Birleştirilen satırları alignment.json'a kaydeder."""
@@ -590,7 +804,7 @@ class ProjectManager:
             # self.db is init in __init__
             if not hasattr(self, 'db'):
                  self.db = DatabaseManager()
-            self.db.upsert_lines_batch(project_id, nusha_index, lines)
+            self.db.update_aligned_lines(project_id, nusha_index, [lines[i] for i in indices])
         except Exception as e:
             print(f"[WARN] DB Sync failed for merge_nusha_lines: {e}")
             
@@ -710,9 +924,9 @@ class ProjectManager:
         write_json_atomic(alignment_path, data)
         self._save_metadata(project_id, meta)
         
-        # DB Sync Lines
+        # DB Sync Lines (only the two lines involved)
         try:
-            self.db.upsert_lines_batch(project_id, nusha_index, lines)
+            self.db.update_aligned_lines(project_id, nusha_index, [current_line, target_line])
         except Exception as e:
             print(f"[WARN] DB Sync failed for shift_line_content: {e}")
             
@@ -761,6 +975,178 @@ class ProjectManager:
                 
         return []
 
+    # --- TTS pages ---
+
+    def get_tts_pages(self, project_id: str, nusha_index: int = 1) -> List[Dict]:
+        """
+        Okuma sırasıyla sayfalar ve seslendirilecek token'lar: [{page_key, page_image, tokens}, ...].
+        Editörün oynatıcısıyla aynı sayfa anahtarları (pages/*.png sırası -> p1, p2, ...) ve aynı
+        metin (sayfanın hizalı satırlarının best.raw'ı, giriş kısmı hariç) — ön-seslendirilen ses
+        oynatıcının isteğiyle birebir eşleşir.
+        """
+        nusha_dir = self.get_nusha_dir(project_id, nusha_index)
+        images = sorted(p.name for p in (nusha_dir / "pages").glob("*.png"))
+        pages = [{"page_key": f"p{i + 1}", "page_image": name, "tokens": []} for i, name in enumerate(images)]
+        by_image = {p["page_image"]: p for p in pages}
+
+        # satır görüntüsü -> sayfa görüntüsü (hizalama kaydında page_image yoksa manifestten)
+        manifest_pages: Dict[str, str] = {}
+        manifest = nusha_dir / "lines_manifest.jsonl"
+        if manifest.exists():
+            try:
+                with open(manifest, "r", encoding="utf-8") as f:
+                    for line in f:
+                        rec = json.loads(line)
+                        if rec.get("line_image") and rec.get("page_image"):
+                            manifest_pages[Path(rec["line_image"]).name] = Path(rec["page_image"]).name
+            except Exception as e:
+                print(f"[WARN] Satır manifesti okunamadı ({manifest}): {e}")
+
+        for item in self.get_nusha_alignment(project_id, nusha_index):
+            raw = ((item.get("best") or {}).get("raw") or "").strip()
+            if not raw or raw == "--- [GİRİŞ KISMI / HİZALAMA DIŞI] ---":
+                continue
+            page_image = item.get("page_image") or manifest_pages.get(Path(item.get("line_image") or "").name, "")
+            page = by_image.get(Path(page_image.replace("\\", "/")).name) if page_image else None
+            if page is not None:
+                page["tokens"].extend(raw.split())
+        return pages
+
+    # --- Columnar store (mmap) ---
+
+    def _nusha_store_stamp(self, project_id: str, nusha_index: int) -> str:
+        """get_nusha_alignment kaynağının sürüm damgası: DB revizyonu, yoksa alignment.json stat."""
+        rev = self.db.get_lines_revision(project_id, nusha_index)
+        if rev is not None:
+            return f"db:{rev}"
+        candidates = [self.get_nusha_dir(project_id, nusha_index) / "alignment.json"]
+        if nusha_index == 1:
+            candidates.append(self.projects_dir / project_id / "alignment.json")
+        for p in candidates:
+            if p.exists():
+                st = p.stat()
+                return f"file:{st.st_mtime_ns}:{st.st_size}"
+        return "empty"
+
+    def _nusha_store(self, project_id: str, nusha_index: int) -> AlignmentStore:
+        """Güncel alignment.col'u açar; yoksa veya bayatsa get_nusha_alignment'tan yeniden yazar. (_store_lock altında)"""
+        key = (project_id, nusha_index)
+        stamp = self._nusha_store_stamp(project_id, nusha_index)
+        store = self._stores.get(key)
+        if store is not None and store.stamp == stamp:
+            return store
+        if store is not None:
+            store.close()
+            del self._stores[key]
+
+        path = store_path_for(self.get_nusha_dir(project_id, nusha_index) / "alignment.json")
+        store = open_alignment_store(path, stamp=stamp)
+        if store is None:
+            write_alignment_store(path, self.get_nusha_alignment(project_id, nusha_index), stamp=stamp)
+            store = AlignmentStore(path)
+        self._stores[key] = store
+        return store
+
+    def release_nusha_stores(self, project_id: str, nusha_index: Optional[int] = None):
+        """Açık mmap'leri kapatır (klasör silinmeden önce; Windows'ta açık dosya silinemez)."""
+        with self._store_lock:
+            for key in [k for k in self._stores if k[0] == project_id and nusha_index in (None, k[1])]:
+                self._stores.pop(key).close()
+
+    def get_nusha_lines_slice(
+        self,
+        project_id: str,
+        nusha_index: int,
+        page: Optional[str] = None,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+    ) -> Dict:
+        """
+        Bir sayfanın (page_name) veya line_no aralığının [start, end) satırları; kitabın tamamı
+        okunmaz, sütunlu depodan (mmap) sadece istenen satırlar çözülür.
+        Returns: {"lines": [...], "total": satır_sayısı}
+        """
+        with self._store_lock:
+            store = self._nusha_store(project_id, nusha_index)
+            if page is not None:
+                lines = store.slice_page(page)
+            else:
+                lo = start if start is not None else -(2 ** 31)
+                hi = end if end is not None else 2 ** 31 - 1
+                lines = store.slice_lines(lo, hi)
+            return {"lines": lines, "total": len(store)}
+
+    def get_nusha_page_index(self, project_id: str, nusha_index: int) -> List[Dict]:
+        """[{page_name, lines}, ...] — sayfa sırasıyla, satır sayılarıyla."""
+        with self._store_lock:
+            return self._nusha_store(project_id, nusha_index).pages()
+
+    def get_overlapping_lines(self, project_id: str, nusha_index: int, start_word: int, end_word: int, max_keep: Optional[int] = None) -> List[Dict]:
+        """
+        Nüsha K'nın hangi satırları [start_word, end_word) tahkik aralığıyla çakışıyor?
+        Returns: [{line_no, line_image, ocr_text, best, overlap}, ...] (çakışmaya göre azalan).
+        """
+        index = SpanIndex(self.get_nusha_alignment(project_id, nusha_index))
+        return [
+            {
+                "line_no": item.get("line_no"),
+                "line_image": item.get("line_image", ""),
+                "ocr_text": item.get("ocr_text", ""),
+                "best": item.get("best", {}),
+                "overlap": ov,
+            }
+            for ov, item in index.overlapping(start_word, end_word, max_keep=max_keep)
+        ]
+
+    def list_nusha_indices(self, project_id: str) -> List[int]:
+        """Projedeki nusha_<k> klasörlerinin indeksleri, sayısal sırada."""
+        out = []
+        for p in self.get_project_path(project_id).glob("nusha_*"):
+            suffix = p.name.split("_", 1)[1]
+            if p.is_dir() and suffix.isdigit():
+                out.append(int(suffix))
+        return sorted(out)
+
+    def get_witness_pair_links(self, project_id: str, nusha_a: int, nusha_b: int, max_keep: int = 6) -> Dict:
+        """
+        İki nüsha arasındaki kesin OCR↔OCR bağlantıları ve satır atlamaları (isteğe bağlı).
+        Mukabele verisi sadece tahkik (pivot) üzerinden birleştirilmiş bağlantılar taşır;
+        pivot dışı bir çift istendiğinde hizalama burada hesaplanır ve çift önbelleğinde saklanır.
+        Returns: {"links": {a: {line_no: [...]}, b: {...}}, "skips": {"skips_nA_vs_nB": [...], ...}}
+        """
+        from src.alignment import attach_exact_pair_links
+        from src.project_context import ProjectContext
+        from src.witness_pairs import default_pair_cache
+
+        ctx = ProjectContext.for_project(self.get_project_path(project_id), project_id)
+        payload = {
+            witness_key(nusha_a): self.get_nusha_alignment(project_id, nusha_a),
+            witness_key(nusha_b): self.get_nusha_alignment(project_id, nusha_b),
+        }
+        attach_exact_pair_links(payload, nusha_a, nusha_b, max_keep=max_keep, pair_cache=default_pair_cache(ctx.pair_cache_dir))
+
+        links = {}
+        for src, tgt in ((nusha_a, nusha_b), (nusha_b, nusha_a)):
+            field = f"ocr_{link_field(src, tgt)}_list"
+            links[src] = {it.get("line_no"): it.get(field) or [] for it in payload[witness_key(src)] if isinstance(it, dict)}
+        skips = {k: payload.get(k, []) for k in (skips_key(nusha_a, nusha_b), skips_key(nusha_b, nusha_a))}
+        return {"links": links, "skips": skips}
+
+    def get_line_links(self, project_id: str, nusha_index: int, line_no: int) -> Optional[Dict]:
+        """
+        Tek bir satırın nüshalar arası bağlantılarını çözer (payload v2 referansları -> v1 şekli).
+        Hedef nüshalar sadece referans verildiğinde, nüsha başına bir kez okunur.
+        Returns: {field: resolved, ...} veya satır yoksa None
+        """
+        item = next(
+            (l for l in self.get_nusha_alignment(project_id, nusha_index) if l.get("line_no") == line_no),
+            None,
+        )
+        if item is None:
+            return None
+        resolver = LinkResolver(loader=lambda n: self.get_nusha_alignment(project_id, n))
+        return {field: resolver.resolve_field(item, field) for field in item if is_link_field(field)}
+
     def update_nusha_line(self, project_id: str, nusha_index: int, line_no: int, new_text: str, new_html: str = None) -> bool:
         """
         Updates a single line text in both DB and Filesystem.
@@ -789,10 +1175,9 @@ class ProjectManager:
         if new_html is not None:
              target_line["best"]["html"] = new_html
         
-        # Save to DB
+        # Save to DB (only the edited row; other rows and their trash state stay untouched)
         try:
-            # We must upsert ALL lines because upsert_lines_batch clears the table first!
-            self.db.upsert_lines_batch(project_id, nusha_index, lines)
+            self.db.update_aligned_lines(project_id, nusha_index, [target_line])
         except Exception as e:
             print(f"[ERROR] DB update failed: {e}")
             return False
@@ -840,6 +1225,83 @@ class ProjectManager:
         return True
 
     
+    def realign_nusha_incremental(self, project_id: str, nusha_index: int, new_reference_text: str) -> Optional[int]:
+        """
+        Re-aligns one nusha against an edited reference text without a full re-run.
+        Only lines whose alignment actually changed are written to the DB.
+        Returns the number of changed lines, or None if the nusha has no usable alignment yet.
+        """
+        alignment_path = self.get_project_path(project_id) / f"nusha_{nusha_index}" / "alignment.json"
+        if not alignment_path.exists():
+            return None
+
+        with open(alignment_path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+
+        trace = AlignTrace.from_config()
+        result = incremental_realign(payload, new_reference_text, trace=trace)
+        if result is None:
+            return None
+
+        new_payload, changed_line_nos = result
+        if not changed_line_nos and new_payload is payload:
+            return 0
+
+        write_json_atomic(alignment_path, new_payload)
+        # tam hizalamanın izi korunur; bu çalışma izin runs listesine eklenir
+        trace.append_to_sidecar(alignment_path)
+
+        if changed_line_nos:
+            changed = set(changed_line_nos)
+            try:
+                self.db.update_aligned_lines(
+                    project_id, nusha_index,
+                    [l for l in new_payload.get("aligned", []) if l.get("line_no") in changed]
+                )
+            except Exception as e:
+                print(f"[WARN] DB Sync failed for incremental realign (Nusha {nusha_index}): {e}")
+
+        print(f"[ALIGN] Nusha {nusha_index}: incremental realign -> {len(changed_line_nos)} line(s) updated")
+        return len(changed_line_nos)
+
+    def propagate_reference_edit(self, project_id: str) -> Dict[int, Optional[int]]:
+        """
+        Nusha 1 metni (canlı referans) değişti -> diğer nüshaları artımlı yeniden hizala.
+        Tetikleyiciler: N1 satır düzenleme, birleştirme, kaydırma ve yeni tahkik.docx.
+        """
+        results: Dict[int, Optional[int]] = {}
+        ref_lines = self.get_nusha_alignment(project_id, 1)
+        if not ref_lines:
+            return results
+        reference_text = reference_text_from_lines(ref_lines)
+
+        for idx in self.list_nusha_indices(project_id):
+            if idx == 1:
+                continue
+            try:
+                results[idx] = self.realign_nusha_incremental(project_id, idx, reference_text)
+            except Exception as e:
+                print(f"[WARN] Incremental realign failed for Nusha {idx}: {e}")
+                results[idx] = None
+        return results
+
+    def realign_after_reference_change(self, project_id: str) -> Dict[int, Optional[int]]:
+        """
+        Yeni tahkik.docx yüklendiğinde: önce Nusha 1'i yeni Word metnine göre artımlı
+        hizala, ardından değişikliği diğer nüshalara yay.
+        """
+        results: Dict[int, Optional[int]] = {}
+        docx_path = self.get_project_path(project_id) / "tahkik.docx"
+        if not docx_path.exists():
+            return results
+        try:
+            results[1] = self.realign_nusha_incremental(project_id, 1, read_docx_text(docx_path) or "")
+        except Exception as e:
+            print(f"[WARN] Incremental realign failed for Nusha 1: {e}")
+            results[1] = None
+        results.update(self.propagate_reference_edit(project_id))
+        return results
+
     def get_deleted_lines(self, project_id: str, nusha_index: int) -> List[Dict]:
         """
         Retrieves lines that are marked as deleted.
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Word imla denetimi arka plan işleri (proje başına en fazla bir çalışan iş).
+
+  - start  : ProjectManager.run_word_spellcheck'i ayrı bir thread'de başlatır; iptal edilmiş /
+             yarım kalmış (interrupted) bir işten sonra çağrılırsa artımlı çalıştığı için kalan
+             paragraflardan devam eder,
+  - cancel : uçuştaki sağlayıcı çağrıları biter, kalanlar yapılmaz; kısmi sonuç kaydedilir,
+  - state  : son iş + DB'deki tüm paragraf sonuçları (sayfa yenilemelerinde),
+  - stream : paragraf sonuçlarını DB cursor'ı (seq) üzerinden tamamlandıkça NDJSON satırları
+             olarak akıtır; bağlantı koparsa istemci ?after=<son seq> ile kaldığı yerden alır.
+"""
+
+import json
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+
+class SpellcheckJobs:
+    def __init__(self, project_manager, poll_interval: float = 0.5):
+        self.pm = project_manager
+        self.db = project_manager.db
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        # project_id -> (job_id, cancel_event, thread)
+        self._running: Dict[str, Tuple[str, threading.Event, threading.Thread]] = {}
+        try:
+            n = self.db.mark_interrupted_spellcheck_jobs()
+            if n:
+                print(f"[SpellcheckJobs] {n} yarım kalmış iş 'interrupted' olarak işaretlendi.")
+        except Exception as e:
+            print(f"[WARN] Spellcheck işleri okunamadı: {e}")
+
+    def is_running(self, project_id: str) -> bool:
+        with self._lock:
+            cur = self._running.get(project_id)
+            return bool(cur and cur[2].is_alive())
+
+    def start(self, project_id: str, use_gemini: bool = True, use_openai: bool = True, use_claude: bool = False) -> Dict[str, Any]:
+        with self._lock:
+            cur = self._running.get(project_id)
+            if cur and cur[2].is_alive():
+                return {"started": False, "job": self.db.get_spellcheck_job(cur[0])}
+            if not (self.pm.get_project_path(project_id) / "tahkik.docx").exists():
+                raise FileNotFoundError("Word dosyası bulunamadı.")
+
+            prev = self.db.get_latest_spellcheck_job(project_id)
+            options = {"use_gemini": use_gemini, "use_openai": use_openai, "use_claude": use_claude}
+            if prev and prev["status"] in ("cancelled", "interrupted", "failed"):
+                options["resumed_from"] = prev["job_id"]
+            job_id = uuid.uuid4().hex
+            self.db.create_spellcheck_job(job_id, project_id, options)
+
+            cancel = threading.Event()
+            t = threading.Thread(
+                target=self._run,
+                args=(project_id, job_id, cancel, use_gemini, use_openai, use_claude),
+                name=f"spellcheck-{project_id[:8]}",
+                daemon=True,
+            )
+            self._running[project_id] = (job_id, cancel, t)
+            t.start()
+        return {"started": True, "job": self.db.get_spellcheck_job(job_id)}
+
+    def _run(self, project_id: str, job_id: str, cancel: threading.Event, use_gemini: bool, use_openai: bool, use_claude: bool):
+        try:
+            self.pm.run_word_spellcheck(
+                project_id,
+                use_gemini=use_gemini,
+                use_openai=use_openai,
+                use_claude=use_claude,
+                job_id=job_id,
+                cancel_event=cancel,
+            )
+        except Exception as e:
+            print(f"[SpellcheckJobs] İş başarısız ({project_id}): {e}")
+        finally:
+            with self._lock:
+                cur = self._running.get(project_id)
+                if cur and cur[0] == job_id:
+                    del self._running[project_id]
+
+    def cancel(self, project_id: str) -> bool:
+        with self._lock:
+            cur = self._running.get(project_id)
+        if not cur or not cur[2].is_alive():
+            return False
+        cur[1].set()
+        return True
+
+    def wait(self, project_id: str, timeout: Optional[float] = None) -> None:
+        with self._lock:
+            cur = self._running.get(project_id)
+        if cur:
+            cur[2].join(timeout)
+
+    def state(self, project_id: str) -> Dict[str, Any]:
+        rows = self.db.get_spellcheck_paragraphs(project_id)
+        return {
+            "job": self.db.get_latest_spellcheck_job(project_id),
+            "running": self.is_running(project_id),
+            "per_paragraph": sorted((r["entry"] for r in rows), key=lambda e: e.get("paragraph_index") or 0),
+            "cursor": rows[-1]["seq"] if rows else 0,
+        }
+
+    def stream(self, project_id: str, after: int = 0) -> Iterator[str]:
+        """
+        NDJSON satırları: {"type": "paragraph", "seq", "entry"} ve iş durumu değiştikçe
+        {"type": "job", "job"}. İş bitmiş ve yeni sonuç kalmamışsa akış kapanır.
+        """
+        last_job: Optional[Dict[str, Any]] = None
+        while True:
+            running = self.is_running(project_id)
+            for r in self.db.get_spellcheck_paragraphs(project_id, after_seq=after):
+                after = r["seq"]
+                yield json.dumps({"type": "paragraph", "seq": r["seq"], "entry": r["entry"]}, ensure_ascii=False) + "\n"
+            job = self.db.get_latest_spellcheck_job(project_id)
+            key = job and (job["status"], job["done"], job["total"], job["message"])
+            if key != (last_job and (last_job["status"], last_job["done"], last_job["total"], last_job["message"])):
+                last_job = job
+                yield json.dumps({"type": "job", "job": job}, ensure_ascii=False) + "\n"
+            if not running:
+                return
+            time.sleep(self.poll_interval)
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Aşama defteri (stage ledger) — hangi aşama hangi sayfa için ne üretti, ne zaman, hangi
+ayarlarla (dpi / model / motor) ve hangi sonuçla.
+
+Proje durumu eskiden klasörler taranarak çıkarılıyordu (pages/*.png, lines, ocr/*.txt,
+alignment.json); yavaştı ve yarım kalan çalıştırmadan / elle silinen dosyadan sonra yanlıştı.
+Artık aşamalar SQLite `stage_ledger` tablosuna yazar:
+
+  - satır  : (project_id, nusha_index, stage, unit); unit = sayfa anahtarı (sayfa resminin
+             adı, ör. page_0001) veya '' (aşama çalıştırmasının kendisi: running / completed / failed),
+  - durum  : DatabaseManager.get_stage_summary -> nüsha başına tek gruplu sorgu,
+  - yeniden: DatabaseManager.units_needing_run -> üst aşaması tamam olup kendi çıktısı eksik,
+             hatalı, üst aşamadan eski veya farklı ayarla üretilmiş sayfalar (tek sorgu),
+  - uzlaştırma: reconcile_nusha -> defteri diskten yeniden kurar (eski projeler, elle silinen
+             dosyalar). Komut satırı: python src/scripts/reconcile_ledger.py [project_id ...]
+
+Diskten kurulan satırların ayarları bilinmez (settings_hash NULL); ayar karşılaştırmasında
+eşleşiyor sayılır.
+"""
+
+import json
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.database import DatabaseManager
+
+PIPELINE_STEPS = ("pages", "segmentation", "text_recognition", "alignment")
+
+
+def upstream_of(step: str) -> Optional[str]:
+    if step not in PIPELINE_STEPS:
+        raise ValueError(f"Unknown pipeline step: {step}")
+    i = PIPELINE_STEPS.index(step)
+    return PIPELINE_STEPS[i - 1] if i > 0 else None
+
+
+def page_unit(rec: Dict) -> str:
+    """
+    Manifest kaydının sayfa anahtarı: sayfa resminin adı; yoksa page_name; o da yoksa satır
+    dosyasının sayfa öneki (<sayfa>_line_<n>). Asla '' değildir ('' aşama çalıştırmasıdır).
+    """
+    page_image = rec.get("page_image")
+    if page_image:
+        return Path(page_image).stem
+    if rec.get("page_name"):
+        return str(rec["page_name"])
+    return Path(rec.get("line_image") or "?").stem.rsplit("_line_", 1)[0] or "?"
+
+
+def _read_manifest(manifest: Path) -> List[Dict]:
+    recs = []
+    with open(manifest, "r", encoding="utf-8") as f:
+        for ln in f:
+            ln = ln.strip()
+            if not ln:
+                continue
+            try:
+                recs.append(json.loads(ln))
+            except Exception:
+                continue
+    return recs
+
+
+def _ocr_line_ok(ocr_dir: Path, stem: str) -> Optional[bool]:
+    """None: OCR çıktısı yok; False: Vision hatası kaydedilmiş; True: okundu."""
+    txt = ocr_dir / f"{stem}.txt"
+    js = ocr_dir / f"{stem}.json"
+    if not js.exists():
+        return None
+    if txt.exists() and txt.stat().st_size > 0:
+        return True
+    try:
+        data = json.loads(js.read_text(encoding="utf-8"))
+    except Exception:
+        return False
+    return not (isinstance(data, dict) and "error" in data)
+
+
+def scan_nusha_stages(nusha_dir: Path, aligned_count: Optional[int] = None) -> List[Dict]:
+    """
+    Nüsha klasöründen defter satırları ({stage, unit, status, count, total, error, produced_at}).
+    produced_at dosya zamanlarıdır, böylece 'üst aşama daha yeni' karşılaştırması anlamlı kalır.
+    aligned_count: DB'deki hizalı satır sayısı (alignment.json yoksa da hizalama tamam sayılır).
+    """
+    rows: List[Dict] = []
+    pages_dir = nusha_dir / "pages"
+    if pages_dir.exists():
+        for png in sorted(pages_dir.glob("*.png")):
+            rows.append({"stage": "pages", "unit": png.stem, "status": "completed", "count": 1,
+                         "produced_at": png.stat().st_mtime})
+
+    manifest = nusha_dir / "lines_manifest.jsonl"
+    if manifest.exists():
+        seg_at = manifest.stat().st_mtime
+        by_page: "OrderedDict[str, List[Dict]]" = OrderedDict((r["unit"], []) for r in rows if r["stage"] == "pages")
+        for rec in _read_manifest(manifest):
+            by_page.setdefault(page_unit(rec), []).append(rec)
+        ocr_dir = nusha_dir / "ocr"
+        for unit, recs in by_page.items():
+            rows.append({"stage": "segmentation", "unit": unit, "status": "completed", "count": len(recs),
+                         "produced_at": seg_at})
+            if not recs or not ocr_dir.exists():
+                continue
+            ok = failed = missing = 0
+            ocr_at = None
+            for rec in recs:
+                stem = Path(rec.get("line_image") or "").stem
+                state = _ocr_line_ok(ocr_dir, stem)
+                if state is None:
+                    missing += 1
+                    continue
+                ok += 1 if state else 0
+                failed += 0 if state else 1
+                ocr_at = max(ocr_at or 0.0, (ocr_dir / f"{stem}.json").stat().st_mtime)
+            if ocr_at is None:
+                continue
+            error = None
+            if failed or missing:
+                error = f"{failed} satır hatalı, {missing} satır eksik"
+            rows.append({"stage": "text_recognition", "unit": unit, "status": "failed" if error else "completed",
+                         "count": ok, "total": len(recs), "error": error, "produced_at": ocr_at})
+
+    alignment = nusha_dir / "alignment.json"
+    if alignment.exists() or aligned_count:
+        count = aligned_count
+        if count is None:
+            try:
+                count = json.loads(alignment.read_text(encoding="utf-8")).get("lines_count")
+            except Exception:
+                count = None
+        rows.append({"stage": "alignment", "unit": "", "status": "completed", "count": count,
+                     "produced_at": alignment.stat().st_mtime if alignment.exists() else None})
+    return rows
+
+
+def reconcile_nusha(db: DatabaseManager, project_id: str, nusha_index: int, nusha_dir: Path) -> Dict[str, int]:
+    """Nüshanın defterini diskten yeniden kurar; aşama başına satır sayısı döner."""
+    aligned_count = None
+    try:
+        aligned_count = len(db.get_aligned_lines(project_id, nusha_index)) or None
+    except Exception as e:
+        print(f"[WARN] Hizalı satırlar okunamadı ({project_id}/{nusha_index}): {e}")
+    rows = scan_nusha_stages(nusha_dir, aligned_count=aligned_count)
+    db.replace_nusha_stages(project_id, nusha_index, rows)
+    counts: Dict[str, int] = {}
+    for r in rows:
+        counts[r["stage"]] = counts.get(r["stage"], 0) + 1
+    return counts
+
+
+def nusha_dirs(project_dir: Path) -> Dict[int, Path]:
+    out = {}
+    for p in project_dir.glob("nusha_*"):
+        suffix = p.name.split("_", 1)[1]
+        if p.is_dir() and suffix.isdigit():
+            out[int(suffix)] = p
+    return dict(sorted(out.items()))
+
+
+def reconcile_project(db: DatabaseManager, project_id: str, project_dir: Path) -> Dict[int, Dict[str, int]]:
+    return {k: reconcile_nusha(db, project_id, k, d) for k, d in nusha_dirs(project_dir).items()}
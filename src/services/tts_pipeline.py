@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+TTS Pipeline — seslendirme (OpenAI tashkeel) ve sentez (Google TTS) için boru hattı.
+
+process_tts_request eskiden metni parçalara bölüp her parçayı sırayla seslendiriyor, sonra
+her alt parçayı sırayla sentezliyordu; uzun bir paragrafta ilk ses onlarca saniye sonra
+geliyordu. Burada:
+
+  - seslendirme parçaları eşzamanlı çalışır,
+  - bir parçanın seslendirilmiş metni gelir gelmez alt parçaları sentez kuyruğuna girer
+    (diğer parçaların seslendirmesi beklenmez),
+  - sesler her zaman metin sırasıyla birleştirilir; on_segment sıradaki segment hazır
+    olduğunda (sırayı bozmadan) hemen çağrılır,
+  - sağlayıcı başına eşzamanlılık süreç genelindeki semaforlarla sınırlıdır (aynı anda gelen
+    istekler de sınırı paylaşır),
+  - metrics: ilk sese kadar geçen süre (ttfa_ms), toplam süre, parça / segment sayıları,
+  - cancel_event (ör. akış dinleyicisi koptuğunda): yeni iş başlatılmaz, o ana kadarki sıralı
+    segmentler döner.
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.config import TTS_SYNTH_CONCURRENCY, TTS_VOCALIZE_CONCURRENCY
+
+# Süreç genelinde sağlayıcı başına eşzamanlı çağrı sınırı
+_PROVIDER_SLOTS = {
+    "openai": threading.BoundedSemaphore(max(1, TTS_VOCALIZE_CONCURRENCY)),
+    "google": threading.BoundedSemaphore(max(1, TTS_SYNTH_CONCURRENCY)),
+}
+
+VocalizeFn = Callable[[str], str]
+SynthFn = Callable[[str], Dict[str, Any]]
+# segmenter(chunk_index, vocalized_text) -> [ssml, ...]
+SegmentFn = Callable[[int, str], List[str]]
+
+
+class TTSPipelineError(RuntimeError):
+    """Sentez hatası; partial: o ana kadar sırayla hazır olan segmentler."""
+
+    def __init__(self, message: str, partial: List[Dict[str, Any]]):
+        super().__init__(message)
+        self.partial = partial
+
+
+class TTSPipeline:
+    def __init__(
+        self,
+        vocalize: VocalizeFn,
+        synthesize: SynthFn,
+        segmenter: SegmentFn,
+        vocalize_workers: int = TTS_VOCALIZE_CONCURRENCY,
+        synth_workers: int = TTS_SYNTH_CONCURRENCY,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.vocalize = vocalize
+        self.synthesize = synthesize
+        self.segmenter = segmenter
+        self.vocalize_workers = max(1, int(vocalize_workers))
+        self.synth_workers = max(1, int(synth_workers))
+        self._clock = clock
+        self.metrics: Dict[str, Any] = {}
+
+    def _vocalize(self, text: str) -> Tuple[str, float]:
+        t = self._clock()
+        with _PROVIDER_SLOTS["openai"]:
+            try:
+                out = self.vocalize(text)
+            except Exception as e:
+                print(f"[TTS DEBUG] Vocalization Error: {e}")
+                out = text  # Fallback
+        return out or text, self._clock() - t
+
+    def _synth(self, ssml: str) -> Tuple[Dict[str, Any], float]:
+        t = self._clock()
+        with _PROVIDER_SLOTS["google"]:
+            out = self.synthesize(ssml)
+        return out, self._clock() - t
+
+    def run(
+        self,
+        chunks: List[str],
+        on_segment: Optional[Callable[[Dict[str, Any]], None]] = None,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        chunks: seslendirilecek ham metin parçaları (sırayla).
+        Döner: sentez çıktıları metin sırasıyla. Sentez hatasında TTSPipelineError.
+        """
+        t0 = self._clock()
+        m = {"chunks": len(chunks), "segments": 0, "ttfa_ms": None, "total_ms": None, "vocalize_ms": 0.0, "synth_ms": 0.0}
+        self.metrics = m
+        slots: Dict[int, List[Optional[Dict[str, Any]]]] = {}
+        ordered: List[Dict[str, Any]] = []
+        cursor = [0, 0]  # (parça, segment): sıradaki yayınlanacak segment
+
+        def _flush() -> None:
+            ci, sj = cursor
+            while ci < len(chunks) and ci in slots:
+                segs = slots[ci]
+                while sj < len(segs) and segs[sj] is not None:
+                    if m["ttfa_ms"] is None:
+                        m["ttfa_ms"] = round((self._clock() - t0) * 1000.0, 1)
+                    ordered.append(segs[sj])
+                    if on_segment is not None:
+                        on_segment(segs[sj])
+                    sj += 1
+                if sj < len(segs):
+                    break
+                ci, sj = ci + 1, 0
+            cursor[0], cursor[1] = ci, sj
+
+        failed: Optional[str] = None
+        vpool = ThreadPoolExecutor(max_workers=self.vocalize_workers, thread_name_prefix="tts-voc")
+        spool = ThreadPoolExecutor(max_workers=self.synth_workers, thread_name_prefix="tts-synth")
+        try:
+            pending = {vpool.submit(self._vocalize, text): ("v", i, 0) for i, text in enumerate(chunks)}
+            while pending:
+                if cancel_event is not None and cancel_event.is_set() and not m.get("cancelled"):
+                    m["cancelled"] = True
+                    for f in pending:
+                        f.cancel()
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                # parça sırasıyla işle: aynı anda biten parçalarda öndeki önce sentez kuyruğuna girer
+                for fut in sorted(done, key=lambda f: pending[f][1:]):
+                    kind, i, j = pending.pop(fut)
+                    if fut.cancelled():
+                        continue
+                    if kind == "v":
+                        vocalized, dt = fut.result()
+                        m["vocalize_ms"] += dt * 1000.0
+                        if failed is not None or m.get("cancelled"):
+                            continue
+                        segs = self.segmenter(i, vocalized)
+                        slots[i] = [None] * len(segs)
+                        m["segments"] += len(segs)
+                        for k, ssml in enumerate(segs):
+                            pending[spool.submit(self._synth, ssml)] = ("s", i, k)
+                    else:
+                        try:
+                            out, dt = fut.result()
+                        except Exception as e:
+                            # yeni iş başlatma; uçuştakiler bitsin (hatadan önceki segmentler kısmi sonuca girer)
+                            if failed is None:
+                                failed = f"TTS Synthesis Failed: {e}"
+                                for f in pending:
+                                    f.cancel()
+                            continue
+                        m["synth_ms"] += dt * 1000.0
+                        slots[i][j] = out
+                _flush()
+            if failed is not None:
+                raise TTSPipelineError(failed, list(ordered))
+        finally:
+            vpool.shutdown(wait=False, cancel_futures=True)
+            spool.shutdown(wait=False, cancel_futures=True)
+            m["total_ms"] = round((self._clock() - t0) * 1000.0, 1)
+            m["vocalize_ms"] = round(m["vocalize_ms"], 1)
+            m["synth_ms"] = round(m["synth_ms"], 1)
+        return ordered
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+TTS ön-seslendirme arka plan işleri (proje başına en fazla bir çalışan iş, isteğe bağlı).
+
+Ses eskiden sadece editör "OKU"ya bastığında üretiliyordu; her sayfanın ilk dinlenişi tüm
+harekeleme + sentez gecikmesini ödüyordu. Burada:
+
+  - start  : projenin (nüshanın) bütün sayfalarını okuma sırasıyla batch_save eder; oynatıcı
+             aynı sayfa anahtarı ve metinle istediği için ses depodan anında gelir,
+  - focus  : editörün açık sayfası; sıradaki sayfa ondan ileriye (sonra geriye) doğru seçilir,
+  - bütçe  : iş başına sentezlenen karakter sınırı (TTS_PRERENDER_CHAR_BUDGET) ve sağlayıcı
+             başına düşük eşzamanlılık (TTS_PRERENDER_CONCURRENCY); bütçe dolunca iş
+             'budget_exhausted' olur,
+  - devam  : sayfa ilerlemesi ses deposunun sayfa dizininde (metin özetiyle) tutulur; yarım kalan
+             iş yeniden başlatıldığında (veya süreç açılışında resume_interrupted ile) hazır
+             sayfaları atlar,
+  - state  : son iş (total / done / message) + çalışıyor mu + odak sayfası,
+  - olaylar: bus verilirse her durum / ilerleme güncellemesi 'prerender' olayı olarak yayınlanır
+             (arayüz yoklamak yerine abone olur).
+"""
+
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config import TTS_PRERENDER_CHAR_BUDGET, TTS_PRERENDER_CONCURRENCY
+from src.services.audio_store import page_text_digest
+from src.services.progress_events import ProgressBus, eta_seconds
+
+# Art arda bu kadar sayfa hata verirse (sağlayıcı kapalı, kota...) iş 'failed' olur
+MAX_CONSECUTIVE_FAILURES = 3
+
+
+class TTSPrerenderJobs:
+    def __init__(self, project_manager, tts_service, char_budget: int = TTS_PRERENDER_CHAR_BUDGET, workers: int = TTS_PRERENDER_CONCURRENCY,
+                 bus: Optional[ProgressBus] = None):
+        self.pm = project_manager
+        self.bus = bus
+        self.db = project_manager.db
+        self.tts = tts_service
+        self.char_budget = int(char_budget or 0)
+        self.workers = max(1, int(workers or 1))
+        self._lock = threading.Lock()
+        # project_id -> (job_id, cancel_event, thread)
+        self._running: Dict[str, Tuple[str, threading.Event, threading.Thread]] = {}
+        self._focus: Dict[str, str] = {}
+        try:
+            self._interrupted = self.db.mark_interrupted_tts_prerender_jobs()
+            if self._interrupted:
+                print(f"[TTSPrerender] {len(self._interrupted)} yarım kalmış iş 'interrupted' olarak işaretlendi.")
+        except Exception as e:
+            print(f"[WARN] Ön-seslendirme işleri okunamadı: {e}")
+            self._interrupted = []
+
+    def is_running(self, project_id: str) -> bool:
+        with self._lock:
+            cur = self._running.get(project_id)
+            return bool(cur and cur[2].is_alive())
+
+    def start(self, project_id: str, nusha_index: int = 1, speaking_rate: float = 1.0, focus_page: Optional[str] = None) -> Dict[str, Any]:
+        if focus_page:
+            self.focus(project_id, focus_page)
+        with self._lock:
+            cur = self._running.get(project_id)
+            if cur and cur[2].is_alive():
+                return {"started": False, "job": self.db.get_tts_prerender_job(cur[0])}
+            if not self.pm.get_project_path(project_id).exists():
+                raise FileNotFoundError(f"Project {project_id} not found.")
+
+            prev = self.db.get_latest_tts_prerender_job(project_id)
+            options = {"nusha_index": int(nusha_index or 1), "speaking_rate": float(speaking_rate or 1.0), "char_budget": self.char_budget}
+            if prev and prev["status"] in ("cancelled", "interrupted", "failed", "budget_exhausted"):
+                options["resumed_from"] = prev["job_id"]
+            job_id = uuid.uuid4().hex
+            self.db.create_tts_prerender_job(job_id, project_id, options)
+
+            cancel = threading.Event()
+            t = threading.Thread(
+                target=self._run,
+                args=(project_id, job_id, cancel, options),
+                name=f"tts-prerender-{project_id[:8]}",
+                daemon=True,
+            )
+            self._running[project_id] = (job_id, cancel, t)
+            t.start()
+        return {"started": True, "job": self.db.get_tts_prerender_job(job_id)}
+
+    def resume_interrupted(self) -> List[str]:
+        """Önceki süreçte yarım kalan işleri aynı seçeneklerle yeniden başlatır (süreç açılışında)."""
+        resumed = []
+        pending, self._interrupted = self._interrupted, []
+        for job in pending:
+            opts = job.get("options") or {}
+            try:
+                self.start(job["project_id"], nusha_index=opts.get("nusha_index", 1), speaking_rate=opts.get("speaking_rate", 1.0))
+                resumed.append(job["project_id"])
+            except Exception as e:
+                print(f"[WARN] Ön-seslendirme işi sürdürülemedi ({job['project_id']}): {e}")
+        return resumed
+
+    def focus(self, project_id: str, page_key: Optional[str]) -> None:
+        with self._lock:
+            if page_key:
+                self._focus[project_id] = page_key
+            else:
+                self._focus.pop(project_id, None)
+
+    def _next_page(self, project_id: str, remaining: Dict[str, Dict[str, Any]], order: Dict[str, int]) -> str:
+        """Odak sayfasından ileriye doğru en yakın sayfa; ileride kalmadıysa geriye doğru en yakın."""
+        with self._lock:
+            focus = self._focus.get(project_id)
+        f = order.get(focus, 0)
+        n = len(order)
+        return min(remaining, key=lambda k: (order[k] - f) if order[k] >= f else n + (f - order[k]))
+
+    def _run(self, project_id: str, job_id: str, cancel: threading.Event, options: Dict[str, Any]):
+        nusha_index = options["nusha_index"]
+        started_at = time.time()
+        progress = {"status": "running", "done": 0, "total": None}
+
+        def upd(**kw):
+            self.db.update_tts_prerender_job(job_id, **kw)
+            if self.bus is not None:
+                progress.update({k: kw[k] for k in ("status", "done", "total") if k in kw})
+                self.bus.publish(project_id, "prerender", job_id=job_id, nusha_index=nusha_index, message=kw.get("message"),
+                                 eta_s=eta_seconds(started_at, progress["done"], progress["total"]), **progress)
+
+        try:
+            pages = [p for p in self.pm.get_tts_pages(project_id, nusha_index) if p["tokens"]]
+            order = {p["page_key"]: i for i, p in enumerate(pages)}
+            remaining = {p["page_key"]: p for p in pages}
+            upd(total=len(pages), done=0, message=f"{len(pages)} sayfa")
+            store = self.tts._get_audio_store()
+            done, chars, failures = 0, 0, 0
+            while remaining:
+                if cancel.is_set():
+                    upd(status="cancelled", message=f"İptal edildi ({done}/{len(pages)})")
+                    return
+                key = self._next_page(project_id, remaining, order)
+                page = remaining.pop(key)
+                digest = page_text_digest(page["tokens"])
+                if store.get_page(project_id, nusha_index, key, digest) is None:
+                    cost = len(" ".join(page["tokens"]))
+                    if self.char_budget and chars + cost > self.char_budget:
+                        upd(status="budget_exhausted", message=f"Sağlayıcı bütçesi doldu ({chars}/{self.char_budget} karakter, {done}/{len(pages)} sayfa)")
+                        return
+                    res = self.tts.process_tts_request(
+                        {
+                            "tokens": page["tokens"],
+                            "speaking_rate": options["speaking_rate"],
+                            "nusha_id": nusha_index,
+                            "page_key": key,
+                            "archive_path": project_id,
+                            "action": "batch_save",
+                        },
+                        cancel_event=cancel,
+                        workers=self.workers,
+                    )
+                    if cancel.is_set():
+                        continue
+                    if "error" in res:
+                        failures += 1
+                        print(f"[TTSPrerender] {project_id}/{key}: {res['error']}")
+                        if failures >= MAX_CONSECUTIVE_FAILURES:
+                            upd(status="failed", message=f"{key}: {res['error']}")
+                            return
+                        continue
+                    chars += cost
+                failures = 0
+                done += 1
+                upd(done=done, message=f"{key} hazır ({done}/{len(pages)})")
+            upd(status="completed", message=f"{done}/{len(pages)} sayfa hazır")
+        except Exception as e:
+            print(f"[TTSPrerender] İş başarısız ({project_id}): {e}")
+            upd(status="failed", message=str(e))
+        finally:
+            with self._lock:
+                cur = self._running.get(project_id)
+                if cur and cur[0] == job_id:
+                    del self._running[project_id]
+
+    def cancel(self, project_id: str) -> bool:
+        with self._lock:
+            cur = self._running.get(project_id)
+        if not cur or not cur[2].is_alive():
+            return False
+        cur[1].set()
+        return True
+
+    def wait(self, project_id: str, timeout: Optional[float] = None) -> None:
+        with self._lock:
+            cur = self._running.get(project_id)
+        if cur:
+            cur[2].join(timeout)
+
+    def state(self, project_id: str) -> Dict[str, Any]:
+        with self._lock:
+            focus = self._focus.get(project_id)
+        return {
+            "job": self.db.get_latest_tts_prerender_job(project_id),
+            "running": self.is_running(project_id),
+            "focus": focus,
+        }
@@ -1,119 +1,144 @@
 # -*- coding: utf-8 -*-
-import base64
 import json
 import os
 import re
-import unicodedata
-import datetime
-from docx import Document
-from typing import Any, Dict, Optional, Tuple, List
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, List
 from rapidfuzz.distance import Levenshtein
-from pathlib import Path
 import threading
 
-try:
-    from openai import OpenAI
-except ImportError:
-    OpenAI = None
+from src.config import OPENAI_MODEL, DOC_ARCHIVES_DIR
+from src.llm_transport import get_transport, openai_chat_text
+from src.services.audio_store import AudioStore, audio_key, default_audio_store, page_text_digest
+from src.services.tts_pipeline import TTSPipeline, TTSPipelineError
+from src.trace_sinks import Tracer, default_tracer
+from src.vocalization import (
+    cached_fallback, cached_vocalization, stable_chunks, store_fallback, store_vocalization, vocalize_messages,
+)
+
+_MARK_RE = re.compile(r'<mark name="w(\d+)"/>')
+
+_GENDERS = ("MALE", "FEMALE", "NEUTRAL")
+
+
+class GoogleTTSProvider:
+    """
+    Google Cloud TTS sağlayıcısı (SSML <mark> timepoint'leri). TTSService sadece bu üç çağrıyı
+    kullanır; testler ve yük testi aynı arayüzle yerel bir sağlayıcı verebilir:
+      unavailable_reason() -> Optional[str], list_voices(lang) -> [{"name", "gender"}],
+      synthesize(ssml, voice, speaking_rate) -> (mp3 bytes, timepoints).
+    İstemci süreç başına bir kez kurulur (thread-safe).
+    """
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    def client(self):
+        with self._lock:
+            if self._client is not None:
+                return self._client
+            try:
+                from google.cloud import texttospeech_v1beta1 as texttospeech
+                from google.api_core.client_options import ClientOptions
+
+                api_key = os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY")
+
+                if api_key:
+                    print(f"[TTS DEBUG] Attempting to use Google API Key: {api_key[:5]}...")
+                    options = ClientOptions(api_key=api_key)
+                    self._client = texttospeech.TextToSpeechClient(client_options=options)
+                else:
+                    self._client = texttospeech.TextToSpeechClient()
+
+            except Exception as e:
+                print(f"[TTS Service] google-cloud-texttospeech error: {e}")
+                return None
+            return self._client
+
+    def unavailable_reason(self) -> Optional[str]:
+        try:
+            from google.cloud import texttospeech_v1beta1 as texttospeech  # noqa: F401
+        except Exception:
+            return "google-cloud-texttospeech not installed"
+        if not self.client():
+            print("[TTS DEBUG] Client unavailable, credentials missing?")
+            return "TTS client unavailable (no Google Credentials?)"
+        return None
+
+    def list_voices(self, language_code: str) -> List[Dict[str, str]]:
+        resp = self.client().list_voices(language_code=language_code)
+        out = []
+        for v in resp.voices or []:
+            try:
+                out.append({"name": v.name, "gender": v.ssml_gender.name})
+            except Exception:
+                continue
+        return out
+
+    def synthesize(self, ssml_text: str, voice: Dict[str, Any], speaking_rate: float) -> Tuple[bytes, List[Dict[str, Any]]]:
+        from google.cloud import texttospeech_v1beta1 as texttospeech
+
+        params = {"language_code": voice["language_code"]}
+        if voice.get("name"):
+            params["name"] = voice["name"]
+        if voice.get("gender"):
+            params["ssml_gender"] = getattr(texttospeech.SsmlVoiceGender, voice["gender"])
+        req = texttospeech.SynthesizeSpeechRequest(
+            input=texttospeech.SynthesisInput(ssml=ssml_text),
+            voice=texttospeech.VoiceSelectionParams(**params),
+            audio_config=texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.MP3, speaking_rate=speaking_rate),
+            enable_time_pointing=[texttospeech.SynthesizeSpeechRequest.TimepointType.SSML_MARK],
+        )
+        resp = self.client().synthesize_speech(request=req)
+        print(f"[TTS DEBUG] Synthesis success. Audio bytes: {len(resp.audio_content)}")
+        return resp.audio_content or b"", [{"mark": tp.mark_name, "time": float(tp.time_seconds)} for tp in (resp.timepoints or [])]
 
-from src.config import OPENAI_MODEL, DOC_ARCHIVES_DIR, AUDIO_DIR, AUDIO_MANIFEST
-model_name = OPENAI_MODEL
 
 # =============================================================================
-# TTS Service Logic (Ported from tts_server.py)
+# TTS Service Logic (api_server ve yerel tts_server aynı örneği paylaşır)
 # =============================================================================
 
 class TTSService:
-    def __init__(self):
-        self._tts_client = None
+    """
+    Eşzamanlı isteklere açık: ses listesi (_voices_cache) ve sağlayıcı istemcisi kilitle bir kez
+    kurulur; harekeleme llm_transport üzerinden, önbelleği ve ses deposu zaten thread-safe.
+    """
+
+    def __init__(self, provider=None):
+        self.provider = provider or GoogleTTSProvider()
         self._voices_cache = {}
-        self._openai_client = None
-        self.manifest_lock = threading.Lock()
+        self._voices_lock = threading.Lock()
+        self.audio_store = None
+        self.tracer = None
 
     def _get_client(self):
-        if self._tts_client is not None:
-            return self._tts_client
-        try:
-            from google.cloud import texttospeech_v1beta1 as texttospeech
-            from google.api_core.client_options import ClientOptions
-            
-            api_key = os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY")
-            
-            if api_key:
-                print(f"[TTS DEBUG] Attempting to use Google API Key: {api_key[:5]}...")
-                options = ClientOptions(api_key=api_key)
-                self._tts_client = texttospeech.TextToSpeechClient(client_options=options)
-            else:
-                self._tts_client = texttospeech.TextToSpeechClient()
-                
-        except Exception as e:
-            print(f"[TTS Service] google-cloud-texttospeech error: {e}")
-            return None
-        return self._tts_client
-
-    def _get_openai_client(self):
-        if self._openai_client:
-            return self._openai_client
-        api_key = os.environ.get("OPENAI_API_KEY")
-        if not api_key:
-            return None
-        if OpenAI is None:
-            print("[TTS Service] OpenAI module not available.")
-            return None
-        self._openai_client = OpenAI(api_key=api_key)
-        return self._openai_client
-
-    def _pick_voice(self, language_code: str, gender: str, voice_name: Optional[str] = None) -> Tuple[str, Any]:
-        from google.cloud import texttospeech_v1beta1 as texttospeech
+        return self.provider.client() if hasattr(self.provider, "client") else None
+
+    def _get_audio_store(self) -> AudioStore:
+        if self.audio_store is None:
+            self.audio_store = default_audio_store()
+        return self.audio_store
 
+    def _pick_voice(self, language_code: str, gender: str, voice_name: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+        """(ses adı, sağlayıcıya giden ses tanımı). Dil başına ses listesi bir kez çekilir."""
         if voice_name:
-            vp = texttospeech.VoiceSelectionParams(
-                language_code=language_code,
-                name=voice_name,
-            )
-            return voice_name, vp
+            return voice_name, {"language_code": language_code, "name": voice_name}
 
-        cache_key = f"{language_code}"
-        if cache_key not in self._voices_cache:
-            client = self._get_client()
-            if not client:
-                return "", None
-            try:
-                resp = client.list_voices(language_code=language_code)
-                self._voices_cache[cache_key] = resp.voices or []
-            except Exception:
-                self._voices_cache[cache_key] = []
+        with self._voices_lock:
+            if language_code not in self._voices_cache:
+                try:
+                    self._voices_cache[language_code] = self.provider.list_voices(language_code) or []
+                except Exception as e:
+                    print(f"[TTS Service] list_voices error: {e}")
+                    self._voices_cache[language_code] = []
+            voices = self._voices_cache[language_code]
 
-        voices = self._voices_cache.get(cache_key) or []
         want = str(gender or "").upper().strip()
-        want_gender = {
-            "MALE": texttospeech.SsmlVoiceGender.MALE,
-            "FEMALE": texttospeech.SsmlVoiceGender.FEMALE,
-            "NEUTRAL": texttospeech.SsmlVoiceGender.NEUTRAL,
-        }.get(want, texttospeech.SsmlVoiceGender.MALE)
-
-        chosen = None
-        for v in voices:
-            try:
-                if v and v.ssml_gender == want_gender:
-                    chosen = v
-                    break
-            except Exception:
-                continue
-
-        if chosen is None and voices:
-            chosen = voices[0]
-
+        want = want if want in _GENDERS else "MALE"
+        chosen = next((v for v in voices if v.get("gender") == want), None) or (voices[0] if voices else None)
         if chosen is not None:
-            vp = texttospeech.VoiceSelectionParams(
-                language_code=language_code,
-                name=getattr(chosen, "name", None) or None,
-                ssml_gender=want_gender,
-            )
-            return getattr(chosen, "name", None) or "", vp
-
-        vp = texttospeech.VoiceSelectionParams(language_code=language_code, ssml_gender=want_gender)
-        return "", vp
+            return chosen.get("name") or "", {"language_code": language_code, "name": chosen.get("name"), "gender": want}
+        return "", {"language_code": language_code, "gender": want}
 
     def normalize_arabic(self, text):
         # 1. Map Common Variants
@@ -207,48 +232,84 @@ class TTSService:
             .replace("'", "&apos;")
         )
 
-    def vocalize_chunk_with_retry(self, text_chunk: str, log_file_path: str = "test_output.html", page_name: str = None) -> str:
-        client = self._get_openai_client()
-        if not client:
-            return text_chunk
-            
+    def _diff_segments(self, original: str, vocalized: str) -> List[Tuple[str, Optional[str], bool]]:
+        """
+        Kelime hizalaması -> [(son kelime, reddedilen kelime, geri alındı mı)]. Eşleşen kelimede
+        harekeli hali, değişen/silinen kelimede orijinali kalır; eklenen kelimeler atlanır.
+        """
+        ws_original = original.split()
+        ws_vocalized = vocalized.split()
+        opcodes = Levenshtein.opcodes([self.normalize_arabic(w) for w in ws_original], [self.normalize_arabic(w) for w in ws_vocalized])
+        segments = []
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag == 'equal':
+                for k in range(i2-i1): segments.append((ws_vocalized[j1+k], None, False))
+            elif tag == 'replace':
+                for k in range(i2-i1): segments.append((ws_original[i1+k], ws_vocalized[j1+k] if k < (j2-j1) else None, True))
+            elif tag == 'delete':
+                for k in range(i2-i1): segments.append((ws_original[i1+k], "[DELETED]", True))
+            # insert: ignore
+        return segments
+
+    def _get_tracer(self) -> Tracer:
+        if self.tracer is None:
+            self.tracer = default_tracer()
+        return self.tracer
+
+    def vocalize_chunk_with_retry(self, text_chunk: str, page_name: str = None, scope: str = None) -> str:
+        """
+        İz açıksa (TTS_TRACE) denemeler ve geri dönüş sonucu kuyruğa yazılır; istek beklemez.
+        """
         from src.config import OPENAI_MODEL
-        model_name = OPENAI_MODEL 
+        model_name = OPENAI_MODEL
+        # Aynı parça daha önce harekelendiyse (aynı model + prompt) önbellekten
+        cached = cached_vocalization(text_chunk, model_name)
+        if cached is None:
+            cached = cached_fallback(text_chunk, model_name)
+        if cached is not None:
+            return cached
+
+        # Seslendirme çağrısı llm_transport üzerinden (replay modunda anahtar gerekmez)
+        api_key = os.environ.get("OPENAI_API_KEY")
+        if not api_key and not get_transport().offline:
+            return text_chunk
+
+        tracer = self._get_tracer()
+        ctx = {"scope": scope, "page": page_name, "model": model_name}
         max_retries = 3
         norm_original = self.normalize_arabic(text_chunk)
         vocalized_text = ""
         
         for attempt in range(max_retries):
             try:
-                response = client.chat.completions.create(
+                vocalized_text = openai_chat_text(
                     model=model_name,
-                    messages=[
-                        {"role": "system", "content": (
-                            "You are an expert Arabic linguist. "
-                            "Your task is to add full diacritics (Tashkeel) AND correct/add proper punctuation to the following Arabic text. "
-                            "Do NOT change any words or their order. "
-                            "Return ONLY the fully vocalized and punctuated text."
-                        )},
-                        {"role": "user", "content": text_chunk}
-                    ],
+                    api_key=api_key,
+                    messages=vocalize_messages(text_chunk),
                     temperature=0
                 )
-                vocalized_text = response.choices[0].message.content
                 if not vocalized_text: continue
 
                 # Checks
                 l_count, d_count = self._count_stats(vocalized_text)
+                outcome = "ok"
                 if l_count > 2 * d_count:
+                    outcome = "low_diacritics"
+                elif self.normalize_arabic(vocalized_text) != norm_original:
+                    outcome = "mismatch"
+                if tracer.enabled:
+                    tracer.emit("vocalize.attempt", text=text_chunk, vocalized=vocalized_text, attempt=attempt + 1,
+                                outcome=outcome, letters=l_count, diacritics=d_count, **ctx)
+                if outcome == "low_diacritics":
                     continue # Low diacritics
-
-                norm_vocalized = self.normalize_arabic(vocalized_text)
-                if norm_original != norm_vocalized:
+                if outcome == "mismatch":
                     break # Mismatch, don't retry, go to fallback
                 
                 # Safety check: Ensure token count matches to prevent TTS sync drift
                 if len(text_chunk.split()) != len(vocalized_text.split()):
                      break # Mismatch in token count (extra punctuation?), go to fallback to fix
 
+                store_vocalization(text_chunk, model_name, vocalized_text)
                 return vocalized_text
             except Exception as e:
                 error_msg = str(e)
@@ -257,71 +318,74 @@ class TTSService:
                     break # Stop retrying immediately for quota errors
                 print(f"[TTS Service] OpenAI Error: {e}")
 
-        # Fallback (Simulated) - simplified for API service (skipping complex HTML logging for now to reduce bloat, or can add if critical)
+        # Fallback: kelime hizalaması; uyuşmayan kelimelerde orijinal kalır
         if not vocalized_text:
             return text_chunk
-            
-        ws_original = text_chunk.split()
-        ws_vocalized = vocalized_text.split()
-        norm_w_orig = [self.normalize_arabic(w) for w in ws_original]
-        norm_w_voc = [self.normalize_arabic(w) for w in ws_vocalized]
-        
-        opcodes = Levenshtein.opcodes(norm_w_orig, norm_w_voc)
-        final_words = []
-        for tag, i1, i2, j1, j2 in opcodes:
-            if tag == 'equal':
-                for k in range(i2-i1): final_words.append(ws_vocalized[j1+k])
-            elif tag == 'replace':
-                for k in range(i2-i1): final_words.append(ws_original[i1+k])
-            elif tag == 'delete':
-                for k in range(i2-i1): final_words.append(ws_original[i1+k])
-            elif tag == 'insert':
-                pass # Ignore insertions
-                
-        return " ".join(final_words)
 
-    def process_tts_request(self, obj: Dict[str, Any]) -> Dict[str, Any]:
+        segments = self._diff_segments(text_chunk, vocalized_text)
+        merged = " ".join(s[0] for s in segments)
+        if tracer.enabled:
+            reverted = sum(1 for s in segments if s[2] and self.normalize_arabic(s[0]).strip())
+            tracer.emit("vocalize.fallback", text=text_chunk, vocalized=vocalized_text,
+                        segments=[list(seg) for seg in segments], reverted=reverted, **ctx)
+        # Doğrulanmamış sonuç kalıcı önbelleğe girmez; kısa süreli tutulur
+        store_fallback(text_chunk, model_name, merged)
+        return merged
+
+    def chunk_ssml_segments(self, vocalized_text: str, n_tokens: int, token_offset: int) -> List[str]:
+        """
+        Seslendirilmiş parça -> Google için SSML alt parçaları. İlk n_tokens kelimeye
+        <mark name="w{global index}"/> konur (vurgulama senkronu).
+        """
+        out = []
+        voc_idx_counter = 0
+        for sc in self.split_into_three_by_sentences(vocalized_text):
+            sc_words = sc.split()
+            if not sc_words: continue
+            sc_ssml_fragments = []
+            for t in sc_words:
+                if voc_idx_counter < n_tokens:
+                    mark = f'<mark name="w{token_offset + voc_idx_counter}"/>'
+                    voc_idx_counter += 1
+                else:
+                    mark = ""
+                sc_ssml_fragments.append(f'{mark}{self._escape_xml(t)}')
+            out.append(f"<speak>{' '.join(sc_ssml_fragments)}</speak>")
+        return out
+
+    def process_tts_request(
+        self,
+        obj: Dict[str, Any],
+        on_segment: Optional[Callable[[Dict[str, Any]], None]] = None,
+        cancel_event: Optional[threading.Event] = None,
+        workers: Optional[int] = None,
+    ) -> Dict[str, Any]:
         """
         Main entry point for TTS request processing.
+        on_segment: token isteklerinde her segment (metin sırasıyla) hazır olur olmaz çağrılır.
+        workers: sağlayıcı başına eşzamanlı çağrı (None: config); arka plan ön-seslendirme
+        etkileşimli isteklere yer bırakmak için düşük tutar.
         """
-        try:
-            from google.cloud import texttospeech_v1beta1 as texttospeech
-        except:
-             return {"error": "google-cloud-texttospeech not installed"}
-
         action = obj.get("action")
         page_key = obj.get("page_key")
         archive_path_name = obj.get("archive_path")
         
-        # 1. Lazy Archive Lookup
-        if action != "batch_save" and page_key and archive_path_name:
-            # Simplified lookup logic (skipping strict NFC normalization loop for performance, assuming standard path)
-            target_dir = DOC_ARCHIVES_DIR / archive_path_name
-            if target_dir.exists():
-                nusha_id = obj.get("nusha_id", 1)
-                try: nusha_id = int(nusha_id)
-                except: nusha_id = 1
-                
+        # 1. Lazy Archive Lookup (sayfa dizini SQLite'ta; eski manifest JSON'u bir kez içeri alınır)
+        store = self._get_audio_store()
+        nusha_id = obj.get("nusha_id", 1)
+        try: nusha_id = int(nusha_id)
+        except: nusha_id = 1
+        req_tokens = obj.get("tokens") if isinstance(obj.get("tokens"), list) else None
+        text_digest = page_text_digest(req_tokens) if req_tokens else None
+        if action != "batch_save" and page_key:
+            cached_chunks = store.get_page(archive_path_name or "", nusha_id, page_key, text_digest)
+            if cached_chunks is None and archive_path_name:
                 manifest_filename = f"audio_manifest_n{nusha_id}.json" if nusha_id > 1 else "audio_manifest.json"
-                target_manifest = target_dir / manifest_filename
-                
-                if target_manifest.exists():
-                    try:
-                        manifest = json.loads(target_manifest.read_text(encoding="utf-8"))
-                        if page_key in manifest:
-                            chunks_data = manifest[page_key]
-                            output_chunks = []
-                            for c in chunks_data:
-                                rel = c.get("audio_path")
-                                if not rel: continue
-                                full_path = target_dir / rel
-                                if full_path.exists():
-                                    b64 = base64.b64encode(full_path.read_bytes()).decode('utf-8')
-                                    output_chunks.append({"audio_b64": b64, "timepoints": c.get("timepoints")})
-                            
-                            if output_chunks:
-                                return {"chunks": output_chunks, "source": "archive_cache"}
-                    except: pass
+                target_manifest = DOC_ARCHIVES_DIR / archive_path_name / manifest_filename
+                if target_manifest.exists() and store.import_manifest(archive_path_name, nusha_id, target_manifest):
+                    cached_chunks = store.get_page(archive_path_name, nusha_id, page_key, text_digest)
+            if cached_chunks:
+                return {"chunks": cached_chunks, "source": "archive_cache"}
         
         if action == "check_only":
             return {"error": "Audio not prepared (check_only)", "status": 404}
@@ -339,29 +403,24 @@ class TTSService:
         voice_name = obj.get("voice_name")
         speaking_rate = float(obj.get("speaking_rate", 1.0))
         
-        client = self._get_client()
-        if not client:
-            print("[TTS DEBUG] Client unavailable, credentials missing?") 
-            return {"error": "TTS client unavailable (no Google Credentials?)", "status": 500}
-        
+        unavailable = self.provider.unavailable_reason()
+        if unavailable:
+            return {"error": unavailable, "status": 500}
+
         chosen_name, voice = self._pick_voice(language_code, gender, voice_name)
-        audio_config = texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.MP3, speaking_rate=speaking_rate)
+
+        voice_id = chosen_name or f"{language_code}/{gender}"
 
         def _synth_one(ssml_text: str) -> Dict[str, Any]:
+            # Aynı SSML + ses + hız daha önce sentezlendiyse depodan (Google çağrısı yok)
+            digest = audio_key(ssml_text, voice_id, language_code, speaking_rate)
+            hit = store.get(digest)
+            if hit is not None:
+                return hit
             print(f"[TTS DEBUG] Synthesizing SSML length: {len(ssml_text)}")
-            synthesis_input = texttospeech.SynthesisInput(ssml=ssml_text)
-            req = texttospeech.SynthesizeSpeechRequest(
-                input=synthesis_input,
-                voice=voice,
-                audio_config=audio_config,
-                enable_time_pointing=[texttospeech.SynthesizeSpeechRequest.TimepointType.SSML_MARK],
-            )
             try:
-                resp = client.synthesize_speech(request=req)
-                print(f"[TTS DEBUG] Synthesis success. Audio bytes: {len(resp.audio_content)}")
-                audio_b64 = base64.b64encode(resp.audio_content or b"").decode("ascii")
-                tps = [{"mark": tp.mark_name, "time": float(tp.time_seconds)} for tp in (resp.timepoints or [])]
-                return {"audio_b64": audio_b64, "timepoints": tps}
+                audio, tps = self.provider.synthesize(ssml_text, voice, speaking_rate)
+                return store.put(digest, audio, tps, voice=voice_id, speaking_rate=speaking_rate)
             except Exception as e:
                 print(f"[TTS DEBUG] Google TTS Error: {e}")
                 raise e
@@ -370,81 +429,113 @@ class TTSService:
             print(f"[TTS DEBUG] Processing {len(tokens)} tokens")
             toks = [str(t).strip() for t in tokens if str(t).strip()]
             openai_chunk_size = 75 # Reduced from 300 to fix "Sentence Too Long" errors
-            final_chunks_output = []
-            batch_files_created = []
             token_start = int(obj.get("token_start", 0))
-            current_global_token_index = token_start
-            
-            for i in range(0, len(toks), openai_chunk_size):
-                part = toks[i : i + openai_chunk_size]
-                chunk_text_raw = " ".join(part)
-                print(f"[TTS DEBUG] Chunk {i}: {chunk_text_raw[:50]}...")
-                
-                # Vocalize
-                try:
-                    vocalized_text = self.vocalize_chunk_with_retry(chunk_text_raw, log_file_path="test_output.html", page_name=page_key)
-                    print(f"[TTS DEBUG] Vocalization complete. Length: {len(vocalized_text)}")
-                except Exception as e:
-                    print(f"[TTS DEBUG] Vocalization Error: {e}")
-                    vocalized_text = chunk_text_raw # Fallback
-                
-                # Split for Google
-                sub_chunks = self.split_into_three_by_sentences(vocalized_text)
-                print(f"[TTS DEBUG] Split into {len(sub_chunks)} sub-chunks")
-                
-                voc_idx_counter = 0
-                for sc_idx, sc in enumerate(sub_chunks):
-                    sc_words = sc.split()
-                    if not sc_words: continue
-                    print(f"[TTS DEBUG] Processing sub-chunk {sc_idx} with {len(sc_words)} words")
-                    sc_ssml_fragments = []
-                    for t in sc_words:
-                        if voc_idx_counter < len(part):
-                            real_idx = current_global_token_index + voc_idx_counter
-                            mark = f'<mark name="w{real_idx}"/>'
-                            voc_idx_counter += 1
-                        else:
-                            mark = ""
-                        sc_ssml_fragments.append(f'{mark}{self._escape_xml(t)}')
-                    
-                    final_ssml = f"<speak>{' '.join(sc_ssml_fragments)}</speak>"
-                    
-                    try:
-                        out = _synth_one(final_ssml)
-                        
-                        if action == "batch_save" and page_key:
-                             # ... (save logic)
-                             pass 
-                        else:
-                            final_chunks_output.append(out)
-                    except Exception as e:
-                        print(f"Synth Error in loop: {e}")
-                        import traceback
-                        traceback.print_exc()
-                        return {"error": f"TTS Synthesis Failed: {str(e)}", "partial_chunks": final_chunks_output}
-
-                current_global_token_index += len(part)
-
-            if action == "batch_save" and page_key and batch_files_created:
-                with self.manifest_lock:
-                    nusha_id = int(obj.get("nusha_id", 1))
-                    target_manifest = AUDIO_MANIFEST
-                    if archive_path_name:
-                        name = f"audio_manifest_n{nusha_id}.json" if nusha_id > 1 else "audio_manifest.json"
-                        target_manifest = DOC_ARCHIVES_DIR / archive_path_name / name
-                    
-                    manifest = {}
-                    if target_manifest.exists():
-                         try: manifest = json.loads(target_manifest.read_text(encoding="utf-8"))
-                         except: pass
-                    manifest[page_key] = batch_files_created
-                    target_manifest.write_text(json.dumps(manifest, ensure_ascii=False), encoding="utf-8")
-                
-                return {"ok": True, "saved_chunks": batch_files_created}
+            # İçerik tanımlı sınırlar: tek kelimelik düzeltme sadece kendi parçasını yeniden harekeler
+            spans = stable_chunks(toks, openai_chunk_size)
+            parts = [toks[s:e] for s, e in spans]
+
+            tracer = self._get_tracer()
+
+            def _segments(chunk_index: int, vocalized_text: str) -> List[str]:
+                # Split for Google; marks carry global token indices for highlighting
+                part = parts[chunk_index]
+                if tracer.enabled:
+                    tracer.emit("tts.segments", parts=self.split_into_three_by_sentences(vocalized_text), scope=archive_path_name, page=page_key)
+                return self.chunk_ssml_segments(vocalized_text, len(part), token_start + spans[chunk_index][0])
+
+            def _synth_marked(ssml_text: str) -> Dict[str, Any]:
+                # Vurgulama için segmentin kapsadığı global token aralığı [token_start, token_end)
+                out = dict(_synth_one(ssml_text))
+                marks = [int(m) for m in _MARK_RE.findall(ssml_text)]
+                if marks:
+                    out["token_start"], out["token_end"] = marks[0], marks[-1] + 1
+                return out
+
+            # Seslendirme parçaları eşzamanlı; her parçanın sentezi seslendirmesi gelince başlar
+            pipeline = TTSPipeline(
+                vocalize=lambda text: self.vocalize_chunk_with_retry(text, page_name=page_key, scope=archive_path_name),
+                synthesize=_synth_marked,
+                segmenter=_segments,
+                **({"vocalize_workers": workers, "synth_workers": workers} if workers else {}),
+            )
+            try:
+                outputs = pipeline.run([" ".join(part) for part in parts], on_segment=on_segment, cancel_event=cancel_event)
+            except TTSPipelineError as e:
+                print(f"Synth Error in pipeline: {e}")
+                return {"error": str(e), "partial_chunks": e.partial, "metrics": pipeline.metrics}
+            print(f"[TTS DEBUG] Pipeline metrics: {pipeline.metrics}")
+
+            # batch_save: sayfa -> segment özetleri (arşiv bakışı buradan okur); çıktılar istemciye dönmez
+            if action == "batch_save" and page_key:
+                if pipeline.metrics.get("cancelled"):
+                    return {"error": "Cancelled", "status": 499, "metrics": pipeline.metrics}
+                store.set_page(archive_path_name or "", nusha_id, page_key, [c["audio_hash"] for c in outputs], text_digest)
+                return {"ok": True, "saved_chunks": outputs}
+            final_chunks_output = outputs
  
             print(f"[TTS DEBUG] Returning {len(final_chunks_output)} chunks")
-            return {"chunks": final_chunks_output, "voice": chosen_name}
+            return {"chunks": final_chunks_output, "voice": chosen_name, "metrics": pipeline.metrics}
  
         # SSML only
         out = _synth_one(ssml)
-        return {"audio_b64": out["audio_b64"], "timepoints": out["timepoints"], "voice": chosen_name}
+        return {"audio_url": out["audio_url"], "audio_hash": out["audio_hash"], "timepoints": out["timepoints"], "voice": chosen_name}
+
+    def stream_tts_request(self, obj: Dict[str, Any]) -> Iterator[str]:
+        """
+        process_tts_request'in akışlı hali (NDJSON). Satırlar:
+          {"type": "segment", "index", "audio_url", "audio_hash", "timepoints", "token_start", "token_end"}
+          {"type": "done", "voice", "source", "metrics"} veya {"type": "error", "error", "status"}
+        İlk segment hazır olur olmaz gönderilir; dinleyici koparsa boru hattı yeni iş başlatmaz.
+        """
+        import queue
+
+        events: "queue.Queue" = queue.Queue()
+        cancel = threading.Event()
+        _END = object()
+
+        def _work():
+            try:
+                result = self.process_tts_request(obj, on_segment=lambda seg: events.put(("segment", seg)), cancel_event=cancel)
+            except Exception as e:
+                result = {"error": str(e), "status": 500}
+            events.put(("result", result))
+            events.put((_END, None))
+
+        threading.Thread(target=_work, name="tts-stream", daemon=True).start()
+        sent = 0
+        try:
+            while True:
+                kind, payload = events.get()
+                if kind is _END:
+                    return
+                if kind == "segment":
+                    yield json.dumps({"type": "segment", "index": sent, **payload}, ensure_ascii=False) + "\n"
+                    sent += 1
+                    continue
+                result = payload or {}
+                if "error" in result:
+                    yield json.dumps({"type": "error", "error": result["error"], "status": result.get("status", 500)}, ensure_ascii=False) + "\n"
+                    continue
+                # arşiv/depo isabeti veya SSML isteği: segmentler tek seferde
+                rest = result.get("chunks") or ([result] if result.get("audio_url") else [])
+                for seg in rest[sent:]:
+                    seg = {k: v for k, v in seg.items() if k not in ("voice",)}
+                    yield json.dumps({"type": "segment", "index": sent, **seg}, ensure_ascii=False) + "\n"
+                    sent += 1
+                done = {"type": "done", "voice": result.get("voice"), "source": result.get("source", "synthesis"), "metrics": result.get("metrics")}
+                yield json.dumps(done, ensure_ascii=False) + "\n"
+        finally:
+            cancel.set()
+
+
+_default_service: Optional[TTSService] = None
+_default_service_lock = threading.Lock()
+
+
+def default_tts_service() -> TTSService:
+    """Süreç genelinde paylaşılan servis (api_server ve yerel tts_server aynı önbellekleri kullanır)."""
+    global _default_service
+    with _default_service_lock:
+        if _default_service is None:
+            _default_service = TTSService()
+        return _default_service
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Span Index — nüsha satırlarının tahkik token aralıkları (best.start_word/end_word) üzerinde
+sıralı aralık indeksi.
+
+Nüshalar arası bağlantılar (en yakın orta nokta, çakışan satır listeleri) eskiden her satır
+için diğer nüshanın TÜM satırlarını tarıyordu (O(N×M)). Bu indeks bisect ile O(log M + k)
+sorgu sağlar ve sonuçları eski taramayla birebir aynı sırada döndürür:
+  - nearest_by_mid: eşit mesafede ilk (orijinal sırada önce gelen) satır kazanır,
+  - overlapping: çakışma miktarına göre azalan, eşitlikte orijinal sıra korunur.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Bundan uzun aralıklar (ör. birleştirilmiş satırlar) ayrı listede tutulur ve her sorguda
+# doğrudan taranır; böylece kısa aralıklar için başlangıç penceresi dar kalır.
+LONG_SPAN_TOKENS = 64
+
+
+def line_span(item: Any) -> Optional[Tuple[int, int]]:
+    """Bir alignment satırının (start_word, end_word) aralığı; geçersizse None."""
+    if not isinstance(item, dict):
+        return None
+    b = item.get("best") if isinstance(item.get("best"), dict) else {}
+    s = b.get("start_word")
+    e = b.get("end_word")
+    if isinstance(s, int) and isinstance(e, int):
+        return s, e
+    return None
+
+
+def span_mid(s: int, e: int) -> int:
+    return (s + e) // 2 if e > s else s
+
+
+class SpanIndex:
+    """
+    Bir nüshanın satırları için aralık indeksi.
+    items: alignment 'aligned' listesi (veya aynı şekle sahip dict listesi).
+    """
+
+    def __init__(self, items: Iterable[Dict[str, Any]]):
+        self.items: List[Dict[str, Any]] = []
+        spans: List[Tuple[int, int]] = []
+        for it in items or []:
+            sp = line_span(it)
+            if sp is None:
+                continue
+            self.items.append(it)
+            spans.append(sp)
+        self.spans = spans
+
+        # Orta nokta indeksi: (mid, orijinal sıra)
+        by_mid = sorted(range(len(spans)), key=lambda k: (span_mid(*spans[k]), k))
+        self._mid_keys = [span_mid(*spans[k]) for k in by_mid]
+        self._mid_order = by_mid
+
+        # Çakışma indeksi: sadece e > s olan aralıklar; başlangıca göre sıralı
+        short: List[int] = []
+        self._long: List[int] = []
+        for k, (s, e) in enumerate(spans):
+            if e <= s:
+                continue
+            if e - s > LONG_SPAN_TOKENS:
+                self._long.append(k)
+            else:
+                short.append(k)
+        short.sort(key=lambda k: (spans[k][0], k))
+        self._short_order = short
+        self._short_starts = [spans[k][0] for k in short]
+        self._max_short_len = max((spans[k][1] - spans[k][0] for k in short), default=0)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def has_extents(self) -> bool:
+        """En az bir satırın boş olmayan (e > s) aralığı var mı?"""
+        return bool(self._short_order or self._long)
+
+    def nearest_by_mid(self, s: int, e: int) -> Optional[Dict[str, Any]]:
+        """Orta noktası [s, e) aralığının orta noktasına en yakın satır (eşitlikte ilk satır)."""
+        if not self._mid_keys:
+            return None
+        mid = span_mid(s, e)
+        keys = self._mid_keys
+        pos = bisect_left(keys, mid)
+
+        best_k = None
+        best_dist = None
+        # Sağ taraf: mid'e eşit veya büyük en küçük orta nokta grubunun ilk öğesi
+        if pos < len(keys):
+            best_k = self._mid_order[pos]
+            best_dist = keys[pos] - mid
+        # Sol taraf: mid'den küçük en büyük orta nokta grubunun ilk öğesi
+        if pos > 0:
+            left_key = keys[pos - 1]
+            lpos = bisect_left(keys, left_key)
+            lk = self._mid_order[lpos]
+            ldist = mid - left_key
+            if best_dist is None or ldist < best_dist or (ldist == best_dist and lk < best_k):
+                best_k, best_dist = lk, ldist
+        return self.items[best_k] if best_k is not None else None
+
+    def overlapping(self, s: int, e: int, max_keep: Optional[int] = None) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        [s, e) ile pozitif çakışan satırlar: [(overlap, item), ...]
+        Çakışmaya göre azalan; eşitlikte orijinal sıra. max_keep verilirse kırpılır.
+        """
+        if e <= s:
+            return []
+        spans = self.spans
+        hits: List[Tuple[int, int]] = []  # (orijinal sıra, overlap)
+
+        lo = bisect_right(self._short_starts, s - self._max_short_len)
+        hi = bisect_left(self._short_starts, e)
+        for p in range(lo, hi):
+            k = self._short_order[p]
+            as_, ae_ = spans[k]
+            ov = min(e, ae_) - max(s, as_)
+            if ov > 0:
+                hits.append((k, ov))
+        for k in self._long:
+            as_, ae_ = spans[k]
+            ov = min(e, ae_) - max(s, as_)
+            if ov > 0:
+                hits.append((k, ov))
+
+        hits.sort(key=lambda h: (-h[1], h[0]))
+        if max_keep is not None:
+            hits = hits[:max_keep]
+        return [(ov, self.items[k]) for k, ov in hits]
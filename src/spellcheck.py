@@ -5,7 +5,7 @@ Spellcheck helpers and API integrations (Gemini + OpenAI + Claude)
 
 import json
 import re
-import requests
+import threading
 import time
 from collections import Counter
 from pathlib import Path
@@ -22,10 +22,26 @@ from src.config import (
     SPELLCHECK_SAVE_JSON,
     SPELLCHECK_JSON,
     SPELLCHECK_BACKUPS_DIR,
+    SPELLCHECK_LIMITS,
+    SPELLCHECK_MAX_ATTEMPTS,
+    SPELLCHECK_BATCH_TOKENS,
+    SPELLCHECK_BATCH_MAX_PARAS,
 )
 from src.keys import get_gemini_api_key, get_google_access_token, get_openai_api_key, get_claude_api_key
 from src.utils import normalize_ar
 from src.document import read_docx_paragraphs
+from src.spellcheck_executor import ProviderLimits, SpellcheckExecutor, ordered_errors
+from src.llm_cache import LLMResponseCache, default_llm_cache, prompt_version
+from src.llm_transport import get_transport
+from src.spellcheck_incremental import paragraph_fingerprint, plan_incremental
+from src.spellcheck_batch import (
+    batch_prompt_json_ar,
+    batch_prompt_json_en,
+    batch_prompt_tsv,
+    parse_batch_json,
+    parse_batch_tsv,
+    validate_batch,
+)
 
 
 # =========================
@@ -299,11 +315,12 @@ def _filter_non_orthographic_errors(
     return out
 
 
-def _load_existing_spellcheck_json() -> Optional[Dict[str, Any]]:
+def _load_existing_spellcheck_json(path: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+    path = path or SPELLCHECK_JSON
     try:
-        if not SPELLCHECK_JSON.exists():
+        if not path.exists():
             return None
-        obj = json.loads(SPELLCHECK_JSON.read_text(encoding="utf-8"))
+        obj = json.loads(path.read_text(encoding="utf-8"))
         return obj if isinstance(obj, dict) else None
     except Exception:
         return None
@@ -373,7 +390,16 @@ def _merge_spellcheck_payloads(
         for e in merged:
             e["paragraph_index"] = pidx
 
-        merged_pp.append({"paragraph_index": pidx, "text": p, "errors": merged})
+        old_blk = ex_map.get(pidx, {}) or {}
+        new_blk = d_map.get(pidx, {}) or {}
+        merged_pp.append({
+            "paragraph_index": pidx,
+            "text": p,
+            "errors": merged,
+            "fp": paragraph_fingerprint(p),
+            "checked": bool(old_blk.get("checked") or new_blk.get("checked")),
+            "providers": sorted(set(old_blk.get("providers") or []) | set(new_blk.get("providers") or [])),
+        })
         all_errors.extend(merged)
 
     merged_global = _merge_errors(all_errors)
@@ -419,13 +445,19 @@ def _merge_spellcheck_payloads(
     return out
 
 
-def _backup_spellcheck_json(payload: Dict[str, Any], status_callback: Optional[Callable[[str, str], None]] = None) -> None:
+def _backup_spellcheck_json(
+    payload: Dict[str, Any],
+    status_callback: Optional[Callable[[str, str], None]] = None,
+    current_path: Optional[Path] = None,
+) -> None:
     """
     Save a timestamped backup copy of the *previous* spellcheck.json (if exists) and the *new* payload.
-    Backups live under output_lines/spellcheck_backups/.
+    Backups live next to the current file (output_lines/spellcheck_backups/ or the project's own).
     """
+    current_path = current_path or SPELLCHECK_JSON
+    backups_dir = current_path.parent / SPELLCHECK_BACKUPS_DIR.name
     try:
-        SPELLCHECK_BACKUPS_DIR.mkdir(exist_ok=True)
+        backups_dir.mkdir(parents=True, exist_ok=True)
     except Exception:
         pass
 
@@ -442,9 +474,9 @@ def _backup_spellcheck_json(payload: Dict[str, Any], status_callback: Optional[C
 
     # 1) Backup existing current file (if any)
     try:
-        if SPELLCHECK_JSON.exists():
-            prev = SPELLCHECK_JSON.read_text(encoding="utf-8")
-            prev_path = SPELLCHECK_BACKUPS_DIR / f"{ts}__{stem}__prev.json"
+        if current_path.exists():
+            prev = current_path.read_text(encoding="utf-8")
+            prev_path = backups_dir / f"{ts}__{stem}__prev.json"
             prev_path.write_text(prev, encoding="utf-8")
     except Exception as e:
         if status_callback:
@@ -452,7 +484,7 @@ def _backup_spellcheck_json(payload: Dict[str, Any], status_callback: Optional[C
 
     # 2) Backup new payload
     try:
-        new_path = SPELLCHECK_BACKUPS_DIR / f"{ts}__{stem}__new.json"
+        new_path = backups_dir / f"{ts}__{stem}__new.json"
         new_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
         if status_callback:
             status_callback(f"SPELLCHECK: Yedek kaydedildi: {new_path.name}", "INFO")
@@ -462,7 +494,7 @@ def _backup_spellcheck_json(payload: Dict[str, Any], status_callback: Optional[C
 
     # 3) Best-effort retention: keep last 50 newest
     try:
-        files = sorted([p for p in SPELLCHECK_BACKUPS_DIR.glob("*.json") if p.is_file()], key=lambda p: p.name)
+        files = sorted([p for p in backups_dir.glob("*.json") if p.is_file()], key=lambda p: p.name)
         if len(files) > 50:
             for p in files[:-50]:
                 try:
@@ -510,6 +542,38 @@ def _gemini_prompt(paragraph: str) -> str:
     )
 
 
+def _openai_prompt(paragraph: str) -> str:
+    return (
+        "You are an extremely strict Arabic spelling proofreader for a critical edition (tahqiq).\n"
+        "Return ONLY valid JSON (an array). No extra text.\n"
+        "Each item must be: {\"wrong\":\"...\",\"suggestion\":\"...\",\"reason\":\"...\"}\n"
+        "Rules:\n"
+        "- DO NOT suggest or flag any changes that are only about: harakat/diacritics, i'rab/case endings, tanwin, shadda, sukun/jazm, nasb endings.\n"
+        "- Ignore Arabic diacritics and i'rab marks completely (do not flag them).\n"
+        "- Focus on orthography/spelling/letter-level mistakes.\n"
+        "- Max 30 items.\n"
+        "Text:\n"
+        f"{paragraph}"
+    )
+
+
+def _claude_prompt(paragraph: str) -> str:
+    return (
+        "أنت مدقق إملائي عربي شديد الدقة لنص محقق.\n"
+        "أخرج فقط JSON (مصفوفة) بدون أي كلام إضافي.\n"
+        "كل عنصر بالشكل:\n"
+        "{\"wrong\":\"...\",\"suggestion\":\"...\",\"reason\":\"...\"}\n"
+        "قواعد:\n"
+        "- لا تقترح أي تصحيح للحركات/التشكيل/الإعراب/التنوين/الشدة/السكون/الجزم/النصب.\n"
+        "- تجاهل الحركات والإعراب (لا تعتبرها أخطاء).\n"
+        "- إذا كان التصحيح فقط في التشكيل أو علامات الإعراب أو (ألف التنوين في آخر الكلمة) فلا تذكره.\n"
+        "- ركّز على أخطاء الرسم/الإملاء/الحروف (همزات، تاء مربوطة/هاء، ألف/ياء، ...).\n"
+        "- لا تذكر أكثر من 30 خطأ.\n"
+        "النص:\n"
+        f"{paragraph}\n"
+    )
+
+
 # =========================
 # Gemini Spellcheck (AI Studio - Generative Language API)
 # =========================
@@ -534,136 +598,92 @@ def gemini_spellcheck_paragraph(
         "generationConfig": {"temperature": 0.1, "maxOutputTokens": 8192},
     }
 
-    # Rate limit / transient hata için retry + backoff
-    retries = 2
-    backoff_base = 1.8
-    last_err: Optional[str] = None
-
+    # Tek istek: 429/5xx ve parse hatası err olarak döner; yeniden deneme + geri çekilme
+    # SpellcheckExecutor'da (tek yeniden deneme katmanı).
+    tag = f"P{paragraph_index}" if isinstance(paragraph_index, int) else "P?"
     try:
-        for attempt in range(retries):
+        if debug_callback is not None:
+            debug_callback(f"AI İSTEK (Gemini) {tag} PROMPT:\n{prompt or ''}", "INFO")
+        r = get_transport().post(url, headers=headers, json=payload, timeout=(20, 240))
+        if r.status_code == 200:
+            # Even with HTTP 200, model output can be malformed (executor retries parse failures).
+            try:
+                data = r.json()
+            except Exception as e:
+                return [], f"Gemini: JSON decode hatası: {e}"
+
             if debug_callback is not None:
-                tag = f"P{paragraph_index}" if isinstance(paragraph_index, int) else "P?"
-                p = prompt or ""
-                debug_callback(
-                    f"AI İSTEK (Gemini) {tag} deneme {attempt+1}/{retries} PROMPT:\n{p}",
-                    "INFO",
-                )
-            r = requests.post(url, headers=headers, json=payload, timeout=(20, 240))
-            if r.status_code == 200:
-                # Even with HTTP 200, model output can be malformed.
-                # Treat parse failures as retryable, and include attempt counters in the error.
-                try:
-                    data = r.json()
-                except Exception as e:
-                    last_err = f"Gemini: JSON decode hatası (deneme {attempt+1}/{retries}): {e}"
-                    time.sleep(1.0)
-                    continue
+                debug_callback(f"AI CEVAP (Gemini) {tag} RAW:\n{(r.text or '')[:8000]}", "INFO")
 
-                if debug_callback is not None:
-                    tag = f"P{paragraph_index}" if isinstance(paragraph_index, int) else "P?"
-                    debug_callback(
-                        f"AI CEVAP (Gemini) {tag} deneme {attempt+1}/{retries} RAW:\n{(r.text or '')[:8000]}",
-                        "INFO",
-                    )
-
-                text_out = ""
-                cands = data.get("candidates", [])
-                if cands and isinstance(cands, list):
-                    content = cands[0].get("content", {})
-                    parts = content.get("parts", [])
-                    if parts and isinstance(parts, list):
-                        text_out = "".join([(p.get("text") or "") for p in parts])
+            text_out = ""
+            cands = data.get("candidates", [])
+            if cands and isinstance(cands, list):
+                content = cands[0].get("content", {})
+                parts = content.get("parts", [])
+                if parts and isinstance(parts, list):
+                    text_out = "".join([(p.get("text") or "") for p in parts])
 
-                if debug_callback is not None:
-                    tag = f"P{paragraph_index}" if isinstance(paragraph_index, int) else "P?"
-                    snippet = (text_out or "").replace("\n", "\\n")
-                    debug_callback(f"AI ÇIKTI (Gemini) {tag}: {snippet[:600]}", "INFO")
-
-                if (text_out or "").strip().upper() == "NONE":
-                    return [], None
-
-                # Parse TSV text output
-                items = _extract_items_from_tsv(text_out)
-
-                # Backward compat: if model still returns JSON, try to parse it
-                if not items:
-                    obj = _extract_json_from_text(text_out)
-                    if isinstance(obj, list):
-                        for it in obj:
-                            if not isinstance(it, dict):
-                                continue
-                            items.append({
-                                "wrong": it.get("wrong", "") or it.get("error", "") or "",
-                                "suggestion": it.get("suggestion", "") or it.get("fix", "") or "",
-                                "reason": it.get("reason", "") or it.get("note", "") or "",
-                            })
-
-                if not items:
-                    last_err = (
-                        f"Gemini: çıktı parse edilemedi (deneme {attempt+1}/{retries}). "
-                        f"Beklenen: WRONG<TAB>SUGGESTION<TAB>REASON. "
-                        f"Text: {(text_out or '')[:120]}..."
-                    )
-                    if debug_callback is not None:
-                        tag = f"P{paragraph_index}" if isinstance(paragraph_index, int) else "P?"
-                        debug_callback(
-                            f"Gemini parse retry {tag}: deneme {attempt+1}/{retries} (çıktı parse edilemedi)",
-                            "WARNING",
-                        )
-                    time.sleep(1.0)
-                    continue
+            if debug_callback is not None:
+                snippet = (text_out or "").replace("\n", "\\n")
+                debug_callback(f"AI ÇIKTI (Gemini) {tag}: {snippet[:600]}", "INFO")
 
-                out = []
-                for it in items:
-                    out.append({
-                        "wrong": it.get("wrong", "") or "",
-                        "suggestion": it.get("suggestion", "") or "",
-                        "reason": it.get("reason", "") or "",
-                        "source": "gemini",
-                    })
-                if debug_callback is not None:
-                    tag = f"P{paragraph_index}" if isinstance(paragraph_index, int) else "P?"
-                    prev = [f"{x.get('wrong','')}→{x.get('suggestion','')}" for x in out[:6]]
-                    debug_callback(
-                        f"AI PARSE (Gemini) {tag}: {len(out)} hata. İlkler: {', '.join(prev)}",
-                        "INFO",
-                    )
-                return out, None
-
-            # 429/5xx -> retry
-            if r.status_code in (429, 500, 502, 503, 504):
-                # Quota exhausted: don't bother retrying (instant feedback)
-                if r.status_code == 429:
-                    body_l = (r.text or "").lower()
-                    if ("exceeded your current quota" in body_l) or ("billing" in body_l) or ("rate-limits" in body_l):
-                        if debug_callback is not None:
-                            tag = f"P{paragraph_index}" if isinstance(paragraph_index, int) else "P?"
-                            debug_callback(
-                                f"AI CEVAP (Gemini) {tag} HTTP 429 (quota) RAW:\n{(r.text or '')[:8000]}",
-                                "ERROR",
-                            )
-                        return [], f"Gemini HTTP 429 (quota): {r.text[:500]}"
-                last_err = f"Gemini HTTP {r.status_code}: {r.text[:300]}"
+            if (text_out or "").strip().upper() == "NONE":
+                return [], None
+
+            # Parse TSV text output
+            items = _extract_items_from_tsv(text_out)
+
+            # Backward compat: if model still returns JSON, try to parse it
+            if not items:
+                obj = _extract_json_from_text(text_out)
+                if isinstance(obj, list):
+                    for it in obj:
+                        if not isinstance(it, dict):
+                            continue
+                        items.append({
+                            "wrong": it.get("wrong", "") or it.get("error", "") or "",
+                            "suggestion": it.get("suggestion", "") or it.get("fix", "") or "",
+                            "reason": it.get("reason", "") or it.get("note", "") or "",
+                        })
+
+            if not items:
                 if debug_callback is not None:
-                    tag = f"P{paragraph_index}" if isinstance(paragraph_index, int) else "P?"
-                    debug_callback(
-                        f"AI CEVAP (Gemini) {tag} HTTP {r.status_code} RAW:\n{(r.text or '')[:8000]}",
-                        "WARNING",
-                    )
-                ra = r.headers.get("Retry-After")
-                if ra:
-                    try:
-                        sleep_s = float(ra)
-                    except Exception:
-                        sleep_s = backoff_base ** attempt
-                else:
-                    sleep_s = backoff_base ** attempt
-                time.sleep(min(30.0, sleep_s))
-                continue
+                    debug_callback(f"Gemini parse hatası {tag} (çıktı parse edilemedi)", "WARNING")
+                return [], (
+                    f"Gemini: çıktı parse edilemedi. "
+                    f"Beklenen: WRONG<TAB>SUGGESTION<TAB>REASON. "
+                    f"Text: {(text_out or '')[:120]}..."
+                )
+
+            out = []
+            for it in items:
+                out.append({
+                    "wrong": it.get("wrong", "") or "",
+                    "suggestion": it.get("suggestion", "") or "",
+                    "reason": it.get("reason", "") or "",
+                    "source": "gemini",
+                })
+            if debug_callback is not None:
+                prev = [f"{x.get('wrong','')}→{x.get('suggestion','')}" for x in out[:6]]
+                debug_callback(
+                    f"AI PARSE (Gemini) {tag}: {len(out)} hata. İlkler: {', '.join(prev)}",
+                    "INFO",
+                )
+            return out, None
 
-            return [], f"Gemini HTTP {r.status_code}: {r.text[:500]}"
+        if r.status_code in (429, 500, 502, 503, 504):
+            # Quota exhausted: executor stops the provider instead of retrying (instant feedback)
+            if r.status_code == 429:
+                body_l = (r.text or "").lower()
+                if ("exceeded your current quota" in body_l) or ("billing" in body_l) or ("rate-limits" in body_l):
+                    if debug_callback is not None:
+                        debug_callback(f"AI CEVAP (Gemini) {tag} HTTP 429 (quota) RAW:\n{(r.text or '')[:8000]}", "ERROR")
+                    return [], f"Gemini HTTP 429 (quota): {r.text[:500]}"
+            if debug_callback is not None:
+                debug_callback(f"AI CEVAP (Gemini) {tag} HTTP {r.status_code} RAW:\n{(r.text or '')[:8000]}", "WARNING")
+            return [], f"Gemini HTTP {r.status_code}: {r.text[:300]}"
 
-        return [], (last_err or f"Gemini: işlem başarısız oldu (max retries: {retries}).")
+        return [], f"Gemini HTTP {r.status_code}: {r.text[:500]}"
     except Exception as e:
         return [], f"Gemini exception: {e}"
 
@@ -703,121 +723,92 @@ def vertex_gemini_spellcheck_paragraph(
         f"/locations/{loc}/publishers/google/models/{model}:generateContent"
     )
     
-    # Retry settings
-    retries = 4
-    backoff_base = 1.8
-    last_err: Optional[str] = None
-
-    for attempt in range(retries):
+    # Tek istek (bkz. gemini_spellcheck_paragraph): yeniden deneme SpellcheckExecutor'da.
+    tag = f"P{paragraph_index}" if isinstance(paragraph_index, int) else "P?"
+    try:
         try:
-            try:
-                tok = get_google_access_token()
-            except Exception as e:
-                return [], f"Vertex auth error: {e}"
-            
-            headers = {"Authorization": f"Bearer {tok}", "Content-Type": "application/json"}
-            prompt = _gemini_prompt(paragraph)
-            body = {
-                "contents": [{"role": "user", "parts": [{"text": prompt}]}],
-                "generationConfig": {"temperature": 0.1, "maxOutputTokens": 8192},
-            }
+            tok = get_google_access_token()
+        except Exception as e:
+            return [], f"Vertex auth error: {e}"
 
-            if debug_callback is not None:
-                tag = f"P{paragraph_index}" if isinstance(paragraph_index, int) else "P?"
-                debug_callback(
-                    f"AI İSTEK (Vertex Gemini) {tag} deneme {attempt+1}/{retries} PROMPT:\n{prompt}",
-                    "INFO",
-                )
-            r = requests.post(url, headers=headers, json=body, timeout=(20, 240))
-            
-            # HTTP Error handling
-            if r.status_code != 200:
-                last_err = f"Vertex HTTP {r.status_code}: {r.text[:500]}"
-                if debug_callback is not None:
-                    tag = f"P{paragraph_index}" if isinstance(paragraph_index, int) else "P?"
-                    debug_callback(
-                        f"AI CEVAP (Vertex Gemini) {tag} HTTP {r.status_code} RAW:\n{(r.text or '')[:8000]}",
-                        "WARNING",
-                    )
-                # 429/5xx -> retry
-                if r.status_code in (429, 500, 502, 503, 504):
-                    sleep_s = backoff_base ** attempt
-                    time.sleep(min(30.0, sleep_s))
-                    continue
-                # Other errors -> stop
-                return [], last_err
+        headers = {"Authorization": f"Bearer {tok}", "Content-Type": "application/json"}
+        prompt = _gemini_prompt(paragraph)
+        body = {
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+            "generationConfig": {"temperature": 0.1, "maxOutputTokens": 8192},
+        }
 
-            # Parsing
-            data = r.json()
+        if debug_callback is not None:
+            debug_callback(f"AI İSTEK (Vertex Gemini) {tag} PROMPT:\n{prompt}", "INFO")
+        r = get_transport().post(url, headers=headers, json=body, timeout=(20, 240))
+
+        # HTTP Error handling (429/5xx -> executor retries)
+        if r.status_code != 200:
             if debug_callback is not None:
-                tag = f"P{paragraph_index}" if isinstance(paragraph_index, int) else "P?"
                 debug_callback(
-                    f"AI CEVAP (Vertex Gemini) {tag} deneme {attempt+1}/{retries} RAW:\n{(r.text or '')[:8000]}",
-                    "INFO",
+                    f"AI CEVAP (Vertex Gemini) {tag} HTTP {r.status_code} RAW:\n{(r.text or '')[:8000]}",
+                    "WARNING",
                 )
-            text_out = ""
-            cands = data.get("candidates", [])
-            if cands and isinstance(cands, list):
-                content = cands[0].get("content", {})
-                parts = content.get("parts", [])
-                if parts and isinstance(parts, list):
-                    text_out = "".join([(p.get("text") or "") for p in parts])
-
-            if (text_out or "").strip().upper() == "NONE":
-                return [], None
+            return [], f"Vertex HTTP {r.status_code}: {r.text[:500]}"
 
-            if debug_callback is not None:
-                tag = f"P{paragraph_index}" if isinstance(paragraph_index, int) else "P?"
-                snippet = (text_out or "").replace("\n", "\\n")
-                debug_callback(f"AI ÇIKTI (Vertex Gemini) {tag}: {snippet[:600]}", "INFO")
+        # Parsing
+        try:
+            data = r.json()
+        except Exception as e:
+            return [], f"Vertex: JSON decode hatası: {e}"
+        if debug_callback is not None:
+            debug_callback(f"AI CEVAP (Vertex Gemini) {tag} RAW:\n{(r.text or '')[:8000]}", "INFO")
+        text_out = ""
+        cands = data.get("candidates", [])
+        if cands and isinstance(cands, list):
+            content = cands[0].get("content", {})
+            parts = content.get("parts", [])
+            if parts and isinstance(parts, list):
+                text_out = "".join([(p.get("text") or "") for p in parts])
 
-            items = _extract_items_from_tsv(text_out)
-            if not items:
-                obj = _extract_json_from_text(text_out)
-                if isinstance(obj, list):
-                    for it in obj:
-                        if not isinstance(it, dict):
-                            continue
-                        items.append({
-                            "wrong": it.get("wrong", "") or it.get("error", "") or "",
-                            "suggestion": it.get("suggestion", "") or it.get("fix", "") or "",
-                            "reason": it.get("reason", "") or it.get("note", "") or "",
-                        })
+        if (text_out or "").strip().upper() == "NONE":
+            return [], None
 
-            if not items:
-                last_err = f"Vertex: çıktı parse edilemedi (deneme {attempt+1}/{retries}). Text: {text_out[:100]}..."
-                if debug_callback is not None:
-                    tag = f"P{paragraph_index}" if isinstance(paragraph_index, int) else "P?"
-                    debug_callback(
-                        f"Vertex Gemini parse retry {tag}: deneme {attempt+1}/{retries} (çıktı parse edilemedi)",
-                        "WARNING",
-                    )
-                time.sleep(1.0)
-                continue
+        if debug_callback is not None:
+            snippet = (text_out or "").replace("\n", "\\n")
+            debug_callback(f"AI ÇIKTI (Vertex Gemini) {tag}: {snippet[:600]}", "INFO")
+
+        items = _extract_items_from_tsv(text_out)
+        if not items:
+            obj = _extract_json_from_text(text_out)
+            if isinstance(obj, list):
+                for it in obj:
+                    if not isinstance(it, dict):
+                        continue
+                    items.append({
+                        "wrong": it.get("wrong", "") or it.get("error", "") or "",
+                        "suggestion": it.get("suggestion", "") or it.get("fix", "") or "",
+                        "reason": it.get("reason", "") or it.get("note", "") or "",
+                    })
 
-            out = []
-            for it in items:
-                out.append({
-                    "wrong": it.get("wrong", "") or "",
-                    "suggestion": it.get("suggestion", "") or "",
-                    "reason": it.get("reason", "") or "",
-                    "source": "gemini",
-                })
+        if not items:
             if debug_callback is not None:
-                tag = f"P{paragraph_index}" if isinstance(paragraph_index, int) else "P?"
-                prev = [f"{x.get('wrong','')}→{x.get('suggestion','')}" for x in out[:6]]
-                debug_callback(
-                    f"AI PARSE (Vertex Gemini) {tag}: {len(out)} hata. İlkler: {', '.join(prev)}",
-                    "INFO",
-                )
-            return out, None
+                debug_callback(f"Vertex Gemini parse hatası {tag} (çıktı parse edilemedi)", "WARNING")
+            return [], f"Vertex: çıktı parse edilemedi. Text: {text_out[:100]}..."
 
-        except Exception as e:
-            last_err = f"Vertex exception: {e}"
-            time.sleep(1.0)
-            continue
+        out = []
+        for it in items:
+            out.append({
+                "wrong": it.get("wrong", "") or "",
+                "suggestion": it.get("suggestion", "") or "",
+                "reason": it.get("reason", "") or "",
+                "source": "gemini",
+            })
+        if debug_callback is not None:
+            prev = [f"{x.get('wrong','')}→{x.get('suggestion','')}" for x in out[:6]]
+            debug_callback(
+                f"AI PARSE (Vertex Gemini) {tag}: {len(out)} hata. İlkler: {', '.join(prev)}",
+                "INFO",
+            )
+        return out, None
 
-    return [], (last_err or "Vertex: işlem başarısız oldu (max retries).")
+    except Exception as e:
+        return [], f"Vertex exception: {e}"
 
 
 def _is_vertex_auth_or_perm_error(err: str) -> bool:
@@ -851,82 +842,81 @@ def _is_vertex_model_not_found(err: str) -> bool:
 # =========================
 # OpenAI Spellcheck (Responses API via HTTP)
 # =========================
-def openai_spellcheck_paragraph(
-    paragraph: str,
+def _openai_output_text(resp_json: dict) -> str:
+    ot = resp_json.get("output_text")
+    if isinstance(ot, str) and ot.strip():
+        return ot
+    out = resp_json.get("output", [])
+    if isinstance(out, list):
+        texts = []
+        for item in out:
+            content = item.get("content", [])
+            if isinstance(content, list):
+                for c in content:
+                    if c.get("type") == "output_text" and isinstance(c.get("text"), str):
+                        texts.append(c["text"])
+                    elif isinstance(c.get("text"), str):
+                        texts.append(c.get("text"))
+        if texts:
+            return "".join([t for t in texts if isinstance(t, str)])
+    return ""
+
+
+def _openai_generate(
+    prompt: str,
     api_key: str,
     model: str,
-    paragraph_index: Optional[int] = None,
+    tag: str,
     debug_callback: Optional[Callable[[str, str], None]] = None,
-) -> Tuple[List[Dict[str, Any]], Optional[str]]:
-    paragraph = (paragraph or "").strip()
-    if not paragraph:
-        return [], None
-
+) -> Tuple[str, Optional[str]]:
+    """Tek istek: (model metni, hata). İstisnalar çağırana bırakılır."""
     url = "https://api.openai.com/v1/responses"
     headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-
-    prompt = (
-        "You are an extremely strict Arabic spelling proofreader for a critical edition (tahqiq).\n"
-        "Return ONLY valid JSON (an array). No extra text.\n"
-        "Each item must be: {\"wrong\":\"...\",\"suggestion\":\"...\",\"reason\":\"...\"}\n"
-        "Rules:\n"
-        "- DO NOT suggest or flag any changes that are only about: harakat/diacritics, i'rab/case endings, tanwin, shadda, sukun/jazm, nasb endings.\n"
-        "- Ignore Arabic diacritics and i'rab marks completely (do not flag them).\n"
-        "- Focus on orthography/spelling/letter-level mistakes.\n"
-        "- Max 30 items.\n"
-        "Text:\n"
-        f"{paragraph}"
-    )
-
     body = {
         "model": model,
         "input": prompt,
         "temperature": 0.1,
         "max_output_tokens": 8192,
     }
+    if debug_callback is not None:
+        debug_callback(f"AI İSTEK (GPT/OpenAI) {tag} PROMPT:\n{prompt}", "INFO")
+    r = get_transport().post(url, headers=headers, json=body, timeout=(20, 240))
+    if r.status_code != 200:
+        if debug_callback is not None:
+            debug_callback(
+                f"AI CEVAP (GPT/OpenAI) {tag} HTTP {r.status_code} RAW:\n{(r.text or '')[:8000]}",
+                "WARNING",
+            )
+        return "", f"OpenAI HTTP {r.status_code}: {r.text[:500]}"
+    data = r.json()
+    if debug_callback is not None:
+        debug_callback(f"AI CEVAP (GPT/OpenAI) {tag} RAW:\n{(r.text or '')[:8000]}", "INFO")
 
-    def parse_output_text(resp_json: dict) -> str:
-        ot = resp_json.get("output_text")
-        if isinstance(ot, str) and ot.strip():
-            return ot
-        out = resp_json.get("output", [])
-        if isinstance(out, list):
-            texts = []
-            for item in out:
-                content = item.get("content", [])
-                if isinstance(content, list):
-                    for c in content:
-                        if c.get("type") == "output_text" and isinstance(c.get("text"), str):
-                            texts.append(c["text"])
-                        elif isinstance(c.get("text"), str):
-                            texts.append(c.get("text"))
-            if texts:
-                return "".join([t for t in texts if isinstance(t, str)])
-        return ""
+    text_out = _openai_output_text(data)
+    if debug_callback is not None:
+        snippet = (text_out or "").replace("\n", "\\n")
+        debug_callback(f"AI ÇIKTI (GPT/OpenAI) {tag}: {snippet[:600]}", "INFO")
+    return text_out, None
 
-    try:
-        if debug_callback is not None:
-            tag = f"P{paragraph_index}" if isinstance(paragraph_index, int) else "P?"
-            debug_callback(f"AI İSTEK (GPT/OpenAI) {tag} PROMPT:\n{prompt}", "INFO")
-        r = requests.post(url, headers=headers, json=body, timeout=(20, 240))
-        if r.status_code != 200:
-            if debug_callback is not None:
-                tag = f"P{paragraph_index}" if isinstance(paragraph_index, int) else "P?"
-                debug_callback(
-                    f"AI CEVAP (GPT/OpenAI) {tag} HTTP {r.status_code} RAW:\n{(r.text or '')[:8000]}",
-                    "WARNING",
-                )
-            return [], f"OpenAI HTTP {r.status_code}: {r.text[:500]}"
-        data = r.json()
-        if debug_callback is not None:
-            tag = f"P{paragraph_index}" if isinstance(paragraph_index, int) else "P?"
-            debug_callback(f"AI CEVAP (GPT/OpenAI) {tag} RAW:\n{(r.text or '')[:8000]}", "INFO")
 
-        text_out = parse_output_text(data)
-        if debug_callback is not None:
-            tag = f"P{paragraph_index}" if isinstance(paragraph_index, int) else "P?"
-            snippet = (text_out or "").replace("\n", "\\n")
-            debug_callback(f"AI ÇIKTI (GPT/OpenAI) {tag}: {snippet[:600]}", "INFO")
+def openai_spellcheck_paragraph(
+    paragraph: str,
+    api_key: str,
+    model: str,
+    paragraph_index: Optional[int] = None,
+    debug_callback: Optional[Callable[[str, str], None]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    paragraph = (paragraph or "").strip()
+    if not paragraph:
+        return [], None
+
+    prompt = _openai_prompt(paragraph)
+    tag = f"P{paragraph_index}" if isinstance(paragraph_index, int) else "P?"
+
+    try:
+        text_out, err = _openai_generate(prompt, api_key, model, tag, debug_callback=debug_callback)
+        if err:
+            return [], err
         obj = _extract_json_from_text(text_out)
         if not isinstance(obj, list):
             return [], "OpenAI: JSON parse edilemedi (model metin döndürdü)."
@@ -942,7 +932,6 @@ def openai_spellcheck_paragraph(
                 "source": "openai",
             })
         if debug_callback is not None:
-            tag = f"P{paragraph_index}" if isinstance(paragraph_index, int) else "P?"
             prev = [f"{x.get('wrong','')}→{x.get('suggestion','')}" for x in out[:6]]
             debug_callback(
                 f"AI PARSE (GPT/OpenAI) {tag}: {len(out)} hata. İlkler: {', '.join(prev)}",
@@ -956,39 +945,20 @@ def openai_spellcheck_paragraph(
 # =========================
 # Claude Spellcheck (Anthropic API)
 # =========================
-def claude_spellcheck_paragraph(
-    paragraph: str,
+def _claude_generate(
+    prompt: str,
     api_key: str,
     model: str,
-    paragraph_index: Optional[int] = None,
+    tag: str,
     debug_callback: Optional[Callable[[str, str], None]] = None,
-) -> Tuple[List[Dict[str, Any]], Optional[str]]:
-    paragraph = (paragraph or "").strip()
-    if not paragraph:
-        return [], None
-
+) -> Tuple[str, Optional[str]]:
+    """Tek istek: (model metni, hata). İstisnalar çağırana bırakılır."""
     url = "https://api.anthropic.com/v1/messages"
     headers = {
         "x-api-key": api_key,
         "anthropic-version": "2023-06-01",
         "Content-Type": "application/json"
     }
-
-    prompt = (
-        "أنت مدقق إملائي عربي شديد الدقة لنص محقق.\n"
-        "أخرج فقط JSON (مصفوفة) بدون أي كلام إضافي.\n"
-        "كل عنصر بالشكل:\n"
-        "{\"wrong\":\"...\",\"suggestion\":\"...\",\"reason\":\"...\"}\n"
-        "قواعد:\n"
-        "- لا تقترح أي تصحيح للحركات/التشكيل/الإعراب/التنوين/الشدة/السكون/الجزم/النصب.\n"
-        "- تجاهل الحركات والإعراب (لا تعتبرها أخطاء).\n"
-        "- إذا كان التصحيح فقط في التشكيل أو علامات الإعراب أو (ألف التنوين في آخر الكلمة) فلا تذكره.\n"
-        "- ركّز على أخطاء الرسم/الإملاء/الحروف (همزات، تاء مربوطة/هاء، ألف/ياء، ...).\n"
-        "- لا تذكر أكثر من 30 خطأ.\n"
-        "النص:\n"
-        f"{paragraph}\n"
-    )
-
     body = {
         "model": model,
         "max_tokens": 8192,
@@ -1000,36 +970,51 @@ def claude_spellcheck_paragraph(
             }
         ]
     }
-
-    try:
+    if debug_callback is not None:
+        debug_callback(f"AI İSTEK (Claude) {tag} PROMPT:\n{prompt}", "INFO")
+    r = get_transport().post(url, headers=headers, json=body, timeout=(20, 240))
+    if r.status_code != 200:
         if debug_callback is not None:
-            tag = f"P{paragraph_index}" if isinstance(paragraph_index, int) else "P?"
-            debug_callback(f"AI İSTEK (Claude) {tag} PROMPT:\n{prompt}", "INFO")
-        r = requests.post(url, headers=headers, json=body, timeout=(20, 240))
-        if r.status_code != 200:
-            if debug_callback is not None:
-                tag = f"P{paragraph_index}" if isinstance(paragraph_index, int) else "P?"
-                debug_callback(
-                    f"AI CEVAP (Claude) {tag} HTTP {r.status_code} RAW:\n{(r.text or '')[:8000]}",
-                    "WARNING",
-                )
-            return [], f"Claude HTTP {r.status_code}: {r.text[:500]}"
-        data = r.json()
-        if debug_callback is not None:
-            tag = f"P{paragraph_index}" if isinstance(paragraph_index, int) else "P?"
-            debug_callback(f"AI CEVAP (Claude) {tag} RAW:\n{(r.text or '')[:8000]}", "INFO")
+            debug_callback(
+                f"AI CEVAP (Claude) {tag} HTTP {r.status_code} RAW:\n{(r.text or '')[:8000]}",
+                "WARNING",
+            )
+        return "", f"Claude HTTP {r.status_code}: {r.text[:500]}"
+    data = r.json()
+    if debug_callback is not None:
+        debug_callback(f"AI CEVAP (Claude) {tag} RAW:\n{(r.text or '')[:8000]}", "INFO")
 
-        text_out = ""
-        content = data.get("content", [])
-        if content and isinstance(content, list):
-            for item in content:
-                if item.get("type") == "text" and isinstance(item.get("text"), str):
-                    text_out += item["text"]
+    text_out = ""
+    content = data.get("content", [])
+    if content and isinstance(content, list):
+        for item in content:
+            if item.get("type") == "text" and isinstance(item.get("text"), str):
+                text_out += item["text"]
 
-        if debug_callback is not None:
-            tag = f"P{paragraph_index}" if isinstance(paragraph_index, int) else "P?"
-            snippet = (text_out or "").replace("\n", "\\n")
-            debug_callback(f"AI ÇIKTI (Claude) {tag}: {snippet[:600]}", "INFO")
+    if debug_callback is not None:
+        snippet = (text_out or "").replace("\n", "\\n")
+        debug_callback(f"AI ÇIKTI (Claude) {tag}: {snippet[:600]}", "INFO")
+    return text_out, None
+
+
+def claude_spellcheck_paragraph(
+    paragraph: str,
+    api_key: str,
+    model: str,
+    paragraph_index: Optional[int] = None,
+    debug_callback: Optional[Callable[[str, str], None]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    paragraph = (paragraph or "").strip()
+    if not paragraph:
+        return [], None
+
+    prompt = _claude_prompt(paragraph)
+    tag = f"P{paragraph_index}" if isinstance(paragraph_index, int) else "P?"
+
+    try:
+        text_out, err = _claude_generate(prompt, api_key, model, tag, debug_callback=debug_callback)
+        if err:
+            return [], err
         obj = _extract_json_from_text(text_out)
         if not isinstance(obj, list):
             return [], "Claude: JSON parse edilemedi (model metin döndürdü)."
@@ -1045,7 +1030,6 @@ def claude_spellcheck_paragraph(
                 "source": "claude",
             })
         if debug_callback is not None:
-            tag = f"P{paragraph_index}" if isinstance(paragraph_index, int) else "P?"
             prev = [f"{x.get('wrong','')}→{x.get('suggestion','')}" for x in out[:6]]
             debug_callback(
                 f"AI PARSE (Claude) {tag}: {len(out)} hata. İlkler: {', '.join(prev)}",
@@ -1056,6 +1040,300 @@ def claude_spellcheck_paragraph(
         return [], f"Claude exception: {e}"
 
 
+# =========================
+# Batch Spellcheck (spellcheck_batch: birden çok kısa paragraf tek istekte)
+# =========================
+def _gemini_generate(
+    prompt: str,
+    api_key: str,
+    model: str,
+    tag: str,
+    debug_callback: Optional[Callable[[str, str], None]] = None,
+) -> Tuple[str, Optional[str]]:
+    """Tek istek (yeniden deneme yok: paketlerde SpellcheckExecutor yapar)."""
+    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
+    headers = {"x-goog-api-key": api_key, "Content-Type": "application/json"}
+    payload = {
+        "contents": [{"parts": [{"text": prompt}]}],
+        "generationConfig": {"temperature": 0.1, "maxOutputTokens": 8192},
+    }
+    if debug_callback is not None:
+        debug_callback(f"AI İSTEK (Gemini) {tag} PROMPT:\n{prompt}", "INFO")
+    r = get_transport().post(url, headers=headers, json=payload, timeout=(20, 240))
+    if r.status_code != 200:
+        if debug_callback is not None:
+            debug_callback(
+                f"AI CEVAP (Gemini) {tag} HTTP {r.status_code} RAW:\n{(r.text or '')[:8000]}",
+                "WARNING",
+            )
+        body_l = (r.text or "").lower()
+        if r.status_code == 429 and (("exceeded your current quota" in body_l) or ("billing" in body_l)):
+            return "", f"Gemini HTTP 429 (quota): {r.text[:500]}"
+        return "", f"Gemini HTTP {r.status_code}: {r.text[:500]}"
+    data = r.json()
+    if debug_callback is not None:
+        debug_callback(f"AI CEVAP (Gemini) {tag} RAW:\n{(r.text or '')[:8000]}", "INFO")
+    text_out = ""
+    cands = data.get("candidates", [])
+    if cands and isinstance(cands, list):
+        parts = (cands[0].get("content", {}) or {}).get("parts", [])
+        if parts and isinstance(parts, list):
+            text_out = "".join([(p.get("text") or "") for p in parts])
+    return text_out, None
+
+
+def _batch_tag(items: List[Tuple[int, str]]) -> str:
+    return f"P{items[0][0]}-P{items[-1][0]} ({len(items)} paragraf)"
+
+
+def _run_batch(
+    source: str,
+    label: str,
+    generate: Callable[[], Tuple[str, Optional[str]]],
+    parse: Callable[[str, List[Tuple[int, str]]], Dict[int, List[Dict[str, str]]]],
+    items: List[Tuple[int, str]],
+    debug_callback: Optional[Callable[[str, str], None]] = None,
+) -> Tuple[Dict[int, List[Dict[str, Any]]], Optional[str]]:
+    """
+    Paket isteği + doğrulama. HTTP hatası -> ({}, err) (executor yeniden dener);
+    parse edilemeyen / doğrulanamayan paragraflar sonuçta yer almaz (executor tek tek sorar).
+    """
+    try:
+        text_out, err = generate()
+    except Exception as e:
+        return {}, f"{label} exception: {e}"
+    if err:
+        return {}, err
+    valid = validate_batch(parse(text_out, items), items)
+    if debug_callback is not None:
+        missing = [pidx for pidx, _ in items if pidx not in valid]
+        debug_callback(
+            f"AI PARSE ({label}) {_batch_tag(items)}: {len(valid)}/{len(items)} paragraf çözüldü"
+            + (f"; tek tek sorulacak: {', '.join(f'P{m}' for m in missing)}" if missing else ""),
+            "INFO" if not missing else "WARNING",
+        )
+    return {pidx: [dict(e, source=source) for e in errs] for pidx, errs in valid.items()}, None
+
+
+def gemini_spellcheck_batch(
+    items: List[Tuple[int, str]],
+    api_key: str,
+    model: str,
+    debug_callback: Optional[Callable[[str, str], None]] = None,
+) -> Tuple[Dict[int, List[Dict[str, Any]]], Optional[str]]:
+    prompt = batch_prompt_tsv(items)
+    return _run_batch(
+        "gemini", "Gemini",
+        lambda: _gemini_generate(prompt, api_key, model, _batch_tag(items), debug_callback=debug_callback),
+        parse_batch_tsv, items, debug_callback=debug_callback,
+    )
+
+
+def openai_spellcheck_batch(
+    items: List[Tuple[int, str]],
+    api_key: str,
+    model: str,
+    debug_callback: Optional[Callable[[str, str], None]] = None,
+) -> Tuple[Dict[int, List[Dict[str, Any]]], Optional[str]]:
+    prompt = batch_prompt_json_en(items)
+    return _run_batch(
+        "openai", "GPT/OpenAI",
+        lambda: _openai_generate(prompt, api_key, model, _batch_tag(items), debug_callback=debug_callback),
+        parse_batch_json, items, debug_callback=debug_callback,
+    )
+
+
+def claude_spellcheck_batch(
+    items: List[Tuple[int, str]],
+    api_key: str,
+    model: str,
+    debug_callback: Optional[Callable[[str, str], None]] = None,
+) -> Tuple[Dict[int, List[Dict[str, Any]]], Optional[str]]:
+    prompt = batch_prompt_json_ar(items)
+    return _run_batch(
+        "claude", "Claude",
+        lambda: _claude_generate(prompt, api_key, model, _batch_tag(items), debug_callback=debug_callback),
+        parse_batch_json, items, debug_callback=debug_callback,
+    )
+
+
+def _gemini_spellcheck_with_fallbacks(
+    p: str,
+    paragraph_index: int,
+    gem_provider: str,
+    gem_key: Optional[str],
+    status_callback: Optional[Callable[[str, str], None]] = None,
+    debug_callback: Optional[Callable[[str, str], None]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Tek paragraf için Gemini çağrısı (SpellcheckExecutor'daki "gemini" sağlayıcısı).
+    Vertex ise model/bölge 404 alternatifleri ve yetki hatasında AI Studio fallback'i burada denenir.
+    """
+    if gem_provider == "vertex":
+        e1, err1 = vertex_gemini_spellcheck_paragraph(
+            p,
+            project_id=VERTEX_PROJECT_ID,
+            location=VERTEX_LOCATION,
+            model=VERTEX_GEMINI_MODEL,
+            paragraph_index=paragraph_index,
+            debug_callback=debug_callback,
+        )
+        # If the model is not found (common with region/model-id mismatch), try known Gemini 3 Pro variants
+        if err1 and _is_vertex_model_not_found(err1):
+            # 1) try preview id in same location
+            alt_models = []
+            m0 = (VERTEX_GEMINI_MODEL or "").strip()
+            if m0 and m0 != "gemini-3-pro-preview":
+                alt_models.append("gemini-3-pro-preview")
+            # 2) try global location (some models are only under global)
+            tried = False
+            for am in alt_models:
+                tried = True
+                if status_callback:
+                    status_callback(f"Vertex 404: '{m0}' bulunamadı. Alternatif deneniyor: {am}", "WARNING")
+                e1a, err1a = vertex_gemini_spellcheck_paragraph(
+                    p,
+                    project_id=VERTEX_PROJECT_ID,
+                    location=VERTEX_LOCATION,
+                    model=am,
+                    paragraph_index=paragraph_index,
+                    debug_callback=debug_callback,
+                )
+                if not err1a:
+                    e1, err1 = e1a, None
+                    break
+            if err1:
+                tried = True
+                if status_callback:
+                    status_callback("Vertex 404: global lokasyonda tekrar denenecek (location=global).", "WARNING")
+                e1g, err1g = vertex_gemini_spellcheck_paragraph(
+                    p,
+                    project_id=VERTEX_PROJECT_ID,
+                    location="global",
+                    model=(VERTEX_GEMINI_MODEL or "gemini-3-pro-preview"),
+                    paragraph_index=paragraph_index,
+                    debug_callback=debug_callback,
+                )
+                if not err1g:
+                    e1, err1 = e1g, None
+            if tried and err1 and status_callback:
+                status_callback(
+                    "Vertex tarafında model/region uyumsuzluğu devam ediyor. "
+                    "İstersen GEMINI_PROVIDER=ai_studio ile devam edebiliriz.",
+                    "WARNING",
+                )
+        # If Vertex fails due to auth/perm and we have an AI Studio key, fallback once for this paragraph
+        if err1 and gem_key and _is_vertex_auth_or_perm_error(err1):
+            if status_callback:
+                status_callback(
+                    f"Vertex auth/izin hatası alındı, bu paragraf için AI Studio fallback deneniyor. (P{paragraph_index})",
+                    "WARNING",
+                )
+            e1b, err1b = gemini_spellcheck_paragraph(
+                p,
+                api_key=gem_key,
+                model=SPELLCHECK_GEMINI_MODEL,
+                paragraph_index=paragraph_index,
+                debug_callback=debug_callback,
+            )
+            if not err1b:
+                # Mark that this paragraph was served by fallback (still counts as gemini)
+                err1 = None
+                e1 = e1b
+    else:
+        e1, err1 = gemini_spellcheck_paragraph(
+            p,
+            api_key=gem_key,
+            model=SPELLCHECK_GEMINI_MODEL,
+            paragraph_index=paragraph_index,
+            debug_callback=debug_callback,
+        )
+
+    return e1, err1
+
+
+def _spellcheck_limits() -> Dict[str, ProviderLimits]:
+    """config.SPELLCHECK_LIMITS -> ProviderLimits (Gemini kalıcı kota hatasında kalan paragrafları atlar)."""
+    out: Dict[str, ProviderLimits] = {}
+    for name, lim in SPELLCHECK_LIMITS.items():
+        out[name] = ProviderLimits(
+            concurrency=lim.get("concurrency", 4),
+            rpm=lim.get("rpm", 0),
+            tpm=lim.get("tpm", 0),
+            max_attempts=SPELLCHECK_MAX_ATTEMPTS,
+            stop_on_quota=(name == "gemini"),
+        )
+    return out
+
+
+class _SpellcheckCheckpoint:
+    """
+    spellcheck.partial.jsonl: ilk satır çalışma anahtarı (docx + modeller), sonra tamamlanan her
+    paragraf için bir satır. Çalışma çökerse bir sonraki çalıştırma hatasız biten paragrafları
+    yeniden sormaz; çalışma bitince dosya silinir.
+    """
+
+    def __init__(self, path: Path, run_key: Dict[str, Any]):
+        self.path = path
+        self.run_key = run_key
+        self._f = None
+
+    def load(self, paras: List[str]) -> Dict[int, Dict[str, Any]]:
+        done: Dict[int, Dict[str, Any]] = {}
+        if not self.path.exists():
+            return done
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                header = json.loads(f.readline() or "{}")
+                if header.get("run_key") != self.run_key:
+                    return {}
+                for ln in f:
+                    try:
+                        rec = json.loads(ln)
+                    except Exception:
+                        break  # yarım yazılmış son satır
+                    pidx = rec.get("paragraph_index")
+                    if (
+                        isinstance(pidx, int)
+                        and 1 <= pidx <= len(paras)
+                        and rec.get("text") == paras[pidx - 1]
+                        and not rec.get("call_errors")
+                        and not rec.get("skipped")
+                    ):
+                        done[pidx] = {"errors": rec.get("errors") or {}, "call_errors": []}
+        except Exception as e:
+            print(f"[WARN] Spellcheck ilerleme dosyası okunamadı: {e}")
+            return {}
+        return done
+
+    def open(self, done: Dict[int, Dict[str, Any]], paras: List[str]) -> None:
+        """Dosyayı baştan yazar (devralınan paragraflar korunur) ve eklemeye hazırlar."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = open(self.path, "w", encoding="utf-8")
+        self._f.write(json.dumps({"run_key": self.run_key}, ensure_ascii=False) + "\n")
+        for pidx in sorted(done):
+            self.append(pidx, paras[pidx - 1], done[pidx])
+
+    def append(self, pidx: int, text: str, result: Dict[str, Any]) -> None:
+        if self._f is None:
+            return
+        rec = {"paragraph_index": pidx, "text": text, "errors": result.get("errors") or {}, "call_errors": result.get("call_errors") or []}
+        if result.get("skipped"):
+            rec["skipped"] = result["skipped"]
+        self._f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        self._f.flush()
+
+    def close(self, remove: bool = False) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+        if remove:
+            self.path.unlink(missing_ok=True)
+
+
+_PROVIDER_LABELS = {"gemini": "Gemini", "openai": "GPT/OpenAI", "claude": "Claude"}
+
+
 def spellcheck_tahkik_paragraphs(
     docx_path: Path,
     use_gemini: bool = True,
@@ -1066,10 +1344,33 @@ def spellcheck_tahkik_paragraphs(
     append_to_existing: bool = False,
     status_callback: Optional[Callable[[str, str], None]] = None,
     debug_callback: Optional[Callable[[str, str], None]] = None,
+    use_cache: bool = True,
+    cache: Optional[LLMResponseCache] = None,
+    batch_tokens: Optional[int] = None,
+    incremental: bool = False,
+    paragraphs: Optional[List[str]] = None,
+    output_json: Optional[Path] = None,
+    on_paragraph: Optional[Callable[[Dict[str, Any]], None]] = None,
+    cancel_event: Optional[threading.Event] = None,
 ) -> Dict[str, Any]:
-    if status_callback:
-        status_callback(f"Word dosyası okunuyor: {docx_path.name}...", "INFO")
-    paras = read_docx_paragraphs(docx_path)
+    """
+    incremental : önceki sonuçla (output_json) paragraf parmak izleri üzerinden karşılaştırır;
+                  sadece yeni/değişmiş paragraflar sorulur, değişmeyenlerin sonuçları yeni
+                  indekslerine taşınır, silinen paragrafların sonuçları düşer.
+    paragraphs  : Word yerine bu paragraf listesi kontrol edilir (ör. satır düzenlemeleri uygulanmış metin)
+    output_json : varsayılan config.SPELLCHECK_JSON (proje bazlı kayıt için)
+    on_paragraph: her paragrafın per_paragraph kaydı hazır olunca çağrılır (taşınan / devralınanlar
+                  çalışma başında); sonuçları istemciye paragraf paragraf akıtmak için
+    cancel_event: set edilince kalan çağrılar yapılmaz; kısmi sonuç "cancelled": True ile yazılır
+                  ve artımlı bir sonraki çalıştırma kalan paragraflardan devam eder
+    """
+    output_json = Path(output_json) if output_json else SPELLCHECK_JSON
+    if paragraphs is not None:
+        paras = [p for p in paragraphs if isinstance(p, str) and p.strip()]
+    else:
+        if status_callback:
+            status_callback(f"Word dosyası okunuyor: {docx_path.name}...", "INFO")
+        paras = read_docx_paragraphs(docx_path)
     paras = paras[:min(len(paras), SPELLCHECK_MAX_PARAS)]
     
     if status_callback:
@@ -1112,14 +1413,25 @@ def spellcheck_tahkik_paragraphs(
         if status_callback:
             status_callback("GEMINI_PROVIDER=vertex tespit edildi ama Vertex devre dışı: AI Studio kullanılacak.", "WARNING")
         gem_provider = "ai_studio"
+    transport = get_transport()
+
+    def _key(getter: Callable[[], str]) -> str:
+        # Replay modunda kasetten cevap verilir: anahtar yoksa yer tutucu yeterli
+        try:
+            return getter()
+        except RuntimeError:
+            if transport.offline:
+                return "replay"
+            raise
+
     gem_key = None
     if use_gemini and gem_provider not in ("vertex", "ai_studio"):
         raise RuntimeError("GEMINI_PROVIDER geçersiz. Değer: ai_studio veya vertex olmalı.")
     if use_gemini and gem_provider == "ai_studio":
-        gem_key = get_gemini_api_key()
+        gem_key = _key(get_gemini_api_key)
 
-    oa_key = get_openai_api_key() if use_openai else None
-    claude_key = get_claude_api_key() if use_claude else None
+    oa_key = _key(get_openai_api_key) if use_openai else None
+    claude_key = _key(get_claude_api_key) if use_claude else None
 
     # Döküman token frekansları: Claude yanlış-pozitif filtreleme için
     all_text = "\n".join([p for p in paras if isinstance(p, str)])
@@ -1127,167 +1439,241 @@ def spellcheck_tahkik_paragraphs(
     token_counts = Counter(all_tokens_norm)
     total_tokens = len(all_tokens_norm)
 
-    # If a model hits quota/rate-limit, disable it for remaining paragraphs to avoid wasting time.
-    # [MODIFIED]: User requested NOT to auto-disable models on error, so we keep flags but don't set them false.
-    gem_enabled = bool(use_gemini)
-    oa_enabled = bool(use_openai)
-    claude_enabled = bool(use_claude)
-    
-    # Track "quota exceeded" errors to auto-skip only when absolutely necessary (hard quota, not rate-limit)
-    gem_quota_busted = False
-    
+    # Sağlayıcılar: fn(paragraph, paragraph_index) -> (errors, err). Eşzamanlılık, rpm/tpm sınırları ve
+    # 429/5xx geri çekilmesi SpellcheckExecutor'da (eskiden sıralı çağrı + sabit time.sleep(0.35)).
+    providers: Dict[str, Callable[[str, int], Tuple[List[Dict[str, Any]], Optional[str]]]] = {}
+    if use_gemini:
+        providers["gemini"] = lambda p, pidx: _gemini_spellcheck_with_fallbacks(
+            p, pidx, gem_provider, gem_key, status_callback=status_callback, debug_callback=debug_callback
+        )
+    if use_openai:
+        providers["openai"] = lambda p, pidx: openai_spellcheck_paragraph(
+            p, api_key=oa_key, model=OPENAI_MODEL, paragraph_index=pidx, debug_callback=debug_callback
+        )
+    if use_claude:
+        providers["claude"] = lambda p, pidx: claude_spellcheck_paragraph(
+            p, api_key=claude_key, model=CLAUDE_MODEL, paragraph_index=pidx, debug_callback=debug_callback
+        )
+
+    # Paketleme: kısa ardışık paragraflar tek istekte (spellcheck_batch); 0 = kapalı
+    if batch_tokens is None:
+        batch_tokens = SPELLCHECK_BATCH_TOKENS
+    batch_providers: Dict[str, Callable[[List[Tuple[int, str]]], Tuple[Dict[int, List[Dict[str, Any]]], Optional[str]]]] = {}
+    if batch_tokens and SPELLCHECK_BATCH_MAX_PARAS > 1:
+        if use_gemini and gem_provider == "ai_studio":
+            batch_providers["gemini"] = lambda items: gemini_spellcheck_batch(
+                items, api_key=gem_key, model=SPELLCHECK_GEMINI_MODEL, debug_callback=debug_callback
+            )
+        if use_openai:
+            batch_providers["openai"] = lambda items: openai_spellcheck_batch(
+                items, api_key=oa_key, model=OPENAI_MODEL, debug_callback=debug_callback
+            )
+        if use_claude:
+            batch_providers["claude"] = lambda items: claude_spellcheck_batch(
+                items, api_key=claude_key, model=CLAUDE_MODEL, debug_callback=debug_callback
+            )
+
+    # Artımlı mod: önceki sonuçla paragraf farkı (parmak izi) -> sadece yeni/değişmiş paragraflar sorulur
+    previous: Optional[Dict[str, Any]] = None
+    plan = None
+    if incremental:
+        previous = _load_existing_spellcheck_json(output_json)
+        plan = plan_incremental(previous, paras, providers.keys())
+        if status_callback:
+            sm = plan.summary()
+            status_callback(
+                f"SPELLCHECK (artımlı): {sm['todo']} paragraf kontrol edilecek, {sm['carried']} sonuç taşındı"
+                f" ({sm['moved']} yer değiştirmiş), {sm['dropped']} eski paragraf düştü.",
+                "INFO",
+            )
+    carried: Dict[int, Dict[str, Any]] = plan.carried if plan is not None else {}
+
+    # Selection / start offset: skipped paragraphs still get a per_paragraph entry (stable indexing)
+    jobs: List[Tuple[int, str]] = []
     for idx, p in enumerate(paras):
-        # If selection is set, only run selected paragraphs (but keep stable indexing)
         if sel_set is not None and (idx + 1) not in sel_set:
-            per_para.append({"paragraph_index": idx + 1, "text": p, "errors": []})
             continue
-        # Skip early paragraphs if requested (but still keep a per_paragraph entry for stable indexing)
         if (idx + 1) < start_paragraph:
-            per_para.append({"paragraph_index": idx + 1, "text": p, "errors": []})
             continue
-        if status_callback and (idx + 1) % 5 == 0:
-            status_callback(f"  Paragraf {idx + 1}/{len(paras)} kontrol ediliyor...", "INFO")
-        e1, err1 = ([], None)
-        e2, err2 = ([], None)
-        e3, err3 = ([], None)
-
-        if gem_enabled:
-            # If quota is busted (hard stop), skip calls to avoid spamming errors
-            if gem_quota_busted:
-                pass 
-            else:
-                if gem_provider == "vertex":
-                    e1, err1 = vertex_gemini_spellcheck_paragraph(
-                        p,
-                        project_id=VERTEX_PROJECT_ID,
-                        location=VERTEX_LOCATION,
-                        model=VERTEX_GEMINI_MODEL,
-                        paragraph_index=idx + 1,
-                        debug_callback=debug_callback,
-                    )
-                    # If the model is not found (common with region/model-id mismatch), try known Gemini 3 Pro variants
-                    if err1 and _is_vertex_model_not_found(err1):
-                        # 1) try preview id in same location
-                        alt_models = []
-                        m0 = (VERTEX_GEMINI_MODEL or "").strip()
-                        if m0 and m0 != "gemini-3-pro-preview":
-                            alt_models.append("gemini-3-pro-preview")
-                        # 2) try global location (some models are only under global)
-                        tried = False
-                        for am in alt_models:
-                            tried = True
-                            if status_callback:
-                                status_callback(f"Vertex 404: '{m0}' bulunamadı. Alternatif deneniyor: {am}", "WARNING")
-                            e1a, err1a = vertex_gemini_spellcheck_paragraph(
-                                p,
-                                project_id=VERTEX_PROJECT_ID,
-                                location=VERTEX_LOCATION,
-                                model=am,
-                                paragraph_index=idx + 1,
-                                debug_callback=debug_callback,
-                            )
-                            if not err1a:
-                                e1, err1 = e1a, None
-                                break
-                        if err1:
-                            tried = True
-                            if status_callback:
-                                status_callback("Vertex 404: global lokasyonda tekrar denenecek (location=global).", "WARNING")
-                            e1g, err1g = vertex_gemini_spellcheck_paragraph(
-                                p,
-                                project_id=VERTEX_PROJECT_ID,
-                                location="global",
-                                model=(VERTEX_GEMINI_MODEL or "gemini-3-pro-preview"),
-                                paragraph_index=idx + 1,
-                                debug_callback=debug_callback,
-                            )
-                            if not err1g:
-                                e1, err1 = e1g, None
-                        if tried and err1 and status_callback:
-                            status_callback(
-                                "Vertex tarafında model/region uyumsuzluğu devam ediyor. "
-                                "İstersen GEMINI_PROVIDER=ai_studio ile devam edebiliriz.",
-                                "WARNING",
-                            )
-                    # If Vertex fails due to auth/perm and we have an AI Studio key, fallback once for this paragraph
-                    if err1 and gem_key and _is_vertex_auth_or_perm_error(err1):
-                        if status_callback:
-                            status_callback(
-                                f"Vertex auth/izin hatası alındı, bu paragraf için AI Studio fallback deneniyor. (P{idx+1})",
-                                "WARNING",
-                            )
-                        e1b, err1b = gemini_spellcheck_paragraph(
-                            p,
-                            api_key=gem_key,
-                            model=SPELLCHECK_GEMINI_MODEL,
-                            paragraph_index=idx + 1,
-                            debug_callback=debug_callback,
-                        )
-                        if not err1b:
-                            # Mark that this paragraph was served by fallback (still counts as gemini)
-                            err1 = None
-                            e1 = e1b
-                else:
-                    e1, err1 = gemini_spellcheck_paragraph(
-                        p,
-                        api_key=gem_key,
-                        model=SPELLCHECK_GEMINI_MODEL,
-                        paragraph_index=idx + 1,
-                        debug_callback=debug_callback,
-                    )
-                
-                if err1:
-                    call_errors.append({"paragraph_index": idx + 1, "source": "gemini", "error": err1})
-                    if status_callback:
-                        status_callback(f"API HATASI (Gemini) P{idx+1}: {err1[:220]}", "ERROR")
-                    
-                    # Check for hard quota error to stop wasting calls
-                    if "exceeded your current quota" in str(err1).lower():
-                        gem_quota_busted = True
-                        if status_callback:
-                            status_callback("KOTA BİTTİ (Gemini): Kalan paragraflar atlanacak.", "WARNING")
-                            
-            # Gemini rate-limit'e takılmamak için küçük throttle
-            time.sleep(0.35)
-
-        if oa_enabled:
-            e2, err2 = openai_spellcheck_paragraph(
-                p,
-                api_key=oa_key,
-                model=OPENAI_MODEL,
-                paragraph_index=idx + 1,
-                debug_callback=debug_callback,
-            )
-            if err2:
-                call_errors.append({"paragraph_index": idx + 1, "source": "openai", "error": err2})
-                if status_callback:
-                    status_callback(f"API HATASI (GPT/OpenAI) P{idx+1}: {err2[:220]}", "ERROR")
+        if (idx + 1) in carried:
+            continue
+        jobs.append((idx + 1, p))
 
-        if claude_enabled:
-            e3, err3 = claude_spellcheck_paragraph(
-                p,
-                api_key=claude_key,
-                model=CLAUDE_MODEL,
-                paragraph_index=idx + 1,
-                debug_callback=debug_callback,
+    run_key = {
+        "docx_path": str(Path(docx_path).resolve()),
+        "gemini_model": ((VERTEX_GEMINI_MODEL if gem_provider == "vertex" else SPELLCHECK_GEMINI_MODEL) if use_gemini else None),
+        "openai_model": OPENAI_MODEL if use_openai else None,
+        "claude_model": CLAUDE_MODEL if use_claude else None,
+    }
+    # Ara kayıt çıktının yanında (output_lines/spellcheck.partial.jsonl veya projenin kendi
+    # klasöründe): aynı anda çalışan iki projenin checkpoint'i birbirini ezmez
+    partial_path = output_json.with_name(f"{output_json.stem}.partial.jsonl")
+    checkpoint = _SpellcheckCheckpoint(partial_path, run_key) if SPELLCHECK_SAVE_JSON else None
+    done: Dict[int, Dict[str, Any]] = {}
+    if checkpoint is not None:
+        job_ids = {pidx for pidx, _ in jobs}
+        done = {k: v for k, v in checkpoint.load(paras).items() if k in job_ids}
+        if done and status_callback:
+            status_callback(f"SPELLCHECK: Yarım kalan çalışmadan {len(done)} paragraf devralındı.", "INFO")
+        checkpoint.open(done, paras)
+    pending = [(pidx, p) for pidx, p in jobs if pidx not in done]
+
+    # LLM cevap önbelleği: (sağlayıcı, model, prompt sürümü, normalize paragraf) -> ham hata listesi.
+    # İsabetler executor'a hazır cevap olarak verilir (ağ çağrısı ve rate limit harcanmaz).
+    if cache is None and use_cache:
+        cache = default_llm_cache()
+    cache_models = {name: run_key[f"{name}_model"] for name in providers}
+    prompt_versions = {
+        "gemini": prompt_version(_gemini_prompt),
+        "openai": prompt_version(_openai_prompt),
+        "claude": prompt_version(_claude_prompt),
+    }
+    # Paketli cevaplar farklı prompt'la üretilir: paketleme açıkken sürüm iki şablonu birlikte kapsar
+    for name, build in (("gemini", batch_prompt_tsv), ("openai", batch_prompt_json_en), ("claude", batch_prompt_json_ar)):
+        if name in batch_providers:
+            prompt_versions[name] += "+" + prompt_version(lambda x, b=build: b([(0, x)]))
+    # Boş paragraflar sağlayıcıya gönderilmez (çağrı fonksiyonları zaten ([], None) döner)
+    prefilled: Dict[int, Dict[str, Tuple[List[Dict[str, Any]], Optional[str]]]] = {
+        pidx: {name: ([], None) for name in providers} for pidx, p in pending if not (p or "").strip()
+    }
+    cache_stats = {"hits": 0, "misses": 0, "writes": 0}
+    if cache is not None and use_cache:
+        for pidx, p in pending:
+            if not (p or "").strip():
+                continue
+            for name in providers:
+                hit = cache.get(name, cache_models[name], prompt_versions[name], p)
+                if hit is None:
+                    cache_stats["misses"] += 1
+                else:
+                    cache_stats["hits"] += 1
+                    prefilled.setdefault(pidx, {})[name] = (hit, None)
+        if status_callback and cache_stats["hits"]:
+            status_callback(
+                f"SPELLCHECK: Önbellekten {cache_stats['hits']} cevap kullanıldı ({cache_stats['misses']} çağrı gerekli).",
+                "INFO",
             )
-            if err3:
-                call_errors.append({"paragraph_index": idx + 1, "source": "claude", "error": err3})
-                if status_callback:
-                    status_callback(f"API HATASI (Claude) P{idx+1}: {err3[:220]}", "ERROR")
 
-        merged = _merge_errors(e1 + e2 + e3)
+    progress = {"done": len(done), "quota_reported": False}
+    entries: Dict[int, Dict[str, Any]] = {}
+    # İptal / kota yüzünden hiç sorulmamış paragraflar: kontrol edilmiş sayılmaz, yazılmaz
+    unchecked: set = set()
+
+    def _incomplete(res: Dict[str, Any]) -> bool:
+        skipped = set(res.get("skipped") or [])
+        if not skipped:
+            return False
+        return executor.cancelled or skipped >= set(providers)
+
+    def _entry(pidx: int, res: Dict[str, Any]) -> Dict[str, Any]:
+        """Sağlayıcı sonuçları -> per_paragraph kaydı (birleştirilmiş ve filtrelenmiş)."""
+        p = paras[pidx - 1]
+        failed = {ce["source"] for ce in res["call_errors"]} | set(res.get("skipped") or [])
+        merged = _merge_errors(ordered_errors(res))
         merged = _filter_non_orthographic_errors(merged, status_callback=status_callback)
         merged = _filter_suspicious_errors(merged, token_counts, total_tokens, status_callback=status_callback)
         for e in merged:
-            e["paragraph_index"] = idx + 1
-
-        per_para.append({
-            "paragraph_index": idx + 1,
+            e["paragraph_index"] = pidx
+        return {
+            "paragraph_index": pidx,
             "text": p,
-            "errors": merged
-        })
-        all_errors.extend(merged)
+            "errors": merged,
+            "fp": paragraph_fingerprint(p),
+            "checked": True,
+            "providers": [name for name in providers if name not in failed],
+        }
+
+    def _emit(entry: Dict[str, Any]) -> None:
+        if on_paragraph is None:
+            return
+        try:
+            on_paragraph(entry)
+        except Exception as e:
+            print(f"[WARN] Spellcheck on_paragraph hatası (P{entry.get('paragraph_index')}): {e}")
+
+    def _on_paragraph(pidx: int, result: Dict[str, Any]) -> None:
+        if _incomplete(result):
+            # sonraki çalıştırma (devam / artımlı) bu paragrafı yeniden sorar
+            unchecked.add(pidx)
+            return
+        if checkpoint is not None:
+            checkpoint.append(pidx, paras[pidx - 1], result)
+        if cache is not None and use_cache and (paras[pidx - 1] or "").strip():
+            failed = {ce["source"] for ce in result["call_errors"]} | set(result.get("skipped") or [])
+            from_cache = prefilled.get(pidx) or {}
+            for name, errs in result["errors"].items():
+                if name in failed or name in from_cache:
+                    continue
+                try:
+                    cache.put(name, cache_models[name], prompt_versions[name], paras[pidx - 1], errs)
+                    cache_stats["writes"] += 1
+                except Exception as e:
+                    print(f"[WARN] LLM önbelleğine yazılamadı: {e}")
+        if status_callback:
+            for ce in result["call_errors"]:
+                label = _PROVIDER_LABELS.get(ce["source"], ce["source"])
+                status_callback(f"API HATASI ({label}) P{pidx}: {ce['error'][:220]}", "ERROR")
+            if not progress["quota_reported"] and executor.stopped_reason("gemini"):
+                progress["quota_reported"] = True
+                status_callback("KOTA BİTTİ (Gemini): Kalan paragraflar atlanacak.", "WARNING")
+        entries[pidx] = _entry(pidx, result)
+        _emit(entries[pidx])
+        progress["done"] += 1
+        if status_callback and progress["done"] % 5 == 0:
+            status_callback(f"  Paragraf {progress['done']}/{len(jobs)} kontrol edildi...", "INFO")
+
+    executor = SpellcheckExecutor(
+        providers,
+        limits=_spellcheck_limits(),
+        on_paragraph=_on_paragraph,
+        batch_providers=batch_providers,
+        batch_tokens=batch_tokens,
+        batch_max_paras=SPELLCHECK_BATCH_MAX_PARAS,
+        sleep=transport.sleep,
+        clock=transport.clock,
+        cancel_event=cancel_event,
+    )
+    for pidx in sorted(carried):
+        _emit(carried[pidx])
+    for pidx in sorted(done):
+        entries[pidx] = _entry(pidx, done[pidx])
+        _emit(entries[pidx])
+    try:
+        results = dict(done)
+        results.update(executor.run(pending, prefilled=prefilled))
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+    if status_callback and executor.batch_providers:
+        n_batches = sum(st["batches"] for st in executor.stats.values())
+        n_fallback = sum(st["batch_fallbacks"] for st in executor.stats.values())
+        if n_batches:
+            status_callback(
+                f"SPELLCHECK paketleme: {n_batches} paket istek, {n_fallback} paragraf tek tek yeniden soruldu.",
+                "INFO",
+            )
+    if status_callback and cache is not None and use_cache:
+        status_callback(
+            f"SPELLCHECK önbellek: {cache_stats['hits']} isabet, {cache_stats['misses']} ıska, "
+            f"{cache_stats['writes']} yeni kayıt ({cache.size_bytes() // 1024} KB).",
+            "INFO",
+        )
+
+    # Paragraf sırasıyla birleştir: çıktı çağrıların bitiş sırasından bağımsız
+    for idx, p in enumerate(paras):
+        if (idx + 1) in carried:
+            # artımlı mod: değişmeyen paragrafın (zaten filtrelenmiş) sonucu yeni indeksinde
+            per_para.append(carried[idx + 1])
+            all_errors.extend(carried[idx + 1].get("errors") or [])
+            continue
+        res = results.get(idx + 1)
+        if res is None or (idx + 1) in unchecked:
+            per_para.append({"paragraph_index": idx + 1, "text": p, "errors": [], "fp": paragraph_fingerprint(p), "checked": False})
+            continue
+        call_errors.extend(res["call_errors"])
+        entry = entries.get(idx + 1) or _entry(idx + 1, res)
+        per_para.append(entry)
+        all_errors.extend(entry["errors"])
 
     global_merged = _merge_errors(all_errors)
     global_merged = _filter_non_orthographic_errors(global_merged, status_callback=status_callback)
@@ -1320,11 +1706,21 @@ def spellcheck_tahkik_paragraphs(
                 "openai": bool(use_openai),
                 "claude": bool(use_claude),
             },
+            "cache": cache_stats if (cache is not None and use_cache) else None,
         }
     ]
-
-    if append_to_existing and SPELLCHECK_JSON.exists():
-        ex = _load_existing_spellcheck_json()
+    if executor.cancelled:
+        payload["cancelled"] = True
+        payload["runs"][0]["cancelled"] = True
+        if status_callback:
+            status_callback("SPELLCHECK iptal edildi: kalan paragraflar bir sonraki çalıştırmada kontrol edilecek.", "WARNING")
+    if plan is not None:
+        payload["runs"][0]["incremental"] = plan.summary()
+        prev_runs = (previous or {}).get("runs") or []
+        payload["runs"] = [r for r in prev_runs if isinstance(r, dict)] + payload["runs"]
+
+    if append_to_existing and not incremental and output_json.exists():
+        ex = _load_existing_spellcheck_json(output_json)
         if isinstance(ex, dict):
             if status_callback:
                 status_callback("SPELLCHECK: Mevcut sonuçlara ekleniyor (append)...", "INFO")
@@ -1339,8 +1735,10 @@ def spellcheck_tahkik_paragraphs(
             )
 
     if SPELLCHECK_SAVE_JSON:
-        _backup_spellcheck_json(payload, status_callback=status_callback)
-        SPELLCHECK_JSON.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        _backup_spellcheck_json(payload, status_callback=status_callback, current_path=output_json)
+        output_json.parent.mkdir(parents=True, exist_ok=True)
+        output_json.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        checkpoint.close(remove=True)
 
     return payload
 
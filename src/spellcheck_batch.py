@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+Spellcheck Batch — ardışık kısa paragrafları tek bir LLM isteğinde toplama.
+
+Tahkik metinlerinde paragrafların çoğu birkaç kelimelik tek satırlardır; her biri kendi
+isteğinde tüm sistem prompt'unu taşıyınca maliyeti ve süreyi prompt + istek yükü belirliyordu.
+Burada:
+
+  - pack_batches: ardışık paragrafları token bütçesine (ve paragraf sayısı sınırına) göre paketler,
+  - batch_prompt_*: modelden paragraf kimliğiyle ("P12") anahtarlanmış sonuç ister,
+  - parse_batch_tsv / parse_batch_json: cevabı paragraf indekslerine geri dağıtır,
+  - validate_batch: eksik veya karışmış (başka paragrafın kelimesini taşıyan) paragrafları ayıklar.
+
+Ayıklanan / parse edilemeyen paragraflar çağıran tarafta (SpellcheckExecutor) tek paragraflık
+çağrılarla yeniden sorulur.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.spellcheck_executor import estimate_tokens
+from src.utils import normalize_ar
+
+BatchItems = List[Tuple[int, str]]
+
+_ID_RE = re.compile(r"^\s*[\[\(]?\s*[Pp]\s*(\d+)\s*[\]\)]?\s*[:\-]?\s*$")
+
+
+def pack_batches(items: BatchItems, budget_tokens: int, max_paras: int) -> List[BatchItems]:
+    """
+    Paragrafları sırayı bozmadan paketler. budget_tokens paragraf metinlerinin tahmini token
+    toplamıdır (prompt payı hariç); bütçeyi tek başına aşan paragraf kendi paketinde kalır.
+    """
+    batches: List[BatchItems] = []
+    cur: BatchItems = []
+    used = 0
+    for pidx, text in items:
+        cost = estimate_tokens(text, overhead=8)
+        if cur and (used + cost > budget_tokens or len(cur) >= max_paras):
+            batches.append(cur)
+            cur, used = [], 0
+        cur.append((pidx, text))
+        used += cost
+    if cur:
+        batches.append(cur)
+    return batches
+
+
+def _paragraph_block(items: BatchItems) -> str:
+    return "\n".join(f"[P{pidx}]\n{(text or '').strip()}" for pidx, text in items)
+
+
+def batch_prompt_tsv(items: BatchItems) -> str:
+    """Gemini: düz metin, satır başına bir hata; hatasız paragraf için 'Pn<TAB>NONE'."""
+    return (
+        "أنت مدقق إملائي عربي شديد الدقة لنص محقق.\n"
+        "ستجد عدة فقرات، لكل فقرة معرّف مثل [P12].\n"
+        "أخرج فقط نصًا عاديًا (بدون JSON وبدون Markdown).\n"
+        "سطر لكل خطأ بالشكل التالي تمامًا:\n"
+        "ID\\tWRONG\\tSUGGESTION\\tREASON\n"
+        "حيث ID هو معرّف الفقرة بدون أقواس (مثل P12).\n"
+        "لكل فقرة بلا أخطاء أخرج سطرًا واحدًا: ID\\tNONE\n"
+        "قواعد:\n"
+        "- لا تقترح أي تصحيح للحركات/التشكيل/الإعراب/التنوين/الشدة/السكون/الجزم/النصب.\n"
+        "- تجاهل الحركات والإعراب تمامًا (لا تعتبرها أخطاء).\n"
+        "- إذا كان الفرق فقط في التشكيل أو علامات الإعراب أو (ألف التنوين في آخر الكلمة) فلا تذكره.\n"
+        "- ركّز فقط على أخطاء الرسم/الإملاء/الحروف.\n"
+        "- لا تذكر أكثر من 30 خطأ لكل فقرة.\n"
+        "- لا تنسب كلمة إلى فقرة غير التي وردت فيها.\n"
+        "الفقرات:\n"
+        f"{_paragraph_block(items)}\n"
+    )
+
+
+def batch_prompt_json_en(items: BatchItems) -> str:
+    """OpenAI: paragraf kimliğinden hata dizisine JSON nesnesi."""
+    return (
+        "You are an extremely strict Arabic spelling proofreader for a critical edition (tahqiq).\n"
+        "You will get several paragraphs, each introduced by an id like [P12].\n"
+        "Return ONLY valid JSON: an object whose keys are the paragraph ids (e.g. \"P12\") and whose values are arrays.\n"
+        "Include every id, with [] for paragraphs without mistakes. No extra text.\n"
+        "Each array item must be: {\"wrong\":\"...\",\"suggestion\":\"...\",\"reason\":\"...\"}\n"
+        "Rules:\n"
+        "- DO NOT suggest or flag any changes that are only about: harakat/diacritics, i'rab/case endings, tanwin, shadda, sukun/jazm, nasb endings.\n"
+        "- Ignore Arabic diacritics and i'rab marks completely (do not flag them).\n"
+        "- Focus on orthography/spelling/letter-level mistakes.\n"
+        "- Max 30 items per paragraph.\n"
+        "- Only report a word under the paragraph it occurs in.\n"
+        "Paragraphs:\n"
+        f"{_paragraph_block(items)}"
+    )
+
+
+def batch_prompt_json_ar(items: BatchItems) -> str:
+    """Claude: paragraf kimliğinden hata dizisine JSON nesnesi (Arapça talimat)."""
+    return (
+        "أنت مدقق إملائي عربي شديد الدقة لنص محقق.\n"
+        "ستجد عدة فقرات، لكل فقرة معرّف مثل [P12].\n"
+        "أخرج فقط JSON بدون أي كلام إضافي: كائن مفاتيحه معرّفات الفقرات (مثل \"P12\") وقيمه مصفوفات.\n"
+        "اذكر كل المعرّفات، ومصفوفة فارغة [] للفقرة التي لا أخطاء فيها.\n"
+        "كل عنصر بالشكل:\n"
+        "{\"wrong\":\"...\",\"suggestion\":\"...\",\"reason\":\"...\"}\n"
+        "قواعد:\n"
+        "- لا تقترح أي تصحيح للحركات/التشكيل/الإعراب/التنوين/الشدة/السكون/الجزم/النصب.\n"
+        "- تجاهل الحركات والإعراب (لا تعتبرها أخطاء).\n"
+        "- إذا كان التصحيح فقط في التشكيل أو علامات الإعراب أو (ألف التنوين في آخر الكلمة) فلا تذكره.\n"
+        "- ركّز على أخطاء الرسم/الإملاء/الحروف (همزات، تاء مربوطة/هاء، ألف/ياء، ...).\n"
+        "- لا تذكر أكثر من 30 خطأ لكل فقرة.\n"
+        "- لا تنسب كلمة إلى فقرة غير التي وردت فيها.\n"
+        "الفقرات:\n"
+        f"{_paragraph_block(items)}\n"
+    )
+
+
+def _parse_id(raw: Any) -> Optional[int]:
+    m = _ID_RE.match(str(raw or ""))
+    return int(m.group(1)) if m else None
+
+
+def _item(it: Dict[str, Any]) -> Dict[str, str]:
+    return {
+        "wrong": it.get("wrong", "") or it.get("error", "") or "",
+        "suggestion": it.get("suggestion", "") or it.get("fix", "") or "",
+        "reason": it.get("reason", "") or it.get("note", "") or "",
+    }
+
+
+def parse_batch_tsv(text: str, items: BatchItems) -> Dict[int, List[Dict[str, str]]]:
+    """'Pn<TAB>WRONG<TAB>SUGGESTION<TAB>REASON' / 'Pn<TAB>NONE' satırları -> {pidx: [...]}"""
+    ids = {pidx for pidx, _ in items}
+    out: Dict[int, List[Dict[str, str]]] = {}
+    for raw_line in (text or "").splitlines():
+        line = re.sub(r"^\s*[\-\*\u2022]+\s*", "", raw_line.strip())
+        if "\t" not in line:
+            continue
+        parts = [p.strip() for p in line.split("\t")]
+        pidx = _parse_id(parts[0])
+        if pidx is None or pidx not in ids:
+            continue
+        lst = out.setdefault(pidx, [])
+        if len(parts) < 2 or parts[1].upper() == "NONE" or not parts[1]:
+            continue
+        if parts[1].lower() in ("wrong", "hatalı", "hata", "error"):
+            continue
+        lst.append({
+            "wrong": parts[1],
+            "suggestion": parts[2] if len(parts) >= 3 else "",
+            "reason": " ".join(parts[3:]).strip() if len(parts) >= 4 else "",
+        })
+    return out
+
+
+def parse_batch_json(text: str, items: BatchItems) -> Dict[int, List[Dict[str, str]]]:
+    """{"P12": [...], ...} (veya [{"id": "P12", "errors": [...]}, ...]) -> {pidx: [...]}"""
+    obj = _json_from_text(text)
+    ids = {pidx for pidx, _ in items}
+    out: Dict[int, List[Dict[str, str]]] = {}
+    pairs: List[Tuple[Any, Any]] = []
+    if isinstance(obj, dict):
+        pairs = list(obj.items())
+    elif isinstance(obj, list):
+        pairs = [(it.get("id") or it.get("paragraph"), it.get("errors")) for it in obj if isinstance(it, dict)]
+    for raw_id, val in pairs:
+        pidx = _parse_id(raw_id)
+        if pidx is None or pidx not in ids or not isinstance(val, list):
+            continue
+        out[pidx] = [_item(it) for it in val if isinstance(it, dict) and (it.get("wrong") or it.get("error"))]
+    return out
+
+
+def _json_from_text(text: str) -> Optional[Any]:
+    if not text:
+        return None
+    try:
+        return json.loads(text)
+    except Exception:
+        pass
+    m = re.search(r"(\{.*\}|\[.*\])", text, flags=re.DOTALL)
+    if not m:
+        return None
+    try:
+        return json.loads(m.group(0))
+    except Exception:
+        return None
+
+
+def validate_batch(parsed: Dict[int, List[Dict[str, str]]], items: BatchItems) -> Dict[int, List[Dict[str, str]]]:
+    """
+    Sadece güvenilir paragrafları döner:
+      - cevapta hiç geçmeyen paragraf düşer,
+      - kendi metninde olmayıp paketteki başka bir paragrafta geçen kelime taşıyan paragraf düşer
+        (model sonuçları kaydırmış olabilir).
+    Düşen paragraflar tek paragraflık çağrıyla yeniden sorulmalıdır.
+    """
+    norm_text = {pidx: " " + " ".join(normalize_ar(w) for w in (text or "").split()) + " " for pidx, text in items}
+    ok: Dict[int, List[Dict[str, str]]] = {}
+    for pidx, _ in items:
+        errs = parsed.get(pidx)
+        if errs is None:
+            continue
+        shifted = False
+        for e in errs:
+            w = normalize_ar(e.get("wrong") or "")
+            if not w or w in norm_text[pidx]:
+                continue
+            if any(w in t for q, t in norm_text.items() if q != pidx):
+                shifted = True
+                break
+        if not shifted:
+            ok[pidx] = errs
+    return ok
@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+"""
+Spellcheck Executor — paragraflar ve sağlayıcılar (Gemini / OpenAI / Claude) arasında eşzamanlı çağrı.
+
+spellcheck_tahkik_paragraphs eskiden paragrafları tek tek geziyor, her paragraf için
+sağlayıcıları sırayla çağırıyor ve araya sabit time.sleep(0.35) koyuyordu; 2.000 paragraflık
+bir kitap saatlerce, çoğunlukla ağ beklemesiyle geçiyordu. Burada:
+
+  - her sağlayıcının kendi iş havuzu vardır (eşzamanlılık sınırı = havuz boyutu),
+  - RateLimiter dakika başına istek (rpm) ve token (tpm) sınırlarını uygular,
+  - 429/5xx/ağ hatalarında üstel geri çekilme (jitter'lı) ile yeniden denenir; 429'da o
+    sağlayıcının tüm işçileri kısa bir süre bekletilir,
+  - sonuçlar paragraf ve sağlayıcı sırasına göre toplanır: çıktı (ve _merge_errors girdisi)
+    çağrıların bitiş sırasından bağımsızdır,
+  - batch_providers verilirse ardışık paragraflar token bütçesine göre tek istekte toplanır
+    (spellcheck_batch); cevabı doğrulanamayan paragraflar tek tek yeniden sorulur,
+  - her paragraf tamamlandığında on_paragraph çağrılır (ilerleme dosyası için), böylece bir
+    çökme sadece o an uçuşta olan çağrıları kaybettirir,
+  - cancel_event ile iş yarıda kesilebilir: uçuştaki çağrılar biter, kalanlar atlanır.
+
+Sağlayıcı fonksiyonları: fn(paragraph_text, paragraph_index) -> (errors, err_str|None)
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+PROVIDER_ORDER = ("gemini", "openai", "claude")
+
+ProviderFn = Callable[[str, int], Tuple[List[Dict[str, Any]], Optional[str]]]
+BatchFn = Callable[[List[Tuple[int, str]]], Tuple[Dict[int, List[Dict[str, Any]]], Optional[str]]]
+
+
+def estimate_tokens(text: str, overhead: int = 300) -> int:
+    """Kaba token tahmini (Arapça için ~3 karakter/token) + prompt/çıktı payı."""
+    return overhead + len(text or "") // 3
+
+
+def is_hard_quota_error(err: Optional[str]) -> bool:
+    e = (err or "").lower()
+    return ("exceeded your current quota" in e) or ("insufficient_quota" in e) or ("billing" in e)
+
+
+def is_retryable_error(err: Optional[str]) -> bool:
+    """429 / 5xx / zaman aşımı / bağlantı / bozuk model çıktısı (kalıcı kota hatası hariç)."""
+    e = (err or "").lower()
+    if not e or is_hard_quota_error(e):
+        return False
+    if "429" in e or "rate limit" in e or "rate-limit" in e:
+        return True
+    if any(f"http {c}" in e for c in (500, 502, 503, 504)):
+        return True
+    if "parse edilemedi" in e or "json decode" in e:
+        return True
+    return ("exception" in e) and any(k in e for k in ("timeout", "timed out", "connection", "reset"))
+
+
+def is_rate_limited(err: Optional[str]) -> bool:
+    e = (err or "").lower()
+    return "429" in e or "rate limit" in e or "rate-limit" in e
+
+
+class ProviderLimits:
+    """Sağlayıcı başına eşzamanlılık, rpm/tpm ve yeniden deneme ayarları (0 = sınırsız)."""
+
+    def __init__(
+        self,
+        concurrency: int = 4,
+        rpm: int = 0,
+        tpm: int = 0,
+        max_attempts: int = 4,
+        backoff_base: float = 1.8,
+        backoff_max: float = 30.0,
+        stop_on_quota: bool = False,
+    ):
+        self.concurrency = max(1, int(concurrency))
+        self.rpm = max(0, int(rpm))
+        self.tpm = max(0, int(tpm))
+        self.max_attempts = max(1, int(max_attempts))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stop_on_quota = stop_on_quota
+
+    def backoff(self, attempt: int) -> float:
+        """attempt: 1'den başlar. Üstel + %0-25 jitter, backoff_max ile sınırlı."""
+        base = min(self.backoff_max, self.backoff_base ** attempt)
+        return base * (1.0 + random.random() * 0.25)
+
+
+class RateLimiter:
+    """
+    İki kovalı token bucket: dakika başına istek (rpm) ve token (tpm). Thread-safe.
+    pause(s): 429 sonrası tüm işçileri s saniye bekletir.
+    """
+
+    def __init__(
+        self,
+        rpm: int = 0,
+        tpm: int = 0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._req = float(rpm)
+        self._tok = float(tpm)
+        self._last = clock()
+        self._paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        dt = max(0.0, now - self._last)
+        self._last = now
+        if self.rpm:
+            self._req = min(float(self.rpm), self._req + dt * self.rpm / 60.0)
+        if self.tpm:
+            self._tok = min(float(self.tpm), self._tok + dt * self.tpm / 60.0)
+
+    def acquire(self, tokens: int = 1) -> float:
+        """Kota açılana kadar bekler; toplam bekleme süresini döner."""
+        if self.tpm:
+            tokens = min(tokens, self.tpm)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                wait = self._paused_until - now
+                if wait <= 0:
+                    req_ok = not self.rpm or self._req >= 1.0
+                    tok_ok = not self.tpm or self._tok >= tokens
+                    if req_ok and tok_ok:
+                        if self.rpm:
+                            self._req -= 1.0
+                        if self.tpm:
+                            self._tok -= tokens
+                        return waited
+                    wait = max(
+                        (1.0 - self._req) * 60.0 / self.rpm if not req_ok else 0.0,
+                        (tokens - self._tok) * 60.0 / self.tpm if not tok_ok else 0.0,
+                    )
+            self._sleep(wait)
+            waited += wait
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+
+class SpellcheckExecutor:
+    def __init__(
+        self,
+        providers: Dict[str, ProviderFn],
+        limits: Optional[Dict[str, ProviderLimits]] = None,
+        on_paragraph: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+        batch_providers: Optional[Dict[str, BatchFn]] = None,
+        batch_tokens: int = 0,
+        batch_max_paras: int = 1,
+        cancel_event: Optional[threading.Event] = None,
+    ):
+        """
+        providers : {"gemini": fn, "openai": fn, ...} (sadece etkin olanlar)
+        on_paragraph(pidx, result): bir paragrafın tüm sağlayıcıları bittiğinde, çağıran thread'de
+        sleep/clock: testlerde sahte zaman için
+        batch_providers: {"gemini": fn_batch, ...}; fn_batch([(pidx, text), ...]) -> ({pidx: errors}, err|None)
+        batch_tokens / batch_max_paras: paket bütçesi (0 veya 1 paragraf = paketleme kapalı)
+        cancel_event: set edilince henüz yapılmamış çağrılar atlanır (sonuçta "skipped" olarak işaretlenir)
+        """
+        limits = limits or {}
+        self.order = [p for p in PROVIDER_ORDER if p in providers] + sorted(p for p in providers if p not in PROVIDER_ORDER)
+        self.providers = providers
+        self.limits = {p: limits.get(p) or ProviderLimits() for p in self.order}
+        self.limiters = {p: RateLimiter(self.limits[p].rpm, self.limits[p].tpm, clock=clock, sleep=sleep) for p in self.order}
+        self.on_paragraph = on_paragraph
+        self.batch_providers = {p: f for p, f in (batch_providers or {}).items() if p in self.providers}
+        self.batch_tokens = max(0, int(batch_tokens or 0))
+        self.batch_max_paras = max(1, int(batch_max_paras or 1))
+        self._sleep = sleep
+        self._cancel = cancel_event
+        self._stopped: Dict[str, str] = {}
+        self._skipped: set = set()
+        self.stats = {p: {"calls": 0, "retries": 0, "errors": 0, "skipped": 0, "cached": 0, "batches": 0, "batch_fallbacks": 0} for p in self.order}
+        self._stats_lock = threading.Lock()
+
+    def stopped_reason(self, provider: str) -> Optional[str]:
+        return self._stopped.get(provider)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel is not None and self._cancel.is_set()
+
+    def _with_retries(self, provider: str, tokens: int, attempt_fn: Callable[[], Tuple[Any, Optional[str]]]):
+        """
+        Rate limit + yeniden deneme + kota durdurma. Döner: (out, err, skipped);
+        skipped=True ise sağlayıcı kota nedeniyle durdurulmuştu (veya iş iptal edildi) ve çağrı yapılmadı.
+        """
+        lim = self.limits[provider]
+        limiter = self.limiters[provider]
+        out: Any = None
+        err: Optional[str] = None
+        for attempt in range(1, lim.max_attempts + 1):
+            if provider in self._stopped or self.cancelled:
+                return None, None, True
+            limiter.acquire(tokens)
+            with self._stats_lock:
+                self.stats[provider]["calls"] += 1
+            out, err = attempt_fn()
+            if not err:
+                return out, None, False
+            if lim.stop_on_quota and is_hard_quota_error(err):
+                self._stopped.setdefault(provider, err)
+                break
+            if attempt >= lim.max_attempts or not is_retryable_error(err):
+                break
+            delay = lim.backoff(attempt)
+            if is_rate_limited(err):
+                limiter.pause(delay)
+            with self._stats_lock:
+                self.stats[provider]["retries"] += 1
+            self._sleep(delay)
+        with self._stats_lock:
+            self.stats[provider]["errors"] += 1
+        return out, err, False
+
+    def _mark_skipped(self, provider: str, pidxs: List[int]) -> None:
+        with self._stats_lock:
+            self.stats[provider]["skipped"] += len(pidxs)
+            self._skipped.update((pidx, provider) for pidx in pidxs)
+
+    def _call(self, provider: str, text: str, pidx: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        fn = self.providers[provider]
+        errs, err, skipped = self._with_retries(provider, estimate_tokens(text), lambda: fn(text, pidx))
+        if skipped:
+            self._mark_skipped(provider, [pidx])
+            return [], None
+        return errs or [], err
+
+    def _call_batch(self, provider: str, batch: List[Tuple[int, str]]) -> Dict[int, Tuple[List[Dict[str, Any]], Optional[str]]]:
+        """
+        Bir paket için tek istek. Cevapta olmayan / doğrulanamayan paragraflar (veya tüm paket
+        parse edilemediyse hepsi) tek paragraflık çağrılarla yeniden sorulur.
+        """
+        fn = self.batch_providers[provider]
+        tokens = estimate_tokens("".join(t for _, t in batch), overhead=300 + 40 * len(batch))
+        got, err, skipped = self._with_retries(provider, tokens, lambda: fn(batch))
+        with self._stats_lock:
+            self.stats[provider]["batches"] += 1
+        if skipped:
+            self._mark_skipped(provider, [pidx for pidx, _ in batch])
+            return {pidx: ([], None) for pidx, _ in batch}
+        got = got if (not err and isinstance(got, dict)) else {}
+        out: Dict[int, Tuple[List[Dict[str, Any]], Optional[str]]] = {}
+        missing = []
+        for pidx, text in batch:
+            if pidx in got:
+                out[pidx] = (got[pidx] or [], None)
+            else:
+                missing.append((pidx, text))
+        if missing:
+            with self._stats_lock:
+                self.stats[provider]["batch_fallbacks"] += len(missing)
+            for pidx, text in missing:
+                out[pidx] = self._call(provider, text, pidx)
+        return out
+
+    def run(
+        self,
+        jobs: List[Tuple[int, str]],
+        prefilled: Optional[Dict[int, Dict[str, Tuple[List[Dict[str, Any]], Optional[str]]]]] = None,
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        jobs: [(paragraph_index, text), ...]
+        prefilled: {pidx: {provider: (errors, None)}} — önceden bilinen cevaplar (ör. LLM önbelleği);
+                   bu çağrılar kuyruğa alınmaz, rate limit harcamaz.
+        Returns: {pidx: {"errors": {provider: [...]}, "call_errors": [{paragraph_index, source, error}],
+                         "skipped": [provider, ...] (sadece atlanan varsa)}}
+        """
+        prefilled = prefilled or {}
+        results: Dict[int, Dict[str, Any]] = {}
+        partial: Dict[int, Dict[str, Tuple[List[Dict[str, Any]], Optional[str]]]] = {}
+        queued: List[Tuple[int, str, str]] = []
+        for pidx, text in jobs:
+            pre = prefilled.get(pidx) or {}
+            got = {p: pre[p] for p in self.order if p in pre}
+            for p in got:
+                self.stats[p]["cached"] += 1
+            if len(got) == len(self.order):
+                results[pidx] = self._assemble(pidx, got)
+                if self.on_paragraph:
+                    self.on_paragraph(pidx, results[pidx])
+                continue
+            partial[pidx] = got
+            queued.extend((pidx, text, p) for p in self.order if p not in got)
+        if not queued:
+            return results
+
+        pools = {p: ThreadPoolExecutor(max_workers=self.limits[p].concurrency, thread_name_prefix=f"sc-{p}") for p in self.order}
+        try:
+            futures = {}
+            # paragraf sırasıyla kuyruğa al: her sağlayıcı baştan sona ilerler
+            for p in self.order:
+                items = [(pidx, text) for pidx, text, q in queued if q == p]
+                if p in self.batch_providers and self.batch_tokens > 0 and self.batch_max_paras > 1:
+                    from src.spellcheck_batch import pack_batches
+                    for batch in pack_batches(items, self.batch_tokens, self.batch_max_paras):
+                        if len(batch) == 1:
+                            futures[pools[p].submit(self._call, p, batch[0][1], batch[0][0])] = ([batch[0][0]], p, False)
+                        else:
+                            futures[pools[p].submit(self._call_batch, p, batch)] = ([pidx for pidx, _ in batch], p, True)
+                else:
+                    for pidx, text in items:
+                        futures[pools[p].submit(self._call, p, text, pidx)] = ([pidx], p, False)
+            for fut in as_completed(futures):
+                pidxs, p, is_batch = futures[fut]
+                try:
+                    out = fut.result()
+                except Exception as e:
+                    out = {pidx: ([], f"{p} exception: {e}") for pidx in pidxs} if is_batch else ([], f"{p} exception: {e}")
+                for pidx in pidxs:
+                    got = partial[pidx]
+                    got[p] = out[pidx] if is_batch else out
+                    if len(got) == len(self.order):
+                        results[pidx] = self._assemble(pidx, partial.pop(pidx))
+                        if self.on_paragraph:
+                            self.on_paragraph(pidx, results[pidx])
+        finally:
+            for pool in pools.values():
+                pool.shutdown(wait=True, cancel_futures=True)
+        return results
+
+    def _assemble(self, pidx: int, got: Dict[str, Tuple[List[Dict[str, Any]], Optional[str]]]) -> Dict[str, Any]:
+        errors: Dict[str, List[Dict[str, Any]]] = {}
+        call_errors: List[Dict[str, Any]] = []
+        for p in self.order:
+            errs, err = got[p]
+            errors[p] = errs or []
+            if err:
+                call_errors.append({"paragraph_index": pidx, "source": p, "error": err})
+        out = {"errors": errors, "call_errors": call_errors}
+        skipped = [p for p in self.order if (pidx, p) in self._skipped]
+        if skipped:
+            # kota nedeniyle hiç sorulmadı: boş liste gerçek bir "hata yok" cevabı değildir
+            out["skipped"] = skipped
+        return out
+
+
+def ordered_errors(result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Sağlayıcı sırasıyla birleştirilmiş ham hata listesi (eski e1 + e2 + e3 ile aynı sıra)."""
+    errors = result.get("errors") or {}
+    order = [p for p in PROVIDER_ORDER if p in errors] + sorted(p for p in errors if p not in PROVIDER_ORDER)
+    out: List[Dict[str, Any]] = []
+    for p in order:
+        out.extend(errors[p] or [])
+    return out
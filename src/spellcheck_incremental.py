@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Spellcheck Incremental — sadece değişen paragrafları yeniden kontrol etme.
+
+Editör birkaç kelimeyi düzelttiğinde (update_nusha_line) veya yeni bir tahkik.docx
+yüklendiğinde, imla sonuçlarını tazelemenin tek yolu eskiden tüm belgeyi yeniden göndermekti.
+Burada her paragraf sonucu bir içerik parmak izi ("fp") taşır ve yeniden çalıştırmada:
+
+  - önceki per_paragraph listesi ile yeni paragraflar parmak izleri üzerinden eşlenir
+    (sıralı eşleşme + yer değiştirmiş paragraflar için fp araması),
+  - eşleşen ve eksiksiz kontrol edilmiş paragrafların sonuçları yeni indekslerine taşınır,
+  - yeni / değişmiş / eksik kontrol edilmiş paragraflar sağlayıcılara gönderilir,
+  - eşleşmeyen eski paragrafların sonuçları düşer.
+
+apply_line_edits, Nüsha 1 satır düzenlemelerini (best.raw, [start_word, end_word) aralığıyla)
+Word paragraflarının üzerine uygular: imla kontrolü düzenlenmiş canlı metni görür.
+"""
+
+import copy
+import hashlib
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.llm_cache import normalize_paragraph
+
+PROVIDER_MODEL_FIELDS = {"gemini": "gemini_model", "openai": "openai_model", "claude": "claude_model"}
+
+
+def paragraph_fingerprint(text: str) -> str:
+    return hashlib.sha1(normalize_paragraph(text).encode("utf-8")).hexdigest()[:16]
+
+
+def _entry_is_complete(entry: Dict[str, Any], previous: Dict[str, Any], providers: Iterable[str], failed: set) -> bool:
+    """Bu paragraf istenen tüm sağlayıcılarla hatasız kontrol edilmiş mi?"""
+    pidx = entry.get("paragraph_index")
+    if pidx in failed:
+        return False
+    if "checked" in entry:
+        if not entry.get("checked"):
+            return False
+        done = set(entry.get("providers") or [])
+    else:
+        # Eski spellcheck.json: kontrol kapsamı start/selection'dan, sağlayıcılar model alanlarından
+        start = previous.get("start_paragraph") or 1
+        sel = previous.get("selected_paragraphs")
+        if not isinstance(pidx, int) or pidx < start or (sel is not None and pidx not in sel):
+            return False
+        done = {p for p, f in PROVIDER_MODEL_FIELDS.items() if previous.get(f)}
+    return set(providers) <= done
+
+
+def reanchor_entry(entry: Dict[str, Any], new_pidx: int, text: str) -> Dict[str, Any]:
+    """Taşınan paragraf sonucunu yeni indeksine bağlar (paragraf ve hata kayıtları)."""
+    out = copy.deepcopy(entry)
+    out["paragraph_index"] = new_pidx
+    out["text"] = text
+    out["fp"] = paragraph_fingerprint(text)
+    for e in out.get("errors") or []:
+        if isinstance(e, dict):
+            e["paragraph_index"] = new_pidx
+    return out
+
+
+class IncrementalPlan:
+    """
+    carried : {yeni_pidx: yeniden bağlanmış per_paragraph kaydı}
+    todo    : sağlayıcılara gidecek yeni paragraf indeksleri
+    dropped : sonuçları düşen eski paragraf indeksleri
+    moved   : sırası değişmiş ama içeriği aynı kalmış (taşınan) paragraf sayısı
+    """
+
+    def __init__(self):
+        self.carried: Dict[int, Dict[str, Any]] = {}
+        self.todo: List[int] = []
+        self.dropped: List[int] = []
+        self.moved = 0
+
+    def summary(self) -> Dict[str, int]:
+        return {"carried": len(self.carried), "todo": len(self.todo), "dropped": len(self.dropped), "moved": self.moved}
+
+
+def plan_incremental(previous: Optional[Dict[str, Any]], paras: List[str], providers: Iterable[str]) -> IncrementalPlan:
+    plan = IncrementalPlan()
+    providers = list(providers)
+    old_pp = [
+        e for e in ((previous or {}).get("per_paragraph") or [])
+        if isinstance(e, dict) and isinstance(e.get("paragraph_index"), int)
+    ]
+    failed = {
+        ce.get("paragraph_index") for ce in ((previous or {}).get("call_errors") or [])
+        if isinstance(ce, dict) and ce.get("source") in providers
+    }
+    old_fps = [e.get("fp") or paragraph_fingerprint(e.get("text") or "") for e in old_pp]
+    new_fps = [paragraph_fingerprint(p) for p in paras]
+
+    match: Dict[int, int] = {}  # yeni liste indeksi -> eski liste indeksi
+    sm = SequenceMatcher(None, old_fps, new_fps, autojunk=False)
+    for tag, i1, i2, j1, j2 in sm.get_opcodes():
+        if tag == "equal":
+            for k in range(i2 - i1):
+                match[j1 + k] = i1 + k
+
+    # Yer değiştirmiş paragraflar: eşleşmemiş eski kayıtlar arasında aynı fp
+    unused: Dict[str, List[int]] = {}
+    used = set(match.values())
+    for i, fp in enumerate(old_fps):
+        if i not in used:
+            unused.setdefault(fp, []).append(i)
+    for j, fp in enumerate(new_fps):
+        if j not in match and unused.get(fp):
+            match[j] = unused[fp].pop(0)
+            plan.moved += 1
+
+    for j, p in enumerate(paras):
+        i = match.get(j)
+        if i is not None and _entry_is_complete(old_pp[i], previous or {}, providers, failed):
+            plan.carried[j + 1] = reanchor_entry(old_pp[i], j + 1, p)
+        else:
+            plan.todo.append(j + 1)
+
+    carried_old = {match[j - 1] for j in plan.carried}
+    plan.dropped = [old_pp[i]["paragraph_index"] for i in range(len(old_pp)) if i not in carried_old]
+    return plan
+
+
+def apply_line_edits(paras: List[str], lines: List[Dict[str, Any]]) -> Tuple[List[str], int]:
+    """
+    Nüsha 1 satırlarının best.raw metnini Word token akışındaki [start_word, end_word)
+    aralıklarının yerine koyar. Token akışı " ".join(paras).split() ile aynıdır (tokenize_text).
+    Token'ları birebir aynı olan satırlar düzenleme sayılmaz (hemze / tâ-i merbûta düzeltmeleri
+    normalize_ar'da kaybolacağı için karşılaştırma ham metinle yapılır); çakışan aralıklardan ilki uygulanır.
+    Döner: (yeni paragraflar, uygulanan düzenleme sayısı)
+    """
+    tokens: List[str] = []
+    bounds: List[Tuple[int, int]] = []
+    for p in paras:
+        s = len(tokens)
+        tokens.extend((p or "").split())
+        bounds.append((s, len(tokens)))
+
+    edits: List[Tuple[int, int, List[str]]] = []
+    for l in lines or []:
+        best = l.get("best") if isinstance(l, dict) else None
+        if not isinstance(best, dict):
+            continue
+        s, e, raw = best.get("start_word"), best.get("end_word"), best.get("raw")
+        if not isinstance(s, int) or not isinstance(e, int) or not isinstance(raw, str):
+            continue
+        if s < 0 or e <= s or e > len(tokens):
+            continue
+        new = raw.split()
+        if new == tokens[s:e]:
+            continue
+        edits.append((s, e, new))
+    if not edits:
+        return list(paras), 0
+
+    slots: List[List[str]] = [[t] for t in tokens]
+    applied = 0
+    last_end = -1
+    for s, e, new in sorted(edits, key=lambda x: (x[0], x[1])):
+        if s < last_end:
+            continue
+        slots[s] = new
+        for k in range(s + 1, e):
+            slots[k] = []
+        last_end = e
+        applied += 1
+
+    out = []
+    for s, e in bounds:
+        text = " ".join(t for k in range(s, e) for t in slots[k])
+        if text:
+            out.append(text)
+    return out, applied
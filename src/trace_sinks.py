@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+"""
+Trace Sinks — TTS harekeleme izleri için arka planda yazan, isteğe bağlı izleme.
+
+Eskiden TTS sıcak yolunda her parça için test_wordu.docx açılıp kaydediliyordu (belge
+büyüdükçe O(n²)) ve test_output.html istek içinde eşzamanlı yazılıyordu. Şimdi:
+
+  - Tracer.emit(kind, **alanlar) kaydı sınırlı bir kuyruğa koyar ve hemen döner; kuyruk
+    doluysa kayıt atılır (stats["dropped"]), istek asla beklemez,
+  - tek bir arka plan thread'i kayıtları sink'lere yazar: JsonlSink (satır başına bir kayıt,
+    satır tamponlu: çökmede kayıt kaybolmaz), HtmlReportSink / DocxReportSink (kayıt tutmaz;
+    raporu her TTS_TRACE_REPORT_EVERY kayıtta ve flush/kapanışta JSONL dosyasından yeniden üretir),
+  - varsayılan kapalı (TTS_TRACE boş): emit tek bir bool kontrolüdür,
+  - raporlar sonradan JSONL'den de üretilir:
+        python -m src.trace_sinks output_lines/traces/tts_trace.jsonl --html rapor.html --docx rapor.docx
+
+Kayıt türleri (services/tts_service):
+  vocalize.attempt  : text, vocalized, attempt, outcome (ok | low_diacritics | mismatch), letters, diacritics
+  vocalize.fallback : text, vocalized, segments [[son kelime, reddedilen, geri alındı mı], ...], reverted
+  tts.segments      : parts (Google'a giden, SSML'siz bölümler)
+Hepsinde ts, kind ve varsa scope (arşiv/proje) ile page.
+"""
+
+import abc
+import argparse
+import atexit
+import html
+import json
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.config import TTS_TRACE, TTS_TRACE_DIR, TTS_TRACE_QUEUE_SIZE, TTS_TRACE_REPORT_EVERY
+
+SINK_NAMES = ("jsonl", "html", "docx")
+
+
+class JsonlSink:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = open(self.path, "a", encoding="utf-8", buffering=1)
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def flush(self) -> None:
+        if not self._f.closed:
+            self._f.flush()
+
+    def close(self) -> None:
+        self._f.close()
+
+
+class _ReportSink(abc.ABC):
+    """
+    Kayıt tutmaz: rapor, source (JsonlSink) dosyasından her `every` kayıtta ve flush/close'da
+    baştan yazılır (every <= 0: sadece flush/close). Bellek süreç ömrü boyunca büyümez.
+    """
+
+    def __init__(self, path: Path, source: JsonlSink, every: int = TTS_TRACE_REPORT_EVERY):
+        self.path = Path(path)
+        self.source = source
+        self.every = int(every or 0)
+        self._pending = 0
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._pending += 1
+        if self.every > 0 and self._pending >= self.every:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._pending:
+            self.source.flush()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.render(load_records(self.source.path), self.path)
+            self._pending = 0
+
+    def close(self) -> None:
+        self.flush()
+
+    @abc.abstractmethod
+    def render(self, records: List[Dict[str, Any]], path: Path) -> None:
+        ...
+
+
+class HtmlReportSink(_ReportSink):
+    def render(self, records, path):
+        Path(path).write_text(render_html_report(records), encoding="utf-8")
+
+
+class DocxReportSink(_ReportSink):
+    def render(self, records, path):
+        render_docx_report(records, path)
+
+
+_FLUSH = object()
+_CLOSE = object()
+
+
+class Tracer:
+    """
+    sinks boşsa kapalı (enabled False). Thread-safe; yazıcı thread ilk kayıtta başlar.
+    stats: emitted / dropped / written / errors.
+    """
+
+    def __init__(self, sinks: Optional[Iterable[Any]] = None, max_queue: int = TTS_TRACE_QUEUE_SIZE):
+        self.sinks = list(sinks or [])
+        self.enabled = bool(self.sinks)
+        self.stats = {"emitted": 0, "dropped": 0, "written": 0, "errors": 0}
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, int(max_queue or 1)))
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def emit(self, kind: str, **fields: Any) -> None:
+        if not self.enabled or self._closed:
+            return
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait({"ts": time.time(), "kind": kind, **fields})
+            self.stats["emitted"] += 1
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._writer, name="trace-writer", daemon=True)
+                self._thread.start()
+
+    def _writer(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _CLOSE or isinstance(item, tuple):
+                for sink in self.sinks:
+                    self._call(sink, "close" if item is _CLOSE else "flush")
+                if isinstance(item, tuple):
+                    item[1].set()
+                if item is _CLOSE:
+                    return
+                continue
+            for sink in self.sinks:
+                if self._call(sink, "write", item):
+                    self.stats["written"] += 1
+
+    def _call(self, sink, method: str, *args) -> bool:
+        try:
+            getattr(sink, method)(*args)
+            return True
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"[WARN] İz yazılamadı ({type(sink).__name__}.{method}): {e}")
+            return False
+
+    def flush(self, timeout: Optional[float] = 10.0) -> bool:
+        """Kuyruktaki kayıtlar yazılıp sink'ler flush edilene kadar bekler (testler / kapanış)."""
+        if not self.enabled or self._thread is None or self._closed:
+            return True
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        return done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        if not self.enabled or self._closed:
+            return
+        self._closed = True
+        if self._thread is None:
+            for sink in self.sinks:
+                self._call(sink, "close")
+            return
+        self._queue.put(_CLOSE)
+        self._thread.join(timeout)
+
+
+def make_sinks(names: Iterable[str], directory: Path, stem: str = "tts_trace",
+               report_every: int = TTS_TRACE_REPORT_EVERY) -> List[Any]:
+    """Raporlar JSONL'den üretildiği için html/docx istenince JSONL sink'i de (ilk sırada) eklenir."""
+    directory = Path(directory)
+    names = [n.strip().lower() for n in names if n.strip()]
+    for name in names:
+        if name not in SINK_NAMES:
+            print(f"[WARN] Bilinmeyen iz sink'i: {name} (geçerli: {', '.join(SINK_NAMES)})")
+    if not any(n in SINK_NAMES for n in names):
+        return []
+    jsonl = JsonlSink(directory / f"{stem}.jsonl")
+    sinks: List[Any] = [jsonl]
+    if "html" in names:
+        sinks.append(HtmlReportSink(directory / f"{stem}.html", jsonl, report_every))
+    if "docx" in names:
+        sinks.append(DocxReportSink(directory / f"{stem}.docx", jsonl, report_every))
+    return sinks
+
+
+_default_tracer: Optional[Tracer] = None
+_default_lock = threading.Lock()
+
+
+def default_tracer() -> Tracer:
+    """Süreç genelinde paylaşılan izleyici; TTS_TRACE boşsa kapalı (config.TTS_TRACE_DIR)."""
+    global _default_tracer
+    with _default_lock:
+        if _default_tracer is None:
+            names = [n for n in (TTS_TRACE or "").split(",") if n.strip()]
+            _default_tracer = Tracer(make_sinks(names, TTS_TRACE_DIR) if names else [])
+            if _default_tracer.enabled:
+                atexit.register(_default_tracer.close)
+        return _default_tracer
+
+
+# --- Raporlar (JSONL'den veya report sink'lerinden) ---
+
+def load_records(path: Path) -> List[Dict[str, Any]]:
+    out = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                out.append(json.loads(line))
+            except Exception:
+                continue
+    return out
+
+
+_OUTCOME_TITLES = {
+    "ok": "Hareke Kontrolü: {attempt}. Denemede BAŞARILI",
+    "low_diacritics": "Hareke Kontrolü: {attempt}. Deneme BAŞARISIZ (Yetersiz Hareke: L={letters}, D={diacritics})",
+    "mismatch": "Hareke Kontrolü: BAŞARILI (Ancak {attempt}. Denemede Yapısal Uyumsuzluk - Durduruldu)",
+}
+
+_HTML_HEAD = """<!DOCTYPE html>
+<html lang="ar" dir="rtl">
+<head>
+<meta charset="UTF-8">
+<style>
+body { font-family: 'Traditional Arabic', 'Amiri', 'Arial', sans-serif; font-size: 20px; direction: rtl; padding: 20px; background: #f9f9f9; }
+.section { margin-bottom: 20px; padding: 15px; background: #fff; border: 1px solid #ddd; border-radius: 5px; }
+.section h2 { font-size: 18px; color: #333; border-bottom: 1px solid #eee; padding-bottom: 5px; margin-top: 0; }
+.reverted { color: red; font-weight: bold; text-decoration: underline; }
+.text-content { line-height: 1.8; }
+.meta-info { background: #e3f2fd; color: #0d47a1; padding: 10px; border-radius: 5px; margin-bottom: 15px; font-weight: bold; }
+.page { background: #e0f7fa; padding: 10px; border-radius: 5px; color: #006064; }
+</style>
+</head>
+<body>
+"""
+
+
+def record_title(rec: Dict[str, Any]) -> str:
+    if rec.get("kind") == "vocalize.attempt":
+        return _OUTCOME_TITLES.get(rec.get("outcome"), "{outcome}").format(**{"attempt": "?", "letters": "?", "diacritics": "?", **rec})
+    if rec.get("kind") == "vocalize.fallback":
+        return f"{rec.get('reverted', 0)} kelime orijinalden kurtarıldı"
+    if rec.get("kind") == "tts.segments":
+        return "Google TTS Payloads (Split / Unmerged)"
+    return str(rec.get("kind") or "Event")
+
+
+def render_html_report(records: Iterable[Dict[str, Any]]) -> str:
+    e = html.escape
+    parts = [_HTML_HEAD]
+    last_page = None
+    for rec in records:
+        page = (rec.get("scope") or "", rec.get("page") or "")
+        if any(page) and page != last_page:
+            parts.append(f'<h1 class="page">{e(" / ".join(p for p in page if p))}</h1>')
+            last_page = page
+        parts.append(f'<div class="chunk-container"><div class="meta-info">{e(record_title(rec))}</div>')
+        if rec.get("kind") == "tts.segments":
+            for i, chunk in enumerate(rec.get("parts") or []):
+                parts.append(f'<div class="section"><strong>Part {i + 1}:</strong><br>{e(chunk)}</div>')
+        else:
+            parts.append(f'<div class="section"><h2>Original Text</h2><div class="text-content">{e(rec.get("text") or "")}</div></div>')
+            parts.append(f'<div class="section"><h2>Vocalized Text (AI Raw)</h2><div class="text-content">{e(rec.get("vocalized") or "")}</div></div>')
+            reversions = [s for s in rec.get("segments") or [] if s[2]]
+            if rec.get("kind") == "vocalize.fallback":
+                parts.append('<div style="font-size:16px; color:#666;"><strong>Details (Reversions):</strong><br>')
+                for final, rejected, _ in reversions:
+                    parts.append(f'<div>Rejected: <span style="text-decoration: line-through;">{e(str(rejected))}</span> &rarr; Kept: <span class="reverted">{e(final)}</span></div>')
+                if not reversions:
+                    parts.append('<div><em>Hiçbir değişen kelime yok (Tam eşleşme veya AI kusursuz).</em></div>')
+                parts.append('</div>')
+        parts.append('</div><hr>\n')
+    parts.append("</body></html>\n")
+    return "".join(parts)
+
+
+def render_docx_report(records: Iterable[Dict[str, Any]], path: Path) -> None:
+    """Eski test_wordu.docx biçimi: her harekeleme cevabı + geri dönüş sonucu (geri alınan kelimeler kalın)."""
+    from docx import Document
+
+    doc = Document()
+    for rec in records:
+        if rec.get("kind") == "vocalize.attempt" and rec.get("vocalized"):
+            doc.add_paragraph("--- New Chunk ---")
+            doc.add_paragraph(rec["vocalized"])
+        elif rec.get("kind") == "vocalize.fallback":
+            doc.add_paragraph("--- FALLBACK RESULT (Bold = Reverted) ---")
+            p = doc.add_paragraph()
+            for final, _, reverted in rec.get("segments") or []:
+                run = p.add_run(final + " ")
+                if reverted:
+                    run.bold = True
+                    run.underline = True
+    doc.save(str(path))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="JSONL izinden HTML / DOCX raporu üretir.")
+    ap.add_argument("trace", help="tts_trace.jsonl")
+    ap.add_argument("--html", help="HTML rapor yolu")
+    ap.add_argument("--docx", help="DOCX rapor yolu")
+    args = ap.parse_args(argv)
+    records = load_records(Path(args.trace))
+    if not args.html and not args.docx:
+        args.html = str(Path(args.trace).with_suffix(".html"))
+    if args.html:
+        Path(args.html).write_text(render_html_report(records), encoding="utf-8")
+        print(f"HTML: {args.html} ({len(records)} kayıt)")
+    if args.docx:
+        render_docx_report(records, Path(args.docx))
+        print(f"DOCX: {args.docx} ({len(records)} kayıt)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -6,31 +6,25 @@ Utility functions: file operations and text normalization
 import re
 from pathlib import Path
 from typing import Tuple, Optional
-from src.config import PAGES_DIR, LINES_DIR, OCR_DIR, LINES_MANIFEST, ALIGNMENT_JSON, VIEWER_HTML, INDEX_HTML, SPELLCHECK_JSON
+from src.project_context import ProjectContext, default_context
 
 
 # =========================
 # HARD CLEANUP
 # =========================
-def hard_cleanup_output():
-    """Deletes old pages/lines/ocr + manifests + viewer/alignment/index/spellcheck."""
-    for p in PAGES_DIR.glob("*"):
-        if p.is_file():
-            p.unlink(missing_ok=True)
+def hard_cleanup_output(ctx: Optional[ProjectContext] = None, nusha_index: int = 1):
+    """Deletes old pages/lines/ocr + manifests + viewer/alignment/index/spellcheck (ctx'in nüshası; varsayılan output_lines)."""
+    ctx = ctx or default_context()
+    for d in (ctx.pages_dir(nusha_index), ctx.lines_dir(nusha_index), ctx.ocr_dir(nusha_index)):
+        for p in d.glob("*"):
+            if p.is_file():
+                p.unlink(missing_ok=True)
 
-    for p in LINES_DIR.glob("*"):
-        if p.is_file():
-            p.unlink(missing_ok=True)
-
-    for p in OCR_DIR.glob("*"):
-        if p.is_file():
-            p.unlink(missing_ok=True)
-
-    LINES_MANIFEST.unlink(missing_ok=True)
-    ALIGNMENT_JSON.unlink(missing_ok=True)
-    VIEWER_HTML.unlink(missing_ok=True)
-    INDEX_HTML.unlink(missing_ok=True)
-    SPELLCHECK_JSON.unlink(missing_ok=True)
+    ctx.lines_manifest(nusha_index).unlink(missing_ok=True)
+    ctx.alignment_json(nusha_index).unlink(missing_ok=True)
+    ctx.viewer_html(nusha_index).unlink(missing_ok=True)
+    ctx.index_html.unlink(missing_ok=True)
+    ctx.spellcheck_json.unlink(missing_ok=True)
 
 
 # =========================
@@ -59,34 +53,38 @@ def take_prefix_words(s: str, n: int) -> str:
 # =========================
 # File existence checks
 # =========================
-def check_pages_exist() -> Tuple[bool, int]:
+def check_pages_exist(ctx: Optional[ProjectContext] = None, nusha_index: int = 1) -> Tuple[bool, int]:
     """Pages klasöründe PNG dosyaları var mı kontrol et"""
-    pages = list(PAGES_DIR.glob("*.png"))
+    pages = list((ctx or default_context()).pages_dir(nusha_index).glob("*.png"))
     return len(pages) > 0, len(pages)
 
 
-def check_lines_exist() -> Tuple[bool, int]:
+def check_lines_exist(ctx: Optional[ProjectContext] = None, nusha_index: int = 1) -> Tuple[bool, int]:
     """Lines klasöründe PNG dosyaları ve manifest var mı kontrol et"""
-    lines = list(LINES_DIR.glob("*.png"))
-    manifest_exists = LINES_MANIFEST.exists()
+    ctx = ctx or default_context()
+    lines = list(ctx.lines_dir(nusha_index).glob("*.png"))
+    manifest_exists = ctx.lines_manifest(nusha_index).exists()
     return len(lines) > 0 and manifest_exists, len(lines)
 
 
-def check_ocr_exist() -> Tuple[bool, int]:
+def check_ocr_exist(ctx: Optional[ProjectContext] = None, nusha_index: int = 1) -> Tuple[bool, int]:
     """OCR klasöründe txt dosyaları var mı kontrol et"""
-    ocr_files = list(OCR_DIR.glob("*.txt"))
+    ocr_files = list((ctx or default_context()).ocr_dir(nusha_index).glob("*.txt"))
     return len(ocr_files) > 0, len(ocr_files)
 
 
-def check_spellcheck_exist() -> Tuple[bool, Optional[Path]]:
+def check_spellcheck_exist(ctx: Optional[ProjectContext] = None) -> Tuple[bool, Optional[Path]]:
     """Spellcheck JSON dosyası var mı kontrol et"""
-    exists = SPELLCHECK_JSON.exists()
-    return exists, SPELLCHECK_JSON if exists else None
+    path = (ctx or default_context()).spellcheck_json
+    exists = path.exists()
+    return exists, path if exists else None
 
 
-def check_alignment_exist() -> Tuple[bool, Optional[Path]]:
+def check_alignment_exist(ctx: Optional[ProjectContext] = None, nusha_index: int = 1) -> Tuple[bool, Optional[Path]]:
     """Alignment JSON dosyası var mı kontrol et"""
-    exists = ALIGNMENT_JSON.exists()
+    path = (ctx or default_context()).alignment_json(nusha_index)
+    exists = path.exists()
+    return exists, path if exists else None
 
 # =========================
 # ATOMIC FILE OPERATIONS
@@ -20,6 +20,8 @@ from src.config import (
     NUSHA4_LINES_MANIFEST,
 )
 from src.utils import normalize_ar
+from src.payload_v2 import compact_line, compact_payload
+from src.witnesses import witness_indices, witness_key
 # Import detect_line_skips locally or with try-except to avoid potential circular imports if alignment.py changes
 try:
     from src.alignment import detect_line_skips
@@ -486,7 +488,13 @@ def write_viewer_html(
     except Exception:
         pass
     
-    data_json = json.dumps(alignment, ensure_ascii=False)
+    # v2: nüshalar arası bağlantılar kopya yerine referans olarak gömülür; JS tarafı resolveRef ile çözer
+    view_list = alignment.get("aligned_view")
+    view_src = next((k for k in witness_indices(alignment) if alignment.get(witness_key(k)) is view_list), 1)
+    embedded = compact_payload(alignment)
+    if isinstance(view_list, list):
+        embedded["aligned_view"] = [compact_line(it, view_src) for it in view_list]
+    data_json = json.dumps(embedded, ensure_ascii=False)
 
     html = """<!doctype html>
 <html lang="tr">
@@ -965,6 +973,26 @@ def write_viewer_html(
 
 <script>
 const DATA = __DATA_JSON_PLACEHOLDER__;
+// v2 payload: cross-nusha links are {n, l, s, e, ov} references, resolved on first use
+const _refIndex = {};
+function witnessLines(n) {
+  return (n === 1 ? DATA.aligned : (n === 2 ? DATA.aligned_alt : DATA["aligned_alt" + n])) || [];
+}
+function resolveRef(x, ocr) {
+  if (!x || typeof x !== "object" || x.n == null || x.l == null) return x;
+  let idx = _refIndex[x.n];
+  if (!idx) {
+    idx = new Map();
+    witnessLines(x.n).forEach(t => { if (t && t.line_no != null) idx.set(t.line_no, t); });
+    _refIndex[x.n] = idx;
+  }
+  const t = idx.get(x.l);
+  if (!t) return null;
+  const out = { line_no: t.line_no, line_image: t.line_image || "", ocr_text: t.ocr_text || "" };
+  if (!ocr) out.best = t.best || {};
+  if (x.ov != null) out.overlap = x.ov;
+  return out;
+}
 // Primary (Nüsha 1) mapping (may include localStorage overrides)
 let mapping = DATA.aligned_view || DATA.aligned || [];
 // Nüsha 2 mapping
@@ -3706,10 +3734,10 @@ function openCompare(lineNo, targetNusha) {
   function pickArr(obj, ocrField, listField, ptrField) {
     if (!obj || typeof obj !== "object") return [];
     const o = obj[ocrField];
-    if (Array.isArray(o) && o.length) return o;
+    if (Array.isArray(o) && o.length) return o.map(x => resolveRef(x, true)).filter(Boolean);
     const l = obj[listField];
-    if (Array.isArray(l) && l.length) return l;
-    const p = obj[ptrField];
+    if (Array.isArray(l) && l.length) return l.map(x => resolveRef(x, false)).filter(Boolean);
+    const p = resolveRef(obj[ptrField], false);
     if (p && typeof p === "object" && p.line_image) return [p];
     return [];
   }
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Vocalization — TTS öncesi harekeleme (tashkeel) için ortak prompt, kalıcı önbellek ve
+içerik tanımlı parçalama. services/tts_service.py kullanır (tts_server.py de aynı servise gider).
+
+Editörler mukabele sırasında aynı satırları defalarca dinliyor; her istek aynı harekesiz metni
+yeniden OpenAI'ye gönderiyordu. Burada:
+
+  - harekelenmiş parça LLMResponseCache'te (llm_cache.sqlite, sağlayıcı "tashkeel") saklanır;
+    anahtar: normalize metin + model + prompt sürümü (VOCALIZE_PROMPT_VERSION),
+  - stable_chunks token akışını içerik tanımlı sınırlarla (cümle sonu veya kelime özeti)
+    böler: paragrafta tek kelime düzeltilince sadece o kelimenin parçası (nadiren bir komşusu)
+    değişir, diğer parçalar önbellekten gelir. Sabit 75/300'lük pencerelerde tek kelimelik
+    ekleme sonraki bütün parçaları kaydırıyordu.
+
+Doğrulamadan geçmeyen cevaptan kelime kelime onarılan (geri dönüş) sonuç kalıcı önbelleğe
+yazılmaz; sadece süreç içinde kısa süre (FALLBACK_TTL_S) tutulur, sonra model yeniden sorulur.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from src.llm_cache import LLMResponseCache, cache_key, default_llm_cache, prompt_version
+from src.utils import normalize_ar
+
+VOCALIZE_SYSTEM_PROMPT = (
+    "You are an expert Arabic linguist. "
+    "Your task is to add full diacritics (Tashkeel) AND correct/add proper punctuation to the following Arabic text. "
+    "Do NOT change any words or their order. "
+    "Return ONLY the fully vocalized and punctuated text."
+)
+
+CACHE_PROVIDER = "tashkeel"
+
+# Parça sonu sayılan noktalama (kelimenin sonunda)
+_SENTENCE_END = (".", "!", "?", "؟", "؛", ":", "۔")
+
+
+def vocalize_messages(text_chunk: str) -> List[dict]:
+    return [
+        {"role": "system", "content": VOCALIZE_SYSTEM_PROMPT},
+        {"role": "user", "content": text_chunk},
+    ]
+
+
+VOCALIZE_PROMPT_VERSION = prompt_version(lambda t: json.dumps(vocalize_messages(t), ensure_ascii=False))
+
+
+def cached_vocalization(text_chunk: str, model: str, cache: Optional[LLMResponseCache] = None) -> Optional[str]:
+    cache = cache if cache is not None else default_llm_cache()
+    if cache is None or not (text_chunk or "").strip():
+        return None
+    hit = cache.get(CACHE_PROVIDER, model, VOCALIZE_PROMPT_VERSION, text_chunk)
+    return hit if isinstance(hit, str) and hit.strip() else None
+
+
+def store_vocalization(text_chunk: str, model: str, vocalized: str, cache: Optional[LLMResponseCache] = None) -> None:
+    """Sadece doğrulamadan geçmiş model cevapları saklanır (geri dönüş için store_fallback)."""
+    cache = cache if cache is not None else default_llm_cache()
+    if cache is None or not (vocalized or "").strip():
+        return
+    try:
+        cache.put(CACHE_PROVIDER, model, VOCALIZE_PROMPT_VERSION, text_chunk, vocalized)
+    except Exception as e:
+        print(f"[WARN] Harekeleme önbelleğine yazılamadı: {e}")
+
+
+FALLBACK_TTL_S = 600.0
+FALLBACK_MAX_ENTRIES = 512
+
+_fallback_lock = threading.Lock()
+_fallbacks: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+
+def _fallback_key(text_chunk: str, model: str) -> str:
+    return cache_key(CACHE_PROVIDER + ":fallback", model, VOCALIZE_PROMPT_VERSION, text_chunk)
+
+
+def cached_fallback(text_chunk: str, model: str, now: Optional[float] = None) -> Optional[str]:
+    """Süresi dolmamış geri dönüş sonucu (aynı parça kısa sürede tekrar dinlenince model yeniden sorulmaz)."""
+    now = time.monotonic() if now is None else now
+    key = _fallback_key(text_chunk, model)
+    with _fallback_lock:
+        hit = _fallbacks.get(key)
+        if hit is None:
+            return None
+        if hit[0] <= now:
+            del _fallbacks[key]
+            return None
+        return hit[1]
+
+
+def store_fallback(text_chunk: str, model: str, merged: str, now: Optional[float] = None) -> None:
+    if not (merged or "").strip():
+        return
+    now = time.monotonic() if now is None else now
+    key = _fallback_key(text_chunk, model)
+    with _fallback_lock:
+        _fallbacks[key] = (now + FALLBACK_TTL_S, merged)
+        _fallbacks.move_to_end(key)
+        while len(_fallbacks) > FALLBACK_MAX_ENTRIES:
+            _fallbacks.popitem(last=False)
+
+
+def _is_boundary(token: str, divisor: int) -> bool:
+    if token.endswith(_SENTENCE_END):
+        return True
+    key = normalize_ar(token) or token
+    return int(hashlib.md5(key.encode("utf-8")).hexdigest()[:8], 16) % divisor == 0
+
+
+def stable_chunks(tokens: List[str], max_size: int, min_size: Optional[int] = None, divisor: int = 16) -> List[Tuple[int, int]]:
+    """
+    Token listesini [start, end) aralıklarına böler. Bir parça en az min_size (varsayılan
+    max_size * 2 // 5) token olduktan sonra cümle sonu veya özeti divisor'a bölünen bir kelimede
+    kapanır; max_size'ı asla aşmaz. Sınırlar kelimelerin kendisine bağlı olduğu için bir
+    düzenleme sonrası parçalar ilk ortak sınırdan itibaren yeniden aynı olur.
+    """
+    max_size = max(1, int(max_size))
+    min_size = max(1, min(max_size, int(min_size) if min_size else max_size * 2 // 5))
+    out: List[Tuple[int, int]] = []
+    start = 0
+    for i, tok in enumerate(tokens):
+        n = i + 1 - start
+        if n >= max_size or (n >= min_size and _is_boundary(tok, divisor)):
+            out.append((start, i + 1))
+            start = i + 1
+    if start < len(tokens):
+        out.append((start, len(tokens)))
+    return out
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+Witness Pair Cache — nüsha çiftleri arasındaki OCR↔OCR kelime hizalamasının ortak önbelleği.
+
+Aynı iki nüsha için aynı global hizalama eskiden birkaç kez hesaplanıyordu:
+  - detect_line_skips(A, B) ve detect_line_skips(B, A) (her yön ayrı opcodes),
+  - attach_ocr_to_ocr_links içindeki satır çifti sayımları,
+  - debug_skips.generate_full_matrix (Dizgi ↔ Nüsha 1).
+
+Burada her SIRASIZ çift için hizalama bir kez hesaplanır, eşleşen bloklar (equal opcodes)
+diske yazılır ve tüm tüketiciler aynı nesneden beslenir. Anahtar, iki tarafın normalize token
+dizilerinin özetidir; metin değişmedikçe önbellek geçerlidir.
+
+Bellekteki çiftler LRU ile sınırlıdır (max_entries); disk klasörü her yazımda yaş ve toplam
+boyuta göre budanır (en uzun süredir kullanılmayan dosya önce gider; diskten okunan dosyanın
+mtime'ı yenilenir). default_pair_cache klasör başına bir nesne tutar, en fazla DEFAULT_CACHES_KEEP.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from rapidfuzz.distance import Levenshtein
+
+from src.utils import normalize_ar, write_json_atomic
+
+PAIR_CACHE_VERSION = 1
+PAIR_CACHE_MEM_ENTRIES = 64
+DEFAULT_CACHES_KEEP = 8
+
+
+class WitnessTokens:
+    """
+    Bir nüshanın (veya dizginin) satırlarından düzleştirilmiş normalize token dizisi.
+      norms[k]     : k. token (boş normalizasyonlar atlanır)
+      line_of[k]   : token'ın geldiği satırın listedeki indeksi
+      word_of[k]   : satır içindeki kelime sırası (split() indeksi)
+    """
+
+    def __init__(self, lines: List[Dict[str, Any]], text_field: str = "ocr_text"):
+        self.norms: List[str] = []
+        self.line_of: List[int] = []
+        self.word_of: List[int] = []
+        for li, it in enumerate(lines or []):
+            txt = _line_text(it, text_field)
+            for wi, w in enumerate(txt.split()):
+                n = normalize_ar(w)
+                if not n:
+                    continue
+                self.norms.append(n)
+                self.line_of.append(li)
+                self.word_of.append(wi)
+        self.fingerprint = hashlib.sha1("\n".join(self.norms).encode("utf-8")).hexdigest()
+
+    def __len__(self) -> int:
+        return len(self.norms)
+
+
+def _line_text(it: Any, text_field: str) -> str:
+    if not isinstance(it, dict):
+        return ""
+    if text_field == "ref_text":
+        return ((it.get("best") or {}).get("raw") or "") if isinstance(it.get("best"), dict) else ""
+    return it.get(text_field) or ""
+
+
+def _compute_blocks(a: List[str], b: List[str]) -> List[Tuple[int, int, int]]:
+    """equal opcode blokları: [(i1, j1, n), ...]"""
+    if not a or not b:
+        return []
+    unique_words = sorted(set(a) | set(b))
+    word2char = {w: chr(0xE000 + i) for i, w in enumerate(unique_words)}
+    s_a = "".join(word2char[w] for w in a)
+    s_b = "".join(word2char[w] for w in b)
+    return [
+        (i1, j1, i2 - i1)
+        for tag, i1, i2, j1, j2 in Levenshtein.opcodes(s_a, s_b)
+        if tag == "equal"
+    ]
+
+
+class PairAlignment:
+    """
+    Bir sırasız çiftin hizalaması (kanonik yönde: a = parmak izi küçük olan taraf).
+    Tüketiciler WitnessPairCache.get ile kendi yönlerinde bir PairView alır.
+    """
+
+    def __init__(self, fp_a: str, fp_b: str, len_a: int, len_b: int, blocks: List[Tuple[int, int, int]]):
+        self.fp_a = fp_a
+        self.fp_b = fp_b
+        self.len_a = len_a
+        self.len_b = len_b
+        self.blocks = blocks
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "version": PAIR_CACHE_VERSION,
+            "fp_a": self.fp_a,
+            "fp_b": self.fp_b,
+            "len_a": self.len_a,
+            "len_b": self.len_b,
+            "blocks": [list(b) for b in self.blocks],
+        }
+
+    @classmethod
+    def from_json(cls, d: Dict[str, Any]) -> "PairAlignment":
+        return cls(d["fp_a"], d["fp_b"], int(d["len_a"]), int(d["len_b"]), [tuple(b) for b in d.get("blocks", [])])
+
+
+class PairView:
+    """Bir çift hizalamanın src→tgt yönündeki görünümü."""
+
+    def __init__(self, pair: PairAlignment, src: WitnessTokens, tgt: WitnessTokens, swapped: bool):
+        self.pair = pair
+        self.src = src
+        self.tgt = tgt
+        self.swapped = swapped
+
+    def matches(self):
+        """(src_token_idx, tgt_token_idx) eşleşmeleri, src sırasında."""
+        for i1, j1, n in self.pair.blocks:
+            if self.swapped:
+                i1, j1 = j1, i1
+            for k in range(n):
+                yield i1 + k, j1 + k
+
+    def matched_src(self) -> List[bool]:
+        flags = [False] * len(self.src)
+        for i, _ in self.matches():
+            flags[i] = True
+        return flags
+
+    def matched_tgt(self) -> List[bool]:
+        flags = [False] * len(self.tgt)
+        for _, j in self.matches():
+            flags[j] = True
+        return flags
+
+    def line_pair_counts(self) -> Dict[Tuple[int, int], int]:
+        """(src_line_idx, tgt_line_idx) -> ortak token sayısı."""
+        out: Dict[Tuple[int, int], int] = {}
+        l_src, l_tgt = self.src.line_of, self.tgt.line_of
+        for i, j in self.matches():
+            key = (l_src[i], l_tgt[j])
+            out[key] = out.get(key, 0) + 1
+        return out
+
+
+class WitnessPairCache:
+    """
+    Sırasız nüsha çiftleri için hizalama önbelleği (bellek + disk).
+    cache_dir None ise sadece bellekte tutulur. max_entries: bellekteki çift sayısı (LRU);
+    max_disk_bytes / max_age_s: disk klasörü sınırları (0 = sınırsız).
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = None,
+        max_entries: int = PAIR_CACHE_MEM_ENTRIES,
+        max_disk_bytes: int = 0,
+        max_age_s: float = 0,
+    ):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_entries = max(1, int(max_entries or 1))
+        self.max_disk_bytes = max(0, int(max_disk_bytes or 0))
+        self.max_age_s = max(0.0, float(max_age_s or 0))
+        self._mem: "OrderedDict[Tuple[str, str], PairAlignment]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.pruned = 0
+
+    def _path(self, fp_a: str, fp_b: str) -> Optional[Path]:
+        if not self.cache_dir:
+            return None
+        return self.cache_dir / f"{fp_a[:16]}_{fp_b[:16]}.json"
+
+    def _load(self, fp_a: str, fp_b: str) -> Optional[PairAlignment]:
+        path = self._path(fp_a, fp_b)
+        if not path or not path.exists():
+            return None
+        try:
+            d = json.loads(path.read_text(encoding="utf-8"))
+            if d.get("version") != PAIR_CACHE_VERSION or d.get("fp_a") != fp_a or d.get("fp_b") != fp_b:
+                return None
+            pair = PairAlignment.from_json(d)
+            if self.max_disk_bytes or self.max_age_s:
+                os.utime(path, None)  # budamada "son kullanım"
+            return pair
+        except Exception as e:
+            print(f"[WARN] Pair cache okunamadı ({path.name}): {e}")
+            return None
+
+    def _store(self, pair: PairAlignment) -> None:
+        path = self._path(pair.fp_a, pair.fp_b)
+        if not path:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            write_json_atomic(path, pair.to_json(), indent=None)
+        except Exception as e:
+            print(f"[WARN] Pair cache yazılamadı ({path.name}): {e}")
+            return
+        self.prune_disk(keep=path)
+
+    def prune_disk(self, keep: Optional[Path] = None, now: Optional[float] = None) -> int:
+        """Yaşı max_age_s'i aşan, sonra toplam max_disk_bytes'a inene kadar en eski dosyaları siler."""
+        if not self.cache_dir or not (self.max_disk_bytes or self.max_age_s):
+            return 0
+        now = time.time() if now is None else now
+        files = []
+        for f in self.cache_dir.glob("*.json"):
+            try:
+                st = f.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, f))
+        files.sort(key=lambda x: x[0])
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for mtime, size, f in files:
+            too_old = self.max_age_s and now - mtime > self.max_age_s
+            too_big = self.max_disk_bytes and total > self.max_disk_bytes
+            if not (too_old or too_big) or f == keep:
+                continue
+            try:
+                f.unlink()
+            except OSError as e:
+                print(f"[WARN] Pair cache silinemedi ({f.name}): {e}")
+                continue
+            total -= size
+            removed += 1
+        self.pruned += removed
+        return removed
+
+    def get(self, src: WitnessTokens, tgt: WitnessTokens) -> PairView:
+        """src→tgt görünümü; hizalama çift başına bir kez hesaplanır."""
+        swapped = src.fingerprint > tgt.fingerprint
+        a, b = (tgt, src) if swapped else (src, tgt)
+        key = (a.fingerprint, b.fingerprint)
+
+        with self._lock:
+            pair = self._mem.get(key)
+            if pair is None:
+                pair = self._load(*key)
+                if pair is None:
+                    self.misses += 1
+                    pair = PairAlignment(a.fingerprint, b.fingerprint, len(a), len(b), _compute_blocks(a.norms, b.norms))
+                    self._store(pair)
+                else:
+                    self.hits += 1
+                self._mem[key] = pair
+                while len(self._mem) > self.max_entries:
+                    self._mem.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self.hits += 1
+                self._mem.move_to_end(key)
+        return PairView(pair, src, tgt, swapped)
+
+    def get_lines(
+        self,
+        src_lines: List[Dict[str, Any]],
+        tgt_lines: List[Dict[str, Any]],
+        src_field: str = "ocr_text",
+        tgt_field: str = "ocr_text",
+    ) -> PairView:
+        return self.get(WitnessTokens(src_lines, src_field), WitnessTokens(tgt_lines, tgt_field))
+
+
+_default_caches: "OrderedDict[Path, WitnessPairCache]" = OrderedDict()
+_default_caches_lock = threading.Lock()
+
+
+def default_pair_cache(cache_dir: Optional[Path] = None) -> WitnessPairCache:
+    """
+    Süreç genelinde paylaşılan, diske yazan önbellek; klasör başına bir tane
+    (varsayılan config.PAIR_ALIGN_CACHE_DIR, ProjectContext ile ctx.pair_cache_dir).
+    Sınırlar config.PAIR_ALIGN_CACHE_*'tan; en son kullanılan DEFAULT_CACHES_KEEP klasör bellekte kalır.
+    """
+    from src.config import (
+        PAIR_ALIGN_CACHE_DIR, PAIR_ALIGN_CACHE_MAX_AGE_DAYS, PAIR_ALIGN_CACHE_MAX_MB, PAIR_ALIGN_CACHE_MEM_ENTRIES,
+    )
+    key = Path(cache_dir if cache_dir is not None else PAIR_ALIGN_CACHE_DIR)
+    with _default_caches_lock:
+        cache = _default_caches.get(key)
+        if cache is None:
+            cache = _default_caches[key] = WitnessPairCache(
+                key,
+                max_entries=PAIR_ALIGN_CACHE_MEM_ENTRIES,
+                max_disk_bytes=PAIR_ALIGN_CACHE_MAX_MB * 1024 * 1024,
+                max_age_s=PAIR_ALIGN_CACHE_MAX_AGE_DAYS * 86400,
+            )
+            while len(_default_caches) > DEFAULT_CACHES_KEEP:
+                _default_caches.popitem(last=False)
+        else:
+            _default_caches.move_to_end(key)
+    return cache
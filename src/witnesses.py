@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Witnesses — N nüsha için payload anahtar ve bağlantı alanı adlandırması.
+
+Nüsha sayısı eskiden 4'e sabitti (aligned_alt / aligned_alt3 / aligned_alt4 ve her çift için
+elle yazılmış alan adları). Buradaki yardımcılar aynı adlandırmayı herhangi bir k için üretir;
+k <= 4 için çıktı eski şemayla birebir aynıdır, böylece viewer ve kayıtlı alignment.json
+dosyaları değişmeden çalışır.
+
+  witness_key(1) = "aligned", witness_key(2) = "aligned_alt", witness_key(k) = f"aligned_alt{k}"
+  link_field(src, tgt): src nüshasındaki bir satırın tgt nüshasını gösteren alanı
+    - tgt == 1                  -> "alt"
+    - tgt == 2 ve src == 1      -> "alt"   (geriye uyum: N1 ↔ N2 her iki tarafta "alt")
+    - tgt == 2                  -> "alt2"
+    - diğer                     -> f"alt{tgt}"
+"""
+
+from typing import Any, Dict, List
+
+PIVOT_WITNESS = 1
+
+
+def witness_key(k: int) -> str:
+    if k == 1:
+        return "aligned"
+    if k == 2:
+        return "aligned_alt"
+    return f"aligned_alt{k}"
+
+
+def has_key(k: int) -> str:
+    return "has_alt" if k == 2 else f"has_alt{k}"
+
+
+def lines_count_key(k: int) -> str:
+    if k == 1:
+        return "lines_count"
+    return "lines_count_alt" if k == 2 else f"lines_count_alt{k}"
+
+
+def link_field(src: int, tgt: int) -> str:
+    if tgt == 1:
+        return "alt"
+    if tgt == 2:
+        return "alt" if src == 1 else "alt2"
+    return f"alt{tgt}"
+
+
+def skips_key(src: int, tgt: int) -> str:
+    return f"skips_n{src}_vs_n{tgt}"
+
+
+def witness_indices(payload: Dict[str, Any]) -> List[int]:
+    """Payload'da satırı olan nüsha indeksleri (1 her zaman dahil), sıralı."""
+    if not isinstance(payload, dict):
+        return [PIVOT_WITNESS]
+    out = {PIVOT_WITNESS}
+    for k in payload.get("witness_indices") or []:
+        if isinstance(k, int) and k > 1:
+            out.add(k)
+    for key, val in payload.items():
+        if not key.startswith("aligned_alt") or not isinstance(val, list) or not val:
+            continue
+        suffix = key[len("aligned_alt"):]
+        if suffix == "":
+            out.add(2)
+        elif suffix.isdigit():
+            out.add(int(suffix))
+    return sorted(out)
@@ -15,6 +15,13 @@ const humanizeMessage = (msg: string) => {
     return msg;
 };
 
+// Kalan süre (progress olayındaki eta_s)
+const formatEta = (seconds: number) => {
+    if (seconds < 60) return `${Math.ceil(seconds)} sn`;
+    const minutes = Math.ceil(seconds / 60);
+    return minutes < 60 ? `${minutes} dk` : `${Math.floor(minutes / 60)} sa ${minutes % 60} dk`;
+};
+
 export default function CompactListDashboard() {
     const params = useParams();
     const projectId = params.id as string;
@@ -154,18 +161,33 @@ export default function CompactListDashboard() {
         setOutputPreviews(prev => ({ ...prev, [key]: !prev[key] }));
     };
 
+    // Sunucu olayları (SSE): yoklama yok. Bağlanınca (snapshot) ve iş durumu değişince bir kez
+    // yenilenir; aşama ilerlemesi (sayılar, ETA) olaydan doğrudan işlenir.
     useEffect(() => {
-        const init = async () => {
+        const refresh = async () => {
             const data = await fetchStatus();
             if (data) fetchPipelineStatus(data);
         };
-        init();
 
-        const interval = setInterval(async () => {
-            const data = await fetchStatus();
-            if (data) fetchPipelineStatus(data);
-        }, 2000);
-        return () => clearInterval(interval);
+        const source = new EventSource(`http://127.0.0.1:8000/api/projects/${projectId}/events`);
+        source.addEventListener('snapshot', () => { refresh(); });
+        source.addEventListener('job', () => { refresh(); });
+        source.addEventListener('progress', (e) => {
+            const ev = JSON.parse((e as MessageEvent).data);
+            setStatus((prev: any) => {
+                const key = `nusha_${ev.nusha_index}`;
+                if (!prev?.nushas?.[key]) return prev;
+                const progress = {
+                    status: 'processing', percent: ev.percent, message: ev.message,
+                    stage: ev.stage, done: ev.done, total: ev.total, eta_s: ev.eta_s
+                };
+                return {
+                    ...prev, busy: true, step: ev.kind, message: ev.message, progress: ev.percent, active_nusha: ev.nusha_index,
+                    nushas: { ...prev.nushas, [key]: { ...prev.nushas[key], progress } }
+                };
+            });
+        });
+        return () => source.close();
     }, [projectId]);
 
     // --- ACTIONS ---
@@ -257,6 +279,14 @@ export default function CompactListDashboard() {
         setTimeout(() => setProcessing(null), 2000);
     };
 
+    // Projenin çalışan / kuyruktaki işlerini iptal et (iş kuyruğu)
+    const cancelJobs = async () => {
+        try {
+            await fetch(`http://127.0.0.1:8000/api/projects/${projectId}/jobs/cancel`, { method: 'POST' });
+            fetchStatus();
+        } catch (e) { console.error("Cancel failed", e); }
+    };
+
     const deletePipelineStep = async (step: string, nushaIndex: number, restart: boolean = false) => {
         if (!confirm("Bu işlem bu aşamadaki verileri sıfırlayacak. Emin misiniz?")) return;
 
@@ -431,8 +461,21 @@ export default function CompactListDashboard() {
                                                     /* PROGRESS BAR */
                                                     <div className="w-full">
                                                         <div className="flex justify-between text-[10px] font-bold text-blue-600 mb-1">
-                                                            <span>{humanizeMessage(nusha.progress?.message)}</span>
-                                                            <span>%{nusha.progress?.percent || 0}</span>
+                                                            <span>
+                                                                {humanizeMessage(nusha.progress?.message)}
+                                                                {nusha.progress?.total > 0 && ` ${nusha.progress.done ?? 0}/${nusha.progress.total}`}
+                                                            </span>
+                                                            <span className="flex items-center gap-2">
+                                                                %{nusha.progress?.percent || 0}
+                                                                {nusha.progress?.eta_s > 0 && (
+                                                                    <span className="font-normal text-blue-400">~{formatEta(nusha.progress.eta_s)}</span>
+                                                                )}
+                                                                {status?.busy && status?.active_nusha === n && (
+                                                                    <button onClick={cancelJobs} className="text-red-500 hover:text-red-700" title="İşi iptal et">
+                                                                        <XCircle size={12} />
+                                                                    </button>
+                                                                )}
+                                                            </span>
                                                         </div>
                                                         <div className="w-full bg-blue-100 rounded-full h-1.5">
                                                             <div className="bg-blue-600 h-1.5 rounded-full transition-all duration-500"
@@ -863,7 +906,7 @@ export default function CompactListDashboard() {
                                                                     <div className="bg-amber-50 border border-amber-100 rounded p-2">
                                                                         <div className="text-[10px] font-bold text-amber-800 mb-1">⚙️ Çalışan Fonksiyonlar ({alignData.functions_executed?.length || 0} adım)</div>
                                                                         <div className="space-y-1">
-                                                                            {alignData.functions_executed?.map((fn: { name: string, description: string, output: string, data?: any }, idx: number) => {
+                                                                            {alignData.functions_executed?.map((fn: { name: string, description: string, output: string, data?: any, wall_ms?: number, peak_kb?: number }, idx: number) => {
                                                                                 const fnKey = `${n}-fn-${idx}`;
                                                                                 const isExpanded = expandedFunctions[fnKey];
                                                                                 const hasData = fn.data && Object.keys(fn.data).length > 0;
@@ -885,6 +928,11 @@ export default function CompactListDashboard() {
                                                                                                     <span className="font-mono font-bold text-amber-900">{fn.name}</span>
                                                                                                     <span className="text-slate-400">—</span>
                                                                                                     <span className="text-slate-600">{fn.description}</span>
+                                                                                                    {fn.wall_ms !== undefined && (
+                                                                                                        <span className="font-mono text-[9px] text-slate-400">
+                                                                                                            {fn.wall_ms.toFixed(1)} ms{fn.peak_kb !== undefined ? ` · ${(fn.peak_kb / 1024).toFixed(1)} MB` : ""}
+                                                                                                        </span>
+                                                                                                    )}
                                                                                                 </div>
                                                                                                 <div className="text-[9px] text-green-700 bg-green-50 rounded px-1.5 py-0.5 mt-0.5 inline-block">
                                                                                                     → {fn.output}
@@ -104,14 +104,49 @@ export default function ProjectsPage() {
 
     useEffect(() => { fetchProjects(); }, []);
 
-    // Polling for processing projects
+    // Bütün projelerin olayları (SSE): iş durumu değişince o projenin durumu bir kez alınır,
+    // aşama ilerlemesi olaydan doğrudan işlenir (yoklama yok)
     useEffect(() => {
-        if (!processing) return;
-        const interval = setInterval(() => {
-            projects.forEach(p => fetchProjectStatus(p.id));
-        }, 3000);
-        return () => clearInterval(interval);
-    }, [processing, projects, fetchProjectStatus]);
+        const source = new EventSource(`${API}/api/events`);
+        source.addEventListener('job', (e) => {
+            const ev = JSON.parse((e as MessageEvent).data);
+            fetchProjectStatus(ev.project_id);
+        });
+        source.addEventListener('progress', (e) => {
+            const ev = JSON.parse((e as MessageEvent).data);
+            setProjectStatuses(prev => {
+                const status = prev[ev.project_id];
+                const key = `nusha_${ev.nusha_index}`;
+                if (!status?.nushas?.[key]) return prev;
+                const progress = { status: 'processing', percent: ev.percent, message: ev.message, done: ev.done, total: ev.total, eta_s: ev.eta_s };
+                return { ...prev, [ev.project_id]: { ...status, nushas: { ...status.nushas, [key]: { ...status.nushas[key], progress } } } };
+            });
+        });
+        return () => source.close();
+    }, [fetchProjectStatus]);
+
+    // Kuyruğa alınan işler bitene kadar bekler ('job' olayları; bağlanmadan önce biten işler snapshot'ta sorgulanır)
+    const waitForJobs = (projectId: string, jobIds: string[]) => new Promise<void>((resolve) => {
+        const pending = new Set(jobIds);
+        if (pending.size === 0) return resolve();
+        const source = new EventSource(`${API}/api/projects/${projectId}/events`);
+        const settle = (jobId: string, status: string) => {
+            if (['completed', 'failed', 'cancelled'].includes(status)) pending.delete(jobId);
+            if (pending.size === 0) { source.close(); resolve(); }
+        };
+        source.addEventListener('snapshot', async () => {
+            for (const jobId of Array.from(pending)) {
+                try {
+                    const res = await fetch(`${API}/api/jobs/${jobId}`);
+                    if (res.ok) settle(jobId, (await res.json()).status);
+                } catch { settle(jobId, 'failed'); }
+            }
+        });
+        source.addEventListener('job', (e) => {
+            const ev = JSON.parse((e as MessageEvent).data);
+            if (pending.has(ev.job_id)) settle(ev.job_id, ev.status);
+        });
+    });
 
     // ======== NUSHA SELECTION ========
     const toggleNushaSelection = (projectId: string, nushaId: number) => {
@@ -141,25 +176,14 @@ export default function ProjectsPage() {
             try {
                 const dpi = dpiSelections[projectId]?.[nushaId] || 300;
                 setProcessing(`${projectId}-full-${nushaId}`);
-                await fetch(`${API}/api/projects/${projectId}/nusha/${nushaId}/pipeline/full`, {
+                const res = await fetch(`${API}/api/projects/${projectId}/nusha/${nushaId}/pipeline/full`, {
                     method: 'POST',
                     headers: { 'Content-Type': 'application/json' },
                     body: JSON.stringify({ dpi })
                 });
-                // Poll until this nusha finishes
-                let done = false;
-                while (!done) {
-                    await new Promise(r => setTimeout(r, 3000));
-                    try {
-                        const res = await fetch(`${API}/api/projects/${projectId}/status`);
-                        if (res.ok) {
-                            const d = await res.json();
-                            setProjectStatuses(prev => ({ ...prev, [projectId]: d }));
-                            const nusha = d.nushas ? Object.values(d.nushas).find((n: any) => n.id === nushaId) as any : null;
-                            if (!nusha || nusha.progress?.status !== 'processing') done = true;
-                        }
-                    } catch { done = true; }
-                }
+                // Wait until this nusha's job chain finishes (server push)
+                const queued = res.ok ? await res.json() : null;
+                await waitForJobs(projectId, (queued?.jobs || []).map((j: any) => j.job_id));
                 // Uncheck completed nusha
                 setSelectedNushas(prev => {
                     const set = new Set(prev[projectId] || []);
@@ -1,7 +1,7 @@
 "use client";
 
 import React, { useRef, useState, useEffect, useCallback } from "react";
-import { useMukabele, Footnote } from "./MukabeleContext";
+import { useMukabele, Footnote, nushaIndices } from "./MukabeleContext";
 import { useParams } from "next/navigation";
 import { AlertCircle, Plus, Minus, Type, X, Check, ArrowUp, Trash2, Bold, Italic } from "lucide-react";
 import { v4 as uuidv4 } from "uuid";
@@ -27,7 +27,8 @@ export default function DocumentView() {
         baseNushaIndex,
         setPages,
         refreshData,
-        saveLineText
+        saveLineText,
+        data
     } = useMukabele();
 
     const { activeWordIndex } = useTTS();
@@ -139,7 +140,7 @@ export default function DocumentView() {
                 marker.dataset.ignore = "true"; // Start using dataset to identify
                 // We can't use complex title/onclick efficiently here without event delegation.
                 // We set attributes for delegation.
-                const sigla = siglas[fn.nusha_index] || (fn.nusha_index === 1 ? "A" : fn.nusha_index === 2 ? "B" : fn.nusha_index === 3 ? "C" : "D");
+                const sigla = siglas[fn.nusha_index] || String.fromCharCode(64 + fn.nusha_index);
                 const symbol = fn.type === "variation" ? ":" : fn.type === "omission" ? "-" : "+";
                 marker.title = `${sigla}${symbol} ${fn.content}`;
                 marker.innerText = `[${fn.id.slice(0, 0)}]`; // Hacky placeholder? No, we used numbers derived from map outside.
@@ -409,7 +410,7 @@ export default function DocumentView() {
 
         // Set default target nusha to first available non-base
         if (baseNushaIndex === targetNusha) {
-            const next = [1, 2, 3, 4].find(n => n !== baseNushaIndex);
+            const next = nushaIndices(data).find(n => n !== baseNushaIndex);
             if (next) setTargetNusha(next);
         }
     };
@@ -547,7 +548,7 @@ export default function DocumentView() {
 
                     {/* Nusha Selector */}
                     <div className="flex gap-1 justify-center py-1">
-                        {[1, 2, 3, 4].map(n => {
+                        {nushaIndices(data).map(n => {
                             if (n === baseNushaIndex) return null; // Hide Base Nusha
                             return (
                                 <button
@@ -555,7 +556,7 @@ export default function DocumentView() {
                                     onClick={() => setTargetNusha(n)}
                                     className={`w-6 h-6 rounded-full text-xs font-bold border ${targetNusha === n ? "bg-purple-600 text-white border-purple-600" : "bg-slate-50 text-slate-500 border-slate-200"}`}
                                 >
-                                    {siglas[n] || (n === 1 ? "A" : n === 2 ? "B" : n === 3 ? "C" : "D")}
+                                    {siglas[n] || String.fromCharCode(64 + n)}
                                 </button>
                             );
                         })}
@@ -871,7 +872,7 @@ export default function DocumentView() {
                                                 if (a.line_no !== b.line_no) return a.line_no - b.line_no;
                                                 return a.index - b.index;
                                             }).map((fn, i) => {
-                                                const sigla = siglas[fn.nusha_index] || (fn.nusha_index === 1 ? "A" : fn.nusha_index === 2 ? "B" : fn.nusha_index === 3 ? "C" : "D");
+                                                const sigla = siglas[fn.nusha_index] || String.fromCharCode(64 + fn.nusha_index);
                                                 let content = "";
                                                 if (fn.type === "variation") content = ` : ${fn.content}`;
                                                 if (fn.type === "omission") content = ` - ${fn.content}`;
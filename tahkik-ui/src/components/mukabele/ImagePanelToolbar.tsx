@@ -1,7 +1,7 @@
 "use client";
 
 import React, { useState } from "react";
-import { useMukabele } from "./MukabeleContext";
+import { useMukabele, hasNusha, nushaIndices } from "./MukabeleContext";
 import { ChevronLeft, ChevronRight, ZoomIn, ZoomOut, RotateCcw, Settings } from "lucide-react";
 import ProjectSettingsDialog from "./ProjectSettingsDialog";
 
@@ -45,19 +45,11 @@ export default function ImagePanelToolbar() {
 
                 {/* Nüsha Toggle */}
                 <div className="flex items-center bg-slate-100 rounded-lg p-0.5">
-                    {[1, 2, 3, 4].map(idx => {
+                    {nushaIndices(data).map(idx => {
                         // Check availability if data is loaded
-                        let hasNusha = false;
-                        if (idx === 1) hasNusha = true;
-                        else if (data) {
-                            if (idx === 2) hasNusha = !!data.has_alt;
-                            if (idx === 3) hasNusha = !!data.has_alt3;
-                            if (idx === 4) hasNusha = !!data.has_alt4;
-                        }
+                        if (!hasNusha(data, idx)) return null;
 
-                        if (!hasNusha) return null;
-
-                        const sigla = siglas[idx] || (idx === 1 ? "A" : idx === 2 ? "B" : idx === 3 ? "C" : "D");
+                        const sigla = siglas[idx] || String.fromCharCode(64 + idx);
 
                         return (
                             <button
@@ -34,11 +34,10 @@ export interface Footnote {
 export interface MukabeleData {
     aligned: LineData[]; // Nusha 1 (Primary)
     aligned_alt?: LineData[]; // Nusha 2
-    aligned_alt3?: LineData[]; // Nusha 3
-    aligned_alt4?: LineData[]; // Nusha 4
+    [key: `aligned_alt${number}`]: LineData[] | undefined; // Nusha 3..N
     has_alt?: boolean;
-    has_alt3?: boolean;
-    has_alt4?: boolean;
+    [key: `has_alt${number}`]: boolean | undefined;
+    witness_indices?: number[]; // Nüshas present in the payload (1 always included)
     default_nusha?: number;
     nusha_siglas?: { [key: string]: string };
     nusha_names?: { [key: string]: string };
@@ -47,6 +46,32 @@ export interface MukabeleData {
     // ... spellcheck data, etc.
 }
 
+// Payload key for a nusha: 1 -> aligned, 2 -> aligned_alt, k -> aligned_alt{k}
+export const nushaKey = (idx: number): keyof MukabeleData =>
+    (idx <= 1 ? "aligned" : idx === 2 ? "aligned_alt" : `aligned_alt${idx}`) as keyof MukabeleData;
+
+export const getNushaLines = (data: MukabeleData | null | undefined, idx: number): LineData[] =>
+    ((data?.[nushaKey(idx)] as LineData[] | undefined) || []);
+
+export const hasNusha = (data: MukabeleData | null | undefined, idx: number): boolean => {
+    if (idx === 1) return true;
+    if (!data) return false;
+    if (data.witness_indices) return data.witness_indices.includes(idx);
+    return !!data[(idx === 2 ? "has_alt" : `has_alt${idx}`) as keyof MukabeleData];
+};
+
+// All nusha indices present in the payload, in order
+export const nushaIndices = (data: MukabeleData | null | undefined): number[] => {
+    if (!data) return [1];
+    if (data.witness_indices && data.witness_indices.length) return data.witness_indices;
+    const out = [1];
+    Object.keys(data).forEach(k => {
+        const m = /^aligned_alt(\d*)$/.exec(k);
+        if (m && Array.isArray((data as any)[k]) && (data as any)[k].length) out.push(m[1] ? parseInt(m[1], 10) : 2);
+    });
+    return out.sort((a, b) => a - b);
+};
+
 interface MukabeleContextType {
     // Data
     data: MukabeleData | null;
@@ -244,13 +269,7 @@ export function MukabeleProvider({ children }: { children: React.ReactNode }) {
             let currentLineIdx = -1;
 
             // Get current lines based on OLD nushaIndex
-            let currentLines: LineData[] = [];
-            switch (nushaIndex) {
-                case 2: currentLines = data?.aligned_alt || []; break;
-                case 3: currentLines = data?.aligned_alt3 || []; break;
-                case 4: currentLines = data?.aligned_alt4 || []; break;
-                default: currentLines = data?.aligned || []; break;
-            }
+            const currentLines: LineData[] = getNushaLines(data, nushaIndex);
 
             // Find line index
             currentLineIdx = currentLines.findIndex(l => l.line_no === activeLine);
@@ -303,13 +322,7 @@ export function MukabeleProvider({ children }: { children: React.ReactNode }) {
 
         // 3. Find Match in Target Nüsha
         if (pivotWord && data) {
-            let targetLines: LineData[] = [];
-            switch (targetIndex) {
-                case 2: targetLines = data.aligned_alt || []; break;
-                case 3: targetLines = data.aligned_alt3 || []; break;
-                case 4: targetLines = data.aligned_alt4 || []; break;
-                default: targetLines = data.aligned || []; break;
-            }
+            const targetLines: LineData[] = getNushaLines(data, targetIndex);
 
             if (targetLines.length > 0) {
                 // Heuristic: Start search from relative position to avoid false positives (e.g. common words)
@@ -401,7 +414,7 @@ export function MukabeleProvider({ children }: { children: React.ReactNode }) {
         // Update in data state
         if (data) {
             const newData = { ...data };
-            const keys: (keyof MukabeleData)[] = ['aligned', 'aligned_alt', 'aligned_alt3', 'aligned_alt4'];
+            const keys: (keyof MukabeleData)[] = nushaIndices(newData).map(nushaKey);
             for (const key of keys) {
                 const arr = newData[key] as LineData[] | undefined;
                 if (arr) {
@@ -475,7 +488,7 @@ export function MukabeleProvider({ children }: { children: React.ReactNode }) {
             // Remove from local data state
             if (data) {
                 const newData = { ...data };
-                const keys: (keyof MukabeleData)[] = ['aligned', 'aligned_alt', 'aligned_alt3', 'aligned_alt4'];
+                const keys: (keyof MukabeleData)[] = nushaIndices(newData).map(nushaKey);
                 for (const key of keys) {
                     const arr = newData[key] as LineData[] | undefined;
                     if (arr) {
@@ -539,12 +552,7 @@ export function MukabeleProvider({ children }: { children: React.ReactNode }) {
     // Derived Data
     const lines = React.useMemo(() => {
         if (!data) return [];
-        switch (nushaIndex) {
-            case 2: return data.aligned_alt || [];
-            case 3: return data.aligned_alt3 || [];
-            case 4: return data.aligned_alt4 || [];
-            default: return data.aligned || [];
-        }
+        return getNushaLines(data, nushaIndex);
     }, [data, nushaIndex]);
 
     // LOAD DATA FUNCTION
@@ -567,10 +575,9 @@ export function MukabeleProvider({ children }: { children: React.ReactNode }) {
             const finalSiglas: any = { ...serverSiglas };
 
             // Fill defaults only if missing
-            if (!finalSiglas["1"] && jsonData.aligned) finalSiglas["1"] = "A";
-            if (!finalSiglas["2"] && jsonData.aligned_alt) finalSiglas["2"] = "B";
-            if (!finalSiglas["3"] && jsonData.aligned_alt3) finalSiglas["3"] = "C";
-            if (!finalSiglas["4"] && jsonData.aligned_alt4) finalSiglas["4"] = "D";
+            nushaIndices(jsonData).forEach(idx => {
+                if (!finalSiglas[String(idx)]) finalSiglas[String(idx)] = String.fromCharCode(64 + idx); // A, B, C, ...
+            });
 
             setSiglas(finalSiglas);
 
@@ -597,13 +604,7 @@ export function MukabeleProvider({ children }: { children: React.ReactNode }) {
                 }));
 
                 // Distribute lines to pages
-                let currentLines: LineData[] = [];
-                switch (nushaIndex) {
-                    case 2: currentLines = jsonData.aligned_alt || []; break;
-                    case 3: currentLines = jsonData.aligned_alt3 || []; break;
-                    case 4: currentLines = jsonData.aligned_alt4 || []; break;
-                    default: currentLines = jsonData.aligned || []; break;
-                }
+                const currentLines: LineData[] = getNushaLines(jsonData, nushaIndex);
 
                 // Helper to normalize
                 const norm = (s: string) => s.replace(/\\/g, "/").split("/").pop();
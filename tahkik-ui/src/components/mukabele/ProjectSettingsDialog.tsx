@@ -2,7 +2,7 @@
 
 import React from "react";
 import { Settings, X, AlertTriangle } from "lucide-react";
-import { useMukabele } from "./MukabeleContext";
+import { useMukabele, nushaIndices } from "./MukabeleContext";
 
 interface ProjectSettingsDialogProps {
     isOpen: boolean;
@@ -11,6 +11,7 @@ interface ProjectSettingsDialogProps {
 
 export default function ProjectSettingsDialog({ isOpen, onClose }: ProjectSettingsDialogProps) {
     const {
+        data,
         siglas, updateSigla,
         baseNushaIndex, updateBaseNusha
     } = useMukabele();
@@ -34,7 +35,7 @@ export default function ProjectSettingsDialog({ isOpen, onClose }: ProjectSettin
                     <div>
                         <div className="text-xs font-bold text-slate-500 uppercase mb-3 px-1">Nüsha Yönetimi</div>
                         <div className="space-y-2">
-                            {[1, 2, 3, 4].map(idx => (
+                            {nushaIndices(data).map(idx => (
                                 <div
                                     key={idx}
                                     className={`grid grid-cols-[1fr_auto_auto] gap-3 items-center p-2 rounded border transition-colors ${baseNushaIndex === idx
@@ -57,7 +58,7 @@ export default function ProjectSettingsDialog({ isOpen, onClose }: ProjectSettin
                                         <span className="text-[10px] uppercase font-bold text-slate-500">Rumuz</span>
                                         <input
                                             className="w-10 text-center bg-slate-900 border border-slate-600 rounded py-1 text-xs text-white uppercase placeholder-slate-600 focus:outline-none focus:border-amber-500/50 focus:ring-1 focus:ring-amber-500/50 transition-all font-mono"
-                                            placeholder={idx === 1 ? "A" : idx === 2 ? "B" : idx === 3 ? "C" : "D"}
+                                            placeholder={String.fromCharCode(64 + idx)}
                                             defaultValue={siglas[idx] || ""}
                                             onBlur={(e) => {
                                                 const val = e.target.value.trim().toUpperCase();
@@ -17,6 +17,17 @@ interface TTSContextType {
     currentTime: number;
     duration: number;
     seek: (time: number) => void;
+    prerender: PrerenderState | null; // Background pre-render job of the project
+    startPrerender: () => void;
+    cancelPrerender: () => void;
+}
+
+interface PrerenderState {
+    status: string; // running | completed | cancelled | failed | interrupted | budget_exhausted
+    done: number;
+    total: number;
+    message: string;
+    running: boolean;
 }
 
 const TTSContext = createContext<TTSContextType | undefined>(undefined);
@@ -32,10 +43,13 @@ export function TTSProvider({ children }: { children: React.ReactNode }) {
     const [totalAudioChunks, setTotalAudioChunks] = useState(0);
     const [currentTime, setCurrentTime] = useState(0);
     const [duration, setDuration] = useState(0);
+    const [prerender, setPrerender] = useState<PrerenderState | null>(null);
 
     // Audio State
     const audioRef = useRef<HTMLAudioElement | null>(null);
-    const chunksRef = useRef<any[]>([]); // { audio_url, timepoints, start_token }
+    const chunksRef = useRef<any[]>([]); // { url, timepoints, start_token, end_token }
+    const streamDoneRef = useRef(true);
+    const waitingForChunkRef = useRef<number | null>(null);
     const chunkIndexRef = useRef(0);
     const timepointsRef = useRef<any[]>([]);
 
@@ -98,10 +112,15 @@ export function TTSProvider({ children }: { children: React.ReactNode }) {
         console.log("[TTS] Fetching for tokens:", allTokens.length);
 
         setIsLoading(true);
+        chunksRef.current = [];
+        streamDoneRef.current = false;
+        waitingForChunkRef.current = null;
+        setTotalAudioChunks(0);
+        setCurrentAudioChunk(0);
+        chunkIndexRef.current = 0;
         try {
-            // Check if backend has cached audio or generate on fly
-            // We'll send tokens to /api/tts
-            const res = await fetch("http://127.0.0.1:8000/api/tts", {
+            // Streamed NDJSON: playback starts on the first segment, the rest are appended as they arrive
+            const res = await fetch("http://127.0.0.1:8000/api/tts/stream", {
                 method: "POST",
                 headers: { "Content-Type": "application/json" },
                 body: JSON.stringify({
@@ -112,61 +131,70 @@ export function TTSProvider({ children }: { children: React.ReactNode }) {
                     archive_path: projectId // Use project ID as archive path for caching
                 })
             });
-            const data = await res.json();
-
-            if (data.chunks) {
-                // Process chunks
-                let globalTokenOffset = 0;
-                const processedChunks = data.chunks.map((c: any) => {
-                    // Create blob URL for audio
-                    const byteCharacters = atob(c.audio_b64);
-                    const byteNumbers = new Array(byteCharacters.length);
-                    for (let i = 0; i < byteCharacters.length; i++) {
-                        byteNumbers[i] = byteCharacters.charCodeAt(i);
+            if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
+
+            const reader = res.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = "";
+            const handleLine = (line: string) => {
+                if (!line.trim()) return;
+                const ev = JSON.parse(line);
+                if (ev.type === "segment") {
+                    chunksRef.current.push({
+                        // Audio is served by URL from the content-addressed store (ETag + Range, browser-cached)
+                        url: `http://127.0.0.1:8000${ev.audio_url}`,
+                        timepoints: ev.timepoints,
+                        // Timepoint marks are "w{global token index}"; token_start/end give the segment's span
+                        start_token: ev.token_start ?? null,
+                        end_token: ev.token_end ?? null
+                    });
+                    setTotalAudioChunks(chunksRef.current.length);
+                    if (chunksRef.current.length === 1) {
+                        setIsLoading(false);
+                        playChunk(0);
+                    } else if (waitingForChunkRef.current === chunksRef.current.length - 1) {
+                        waitingForChunkRef.current = null;
+                        playChunk(chunksRef.current.length - 1);
                     }
-                    const byteArray = new Uint8Array(byteNumbers);
-                    const blob = new Blob([byteArray], { type: "audio/mp3" });
-                    const url = URL.createObjectURL(blob);
-
-                    const chunkInfo = {
-                        url,
-                        timepoints: c.timepoints,
-                        start_token: globalTokenOffset
-                    };
-
-                    // Estimate token count in this chunk to update offset?
-                    // Actually the backend might not return token counts per chunk easily 
-                    // unless we parse timepoints.
-                    // But wait, our backend splits by sentence ~300 chars.
-                    // We assumed linear progression.
-                    // ISSUE: Synchronization depends on accurate token mapping.
-                    // The backend `process_tts_request` generates timepoints with mark names like "w123".
-                    // "w{real_idx}" where real_idx is global index. PERFECT!
-
-                    return chunkInfo;
-                });
-
-                chunksRef.current = processedChunks;
-                setTotalAudioChunks(processedChunks.length);
-                setCurrentAudioChunk(0);
-                chunkIndexRef.current = 0;
-
-                // Start playing first chunk
-                playChunk(0);
+                } else if (ev.type === "error") {
+                    throw new Error(ev.error);
+                }
+            };
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const ndjsonLines = buffer.split("\n");
+                buffer = ndjsonLines.pop() || "";
+                ndjsonLines.forEach(handleLine);
             }
+            handleLine(buffer);
         } catch (e) {
             console.error("TTS Fetch Error", e);
             alert("Ses verisi alınamadı via API.");
         } finally {
+            streamDoneRef.current = true;
+            if (waitingForChunkRef.current !== null) {
+                // Stream ended while the player was waiting for the next segment
+                waitingForChunkRef.current = null;
+                stop();
+            }
             setIsLoading(false);
         }
     };
 
     const playChunk = (index: number) => {
         if (index >= chunksRef.current.length) {
+            if (!streamDoneRef.current) {
+                // Next segment is still being synthesized; it starts as soon as it arrives
+                waitingForChunkRef.current = index;
+                setIsLoading(true);
+                return;
+            }
             stop();
             return;
         }
+        setIsLoading(false);
 
         const chunk = chunksRef.current[index];
         setCurrentAudioChunk(index);
@@ -269,6 +297,67 @@ export function TTSProvider({ children }: { children: React.ReactNode }) {
         // Let's keep them.
     }, []);
 
+    // --- Background pre-render (whole project, prioritized around the open page) ---
+    const prerenderUrl = projectId ? `http://127.0.0.1:8000/api/projects/${projectId}/tts/prerender` : null;
+
+    const refreshPrerender = useCallback(async () => {
+        if (!prerenderUrl) return;
+        try {
+            const res = await fetch(prerenderUrl);
+            if (!res.ok) return;
+            const data = await res.json();
+            setPrerender(data.job ? {
+                status: data.job.status, done: data.job.done, total: data.job.total,
+                message: data.job.message, running: data.running
+            } : null);
+        } catch (e) {
+            console.error("[TTS] Prerender state error", e);
+        }
+    }, [prerenderUrl]);
+
+    const startPrerender = useCallback(async () => {
+        if (!prerenderUrl) return;
+        await fetch(prerenderUrl, {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({ nusha_index: nushaIndex || 1, focus_page: activePageKey })
+        });
+        refreshPrerender();
+    }, [prerenderUrl, nushaIndex, activePageKey, refreshPrerender]);
+
+    const cancelPrerender = useCallback(async () => {
+        if (!prerenderUrl) return;
+        await fetch(`${prerenderUrl}/cancel`, { method: "POST" });
+        refreshPrerender();
+    }, [prerenderUrl, refreshPrerender]);
+
+    useEffect(() => { refreshPrerender(); }, [refreshPrerender]);
+
+    // Progress pushed by the server (SSE 'prerender' events) while the job runs
+    useEffect(() => {
+        if (!projectId || !prerender?.running) return;
+        const source = new EventSource(`http://127.0.0.1:8000/api/projects/${projectId}/events`);
+        source.addEventListener('snapshot', () => { refreshPrerender(); });
+        source.addEventListener('prerender', (e) => {
+            const ev = JSON.parse((e as MessageEvent).data);
+            setPrerender({
+                status: ev.status, done: ev.done, total: ev.total,
+                message: ev.message, running: ev.status === 'running'
+            });
+        });
+        return () => source.close();
+    }, [projectId, prerender?.running, refreshPrerender]);
+
+    // Keep the job working around the page the editor has open
+    useEffect(() => {
+        if (!prerenderUrl || !prerender?.running || !activePageKey) return;
+        fetch(`${prerenderUrl}/focus`, {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({ page_key: activePageKey })
+        }).catch(() => { });
+    }, [prerenderUrl, prerender?.running, activePageKey]);
+
     // Reset audio when page changes
     useEffect(() => {
         stop();
@@ -289,7 +378,8 @@ export function TTSProvider({ children }: { children: React.ReactNode }) {
             isPlaying, isLoading, play, pause, stop,
             activeWordIndex, rate, setRate,
             currentAudioChunk, totalAudioChunks,
-            currentTime, duration, seek
+            currentTime, duration, seek,
+            prerender, startPrerender, cancelPrerender
         }}>
             {children}
         </TTSContext.Provider>
@@ -2,13 +2,14 @@
 
 import React from "react";
 import { useTTS } from "./TTSContext";
-import { Play, Pause, Square, RefreshCw, Volume2 } from "lucide-react";
+import { Play, Pause, Square, RefreshCw, Volume2, Download } from "lucide-react";
 
 export default function TextPanelFooter() {
     const {
         isPlaying, isLoading, play, pause, stop,
         rate, setRate,
-        currentTime, duration, seek
+        currentTime, duration, seek,
+        prerender, startPrerender, cancelPrerender
     } = useTTS();
 
     const formatTime = (t: number) => {
@@ -74,6 +75,21 @@ export default function TextPanelFooter() {
                 </div>
 
                 <div className="flex items-center gap-2">
+                    <button
+                        onClick={prerender?.running ? cancelPrerender : startPrerender}
+                        className={`flex items-center gap-1 rounded px-1.5 py-0.5 text-[10px] transition-colors ${prerender?.running
+                            ? "text-amber-700 bg-amber-50 hover:bg-amber-100"
+                            : "text-slate-500 hover:text-slate-700 hover:bg-slate-100"
+                            }`}
+                        title={prerender?.message || "Tüm sayfaları arka planda seslendir"}
+                    >
+                        {prerender?.running
+                            ? <RefreshCw className="animate-spin" size={11} />
+                            : <Download size={11} />}
+                        <span className="font-mono tabular-nums">
+                            {prerender && prerender.total > 0 ? `${prerender.done}/${prerender.total}` : "ÖN-SES"}
+                        </span>
+                    </button>
                     <div className="flex items-center gap-1 text-slate-400">
                         <Volume2 size={12} />
                     </div>
@@ -0,0 +1,19 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.services.project_manager import ProjectManager
+
+
+def make_project_manager(projects_dir):
+    """Geçici proje klasöründe (kendi tahkik_global.db'si ile) ProjectManager; gerçek DB'ye dokunmaz."""
+    return ProjectManager(projects_dir=Path(projects_dir))
+
+
+@pytest.fixture
+def project_manager(tmp_path):
+    return make_project_manager(tmp_path / "projects")
@@ -0,0 +1,86 @@
+import sys
+import json
+import random
+import tempfile
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.alignment import align_ocr_to_tahkik_segment_dp
+from src.align_trace import AlignTrace, trace_path_for
+
+VOCAB = ["كتاب", "الله", "قال", "في", "من", "على", "الحمد", "رب", "العالمين", "محمد", "العلم", "نور", "هذا", "ذلك"]
+STAGES = ["load", "normalize", "encode", "opcodes", "refinement", "scoring"]
+
+
+def _align(level):
+    rnd = random.Random(2)
+    tokens = [rnd.choice(VOCAB) + str(rnd.randint(0, 30)) for _ in range(600)]
+    lines = [{"ocr_text": " ".join(tokens[i:i + 8]), "line_image": f"{i}.png"} for i in range(0, len(tokens), 8)]
+    trace = AlignTrace(level)
+    payload = align_ocr_to_tahkik_segment_dp(
+        "test.docx", ocr_lines_override=lines, write_json=False, reference_text_override=" ".join(tokens), trace=trace
+    )
+    return payload, trace
+
+
+def test_off_records_nothing():
+    payload, trace = _align("off")
+    assert trace.stages == []
+    assert "debug_log" not in payload
+    with tempfile.TemporaryDirectory() as tmp:
+        alignment_path = Path(tmp) / "alignment.json"
+        trace_path_for(alignment_path).write_text("{}", encoding="utf-8")
+        assert trace.write_sidecar(alignment_path) is None
+        assert not trace_path_for(alignment_path).exists(), "Stale trace must be removed"
+
+
+def test_summary_has_timings_without_samples():
+    payload, trace = _align("summary")
+    assert [s.name for s in trace.stages] == STAGES
+    for st in trace.stages:
+        assert st.wall_ms >= 0 and st.output
+        assert st.data == {} and st.peak_kb is None
+    assert payload["aligned"] == _align("off")[0]["aligned"]
+
+
+def test_full_sidecar_roundtrip():
+    payload, trace = _align("full")
+    opcodes = next(s for s in trace.stages if s.name == "opcodes")
+    assert opcodes.data["first_20_opcodes"] and opcodes.peak_kb is not None
+    with tempfile.TemporaryDirectory() as tmp:
+        alignment_path = Path(tmp) / "alignment.json"
+        path = trace.write_sidecar(alignment_path)
+        assert path.name == "alignment.trace.json"
+        data = json.loads(path.read_text(encoding="utf-8"))
+        assert data["level"] == "full"
+        assert [s["name"] for s in data["stages"]] == STAGES
+        assert all({"name", "description", "output", "data", "wall_ms"} <= set(s) for s in data["stages"])
+
+
+def test_partial_run_appends_without_clobbering():
+    _, full = _align("summary")
+    with tempfile.TemporaryDirectory() as tmp:
+        alignment_path = Path(tmp) / "alignment.json"
+        full.write_sidecar(alignment_path)
+
+        assert AlignTrace("off").append_to_sidecar(alignment_path) is None
+        inc = AlignTrace("summary")
+        with inc.stage("incremental_realign") as st:
+            st.output = "2 satır"
+        for _ in range(2):
+            inc.append_to_sidecar(alignment_path)
+
+        data = json.loads(trace_path_for(alignment_path).read_text(encoding="utf-8"))
+        assert [s["name"] for s in data["stages"]] == STAGES, "full alignment trace is kept"
+        assert [r["kind"] for r in data["runs"]] == ["incremental", "incremental"]
+        assert data["runs"][0]["stages"][0]["output"] == "2 satır"
+
+
+if __name__ == "__main__":
+    test_off_records_nothing()
+    test_summary_has_timings_without_samples()
+    test_full_sidecar_roundtrip()
+    test_partial_run_appends_without_clobbering()
+    print("All align trace tests passed.")
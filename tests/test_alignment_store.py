@@ -0,0 +1,102 @@
+import sys
+import json
+import random
+import tempfile
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.alignment import align_ocr_to_tahkik_segment_dp, attach_span_links
+from src.alignment_store import AlignmentStore, open_alignment_store, store_path_for, write_alignment_store
+from src.database import DatabaseManager
+from src.payload_v2 import compact_payload
+from src.witnesses import witness_key
+
+VOCAB = ["كتاب", "الله", "قال", "في", "من", "على", "الحمد", "رب", "العالمين", "محمد", "العلم", "نور", "هذا", "ذلك"]
+
+
+def _payload(n_words=700):
+    rnd = random.Random(4)
+    tokens = [rnd.choice(VOCAB) + str(rnd.randint(0, 30)) for _ in range(n_words)]
+    payload = {}
+    for k in (1, 2):
+        r = random.Random(k)
+        lines = []
+        i = 0
+        while i < len(tokens):
+            n = r.randint(5, 10)
+            idx = len(lines)
+            lines.append({
+                "ocr_text": " ".join(w for w in tokens[i:i + n] if r.random() > 0.05),
+                "line_image": f"n{k}/p{idx // 15:03d}_line_{idx:04d}.png",
+                "page_image": f"n{k}/p{idx // 15:03d}.png",
+                "page_name": f"p{idx // 15:03d}.png",
+                "bbox": [10, 40 * (idx % 15), 900, 40 * (idx % 15) + 38],
+                "line_index": idx,
+            })
+            i += n
+        payload[witness_key(k)] = align_ocr_to_tahkik_segment_dp(
+            "test.docx", ocr_lines_override=lines, write_json=False, reference_text_override=" ".join(tokens)
+        )["aligned"]
+    attach_span_links(payload)
+    return compact_payload(payload)
+
+
+def _json_roundtrip(lines):
+    return json.loads(json.dumps(lines, ensure_ascii=False))
+
+
+def test_parity_with_json():
+    lines = _json_roundtrip(_payload()["aligned"])
+    # odd shapes that must fall back to the extra JSON
+    lines[1]["line_index"] = None
+    lines[2]["bbox"] = None
+    lines[3]["best"]["score"] = 71.25
+    lines[4]["candidates"] = []
+    del lines[5]["page_name"]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = store_path_for(Path(tmp) / "alignment.json")
+        write_alignment_store(path, lines, stamp="file:1")
+        with AlignmentStore(path) as store:
+            assert len(store) == len(lines)
+            assert store.to_lines() == lines
+            assert store.line_no_sorted
+
+
+def test_parity_with_db_rows():
+    lines = _payload()["aligned_alt"]
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(Path(tmp) / "t.db")
+        db.upsert_lines_batch("p", 2, lines)
+        from_db = db.get_aligned_lines("p", 2)
+        path = Path(tmp) / "alignment.col"
+        write_alignment_store(path, from_db, stamp=f"db:{db.get_lines_revision('p', 2)}")
+        with AlignmentStore(path) as store:
+            assert store.to_lines() == from_db
+
+
+def test_slices_and_staleness():
+    lines = _payload()["aligned"]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "alignment.col"
+        write_alignment_store(path, lines, stamp="db:1")
+        with AlignmentStore(path) as store:
+            pages = store.pages()
+            assert pages[0] == {"page_name": "p000.png", "lines": 15}
+            assert sum(p["lines"] for p in pages) == len(lines)
+            assert store.slice_page("p001.png") == [l for l in lines if l["page_name"] == "p001.png"]
+            assert store.slice_lines(20, 25) == [l for l in lines if 20 <= l["line_no"] < 25]
+            assert store.slice_page("missing.png") == []
+
+        assert open_alignment_store(path, stamp="db:2") is None
+        store = open_alignment_store(path, stamp="db:1")
+        assert store is not None
+        store.close()
+
+
+if __name__ == "__main__":
+    test_parity_with_json()
+    test_parity_with_db_rows()
+    test_slices_and_staleness()
+    print("All alignment store tests passed.")
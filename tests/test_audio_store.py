@@ -0,0 +1,83 @@
+import sys
+import json
+import os
+import tempfile
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.services.audio_store import AudioStore, audio_key, audio_url, parse_range
+
+
+def test_put_get_and_page_index_survive_reopen():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = AudioStore(Path(tmp) / "store")
+        k1 = audio_key('<speak><mark name="w0"/>قَالَ</speak>', "ar-XA-Wavenet-B", "ar-XA", 1.0)
+        k2 = audio_key('<speak><mark name="w0"/>قَالَ</speak>', "ar-XA-Wavenet-B", "ar-XA", 1.25)
+        assert k1 != k2 and len(k1) == 64
+        assert store.get(k1) is None
+
+        entry = store.put(k1, b"ID3 mp3", [{"mark": "w0", "time": 0.1}], voice="ar-XA-Wavenet-B")
+        assert entry == {"audio_url": audio_url(k1), "audio_hash": k1, "timepoints": [{"mark": "w0", "time": 0.1}]}
+        assert store.path_for(k1).read_bytes() == b"ID3 mp3"
+        store.set_page("proj", 2, "page_1", [k1])
+        store.close()
+
+        store = AudioStore(Path(tmp) / "store")
+        assert store.get(k1) == entry
+        assert store.get_page("proj", 2, "page_1") == [entry]
+        assert store.get_page("proj", 1, "page_1") is None
+        store.path_for(k1).unlink()
+        assert store.get_page("proj", 2, "page_1") is None, "missing file invalidates the page"
+        assert store.path_for("../etc/passwd") is None
+        store.close()
+
+
+def test_legacy_manifest_is_imported_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = Path(tmp) / "archive"
+        (archive / "audio").mkdir(parents=True)
+        (archive / "audio" / "p1_0.mp3").write_bytes(b"a0")
+        (archive / "audio" / "p1_1.mp3").write_bytes(b"a1")
+        manifest = archive / "audio_manifest.json"
+        manifest.write_text(json.dumps({
+            "p1": [{"audio_path": "audio/p1_0.mp3", "timepoints": [{"mark": "w0", "time": 0.0}]},
+                   {"audio_path": "audio/p1_1.mp3", "timepoints": []}],
+            "p2": [{"audio_path": "audio/missing.mp3", "timepoints": []}],
+        }), encoding="utf-8")
+
+        store = AudioStore(Path(tmp) / "store")
+        assert store.import_manifest("archive", 1, manifest) == 1
+        chunks = store.get_page("archive", 1, "p1")
+        assert [store.path_for(c["audio_hash"]).read_bytes() for c in chunks] == [b"a0", b"a1"]
+        assert chunks[0]["timepoints"] == [{"mark": "w0", "time": 0.0}]
+        assert store.get_page("archive", 1, "p2") is None
+
+        assert store.import_manifest("archive", 1, manifest) == 0, "unchanged manifest is not re-read"
+        st = manifest.stat()
+        os.utime(manifest, (st.st_atime, st.st_mtime + 5))
+        assert store.import_manifest("archive", 1, manifest) == 1
+        store.close()
+
+
+def test_parse_range():
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    for bad in ("bytes=100-", "bytes=9-3", "bytes=-0"):
+        try:
+            parse_range(bad, 100)
+            assert False, bad
+        except ValueError:
+            pass
+
+
+if __name__ == "__main__":
+    test_put_get_and_page_index_survive_reopen()
+    test_legacy_manifest_is_imported_once()
+    test_parse_range()
+    print("All audio store tests passed.")
@@ -0,0 +1,110 @@
+import sys
+import random
+import tempfile
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.alignment import align_ocr_to_tahkik_segment_dp
+from src.incremental_alignment import diff_token_streams, incremental_realign
+from src.database import DatabaseManager
+
+VOCAB = ["كتاب", "الله", "قال", "في", "من", "على", "الحمد", "رب", "العالمين", "محمد", "العلم", "نور", "هذا", "ذلك"]
+
+
+def _make_fixture(n_words=2000, seed=3):
+    rnd = random.Random(seed)
+    tokens = [rnd.choice(VOCAB) + ("" if rnd.random() < 0.6 else str(rnd.randint(0, 40))) for _ in range(n_words)]
+    lines = []
+    i = 0
+    while i < len(tokens):
+        n = rnd.randint(5, 10)
+        seg = [w if rnd.random() > 0.1 else w[::-1] for w in tokens[i:i + n]]
+        lines.append({"ocr_text": " ".join(seg), "line_image": f"l{len(lines)}.png", "line_index": len(lines)})
+        i += n
+    payload = align_ocr_to_tahkik_segment_dp(
+        "test.docx", ocr_lines_override=lines, write_json=False, reference_text_override=" ".join(tokens)
+    )
+    return tokens, lines, payload
+
+
+def test_diff_token_streams():
+    old = ["a", "b", "c", "d", "e"]
+    assert diff_token_streams(old, list(old)) == []
+    assert diff_token_streams(old, ["a", "b", "x", "d", "e"]) == [("replace", 2, 3, 2, 3)]
+    assert diff_token_streams(old, ["a", "b", "c", "d", "e", "f"]) == [("insert", 5, 5, 5, 6)]
+    assert diff_token_streams(old, ["a", "e"]) == [("delete", 1, 4, 1, 1)]
+
+
+def test_unchanged_reference_is_noop():
+    tokens, _, payload = _make_fixture()
+    new_payload, changed = incremental_realign(payload, " ".join(tokens))
+    assert changed == []
+    assert new_payload is payload
+
+
+def test_replacement_only_touches_window():
+    tokens, _, payload = _make_fixture()
+    new_tokens = list(tokens)
+    new_tokens[1000] = "كلمة_جديدة"
+
+    new_payload, changed = incremental_realign(payload, " ".join(new_tokens))
+    # Same token count -> no shift; only lines around the edit may change
+    line_of_edit = next(
+        l["line_no"] for l in payload["aligned"] if l["best"]["start_word"] <= 1000 < l["best"]["end_word"]
+    )
+    assert changed, "Edited line must be re-aligned"
+    assert all(abs(ln - line_of_edit) <= 3 for ln in changed)
+    assert "كلمة_جديدة" in " ".join(l["best"]["raw"] for l in new_payload["aligned"])
+    assert new_payload["tahkik_word_count"] == len(new_tokens)
+
+
+def test_insert_and_delete_shift_indices():
+    tokens, lines, payload = _make_fixture()
+    new_tokens = list(tokens)
+    del new_tokens[300]
+    new_tokens[1500:1500] = ["زيادة", "أخرى"]
+
+    new_payload, _ = incremental_realign(payload, " ".join(new_tokens))
+    full = align_ocr_to_tahkik_segment_dp(
+        "test.docx", ocr_lines_override=lines, write_json=False, reference_text_override=" ".join(new_tokens)
+    )
+
+    inc_bounds = [(l["best"]["start_word"], l["best"]["end_word"]) for l in new_payload["aligned"]]
+    full_bounds = [(l["best"]["start_word"], l["best"]["end_word"]) for l in full["aligned"]]
+    same = sum(1 for a, b in zip(inc_bounds, full_bounds) if a == b)
+    assert same / len(full_bounds) > 0.98
+
+    # Line text must match the new token stream everywhere
+    for l in new_payload["aligned"]:
+        s, e = l["best"]["start_word"], l["best"]["end_word"]
+        assert l["best"]["raw"] == " ".join(new_tokens[s:e])
+
+
+def test_update_aligned_lines_preserves_other_rows():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(Path(tmp) / "test.db")
+        lines = [
+            {"line_no": i, "ocr_text": f"ocr {i}", "line_image": f"{i}.png", "best": {"raw": f"ref {i}", "start_word": i, "end_word": i + 1}}
+            for i in range(1, 6)
+        ]
+        db.upsert_lines_batch("p1", 2, lines)
+        db.soft_delete_aligned_line("p1", 2, 5)
+
+        db.update_aligned_lines("p1", 2, [{**lines[1], "best": {"raw": "yeni", "start_word": 2, "end_word": 3}}])
+
+        rows = db.get_aligned_lines("p1", 2)
+        assert [r["line_no"] for r in rows] == [1, 2, 3, 4]
+        assert rows[1]["best"]["raw"] == "yeni"
+        assert rows[0]["best"]["raw"] == "ref 1"
+        assert [r["line_no"] for r in db.get_deleted_lines("p1", 2)] == [5]
+
+
+if __name__ == "__main__":
+    test_diff_token_streams()
+    test_unchanged_reference_is_noop()
+    test_replacement_only_touches_window()
+    test_insert_and_delete_shift_indices()
+    test_update_aligned_lines_preserves_other_rows()
+    print("All incremental alignment tests passed.")
@@ -0,0 +1,78 @@
+import sys
+import tempfile
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import src.spellcheck as sc
+from src.llm_cache import LLMResponseCache, normalize_paragraph, prompt_version
+
+
+def test_key_normalization_and_prompt_version():
+    cache = LLMResponseCache()
+    cache.put("openai", "m1", "v1", "بسم  الله‏ الرحمن ", [{"wrong": "الرحمن"}])
+    assert cache.get("openai", "m1", "v1", " بسم الله الرحمن") == [{"wrong": "الرحمن"}]
+    assert cache.get("openai", "m2", "v1", "بسم الله الرحمن") is None
+    assert cache.get("claude", "m1", "v1", "بسم الله الرحمن") is None
+    assert cache.get("openai", "m1", "v2", "بسم الله الرحمن") is None
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 3
+    assert normalize_paragraph("بِسْمِ") != normalize_paragraph("بسم"), "harakat are part of the key"
+
+    assert prompt_version(sc._openai_prompt) == prompt_version(sc._openai_prompt)
+    assert prompt_version(sc._openai_prompt) != prompt_version(lambda p: sc._openai_prompt(p) + " ")
+
+
+def test_size_bounded_lru_eviction():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "llm_cache.sqlite"
+        cache = LLMResponseCache(path, max_bytes=2000)
+        for i in range(10):
+            cache.put("gemini", "m", "v", f"p{i}", [{"wrong": "x" * 300}])
+            if i == 2:
+                cache.get("gemini", "m", "v", "p0")  # p0 recently used
+        assert cache.size_bytes() <= 2000 and cache.stats["evictions"] > 0
+        assert cache.get("gemini", "m", "v", "p9") is not None
+        assert cache.get("gemini", "m", "v", "p1") is None
+        n = len(cache)
+        cache.close()
+
+        reopened = LLMResponseCache(path, max_bytes=2000)
+        assert len(reopened) == n and reopened.size_bytes() > 0
+        reopened.close()
+
+
+def test_repeated_run_makes_no_provider_calls():
+    paras = ["قال الشيخ رحمه الله", "باب الطهارة", "", "قال الشيخ رحمه الله"]
+    calls = []
+
+    def fake_openai(paragraph, api_key, model, paragraph_index=None, debug_callback=None):
+        calls.append(paragraph_index)
+        return [{"wrong": paragraph.split()[0], "suggestion": "x", "reason": "", "source": "openai"}], None
+
+    saved = (sc.read_docx_paragraphs, sc.openai_spellcheck_paragraph, sc.get_openai_api_key, sc.SPELLCHECK_SAVE_JSON)
+    sc.read_docx_paragraphs = lambda path: list(paras)
+    sc.openai_spellcheck_paragraph = fake_openai
+    sc.get_openai_api_key = lambda: "k"
+    sc.SPELLCHECK_SAVE_JSON = False
+    try:
+        cache = LLMResponseCache()
+        kw = dict(use_gemini=False, use_openai=True, use_claude=False, cache=cache, batch_tokens=0)
+        first = sc.spellcheck_tahkik_paragraphs(Path("book.docx"), **kw)
+        n_first = len(calls)
+        second = sc.spellcheck_tahkik_paragraphs(Path("book.docx"), **kw)
+        assert len(calls) == n_first, "second run served from cache"
+        assert first["per_paragraph"] == second["per_paragraph"]
+        assert second["runs"][0]["cache"]["hits"] == 3 and second["runs"][0]["cache"]["misses"] == 0
+
+        sc.spellcheck_tahkik_paragraphs(Path("book.docx"), use_cache=False, **kw)
+        assert len(calls) == 2 * n_first
+    finally:
+        sc.read_docx_paragraphs, sc.openai_spellcheck_paragraph, sc.get_openai_api_key, sc.SPELLCHECK_SAVE_JSON = saved
+
+
+if __name__ == "__main__":
+    test_key_normalization_and_prompt_version()
+    test_size_bounded_lru_eviction()
+    test_repeated_run_makes_no_provider_calls()
+    print("All LLM cache tests passed.")
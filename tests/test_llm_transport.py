@@ -0,0 +1,144 @@
+import sys
+import json
+import re
+import tempfile
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import src.spellcheck as sc
+from src.llm_transport import CassetteMiss, LLMTransport, TransportResponse, set_transport
+from src.services.tts_service import TTSService
+
+
+PARAS = ["قال الشيخ رحمه الله", "باب الطهاره", "", "فصل في المياة وأحكامها", "والجواب عن ذلك"]
+
+
+def _answer(prompt):
+    blocks = re.findall(r"^\[P(\d+)\]\n(.*)$", prompt, flags=re.M)
+    if blocks:
+        out = {f"P{pid}": [{"wrong": text.split()[-1], "suggestion": text.split()[-1] + "ة", "reason": ""}] for pid, text in blocks}
+        return json.dumps(out, ensure_ascii=False)
+    word = prompt.strip().split()[-1]
+    return json.dumps([{"wrong": word, "suggestion": word + "ة", "reason": ""}], ensure_ascii=False)
+
+
+def _fake_live(calls):
+    """Sağlayıcı taklidi: her paragrafın son kelimesini hatalı sayar (tekli ve paketli prompt'lar)."""
+
+    def post(url, headers=None, json=None, timeout=None):
+        calls.append(url)
+        if "openai.com/v1/responses" in url:
+            body = {"output": [{"content": [{"type": "output_text", "text": _answer(json["input"])}]}]}
+        elif "anthropic.com" in url:
+            body = {"content": [{"type": "text", "text": _answer(json["messages"][0]["content"])}]}
+        elif "chat/completions" in url:
+            body = {"choices": [{"message": {"content": "قَالَ الشَّيْخُ رَحِمَهُ اللَّهُ"}}]}
+        else:
+            return TransportResponse(404, "unknown endpoint")
+        return TransportResponse(200, _dumps(body))
+
+    return post
+
+
+def _dumps(obj):
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def _run_spellcheck():
+    return sc.spellcheck_tahkik_paragraphs(
+        Path("book.docx"), use_gemini=False, use_openai=True, use_claude=True, use_cache=False,
+    )
+
+
+def test_record_then_replay_spellcheck_with_injected_errors():
+    calls = []
+    saved = (sc.read_docx_paragraphs, sc.SPELLCHECK_SAVE_JSON, sc.get_openai_api_key, sc.get_claude_api_key)
+    sc.read_docx_paragraphs = lambda path: list(PARAS)
+    sc.SPELLCHECK_SAVE_JSON = False
+    prev = None
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            cassette = Path(tmp) / "cassette.jsonl"
+            prev = set_transport(LLMTransport("record", cassette=cassette, live_post=_fake_live(calls)))
+            sc.get_openai_api_key = sc.get_claude_api_key = lambda: "k"
+            recorded = _run_spellcheck()
+            sc.get_openai_api_key, sc.get_claude_api_key = saved[2:]
+            n_live = len(calls)
+            assert n_live > 0 and recorded["call_errors"] == []
+            lines = cassette.read_text(encoding="utf-8").splitlines()
+            assert len(lines) == n_live and "Bearer" not in cassette.read_text(encoding="utf-8")
+
+            replay = LLMTransport("replay", cassette=cassette, error_rate=0.3, seed=7, latency_ms=250, virtual_time=True)
+            set_transport(replay)
+            replayed = _run_spellcheck()
+            assert len(calls) == n_live, "replay never reaches the live endpoint"
+            assert replay.stats["injected_errors"] > 0 and replay.stats["misses"] == 0
+            assert replay.clock() > 0, "latency and backoff advance the virtual clock only"
+            assert replayed["per_paragraph"] == recorded["per_paragraph"]
+            assert replayed["errors_merged"] == recorded["errors_merged"] and replayed["call_errors"] == []
+    finally:
+        set_transport(prev)
+        sc.read_docx_paragraphs, sc.SPELLCHECK_SAVE_JSON, sc.get_openai_api_key, sc.get_claude_api_key = saved
+
+
+def test_replay_rate_limit_and_misses():
+    with tempfile.TemporaryDirectory() as tmp:
+        cassette = Path(tmp) / "cassette.jsonl"
+        rec = LLMTransport("record", cassette=cassette, live_post=_fake_live([]))
+        body = {"model": "m", "input": "باب الطهاره"}
+        assert rec.post("https://api.openai.com/v1/responses?key=secret", json=body).status_code == 200
+
+        rp = LLMTransport("replay", cassette=cassette, rpm=2, virtual_time=True)
+        got = [rp.post("https://api.openai.com/v1/responses", json=body).status_code for _ in range(3)]
+        assert got == [200, 200, 429]
+        limited = rp.post("https://api.openai.com/v1/responses", json=body)
+        assert int(limited.headers["Retry-After"]) > 0
+        rp.sleep(60)
+        assert rp.post("https://api.openai.com/v1/responses", json=body).status_code == 200
+        assert rp.stats["rate_limited"] == 2
+
+        try:
+            rp.post("https://api.openai.com/v1/responses", json={"model": "m", "input": "غير مسجل"})
+            assert False, "expected CassetteMiss"
+        except CassetteMiss:
+            pass
+
+
+def test_vocalization_replays_without_api_key():
+    import os
+
+    import src.vocalization as voc
+
+    calls = []
+    saved_key = os.environ.pop("OPENAI_API_KEY", None)
+    saved_cache = voc.default_llm_cache
+    voc.default_llm_cache = lambda: None  # kalıcı harekeleme önbelleği taşıyıcıyı atlamasın
+    prev = None
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            cassette = Path(tmp) / "cassette.jsonl"
+            os.environ["OPENAI_API_KEY"] = "k"
+            prev = set_transport(LLMTransport("record", cassette=cassette, live_post=_fake_live(calls)))
+            text = "قال الشيخ رحمه الله"
+            recorded = TTSService().vocalize_chunk_with_retry(text)
+            assert len(calls) == 1 and recorded != text
+
+            del os.environ["OPENAI_API_KEY"]
+            set_transport(LLMTransport("replay", cassette=cassette))
+            assert TTSService().vocalize_chunk_with_retry(text) == recorded
+            assert len(calls) == 1
+    finally:
+        set_transport(prev)
+        voc.default_llm_cache = saved_cache
+        os.environ.pop("OPENAI_API_KEY", None)
+        if saved_key is not None:
+            os.environ["OPENAI_API_KEY"] = saved_key
+
+
+if __name__ == "__main__":
+    test_record_then_replay_spellcheck_with_injected_errors()
+    test_replay_rate_limit_and_misses()
+    test_vocalization_replays_without_api_key()
+    print("All LLM transport tests passed.")
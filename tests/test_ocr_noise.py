@@ -0,0 +1,50 @@
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.ocr_noise import PROFILES, DOTLESS, make_witness, synthetic_reference
+from src.scripts.bench_alignment import check_gate, run_case
+
+
+def test_witness_is_deterministic_and_covers_reference():
+    tokens = synthetic_reference(3000, seed=1)
+    a = make_witness(tokens, PROFILES["medium"], seed=3)
+    assert a == make_witness(tokens, PROFILES["medium"], seed=3)
+
+    clean = make_witness(tokens, PROFILES["clean"], seed=3)
+    spans = [l["gt"] for l in clean]
+    assert spans[0][0] == 0 and spans[-1][1] == len(tokens)
+    assert all(s[1] == n[0] for s, n in zip(spans, spans[1:])), "clean lines tile the reference"
+    assert " ".join(l["ocr_text"] for l in clean) == " ".join(tokens)
+    assert len({l["page_name"] for l in clean}) > 1
+
+
+def test_noise_is_applied():
+    tokens = synthetic_reference(3000, seed=1)
+    heavy = make_witness(tokens, PROFILES["heavy"], seed=3)
+    text = " ".join(l["ocr_text"] for l in heavy)
+    assert any(ch in text for ch in set(DOTLESS.values()))
+    assert any(l["gt"] is None for l in heavy), "page headers"
+    covered = sum(l["gt"][1] - l["gt"][0] for l in heavy if l["gt"])
+    assert covered != len(tokens), "skipped / duplicated lines"
+
+
+def test_benchmark_case_and_gate():
+    tokens = synthetic_reference(2000)
+    clean = run_case(tokens, 2000, "clean", measure_memory=False)
+    assert clean["accuracy"]["exact"] == 1.0
+    light = run_case(tokens, 2000, "light", measure_memory=False)
+    assert light["accuracy"]["within_tol"] > 0.9
+
+    worse = dict(light, wall_s=light["wall_s"] * 3 + 1)
+    assert check_gate([light], [light], 1.25, 0.01) == []
+    assert len(check_gate([worse], [light], 1.25, 0.01)) == 1
+
+
+if __name__ == "__main__":
+    test_witness_is_deterministic_and_covers_reference()
+    test_noise_is_applied()
+    test_benchmark_case_and_gate()
+    print("All OCR noise benchmark tests passed.")
@@ -0,0 +1,182 @@
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.database import DatabaseManager
+from src.services.pipeline_jobs import PipelineJobs, RESOURCE_CPU, RESOURCE_IO
+
+
+def _wait_for(cond, timeout=10.0):
+    t0 = time.time()
+    while not cond():
+        if time.time() - t0 > timeout:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+def _jobs(tmp, **kw):
+    db = DatabaseManager(Path(tmp) / "jobs.db")
+    jobs = PipelineJobs(db, workers={RESOURCE_CPU: 2, RESOURCE_IO: 2}, retry_delay=0, **kw)
+    return db, jobs
+
+
+def test_projects_run_in_parallel_but_each_project_is_serial():
+    with tempfile.TemporaryDirectory() as tmp:
+        _, jobs = _jobs(tmp)
+        log = []
+        lock = threading.Lock()
+        running = {}
+        overlap = []
+
+        def step(job, ctx):
+            pid = job["project_id"]
+            with lock:
+                running[pid] = running.get(pid, 0) + 1
+                if running[pid] > 1:
+                    overlap.append(pid)
+                log.append(("start", pid, job["kind"], time.time()))
+            time.sleep(0.1)
+            ctx.progress(50, "yarı")
+            with lock:
+                running[pid] -= 1
+                log.append(("end", pid, job["kind"], time.time()))
+            return {"success": True}
+
+        jobs.register("segment", step, RESOURCE_CPU)
+        jobs.register("ocr", step, RESOURCE_IO)
+        jobs.start()
+        try:
+            a = jobs.enqueue_chain("A", ["segment", "ocr"])
+            b = jobs.enqueue_chain("B", ["segment", "ocr"])
+            for j in a + b:
+                assert jobs.wait(j["job_id"], 10)["status"] == "completed"
+        finally:
+            jobs.shutdown()
+
+        assert not overlap, "a project never runs two jobs at once"
+        span = {(p, k): [t for ev, p2, k2, t in log if p2 == p and k2 == k] for p in ("A", "B") for k in ("segment", "ocr")}
+        (a_start, a_end), (b_start, b_end) = span[("A", "segment")], span[("B", "segment")]
+        assert max(a_start, b_start) < min(a_end, b_end), "two projects overlap instead of queueing behind one busy flag"
+        for pid in ("A", "B"):
+            kinds = [k for ev, p, k, _ in log if ev == "start" and p == pid]
+            assert kinds == ["segment", "ocr"], "chain order is preserved"
+        done = jobs.get(a[1]["job_id"])
+        assert done["progress"] == 100 and done["attempts"] == 1
+        assert done["wait_ms"] >= 90 and done["run_ms"] >= 90
+        assert a[0]["group_id"] and a[0]["group_id"] == a[1]["group_id"]
+
+
+def test_cancel_queued_and_running_job_cancels_rest_of_chain():
+    with tempfile.TemporaryDirectory() as tmp:
+        _, jobs = _jobs(tmp)
+        started = threading.Event()
+
+        def slow(job, ctx):
+            started.set()
+            for i in range(200):
+                ctx.progress(i // 2, "çalışıyor")
+                time.sleep(0.01)
+            return {"success": True}
+
+        jobs.register("convert", slow, RESOURCE_CPU)
+        jobs.register("align", lambda job, ctx: {"success": True}, RESOURCE_CPU)
+        jobs.start()
+        try:
+            chain = jobs.enqueue_chain("P", ["convert", "align"])
+            other = jobs.enqueue("P", "align")
+            started.wait(5)
+
+            # kuyruktaki tekil iş hemen iptal
+            assert jobs.cancel(other["job_id"])
+            assert jobs.get(other["job_id"])["status"] == "cancelled"
+
+            # çalışan iş bir sonraki ilerleme adımında durur; zincirin kalanı da iptal
+            assert jobs.cancel(chain[0]["job_id"])
+            first = jobs.wait(chain[0]["job_id"], 5)
+            assert first["status"] == "cancelled" and first["progress"] < 100
+            assert jobs.get(chain[1]["job_id"])["status"] == "cancelled"
+            assert jobs.active("P") is None
+            assert not jobs.cancel(chain[0]["job_id"]), "finished jobs cannot be cancelled"
+        finally:
+            jobs.shutdown()
+
+
+def test_retry_then_success_and_final_failure_cancels_chain():
+    with tempfile.TemporaryDirectory() as tmp:
+        _, jobs = _jobs(tmp, max_attempts=2)
+        calls = {"flaky": 0, "broken": 0}
+
+        def flaky(job, ctx):
+            calls["flaky"] += 1
+            if calls["flaky"] == 1:
+                raise RuntimeError("Vision timeout")
+            return {"success": True, "pages": 3}
+
+        def broken(job, ctx):
+            calls["broken"] += 1
+            return {"success": False, "error": "PDF bulunamadı"}
+
+        jobs.register("ocr", flaky, RESOURCE_IO)
+        jobs.register("convert", broken, RESOURCE_CPU)
+        jobs.register("align", lambda job, ctx: {"success": True}, RESOURCE_CPU)
+        jobs.start()
+        try:
+            ok = jobs.wait(jobs.enqueue("A", "ocr")["job_id"], 5)
+            assert ok["status"] == "completed" and ok["attempts"] == 2
+            assert ok["result"] == {"success": True, "pages": 3} and ok["error"] is None
+
+            chain = jobs.enqueue_chain("B", ["convert", "align"])
+            failed = jobs.wait(chain[0]["job_id"], 5)
+            assert failed["status"] == "failed" and failed["attempts"] == 2 and calls["broken"] == 2
+            assert failed["error"] == "PDF bulunamadı"
+            assert jobs.get(chain[1]["job_id"])["status"] == "cancelled"
+            assert [j["status"] for j in jobs.history("B")] == ["cancelled", "failed"]
+        finally:
+            jobs.shutdown()
+
+
+def test_queue_survives_restart():
+    with tempfile.TemporaryDirectory() as tmp:
+        db, jobs = _jobs(tmp)
+        jobs.register("segment", lambda job, ctx: {"success": True}, RESOURCE_CPU)
+        jobs.register("ocr", lambda job, ctx: {"success": True}, RESOURCE_IO)
+        # işçiler başlamadan (süreç kapanmadan önce) kuyruğa alınan işler
+        queued = jobs.enqueue_chain("A", ["segment", "ocr"])
+        db.update_pipeline_job(queued[0]["job_id"], status="running", attempts=1, started_at=time.time())
+        # son deneme hakkındayken süreç kapandı: tekrar kuyruğa girmez, zincirin kalanı iptal
+        crashed = jobs.enqueue_chain("B", ["segment", "ocr"])
+        db.update_pipeline_job(crashed[0]["job_id"], status="running", attempts=2, started_at=time.time())
+        unknown = jobs.enqueue("C", "ocr")
+        conn = db.get_connection()
+        conn.execute("UPDATE pipeline_jobs SET kind='legacy' WHERE job_id=?", (unknown["job_id"],))
+        conn.commit()
+        conn.close()
+
+        _, restarted = _jobs(tmp)
+        restarted.register("segment", lambda job, ctx: {"success": True}, RESOURCE_CPU)
+        restarted.register("ocr", lambda job, ctx: {"success": True}, RESOURCE_IO)
+        restarted.start()
+        try:
+            for j in queued:
+                assert restarted.wait(j["job_id"], 5)["status"] == "completed"
+            assert restarted.get(queued[0]["job_id"])["attempts"] == 2, "the interrupted run counts as an attempt"
+            first = restarted.get(crashed[0]["job_id"])
+            assert first["status"] == "failed" and first["attempts"] == 2 and first["error"]
+            assert restarted.get(crashed[1]["job_id"])["status"] == "cancelled"
+            gone = restarted.wait(unknown["job_id"], 5)
+            assert gone["status"] == "failed" and "Unknown job kind" in gone["error"]
+        finally:
+            restarted.shutdown()
+
+
+if __name__ == "__main__":
+    test_projects_run_in_parallel_but_each_project_is_serial()
+    test_cancel_queued_and_running_job_cancels_rest_of_chain()
+    test_retry_then_success_and_final_failure_cancels_chain()
+    test_queue_survives_restart()
+    print("All pipeline job tests passed.")
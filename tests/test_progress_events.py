@@ -0,0 +1,135 @@
+import sys
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.database import DatabaseManager
+from src.services.pipeline_jobs import PipelineJobs, RESOURCE_CPU, RESOURCE_IO
+from src.services.progress_events import ProgressBus, eta_seconds, format_sse
+from tests.conftest import make_project_manager
+
+
+def _drain(sub, until, timeout=5.0):
+    events = []
+    t0 = time.time()
+    while time.time() - t0 < timeout:
+        ev = sub.get(0.1)
+        if ev is None:
+            continue
+        events.append(ev)
+        if until(ev):
+            return events
+    raise AssertionError(f"timed out: {[(e['type'], e.get('status')) for e in events]}")
+
+
+def test_jobs_publish_lifecycle_and_stage_progress():
+    with tempfile.TemporaryDirectory() as tmp:
+        bus = ProgressBus()
+        jobs = PipelineJobs(DatabaseManager(Path(tmp) / "jobs.db"), workers={RESOURCE_CPU: 1, RESOURCE_IO: 1},
+                            retry_delay=0, max_attempts=1, bus=bus)
+
+        def ocr(job, ctx):
+            for done in range(5):
+                ctx.progress(done * 25, f"OCR: {done}/4", stage="text_recognition", done=done, total=4)
+                time.sleep(0.02)
+            return {"success": True}
+
+        jobs.register("ocr", ocr, RESOURCE_IO)
+        jobs.register("align", lambda job, ctx: {"success": False, "error": "tahkik.docx yok"}, RESOURCE_CPU)
+        sub = bus.subscribe("A")
+        other = bus.subscribe("B")
+        everything = bus.subscribe()
+        jobs.start()
+        try:
+            jobs.enqueue_chain("A", ["ocr", "align", "ocr"])
+            events = _drain(sub, lambda e: e["type"] == "job" and e["status"] == "cancelled")
+        finally:
+            jobs.shutdown()
+
+        statuses = [(e["kind"], e["status"]) for e in events if e["type"] == "job"]
+        assert statuses == [("ocr", "queued"), ("align", "queued"), ("ocr", "queued"), ("ocr", "running"), ("ocr", "completed"),
+                            ("align", "running"), ("align", "failed"), ("ocr", "cancelled")], statuses
+        progress = [e for e in events if e["type"] == "progress"]
+        assert [(e["done"], e["total"]) for e in progress] == [(i, 4) for i in range(5)]
+        assert all(e["stage"] == "text_recognition" and e["nusha_index"] == 1 for e in progress)
+        assert progress[0]["eta_s"] is None and progress[2]["eta_s"] is not None and progress[-1]["eta_s"] == 0.0
+        failed = next(e for e in events if e["type"] == "job" and e["status"] == "failed")
+        assert failed["error"] == "tahkik.docx yok" and "tahkik.docx yok" in failed["message"]
+        assert [e["seq"] for e in events] == sorted(e["seq"] for e in events)
+        assert other.get(0) is None, "subscribers only see their own project"
+        assert everything.get(0)["project_id"] == "A"
+
+        frame = format_sse(failed)
+        assert frame.startswith("event: job\nid: ") and frame.endswith("\n\n")
+        assert json.loads(frame.split("data: ", 1)[1])["error"] == "tahkik.docx yok"
+
+
+def test_async_subscriber_and_slow_client_overflow():
+    bus = ProgressBus(queue_size=4)
+
+    async def listen():
+        sub = bus.subscribe("P")
+        threading.Timer(0.05, lambda: bus.publish("P", "progress", percent=10)).start()
+        first = await sub.aget(2.0)
+        idle = await sub.aget(0.05)
+        sub.close()
+        return first, idle
+
+    first, idle = asyncio.run(listen())
+    assert first["percent"] == 10 and idle is None
+    assert bus.subscriber_count() == 0
+
+    slow = bus.subscribe("P")
+    for i in range(10):
+        bus.publish("P", "progress", percent=i)
+    assert slow.dropped == 6, "publish never blocks; the oldest events are dropped"
+    assert [slow.get(0)["percent"] for _ in range(4)] == [6, 7, 8, 9]
+    assert eta_seconds(100.0, 5, 20, now=110.0) == 30.0 and eta_seconds(100.0, 0, 20) is None
+
+
+def test_step_summaries_replace_directory_scans(project_manager):
+    pm = project_manager
+    ndir = pm.get_project_path("p1") / "nusha_1"
+    (ndir / "pages").mkdir(parents=True)
+    for i in range(3):
+        (ndir / "pages" / f"page_{i + 1:04d}.png").write_bytes(b"")
+    (ndir / "lines_manifest.jsonl").write_text(
+        "".join(json.dumps({"line_image": f"page_0001_line_{i:03d}.png", "page_image": str(ndir / "pages" / "page_0001.png")}) + "\n"
+                for i in range(2)), encoding="utf-8")
+
+    # defter öncesi proje: bir kez diskten uzlaştırılır
+    steps = pm.get_nusha_steps("p1", 1)
+    assert steps["pages"]["count"] == 3 and steps["segmentation"]["count"] == 2
+    assert "text_recognition" not in steps and not (ndir / "steps.json").exists()
+
+    # sonraki okumalar klasöre bakmaz; aşamalar defteri kendileri yazar
+    (ndir / "pages" / "page_0004.png").write_bytes(b"")
+    assert pm.get_nusha_steps("p1", 1)["pages"]["count"] == 3
+    pm.record_nusha_pages("p1", 1, "pages", [{"unit": "page_0004", "status": "completed", "count": 1}], settings={"dpi": 300})
+    pm.record_nusha_step("p1", 1, "pages", "completed", 4, dpi=300)
+    pm.record_nusha_step("p1", 1, "text_recognition", "running", total=2)
+    steps = pm.get_nusha_steps("p1", 1)
+    assert steps["pages"]["count"] == 4 and steps["pages"]["dpi"] == 300
+    assert steps["text_recognition"]["status"] == "running"
+
+    pm.clear_nusha_steps("p1", 1, ["segmentation", "text_recognition", "alignment"])
+    assert list(pm.get_nusha_steps("p1", 1)) == ["pages"]
+    try:
+        pm.record_nusha_step("p1", 1, "ocr", "completed")
+        raise AssertionError("unknown steps are rejected")
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    test_jobs_publish_lifecycle_and_stage_progress()
+    test_async_subscriber_and_slow_client_overflow()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_step_summaries_replace_directory_scans(make_project_manager(tmp))
+    print("All progress event tests passed.")
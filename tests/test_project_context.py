@@ -0,0 +1,113 @@
+import sys
+import json
+import tempfile
+import threading
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from docx import Document
+
+from src.alignment import align_ocr_to_tahkik_segment_dp_multi
+from src.config import OUT
+from src.doc_archive import archive_current_outputs
+from src.ocr import load_ocr_lines_ordered
+from src.project_context import ProjectContext
+from src.utils import hard_cleanup_output
+
+TEXTS = {
+    "A": ["باب الطهارة والمياه", "قال الشيخ رحمه الله"],
+    "B": ["كتاب الصلاة وفضلها", "وعن ابي هريرة انه قال"],
+}
+
+
+def _write_project(ctx, lines, nusha_indices=(1, 2)):
+    """Segmentasyon + OCR çıktısı yerine fixture: manifest, satır dosyaları ve OCR metinleri."""
+    ctx.ensure_dirs(nusha_indices)
+    for k in nusha_indices:
+        recs = []
+        for i, text in enumerate(lines):
+            line = ctx.lines_dir(k) / f"p1_line{i:03d}.png"
+            line.write_bytes(b"png")
+            (ctx.ocr_dir(k) / f"{line.stem}.txt").write_text(text, encoding="utf-8")
+            recs.append({"line_image": str(line), "page_name": "p1", "page_image": str(ctx.pages_dir(k) / "p1.png"),
+                         "bbox": [0, 40 * i, 100, 40 * i + 30], "line_index": i})
+        ctx.lines_manifest(k).write_text("\n".join(json.dumps(r) for r in recs), encoding="utf-8")
+    doc = Document()
+    for text in lines:
+        doc.add_paragraph(text)
+    docx = ctx.root / "tahkik.docx"
+    doc.save(str(docx))
+    return docx
+
+
+def test_layouts_and_settings():
+    legacy = ProjectContext.legacy()
+    assert legacy.root == OUT and legacy.nusha_dir(1) == OUT and legacy.nusha_dir(3) == OUT / "nusha3"
+    assert legacy.alignment_json(2) == OUT / "alignment.json"
+
+    proj = ProjectContext.for_project(Path("/tmp/projects/abc"), dpi=200)
+    assert proj.project_id == "abc" and proj.lines_manifest(2) == Path("/tmp/projects/abc/nusha_2/lines_manifest.jsonl")
+    assert proj.alignment_json(2) == Path("/tmp/projects/abc/nusha_2/alignment.json")
+    tuned = proj.with_settings(vision_retries=1)
+    assert tuned.dpi == 200 and tuned.vision_kwargs()["retries"] == 1
+    assert proj.vision_kwargs()["retries"] == ProjectContext.legacy().vision_retries, "with_settings returns a copy"
+    try:
+        ProjectContext.for_project(Path("/tmp/x"), dpii=300)
+        raise AssertionError("unknown settings are rejected")
+    except ValueError:
+        pass
+
+
+def test_two_projects_in_parallel_keep_outputs_isolated():
+    out_existed = OUT.exists()
+    with tempfile.TemporaryDirectory() as tmp:
+        ctxs = {
+            "A": ProjectContext.for_project(Path(tmp) / "A"),
+            "B": ProjectContext.legacy(Path(tmp) / "B"),
+        }
+        docs = {pid: _write_project(ctx, TEXTS[pid]) for pid, ctx in ctxs.items()}
+        barrier = threading.Barrier(len(ctxs))
+        results, errors = {}, []
+
+        def run(pid):
+            try:
+                barrier.wait(5)
+                payload = align_ocr_to_tahkik_segment_dp_multi(docs[pid], ctx=ctxs[pid])
+                archive = archive_current_outputs(docs[pid], ctx=ctxs[pid])
+                results[pid] = (payload, archive)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(pid,)) for pid in ctxs]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(30)
+        assert not errors, errors
+
+        for pid, ctx in ctxs.items():
+            other = "B" if pid == "A" else "A"
+            payload, archive = results[pid]
+            written = json.loads(ctx.alignment_json().read_text(encoding="utf-8"))
+            blob = json.dumps(written, ensure_ascii=False)
+            assert all(line in blob for line in TEXTS[pid])
+            assert not any(line in blob for line in TEXTS[other]), "one project's alignment never sees the other's OCR"
+            assert payload["witness_indices"] == [1, 2] and payload["aligned"] and payload["aligned_alt"]
+            assert archive is not None and archive.parent == ctx.doc_archives_dir
+            assert (archive / "alignment.json").exists() and (archive / "lines_manifest.jsonl").exists()
+            assert [r["ocr_text"] for r in load_ocr_lines_ordered(ctx=ctx, nusha_index=2)] == TEXTS[pid]
+
+        # temizlik yalnızca kendi bağlamının nüshasını siler
+        hard_cleanup_output(ctxs["A"], 1)
+        assert not ctxs["A"].lines_manifest(1).exists() and not any(ctxs["A"].ocr_dir(1).glob("*"))
+        assert ctxs["A"].lines_manifest(2).exists() and ctxs["B"].lines_manifest(1).exists()
+
+    assert OUT.exists() == out_existed, "explicit contexts never touch output_lines"
+
+
+if __name__ == "__main__":
+    test_layouts_and_settings()
+    test_two_projects_in_parallel_keep_outputs_isolated()
+    print("All project context tests passed.")
@@ -0,0 +1,96 @@
+import sys
+import copy
+import random
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.alignment import _attach_overlap_alt_lists, _match_alt_lines_by_token_mid
+from src.span_index import SpanIndex
+
+
+def _brute_nearest(primary, alt, field):
+    """Reference: the original O(N×M) midpoint scan."""
+    ranges = [(a["best"]["start_word"], a["best"]["end_word"], a) for a in alt]
+    for it in primary:
+        s, e = it["best"]["start_word"], it["best"]["end_word"]
+        mid = (s + e) // 2 if e > s else s
+        best_obj, best_dist = None, None
+        for as_, ae_, aobj in ranges:
+            amid = (as_ + ae_) // 2 if ae_ > as_ else as_
+            dist = abs(amid - mid)
+            if best_dist is None or dist < best_dist:
+                best_dist, best_obj = dist, aobj
+        it[field] = {"line_no": best_obj.get("line_no"), "line_image": best_obj.get("line_image", ""),
+                     "ocr_text": best_obj.get("ocr_text", ""), "best": best_obj.get("best", {})}
+
+
+def _brute_overlap(primary, alt, max_keep, field):
+    """Reference: the original O(N×M) overlap scan."""
+    spans = [(a["best"]["start_word"], a["best"]["end_word"], a) for a in alt if a["best"]["end_word"] > a["best"]["start_word"]]
+    for it in primary:
+        s, e = it["best"]["start_word"], it["best"]["end_word"]
+        if e <= s:
+            it[field] = []
+            continue
+        hits = [(min(e, ae) - max(s, as_), a) for as_, ae, a in spans if min(e, ae) - max(s, as_) > 0]
+        hits.sort(key=lambda x: x[0], reverse=True)
+        it[field] = [{"line_no": a.get("line_no"), "line_image": a.get("line_image", ""), "ocr_text": a.get("ocr_text", ""),
+                      "best": a.get("best", {}), "overlap": ov} for ov, a in hits[:max_keep]]
+
+
+def _random_lines(rnd, n, total):
+    lines = []
+    cursor = 0
+    for i in range(n):
+        if rnd.random() < 0.05:
+            # merged / long or overlapping spans
+            s = max(0, cursor - rnd.randint(0, 20))
+            e = s + rnd.randint(0, 150)
+        elif rnd.random() < 0.05:
+            s = e = cursor
+        else:
+            s = cursor
+            e = cursor + rnd.randint(1, 12)
+            cursor = e
+        lines.append({"line_no": i + 1, "line_image": f"{i}.png", "ocr_text": str(i),
+                      "best": {"start_word": min(s, total), "end_word": min(e, total), "score": 0.5}})
+    return lines
+
+
+def test_span_index_matches_bruteforce():
+    rnd = random.Random(11)
+    for _ in range(20):
+        primary = _random_lines(rnd, rnd.randint(1, 300), 2000)
+        alt = _random_lines(rnd, rnd.randint(1, 300), 2000)
+
+        p1, p2 = copy.deepcopy(primary), copy.deepcopy(primary)
+        _match_alt_lines_by_token_mid(p1, alt, field="alt")
+        _brute_nearest(p2, alt, "alt")
+        assert p1 == p2
+
+        p1, p2 = copy.deepcopy(primary), copy.deepcopy(primary)
+        _attach_overlap_alt_lists(p1, alt, max_keep=6, field="alt_list")
+        _brute_overlap(p2, alt, 6, "alt_list")
+        assert p1 == p2
+
+
+def test_span_index_queries():
+    items = [
+        {"line_no": 1, "best": {"start_word": 0, "end_word": 5}},
+        {"line_no": 2, "best": {"start_word": 5, "end_word": 9}},
+        {"line_no": 3, "best": {"start_word": 9, "end_word": 20}},
+        {"line_no": 4, "best": {}},
+    ]
+    idx = SpanIndex(items)
+    assert len(idx) == 3
+    assert [it["line_no"] for _, it in idx.overlapping(4, 10)] == [2, 1, 3]
+    assert idx.overlapping(30, 40) == []
+    assert idx.nearest_by_mid(6, 8)["line_no"] == 2
+
+
+if __name__ == "__main__":
+    test_span_index_matches_bruteforce()
+    test_span_index_queries()
+    print("All span index tests passed.")
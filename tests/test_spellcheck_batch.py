@@ -0,0 +1,68 @@
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.spellcheck_batch import pack_batches, parse_batch_json, parse_batch_tsv, validate_batch
+from src.spellcheck_executor import ProviderLimits, SpellcheckExecutor
+
+
+ITEMS = [(3, "قال الشيخ رحمه الله"), (4, "باب الطهاره"), (5, "فصل في المياة")]
+
+
+def test_pack_batches_respects_budget_and_order():
+    items = [(i, "كلمة " * (40 if i == 4 else 3)) for i in range(1, 9)]
+    batches = pack_batches(items, budget_tokens=45, max_paras=3)
+    assert [pidx for b in batches for pidx, _ in b] == list(range(1, 9))
+    assert all(len(b) <= 3 for b in batches)
+    assert [pidx for pidx, _ in batches[1]] == [4], "oversized paragraph travels alone"
+
+
+def test_parse_and_validate_keyed_results():
+    tsv = "P3\tNONE\nP4\tالطهاره\tالطهارة\tتاء مربوطة\n- P5\tالمياة\tالمياه\t\nP9\tx\ty\tz\n"
+    got = validate_batch(parse_batch_tsv(tsv, ITEMS), ITEMS)
+    assert got[3] == [] and got[4][0]["suggestion"] == "الطهارة" and got[5][0]["wrong"] == "المياة"
+
+    js = '```json\n{"P3": [], "P4": [{"wrong": "المياة", "suggestion": "المياه", "reason": ""}]}\n```'
+    got = validate_batch(parse_batch_json(js, ITEMS), ITEMS)
+    assert list(got) == [3], "P4 carries a word from P5 (shifted); P5 is missing"
+
+    assert parse_batch_json("not json", ITEMS) == {}
+
+
+def test_executor_batches_and_falls_back_to_single_calls():
+    single_calls = []
+    batch_calls = []
+
+    def single(text, pidx):
+        single_calls.append(pidx)
+        return [{"wrong": text.split()[0], "source": "openai"}], None
+
+    def batch(items):
+        batch_calls.append([pidx for pidx, _ in items])
+        if len(batch_calls) == 1:
+            return {}, None  # unparseable answer
+        # answers every paragraph but the last one
+        return {pidx: [{"wrong": text.split()[0], "source": "openai"}] for pidx, text in items[:-1]}, None
+
+    jobs = [(i, f"w{i} x y") for i in range(1, 9)]
+    ex = SpellcheckExecutor(
+        {"openai": single},
+        limits={"openai": ProviderLimits(concurrency=1)},
+        batch_providers={"openai": batch},
+        batch_tokens=10 ** 6,
+        batch_max_paras=4,
+    )
+    res = ex.run(jobs)
+    assert batch_calls == [[1, 2, 3, 4], [5, 6, 7, 8]]
+    assert sorted(single_calls) == [1, 2, 3, 4, 8]
+    assert [res[i]["errors"]["openai"][0]["wrong"] for i, _ in jobs] == [f"w{i}" for i, _ in jobs]
+    assert ex.stats["openai"]["batches"] == 2 and ex.stats["openai"]["batch_fallbacks"] == 5
+
+
+if __name__ == "__main__":
+    test_pack_batches_respects_budget_and_order()
+    test_parse_and_validate_keyed_results()
+    test_executor_batches_and_falls_back_to_single_calls()
+    print("All spellcheck batch tests passed.")
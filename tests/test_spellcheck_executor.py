@@ -0,0 +1,171 @@
+import sys
+import json
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import src.spellcheck as sc
+from src.llm_transport import LLMTransport, TransportResponse, set_transport
+from src.spellcheck import _SpellcheckCheckpoint, _merge_errors
+from src.spellcheck_executor import ProviderLimits, RateLimiter, SpellcheckExecutor, ordered_errors
+
+
+def _fake_provider(name, delay=0.01, seed=0):
+    rnd = random.Random(seed)
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0, "calls": 0}
+
+    def fn(text, pidx):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+            state["calls"] += 1
+            d = rnd.random() * delay
+        time.sleep(d)
+        with lock:
+            state["active"] -= 1
+        return [{"wrong": w, "suggestion": w + "x", "reason": "", "source": name} for w in text.split()[:2]], None
+
+    return fn, state
+
+
+def test_parallel_results_are_deterministic():
+    jobs = [(i, f"كلمة{i} نص{i % 7} باب") for i in range(1, 61)]
+    outputs = []
+    for seed in (1, 2):
+        g, gs = _fake_provider("gemini", seed=seed)
+        o, _ = _fake_provider("openai", seed=seed + 10)
+        seen = []
+        ex = SpellcheckExecutor(
+            {"openai": o, "gemini": g},
+            limits={"gemini": ProviderLimits(concurrency=3), "openai": ProviderLimits(concurrency=5)},
+            on_paragraph=lambda pidx, res: seen.append(pidx),
+        )
+        res = ex.run(jobs)
+        assert sorted(seen) == [i for i, _ in jobs]
+        assert gs["peak"] <= 3
+        outputs.append([_merge_errors(ordered_errors(res[i])) for i, _ in jobs])
+        # provider order is fixed (gemini before openai) whatever finished first
+        assert [e["source"] for e in ordered_errors(res[5])] == ["gemini", "gemini", "openai", "openai"]
+    assert outputs[0] == outputs[1]
+
+
+def test_retry_on_429_and_stop_on_quota():
+    calls = {"n": 0}
+
+    def flaky(text, pidx):
+        calls["n"] += 1
+        if calls["n"] <= 2:
+            return [], "OpenAI HTTP 429: rate limit"
+        return [{"wrong": "a", "source": "openai"}], None
+
+    def quota(text, pidx):
+        return [], "Gemini HTTP 429 (quota): You exceeded your current quota"
+
+    sleeps = []
+    now = {"t": 0.0}
+
+    def fake_sleep(s):
+        sleeps.append(s)
+        now["t"] += s
+
+    ex = SpellcheckExecutor(
+        {"openai": flaky, "gemini": quota},
+        limits={
+            "openai": ProviderLimits(concurrency=1, max_attempts=4, backoff_base=2.0),
+            "gemini": ProviderLimits(concurrency=1, stop_on_quota=True),
+        },
+        sleep=fake_sleep,
+        clock=lambda: now["t"],
+    )
+    res = ex.run([(1, "x"), (2, "y"), (3, "z")])
+    assert res[1]["errors"]["openai"] and not [c for c in res[1]["call_errors"] if c["source"] == "openai"]
+    assert ex.stats["openai"]["retries"] == 2 and len(sleeps) >= 2 and sleeps[1] > sleeps[0]
+    assert ex.stopped_reason("gemini")
+    assert ex.stats["gemini"]["calls"] == 1 and ex.stats["gemini"]["skipped"] == 2
+
+
+def test_providers_are_single_shot_and_executor_retries():
+    answers = [
+        TransportResponse(503, "unavailable"),
+        TransportResponse(200, json.dumps({"candidates": [{"content": {"parts": [{"text": "garbage"}]}}]})),
+        TransportResponse(200, json.dumps({"candidates": [{"content": {"parts": [{"text": "الطهاره\tالطهارة\t"}]}}]})),
+    ]
+    posts = []
+
+    def live_post(url, headers=None, json=None, timeout=None):
+        posts.append(url)
+        return answers[len(posts) - 1]
+
+    transport = LLMTransport("live", live_post=live_post)
+    transport_sleeps = []
+    transport.sleep = transport_sleeps.append
+    prev = set_transport(transport)
+    try:
+        out, err = sc.gemini_spellcheck_paragraph("باب الطهاره", api_key="k", model="m")
+        assert out == [] and "HTTP 503" in err and len(posts) == 1, "one request per provider call"
+
+        sleeps = []
+        ex = SpellcheckExecutor(
+            {"gemini": lambda text, pidx: sc.gemini_spellcheck_paragraph(text, api_key="k", model="m", paragraph_index=pidx)},
+            limits={"gemini": ProviderLimits(concurrency=1, max_attempts=4)},
+            sleep=sleeps.append,
+        )
+        del answers[0]
+        posts.clear()
+        res = ex.run([(1, "باب الطهاره")])
+        assert res[1]["errors"]["gemini"][0]["suggestion"] == "الطهارة" and not res[1]["call_errors"]
+        # parse failure retried by the executor only: one post per attempt, no sleeps inside the provider
+        assert len(posts) == ex.stats["gemini"]["calls"] == 2 and ex.stats["gemini"]["retries"] == 1
+        assert len(sleeps) == 1 and transport_sleeps == []
+    finally:
+        set_transport(prev)
+
+
+def test_rate_limiter_spaces_requests():
+    now = {"t": 0.0}
+    lim = RateLimiter(rpm=60, tpm=0, clock=lambda: now["t"], sleep=lambda s: now.__setitem__("t", now["t"] + s))
+    for _ in range(60):
+        lim.acquire()
+    assert now["t"] == 0.0, "bucket starts full"
+    lim.acquire()
+    lim.acquire()
+    assert abs(now["t"] - 2.0) < 1e-6, "then one request per second"
+
+    tok = RateLimiter(rpm=0, tpm=600, clock=lambda: now["t"], sleep=lambda s: now.__setitem__("t", now["t"] + s))
+    t0 = now["t"]
+    tok.acquire(600)
+    tok.acquire(300)
+    assert abs(now["t"] - t0 - 30.0) < 1e-6
+
+
+def test_checkpoint_resumes_only_clean_paragraphs():
+    paras = ["a b", "c d", "e f"]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "spellcheck.partial.jsonl"
+        cp = _SpellcheckCheckpoint(path, {"docx_path": "x.docx", "openai_model": "m"})
+        cp.open({}, paras)
+        cp.append(1, "a b", {"errors": {"openai": [{"wrong": "a"}]}, "call_errors": []})
+        cp.append(2, "c d", {"errors": {}, "call_errors": [{"paragraph_index": 2, "source": "openai", "error": "HTTP 500"}]})
+        cp.close()
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"paragraph_index": 3, "te')  # crash mid-write
+
+        done = _SpellcheckCheckpoint(path, {"docx_path": "x.docx", "openai_model": "m"}).load(paras)
+        assert list(done) == [1] and done[1]["errors"]["openai"][0]["wrong"] == "a"
+        assert _SpellcheckCheckpoint(path, {"docx_path": "x.docx", "openai_model": "other"}).load(paras) == {}
+        assert _SpellcheckCheckpoint(path, {"docx_path": "x.docx", "openai_model": "m"}).load(["changed", "c d", "e f"]) == {}
+
+
+if __name__ == "__main__":
+    test_parallel_results_are_deterministic()
+    test_retry_on_429_and_stop_on_quota()
+    test_providers_are_single_shot_and_executor_retries()
+    test_rate_limiter_spaces_requests()
+    test_checkpoint_resumes_only_clean_paragraphs()
+    print("All spellcheck executor tests passed.")
@@ -0,0 +1,92 @@
+import sys
+import json
+import tempfile
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import src.spellcheck as sc
+from src.spellcheck_incremental import apply_line_edits, paragraph_fingerprint, plan_incremental
+
+
+def _pp(idx, text, wrong=None, providers=("openai",)):
+    errs = [{"wrong": wrong, "suggestion": "x", "paragraph_index": idx}] if wrong else []
+    return {"paragraph_index": idx, "text": text, "errors": errs, "fp": paragraph_fingerprint(text),
+            "checked": True, "providers": list(providers)}
+
+
+def test_plan_carries_reanchors_and_drops():
+    previous = {"per_paragraph": [
+        _pp(1, "باب الطهاره", "الطهاره"),
+        _pp(2, "فصل في المياة", "المياة"),
+        _pp(3, "قال الشيخ رحمه الله"),
+        _pp(4, "وهو الذي لا يجوز", providers=()),
+        _pp(5, "والجواب عن ذلك"),
+    ], "call_errors": [{"paragraph_index": 5, "source": "openai", "error": "HTTP 500"}]}
+    paras = [
+        "مقدمة جديدة",            # inserted
+        "باب  الطهاره",           # unchanged (whitespace only) -> carried, 1 -> 2
+        "قال الشيخ رحمه الله",    # unchanged -> carried, 3 -> 3
+        "وهو الذي لا يجوز",       # unchanged but never checked by openai
+        "والجواب عن ذلك",         # had a call error last time
+        "فصل في المياه",          # changed
+    ]
+    plan = plan_incremental(previous, paras, ["openai"])
+    assert sorted(plan.carried) == [2, 3]
+    assert plan.carried[2]["errors"][0]["paragraph_index"] == 2 and plan.carried[2]["text"] == "باب  الطهاره"
+    assert plan.todo == [1, 4, 5, 6]
+    assert plan.dropped == [2, 4, 5]
+
+    assert sorted(plan_incremental(previous, paras, ["openai", "claude"]).carried) == []
+
+    moved = plan_incremental(previous, ["قال الشيخ رحمه الله", "باب الطهاره"], ["openai"])
+    assert sorted(moved.carried) == [1, 2] and moved.moved == 1
+
+
+def test_apply_line_edits_patches_token_spans():
+    paras = ["باب الطهاره وهو", "فصل في المياة"]
+    lines = [
+        {"line_no": 1, "best": {"start_word": 0, "end_word": 2, "raw": "باب الطهارة"}},
+        {"line_no": 2, "best": {"start_word": 2, "end_word": 4, "raw": "وهو فصل"}},  # unchanged
+        {"line_no": 3, "best": {"start_word": 4, "end_word": 6, "raw": "في المياه"}},
+    ]
+    out, n = apply_line_edits(paras, lines)
+    assert n == 2 and out == ["باب الطهارة وهو", "فصل في المياه"]
+    assert apply_line_edits(paras, [lines[1]]) == (paras, 0)
+
+
+def test_incremental_run_only_calls_changed_paragraphs():
+    calls = []
+
+    def fake_openai(paragraph, api_key, model, paragraph_index=None, debug_callback=None):
+        calls.append(paragraph)
+        return [{"wrong": paragraph.split()[-1], "suggestion": "x", "reason": "", "source": "openai"}], None
+
+    saved = (sc.openai_spellcheck_paragraph, sc.get_openai_api_key, sc.SPELLCHECK_SAVE_JSON)
+    sc.openai_spellcheck_paragraph = fake_openai
+    sc.get_openai_api_key = lambda: "k"
+    sc.SPELLCHECK_SAVE_JSON = False
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            out_json = Path(tmp) / "spellcheck.json"
+            kw = dict(use_gemini=False, use_openai=True, use_claude=False, use_cache=False, batch_tokens=0,
+                      incremental=True, output_json=out_json)
+            first = sc.spellcheck_tahkik_paragraphs(Path("book.docx"), paragraphs=["ا ب", "ج د", "ه و"], **kw)
+            assert len(calls) == 3
+            out_json.write_text(json.dumps(first, ensure_ascii=False), encoding="utf-8")
+
+            second = sc.spellcheck_tahkik_paragraphs(Path("book.docx"), paragraphs=["ا ب", "ج ز", "ه و", "ح ط"], **kw)
+            assert calls[3:] == ["ج ز", "ح ط"]
+            assert [p["errors"][0]["wrong"] for p in second["per_paragraph"]] == ["ب", "ز", "و", "ط"]
+            assert second["runs"][-1]["incremental"]["carried"] == 2
+            assert len(second["runs"]) == 2
+    finally:
+        sc.openai_spellcheck_paragraph, sc.get_openai_api_key, sc.SPELLCHECK_SAVE_JSON = saved
+
+
+if __name__ == "__main__":
+    test_plan_carries_reanchors_and_drops()
+    test_apply_line_edits_patches_token_spans()
+    test_incremental_run_only_calls_changed_paragraphs()
+    print("All incremental spellcheck tests passed.")
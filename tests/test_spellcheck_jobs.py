@@ -0,0 +1,93 @@
+import sys
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from docx import Document
+
+import src.spellcheck as sc
+from src.services.spellcheck_jobs import SpellcheckJobs
+from tests.conftest import make_project_manager
+
+
+WORDS = ["الطهاره", "المياة", "الصلاه", "الزكاه", "الصوم", "الحج", "البيوع", "الرهن", "النكاح", "الطلاق", "الجنايات", "الفرائض"]
+PARAS = [f"باب {w}" for w in WORDS]
+
+
+def _wait_for(cond, timeout=10.0):
+    t0 = time.time()
+    while not cond():
+        if time.time() - t0 > timeout:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+def test_job_streams_cancels_and_resumes(project_manager):
+    calls = []
+    gate = threading.Event()
+
+    def fake_openai(paragraph, api_key, model, paragraph_index=None, debug_callback=None):
+        calls.append(paragraph)
+        if paragraph_index > 2:
+            gate.wait(10)
+        return [{"wrong": paragraph.split()[-1], "suggestion": "x", "reason": "", "source": "openai"}], None
+
+    saved = (sc.openai_spellcheck_paragraph, sc.get_openai_api_key, sc.default_llm_cache, sc.SPELLCHECK_BATCH_TOKENS)
+    sc.openai_spellcheck_paragraph = fake_openai
+    sc.get_openai_api_key = lambda: "k"
+    sc.default_llm_cache = lambda: None
+    sc.SPELLCHECK_BATCH_TOKENS = 0
+    try:
+        pm = project_manager
+        pm.get_project_path("p1").mkdir()
+        doc = Document()
+        for p in PARAS:
+            doc.add_paragraph(p)
+        doc.save(pm.get_project_path("p1") / "tahkik.docx")
+
+        jobs = SpellcheckJobs(pm, poll_interval=0.01)
+        first = jobs.start("p1", use_gemini=False, use_openai=True)
+        assert first["started"] and first["job"]["status"] == "running"
+        assert not jobs.start("p1", use_gemini=False, use_openai=True)["started"], "one job per project"
+
+        _wait_for(lambda: len(pm.db.get_spellcheck_paragraphs("p1")) >= 2)
+        assert jobs.cancel("p1")
+        gate.set()
+        jobs.wait("p1")
+        job = pm.db.get_latest_spellcheck_job("p1")
+        assert job["status"] == "cancelled" and job["total"] == len(PARAS)
+        n_first = len(calls)
+        assert n_first < len(PARAS)
+        stored = [r["entry"] for r in pm.db.get_spellcheck_paragraphs("p1")]
+        assert len(stored) == job["done"] == n_first, "paragraphs skipped by the cancel are neither stored nor counted"
+        assert all(e["errors"] for e in stored)
+
+        second = jobs.start("p1", use_gemini=False, use_openai=True)
+        assert second["job"]["options"]["resumed_from"] == first["job"]["job_id"]
+        jobs.wait("p1")
+        assert sorted(calls) == sorted(PARAS), "resume only asks paragraphs the cancelled job skipped"
+
+        lines = [json.loads(l) for l in jobs.stream("p1")]
+        entries = [l["entry"] for l in lines if l["type"] == "paragraph"]
+        assert sorted(e["paragraph_index"] for e in entries) == list(range(1, len(PARAS) + 1))
+        assert lines[-1]["type"] == "job" and lines[-1]["job"]["status"] == "completed"
+        cursor = max(l["seq"] for l in lines if l["type"] == "paragraph")
+        assert [l for l in jobs.stream("p1", after=cursor) if l and json.loads(l)["type"] == "paragraph"] == []
+
+        # restart: results come back from the DB
+        state = SpellcheckJobs(pm).state("p1")
+        assert [e["errors"][0]["wrong"] for e in state["per_paragraph"]] == [p.split()[-1] for p in PARAS]
+        assert state["job"]["status"] == "completed" and not state["running"]
+    finally:
+        sc.openai_spellcheck_paragraph, sc.get_openai_api_key, sc.default_llm_cache, sc.SPELLCHECK_BATCH_TOKENS = saved
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        test_job_streams_cancels_and_resumes(make_project_manager(tmp))
+    print("All spellcheck job tests passed.")
@@ -0,0 +1,146 @@
+import sys
+import json
+import os
+import tempfile
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.services.manuscript_engine import ManuscriptEngine
+from src.services.pipeline_jobs import JobCancelled
+from tests.conftest import make_project_manager
+
+PAGES = ["page_0001", "page_0002", "page_0003"]
+OCR = {"engine": "google_vision", "max_dim": 2000, "jpeg_quality": 90}
+
+
+def _pages(status="completed", t=100.0, **extra):
+    return [dict({"unit": u, "status": status, "count": 1, "produced_at": t}, **extra) for u in PAGES]
+
+
+def test_partial_runs_and_rerun_plan(project_manager):
+    pm = project_manager
+    pm.record_nusha_step("p1", 1, "pages", "completed", 3, dpi=300)
+    pm.record_nusha_pages("p1", 1, "pages", _pages(t=100.0), settings={"dpi": 300})
+    pm.record_nusha_pages("p1", 1, "segmentation", [dict(p, count=2) for p in _pages(t=200.0)], settings={"model": "blla.mlmodel"})
+
+    # OCR yarıda kesildi: 1. sayfa tamam, 2. sayfada Vision hatası, 3. sayfaya gelinmedi
+    pm.record_nusha_step("p1", 1, "text_recognition", "running", total=6, reset=True, **OCR)
+    pm.record_nusha_pages("p1", 1, "text_recognition", [
+        {"unit": "page_0001", "status": "completed", "count": 2, "total": 2, "produced_at": 300.0},
+        {"unit": "page_0002", "status": "failed", "count": 1, "total": 2, "error": "Vision 503", "produced_at": 300.0},
+    ], settings=OCR)
+
+    steps = pm.get_nusha_steps("p1", 1)
+    assert steps["pages"]["count"] == 3 and steps["pages"]["dpi"] == 300 and steps["pages"]["pages"] == 3
+    assert steps["segmentation"]["status"] == "completed" and steps["segmentation"]["count"] == 6
+    ocr = steps["text_recognition"]
+    assert ocr["status"] == "running" and ocr["count"] == 3 and ocr["total"] == 6
+    assert ocr["pages_failed"] == 1 and ocr["error"] == "Vision 503" and ocr["engine"] == "google_vision"
+
+    plan = pm.get_nusha_rerun_plan("p1", 1, settings={"text_recognition": OCR})
+    assert plan["text_recognition"] == ["page_0002", "page_0003"], plan
+    assert plan["segmentation"] == [] and plan["alignment"] is True
+    changed = dict(OCR, max_dim=1600)
+    assert pm.get_nusha_rerun_plan("p1", 1, settings={"text_recognition": changed})["text_recognition"] == PAGES
+
+    # resume: yalnızca eksik sayfalar okunur; sonra 1. sayfa yeniden segmentlenir
+    pm.record_nusha_pages("p1", 1, "text_recognition", [
+        {"unit": u, "status": "completed", "count": 2, "total": 2, "produced_at": 400.0} for u in ("page_0002", "page_0003")
+    ], settings=OCR)
+    pm.record_nusha_step("p1", 1, "alignment", "completed", 6)
+    assert pm.get_nusha_rerun_plan("p1", 1)["alignment"] is False
+    pm.record_nusha_pages("p1", 1, "segmentation", [{"unit": "page_0001", "status": "completed", "count": 3}],
+                          settings={"model": "blla.mlmodel"})
+    pm.record_nusha_pages("p1", 1, "text_recognition", [{"unit": "page_0001", "status": "completed", "count": 3, "total": 3}],
+                          settings=OCR)
+    plan = pm.get_nusha_rerun_plan("p1", 1, settings={"text_recognition": OCR})
+    assert plan["text_recognition"] == [] and plan["alignment"] is True, "newer OCR makes the alignment stale"
+
+    # baştan çalıştırma (reset) eski sayfa satırlarını siler; silinen aşama defterden de çıkar
+    pm.record_nusha_step("p1", 1, "text_recognition", "running", reset=True, **OCR)
+    assert pm.get_nusha_steps("p1", 1)["text_recognition"]["pages"] == 0
+    pm.clear_nusha_steps("p1", 1, ["text_recognition", "alignment"])
+    assert list(pm.get_nusha_steps("p1", 1)) == ["pages", "segmentation"]
+    pm.db.delete_nusha("p1", 1)
+    assert pm.db.get_stage_summary("p1", 1) == {}
+
+
+def test_reconcile_rebuilds_from_disk(project_manager):
+    pm = project_manager
+    ndir = pm.get_project_path("p1") / "nusha_1"
+    for sub in ("pages", "lines", "ocr"):
+        (ndir / sub).mkdir(parents=True)
+    recs = []
+    for u in PAGES:
+        (ndir / "pages" / f"{u}.png").write_bytes(b"png")
+        for i in range(2):
+            recs.append({"page_image": str(ndir / "pages" / f"{u}.png"), "line_image": str(ndir / "lines" / f"{u}_line_{i + 1:03d}.png")})
+    (ndir / "lines_manifest.jsonl").write_text("\n".join(json.dumps(r) for r in recs), encoding="utf-8")
+    # 1. sayfa okundu, 2. sayfanın bir satırı Vision hatası, 3. sayfa hiç okunmadı
+    for stem, text in (("page_0001_line_001", "باب"), ("page_0001_line_002", "قال"), ("page_0002_line_001", "كتاب")):
+        (ndir / "ocr" / f"{stem}.txt").write_text(text, encoding="utf-8")
+        (ndir / "ocr" / f"{stem}.json").write_text("{}", encoding="utf-8")
+    (ndir / "ocr" / "page_0002_line_002.txt").write_text("", encoding="utf-8")
+    (ndir / "ocr" / "page_0002_line_002.json").write_text(json.dumps({"error": "timeout"}), encoding="utf-8")
+    (ndir / "alignment.json").write_text(json.dumps({"lines_count": 3, "aligned": []}), encoding="utf-8")
+    for f in (ndir / "pages").iterdir():
+        os.utime(f, (300.0, 300.0))
+    os.utime(ndir / "lines_manifest.jsonl", (400.0, 400.0))
+    for f in (ndir / "ocr").iterdir():
+        os.utime(f, (500.0, 500.0))
+    os.utime(ndir / "alignment.json", (600.0, 600.0))
+
+    # defterde diskle çelişen eski kayıt: uzlaştırma onu siler
+    pm.record_nusha_pages("p1", 1, "segmentation", [{"unit": "page_0009", "status": "completed", "count": 5}])
+    counts = pm.reconcile_ledger("p1")
+    assert counts == {1: {"pages": 3, "segmentation": 3, "text_recognition": 2, "alignment": 1}}, counts
+
+    steps = pm.get_nusha_steps("p1", 1)
+    assert steps["pages"]["count"] == 3 and steps["segmentation"]["count"] == 6
+    ocr = steps["text_recognition"]
+    assert ocr["status"] == "completed" and ocr["count"] == 3 and ocr["pages"] == 2 and ocr["pages_failed"] == 1
+    assert steps["alignment"]["count"] == 3
+    rows = {r["unit"]: r for r in pm.db.get_stage_units("p1", 1, "text_recognition")}
+    assert rows["page_0002"]["error"] == "1 satır hatalı, 0 satır eksik" and rows["page_0002"]["source"] == "reconcile"
+    assert rows["page_0001"]["settings_hash"] is None, "settings of files found on disk are unknown"
+
+    plan = pm.get_nusha_rerun_plan("p1", 1, settings={"text_recognition": OCR})
+    assert plan["text_recognition"] == ["page_0002", "page_0003"] and plan["alignment"] is False
+
+    # elle silinen sayfa: uzlaştırma sonrası durum diski yansıtır
+    (ndir / "pages" / "page_0003.png").unlink()
+    pm.reconcile_ledger("p1", 1)
+    assert pm.get_nusha_steps("p1", 1)["pages"]["count"] == 2
+
+
+def test_cancelled_step_is_not_recorded_as_failed(project_manager):
+    pm = project_manager
+    pid = pm.create_project("Cancel")
+    (pm.get_project_path(pid) / "tahkik.docx").write_bytes(b"docx")
+    ndir = pm.get_nusha_dir(pid, 1)
+    (ndir / "ocr").mkdir(parents=True)
+    line = ndir / "lines" / "page_0001_line_001.png"
+    (ndir / "lines_manifest.jsonl").write_text(json.dumps({"page_image": "page_0001.png", "line_image": str(line)}), encoding="utf-8")
+    (ndir / "ocr" / f"{line.stem}.txt").write_text("باب", encoding="utf-8")
+
+    def on_progress(percent, message, **kw):
+        raise JobCancelled("job-1")  # iş kuyruğunda iptal edilen iş (JobContext.progress)
+
+    engine = ManuscriptEngine(pid, on_progress=on_progress, pm=pm)
+    try:
+        engine.align_manuscript(1)
+        raise AssertionError("JobCancelled must propagate to the job queue")
+    except JobCancelled:
+        pass
+    step = pm.get_nusha_steps(pid, 1)["alignment"]
+    assert step["status"] == "cancelled" and step["error"] is None, step
+    assert pm.get_nusha_rerun_plan(pid, 1)["alignment"] is True
+
+
+if __name__ == "__main__":
+    for test in (test_partial_runs_and_rerun_plan, test_reconcile_rebuilds_from_disk, test_cancelled_step_is_not_recorded_as_failed):
+        with tempfile.TemporaryDirectory() as tmp:
+            test(make_project_manager(tmp))
+    print("All stage ledger tests passed.")
@@ -0,0 +1,137 @@
+import sys
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import src.vocalization as voc
+from src.llm_transport import TransportResponse, set_transport
+from src.services.tts_service import TTSService
+from src.trace_sinks import HtmlReportSink, JsonlSink, Tracer, _ReportSink, load_records, make_sinks, render_html_report
+
+
+class _BlockingSink:
+    """İlk yazımda kapı açılana kadar bekleyen sink (yavaş disk)."""
+
+    def __init__(self, gate):
+        self.gate = gate
+        self.records = []
+
+    def write(self, record):
+        self.gate.wait(10)
+        self.records.append(record)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _Transport:
+    """Bir kelimeyi değiştiren (yapısal uyumsuzluk -> geri dönüş) OpenAI yerine geçen taşıyıcı."""
+
+    offline = True
+
+    def post(self, url, headers=None, timeout=None, **kw):
+        words = kw["json"]["messages"][-1]["content"].split()
+        words[1] = "كتاب"
+        text = " ".join("".join(c + "َ" for c in w) for w in words)
+        return TransportResponse(200, json.dumps({"choices": [{"message": {"content": text}}]}, ensure_ascii=False), {})
+
+    def sleep(self, s):
+        pass
+
+
+def test_disabled_tracer_is_a_no_op():
+    tracer = Tracer([])
+    assert not tracer.enabled
+    tracer.emit("vocalize.attempt", text="x")
+    assert tracer._thread is None and tracer.stats["emitted"] == 0
+    assert tracer.flush() is True
+
+
+def test_emit_never_blocks_on_slow_sinks():
+    gate = threading.Event()
+    sink = _BlockingSink(gate)
+    tracer = Tracer([sink], max_queue=8)
+    t0 = time.perf_counter()
+    for i in range(100):
+        tracer.emit("tts.segments", parts=[str(i)])
+    assert time.perf_counter() - t0 < 0.5
+    assert tracer.stats["dropped"] > 0 and tracer.stats["emitted"] + tracer.stats["dropped"] == 100
+    gate.set()
+    assert tracer.flush()
+    assert len(sink.records) == tracer.stats["emitted"] == tracer.stats["written"]
+    tracer.close()
+
+
+def test_service_trace_jsonl_renders_reports():
+    with tempfile.TemporaryDirectory() as tmp:
+        tracer = Tracer(make_sinks(["jsonl", "html", "docx"], Path(tmp)))
+        saved = voc.default_llm_cache
+        voc.default_llm_cache = lambda: None
+        prev = set_transport(_Transport())
+        try:
+            svc = TTSService()
+            svc.tracer = tracer
+            out = svc.vocalize_chunk_with_retry("باب الطهارة والمياه", page_name="p3", scope="arsiv")
+        finally:
+            set_transport(prev)
+            voc.default_llm_cache = saved
+        assert out.split()[1] == "الطهارة", "mismatched word reverts to the original"
+        tracer.close()
+
+        records = load_records(Path(tmp) / "tts_trace.jsonl")
+        assert [r["kind"] for r in records] == ["vocalize.attempt", "vocalize.fallback"]
+        assert records[0]["outcome"] == "mismatch" and records[0]["page"] == "p3"
+        assert records[1]["reverted"] == 1 and records[1]["segments"][1] == ["الطهارة", "كَتَاَبَ", True]
+
+        report = (Path(tmp) / "tts_trace.html").read_text(encoding="utf-8")
+        assert report == render_html_report(records)
+        assert "arsiv / p3" in report and '<span class="reverted">الطهارة</span>' in report
+        assert "1 kelime orijinalden kurtarıldı" in report
+        assert (Path(tmp) / "tts_trace.docx").stat().st_size > 0
+
+        # JSONL sink dosyayı ekleyerek açar; yeniden açılışta eski kayıtlar korunur
+        again = JsonlSink(Path(tmp) / "tts_trace.jsonl")
+        again.write({"kind": "tts.segments", "parts": ["a"]})
+        again.close()
+        assert len(load_records(Path(tmp) / "tts_trace.jsonl")) == 3
+
+
+def test_reports_render_from_jsonl_at_intervals():
+    with tempfile.TemporaryDirectory() as tmp:
+        sinks = make_sinks(["html"], Path(tmp), report_every=3)
+        assert [type(s) for s in sinks] == [JsonlSink, HtmlReportSink], "reports are rendered from the JSONL trace"
+        tracer = Tracer(sinks)
+        for i in range(4):
+            tracer.emit("tts.segments", parts=[f"parça {i}"], page=f"p{i}")
+        # kuyruk boşalsın ama flush çağrılmasın: ara rapor 3. kayıtta yazılmış olmalı
+        t0 = time.time()
+        while tracer.stats["written"] < 8 and time.time() - t0 < 5:
+            time.sleep(0.01)
+        report = Path(tmp) / "tts_trace.html"
+        assert report.exists() and "parça 2" in report.read_text(encoding="utf-8")
+        assert "parça 3" not in report.read_text(encoding="utf-8")
+        assert not hasattr(sinks[1], "records"), "report sinks keep no records in memory"
+        tracer.close()
+        assert "parça 3" in report.read_text(encoding="utf-8")
+    try:
+        _ReportSink(Path("x.html"), None)
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("_ReportSink is abstract")
+
+
+if __name__ == "__main__":
+    test_disabled_tracer_is_a_no_op()
+    test_emit_never_blocks_on_slow_sinks()
+    test_service_trace_jsonl_renders_reports()
+    test_reports_render_from_jsonl_at_intervals()
+    print("All trace sink tests passed.")
@@ -0,0 +1,145 @@
+import sys
+import json
+import random
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import src.vocalization as voc
+from src.llm_cache import LLMResponseCache
+from src.llm_transport import TransportResponse, set_transport
+from src.services.audio_store import AudioStore
+from src.services.tts_service import TTSService
+from src.tts_server import make_server
+
+CLIENTS = 20
+LETTERS = "ابتثجحخدذرزسشصضطظعغفقكلمنهوي"
+VOCALIZE_LATENCY = 0.02
+SYNTH_LATENCY = 0.05
+
+
+class _LocalProvider:
+    """Google TTS yerine geçen yerel sağlayıcı: sabit gecikme, sahte MP3, işaret başına timepoint."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.synth_calls = 0
+        self.voice_calls = 0
+        self.active = 0
+        self.peak = 0
+
+    def unavailable_reason(self):
+        return None
+
+    def list_voices(self, language_code):
+        with self.lock:
+            self.voice_calls += 1
+        time.sleep(SYNTH_LATENCY)
+        return [{"name": "ar-XA-Local-A", "gender": "FEMALE"}, {"name": "ar-XA-Local-B", "gender": "MALE"}]
+
+    def synthesize(self, ssml_text, voice, speaking_rate):
+        with self.lock:
+            self.synth_calls += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(SYNTH_LATENCY)
+        with self.lock:
+            self.active -= 1
+        marks = [m.split('"')[0] for m in ssml_text.split('<mark name="')[1:]]
+        return b"ID3" + ssml_text.encode("utf-8"), [{"mark": m, "time": 0.1 * i} for i, m in enumerate(marks)]
+
+
+class _SlowTransport:
+    """Her harfe fetha ekleyen, sabit gecikmeli OpenAI yerine geçen taşıyıcı."""
+
+    offline = True
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def post(self, url, headers=None, timeout=None, **kw):
+        with self.lock:
+            self.calls += 1
+        time.sleep(VOCALIZE_LATENCY)
+        text = kw["json"]["messages"][-1]["content"]
+        body = {"choices": [{"message": {"content": "".join(c + "َ" if c.isalpha() else c for c in text)}}]}
+        return TransportResponse(200, json.dumps(body, ensure_ascii=False), {})
+
+    def sleep(self, s):
+        pass
+
+
+def _requests(seed):
+    rng = random.Random(seed)
+    return [{"tokens": ["".join(rng.choice(LETTERS) for _ in range(rng.randint(2, 6))) for _ in range(30)],
+             "voice_name": None, "gender": "MALE", "speaking_rate": 1.0} for _ in range(CLIENTS)]
+
+
+def _post(url, body):
+    req = urllib.request.Request(url, data=json.dumps(body).encode("utf-8"), headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        return resp.status, json.loads(resp.read().decode("utf-8"))
+
+
+def _run(url, bodies, clients):
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        return list(pool.map(lambda b: _post(url, b), bodies))
+
+
+def test_threaded_server_serves_20_concurrent_clients_with_shared_caches():
+    saved_cache = voc.default_llm_cache
+    cache = LLMResponseCache(None, max_bytes=0)
+    voc.default_llm_cache = lambda: cache
+    transport = _SlowTransport()
+    prev = set_transport(transport)
+    with tempfile.TemporaryDirectory() as tmp:
+        provider = _LocalProvider()
+        svc = TTSService(provider=provider)
+        svc.audio_store = AudioStore(Path(tmp) / "store")
+        httpd = make_server("127.0.0.1", 0, service=svc)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{httpd.server_address[1]}/tts"
+        try:
+            # tek istemci (eski tek thread'li sunucunun davranışı) vs 20 eşzamanlı istemci
+            seq_results = _run(url, _requests(1), 1)
+            assert provider.peak == 1
+            par_results = _run(url, _requests(2), CLIENTS)
+
+            for status, body in seq_results + par_results:
+                assert status == 200 and body["voice"] == "ar-XA-Local-B"
+                assert len(body["chunks"]) == 1 and body["chunks"][0]["audio_b64"]
+            marks = [tp["mark"] for tp in par_results[0][1]["chunks"][0]["timepoints"]]
+            assert marks == [f"w{i}" for i in range(30)]
+            assert provider.peak > 1, "concurrent clients synthesize in parallel"
+            assert provider.voice_calls == 1, "voice list is fetched once and shared"
+            assert provider.synth_calls == 2 * CLIENTS
+
+            # aynı istekler tekrar: harekeleme önbelleği + ses deposu (sağlayıcı / taşıyıcı çağrısı yok)
+            calls = (provider.synth_calls, provider.voice_calls, transport.calls)
+            again = _run(url, _requests(2), CLIENTS)
+            assert (provider.synth_calls, provider.voice_calls, transport.calls) == calls
+            assert [r[1]["chunks"][0]["audio_hash"] for r in again] == [r[1]["chunks"][0]["audio_hash"] for r in par_results]
+
+            # kaydedilen ses aynı sunucudan Range ile
+            h = par_results[0][1]["chunks"][0]["audio_hash"]
+            req = urllib.request.Request(f"http://127.0.0.1:{httpd.server_address[1]}/api/audio/{h}.mp3", headers={"Range": "bytes=0-2"})
+            with urllib.request.urlopen(req, timeout=10) as resp:
+                assert resp.status == 206 and resp.read() == b"ID3"
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+            svc.audio_store.close()
+            set_transport(prev)
+            voc.default_llm_cache = saved_cache
+
+
+if __name__ == "__main__":
+    test_threaded_server_serves_20_concurrent_clients_with_shared_caches()
+    print("All TTS load tests passed.")
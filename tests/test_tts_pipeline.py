@@ -0,0 +1,114 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.services.tts_pipeline import TTSPipeline, TTSPipelineError
+from src.services.tts_service import TTSService
+
+
+def _counter():
+    state = {"cur": 0, "max": 0}
+    lock = threading.Lock()
+
+    class _Track:
+        def __enter__(self):
+            with lock:
+                state["cur"] += 1
+                state["max"] = max(state["max"], state["cur"])
+
+        def __exit__(self, *a):
+            with lock:
+                state["cur"] -= 1
+
+    return _Track(), state
+
+
+def test_pipeline_is_concurrent_ordered_and_reports_ttfa():
+    voc_track, voc_state = _counter()
+    syn_track, syn_state = _counter()
+    emitted = []
+
+    def vocalize(text):
+        with voc_track:
+            # later chunks finish first
+            time.sleep(0.02 * (6 - int(text.split()[0])))
+            return text + " ـ"
+
+    def synthesize(ssml):
+        with syn_track:
+            time.sleep(0.01)
+            return {"ssml": ssml}
+
+    def segmenter(i, voc):
+        return [f"{i}.{k}" for k in range(2)]
+
+    pipe = TTSPipeline(vocalize, synthesize, segmenter, vocalize_workers=3, synth_workers=2)
+    t0 = time.monotonic()
+    out = pipe.run([f"{i} كلمة" for i in range(6)], on_segment=emitted.append)
+    elapsed = time.monotonic() - t0
+
+    expected = [{"ssml": f"{i}.{k}"} for i in range(6) for k in range(2)]
+    assert out == expected and emitted == expected
+    assert voc_state["max"] == 3 and syn_state["max"] <= 2
+    assert elapsed < sum(0.02 * (6 - i) for i in range(6)), "vocalization runs concurrently"
+    m = pipe.metrics
+    assert m["segments"] == 12 and m["chunks"] == 6
+    assert 0 < m["ttfa_ms"] < m["total_ms"]
+
+
+def test_pipeline_falls_back_on_vocalize_error_and_keeps_partial_on_synth_error():
+    def vocalize(text):
+        if text == "b":
+            raise RuntimeError("OpenAI HTTP 500")
+        return text.upper()
+
+    seen = []
+    out = TTSPipeline(vocalize, lambda s: s, lambda i, v: [v] if v else []).run(["a", "b", ""], on_segment=seen.append)
+    assert out == ["A", "b"] == seen
+
+    def synthesize(ssml):
+        if ssml == "C":
+            raise RuntimeError("quota")
+        return ssml
+
+    try:
+        TTSPipeline(lambda t: t.upper(), synthesize, lambda i, v: [v], synth_workers=1).run(["a", "b", "c", "d"])
+        assert False, "expected TTSPipelineError"
+    except TTSPipelineError as e:
+        assert "quota" in str(e) and e.partial[:2] == ["A", "B"] and "C" not in e.partial
+
+
+def test_pipeline_stops_starting_work_when_cancelled():
+    cancel = threading.Event()
+    vocalized = []
+
+    def vocalize(text):
+        vocalized.append(text)
+        if text == "b":
+            cancel.set()
+        time.sleep(0.01)
+        return text
+
+    out = TTSPipeline(vocalize, lambda s: s, lambda i, v: [v], vocalize_workers=1).run(list("abcdef"), cancel_event=cancel)
+    assert out[:1] == ["a"] and len(vocalized) < 6
+    assert "f" not in out
+
+
+def test_chunk_ssml_segments_marks_global_token_indices():
+    svc = TTSService()
+    segs = svc.chunk_ssml_segments("قَالَ الشَّيْخُ. رَحِمَهُ اللَّهُ", n_tokens=4, token_offset=75)
+    joined = " ".join(segs)
+    assert [f'name="w{i}"' in joined for i in range(75, 79)] == [True] * 4
+    assert all(s.startswith("<speak>") and s.endswith("</speak>") for s in segs)
+
+
+if __name__ == "__main__":
+    test_pipeline_is_concurrent_ordered_and_reports_ttfa()
+    test_pipeline_falls_back_on_vocalize_error_and_keeps_partial_on_synth_error()
+    test_pipeline_stops_starting_work_when_cancelled()
+    test_chunk_ssml_segments_marks_global_token_indices()
+    print("All TTS pipeline tests passed.")
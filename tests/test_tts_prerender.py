@@ -0,0 +1,134 @@
+import sys
+import json
+import tempfile
+import threading
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.services.audio_store import AudioStore, audio_key, page_text_digest
+from src.services.tts_prerender import TTSPrerenderJobs
+from tests.conftest import make_project_manager
+
+N_PAGES = 6
+
+
+class _FakeTTS:
+    """batch_save isteğini depoya yazan, çağrılan sayfaları kaydeden sentez yerine geçen servis."""
+
+    def __init__(self, store, gate=None, fail=()):
+        self.store = store
+        self.calls = []
+        self.gate = gate
+        self.fail = set(fail)
+
+    def _get_audio_store(self):
+        return self.store
+
+    def process_tts_request(self, obj, on_segment=None, cancel_event=None, workers=None):
+        key = obj["page_key"]
+        self.calls.append(key)
+        if self.gate is not None:
+            self.gate.wait(10)
+        if key in self.fail:
+            return {"error": "TTS client unavailable", "status": 500}
+        digest = audio_key(" ".join(obj["tokens"]), "v", "ar-XA", obj["speaking_rate"])
+        self.store.put(digest, b"mp3", [])
+        self.store.set_page(obj["archive_path"], obj["nusha_id"], key, [digest], page_text_digest(obj["tokens"]))
+        return {"ok": True}
+
+
+def _project(pm):
+    ndir = pm.get_project_path("p1") / "nusha_1"
+    (ndir / "pages").mkdir(parents=True)
+    aligned = []
+    for i in range(N_PAGES):
+        (ndir / "pages" / f"img_p{i + 1:03d}.png").write_bytes(b"")
+        for j in range(2):
+            aligned.append({"line_no": 2 * i + j, "line_image": f"l{i}_{j}.png", "page_image": f"C:\\x\\img_p{i + 1:03d}.png",
+                            "best": {"raw": f"سطر {i} {j} باب الطهارة"}})
+    aligned.insert(0, {"line_no": -1, "best": {"raw": "--- [GİRİŞ KISMI / HİZALAMA DIŞI] ---"}, "page_image": "img_p001.png"})
+    (ndir / "alignment.json").write_text(json.dumps({"aligned": aligned}, ensure_ascii=False), encoding="utf-8")
+    return pm
+
+
+def test_tts_pages_match_player_keys_and_text(project_manager):
+    pages = _project(project_manager).get_tts_pages("p1", 1)
+    assert [p["page_key"] for p in pages] == [f"p{i + 1}" for i in range(N_PAGES)]
+    assert pages[2]["tokens"] == "سطر 2 0 باب الطهارة سطر 2 1 باب الطهارة".split()
+    assert "GİRİŞ" not in " ".join(pages[0]["tokens"])
+
+
+def test_prerender_prioritizes_focus_page_and_resumes_after_cancel(project_manager):
+    pm = _project(project_manager)
+    gate = threading.Event()
+    tts = _FakeTTS(AudioStore(pm.projects_dir / "store"), gate=gate)
+    jobs = TTSPrerenderJobs(pm, tts, char_budget=0)
+
+    first = jobs.start("p1", focus_page="p4")
+    assert first["started"] and not jobs.start("p1")["started"], "one job per project"
+    while len(tts.calls) < 1:
+        gate.wait(0.01)
+    jobs.cancel("p1")
+    gate.set()
+    jobs.wait("p1")
+    job = pm.db.get_latest_tts_prerender_job("p1")
+    assert job["status"] == "cancelled" and job["total"] == N_PAGES
+    assert tts.calls == ["p4"]
+
+    tts.calls.clear()
+    second = jobs.start("p1", focus_page="p4")
+    assert second["job"]["options"]["resumed_from"] == first["job"]["job_id"]
+    jobs.wait("p1")
+    # forward from the open page first, then backwards; p4 was already rendered
+    assert tts.calls == ["p5", "p6", "p3", "p2", "p1"]
+    state = jobs.state("p1")
+    assert state["job"]["status"] == "completed" and state["job"]["done"] == N_PAGES and not state["running"]
+
+    # edited page text -> only that page is rendered again
+    tts.calls.clear()
+    data = json.loads((pm.get_project_path("p1") / "nusha_1" / "alignment.json").read_text(encoding="utf-8"))
+    data["aligned"][3]["best"]["raw"] = "سطر معدل"
+    (pm.get_project_path("p1") / "nusha_1" / "alignment.json").write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    jobs.start("p1")
+    jobs.wait("p1")
+    assert tts.calls == ["p2"]
+
+
+def test_prerender_budget_failures_and_restart_resume(project_manager):
+    pm = _project(project_manager)
+    tts = _FakeTTS(AudioStore(pm.projects_dir / "store"))
+    page_chars = len(" ".join(pm.get_tts_pages("p1", 1)[1]["tokens"]))
+    jobs = TTSPrerenderJobs(pm, tts, char_budget=page_chars * 2)
+    jobs.start("p1")
+    jobs.wait("p1")
+    job = pm.db.get_latest_tts_prerender_job("p1")
+    assert job["status"] == "budget_exhausted" and job["done"] == 2 and tts.calls == ["p1", "p2"]
+
+    # a job left 'running' by a dead process is resumed on the next start-up
+    pm.db.create_tts_prerender_job("dead", "p1", {"nusha_index": 1, "speaking_rate": 1.0})
+    tts.calls.clear()
+    restarted = TTSPrerenderJobs(pm, tts, char_budget=0)
+    assert pm.db.get_tts_prerender_job("dead")["status"] == "interrupted"
+    assert restarted.resume_interrupted() == ["p1"]
+    restarted.wait("p1")
+    assert tts.calls == ["p3", "p4", "p5", "p6"]
+
+    tts.fail = {"p1", "p2", "p3"}
+    data = json.loads((pm.get_project_path("p1") / "nusha_1" / "alignment.json").read_text(encoding="utf-8"))
+    for item in data["aligned"]:
+        item["best"]["raw"] += " ثم"
+    (pm.get_project_path("p1") / "nusha_1" / "alignment.json").write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    restarted.start("p1")
+    restarted.wait("p1")
+    job = pm.db.get_latest_tts_prerender_job("p1")
+    assert job["status"] == "failed" and job["done"] == 0
+
+
+if __name__ == "__main__":
+    for test in (test_tts_pages_match_player_keys_and_text, test_prerender_prioritizes_focus_page_and_resumes_after_cancel,
+                 test_prerender_budget_failures_and_restart_resume):
+        with tempfile.TemporaryDirectory() as tmp:
+            test(make_project_manager(tmp))
+    print("All TTS pre-render tests passed.")
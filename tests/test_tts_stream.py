@@ -0,0 +1,74 @@
+import sys
+import json
+import threading
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.services.tts_service import TTSService
+
+
+def _segment(i):
+    return {"audio_url": f"/api/audio/{i:064x}.mp3", "audio_hash": f"{i:064x}", "timepoints": [{"mark": f"w{i * 10}", "time": 0.0}],
+            "token_start": i * 10, "token_end": i * 10 + 10}
+
+
+def test_stream_emits_first_segment_before_request_finishes():
+    release = threading.Event()
+    seen_cancel = []
+
+    def fake_process(obj, on_segment=None, cancel_event=None):
+        on_segment(_segment(0))
+        release.wait(5)
+        on_segment(_segment(1))
+        seen_cancel.append(cancel_event.is_set())
+        return {"chunks": [_segment(0), _segment(1)], "voice": "v", "metrics": {"ttfa_ms": 1.0}}
+
+    svc = TTSService()
+    svc.process_tts_request = fake_process
+    stream = svc.stream_tts_request({"tokens": ["a"]})
+    first = json.loads(next(stream))
+    assert first["type"] == "segment" and first["index"] == 0 and first["token_start"] == 0
+    assert not release.is_set(), "first segment arrives while synthesis is still running"
+    release.set()
+    rest = [json.loads(l) for l in stream]
+    assert [e["type"] for e in rest] == ["segment", "done"]
+    assert rest[0]["index"] == 1 and rest[0]["token_end"] == 20
+    assert rest[1]["voice"] == "v" and rest[1]["metrics"] == {"ttfa_ms": 1.0}
+    assert seen_cancel == [False]
+
+
+def test_stream_replays_cached_pages_and_reports_errors():
+    svc = TTSService()
+    svc.process_tts_request = lambda obj, on_segment=None, cancel_event=None: {"chunks": [_segment(0), _segment(1)], "source": "archive_cache"}
+    events = [json.loads(l) for l in svc.stream_tts_request({"page_key": "p1"})]
+    assert [e["index"] for e in events if e["type"] == "segment"] == [0, 1]
+    assert events[-1] == {"type": "done", "voice": None, "source": "archive_cache", "metrics": None}
+
+    svc.process_tts_request = lambda obj, on_segment=None, cancel_event=None: {"error": "ssml or tokens is required", "status": 400}
+    assert [json.loads(l) for l in svc.stream_tts_request({})] == [{"type": "error", "error": "ssml or tokens is required", "status": 400}]
+
+
+def test_closing_stream_cancels_pipeline():
+    cancelled = threading.Event()
+
+    def fake_process(obj, on_segment=None, cancel_event=None):
+        on_segment(_segment(0))
+        if cancel_event.wait(5):
+            cancelled.set()
+        return {"chunks": [_segment(0)]}
+
+    svc = TTSService()
+    svc.process_tts_request = fake_process
+    stream = svc.stream_tts_request({"tokens": ["a"]})
+    next(stream)
+    stream.close()
+    assert cancelled.wait(5)
+
+
+if __name__ == "__main__":
+    test_stream_emits_first_segment_before_request_finishes()
+    test_stream_replays_cached_pages_and_reports_errors()
+    test_closing_stream_cancels_pipeline()
+    print("All TTS stream tests passed.")
@@ -0,0 +1,141 @@
+import json
+import random
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import src.services.tts_service as tts_service
+from src.config import OPENAI_MODEL
+import src.vocalization as voc
+from src.llm_cache import LLMResponseCache
+from src.llm_transport import TransportResponse, set_transport
+from src.vocalization import cached_vocalization, stable_chunks, store_vocalization
+
+LETTERS = "ابتثجحخدذرزسشصضطظعغفقكلمنهوي"
+_rng = random.Random(7)
+TOKENS = ["".join(_rng.choice(LETTERS) for _ in range(_rng.randint(2, 6))) + ("." if _rng.random() < 0.06 else "") for _ in range(300)]
+
+
+class _FakeTransport:
+    """Her harfe fetha ekleyerek cevap veren OpenAI yerine geçen taşıyıcı."""
+
+    offline = True
+
+    def __init__(self):
+        self.calls = []
+
+    def post(self, url, headers=None, timeout=None, **kw):
+        text = kw["json"]["messages"][-1]["content"]
+        self.calls.append(text)
+        vocalized = "".join(c + "َ" if c.isalpha() else c for c in text)
+        body = {"choices": [{"message": {"content": vocalized}}]}
+        return TransportResponse(200, json.dumps(body, ensure_ascii=False), {})
+
+    def sleep(self, s):
+        pass
+
+
+def test_stable_chunks_localize_single_word_edits():
+    spans = stable_chunks(TOKENS, 75)
+    assert spans[0][0] == 0 and spans[-1][1] == len(TOKENS)
+    assert all(a[1] == b[0] for a, b in zip(spans, spans[1:]))
+    assert all(30 <= e - s <= 75 for s, e in spans[:-1])
+
+    def chunks(toks, fixed=False):
+        spans = [(i, i + 75) for i in range(0, len(toks), 75)] if fixed else stable_chunks(toks, 75)
+        return [" ".join(toks[s:e]) for s, e in spans]
+
+    changed = {True: [], False: []}
+    for pos in range(0, 300, 5):
+        for edited in (TOKENS[:pos] + ["مستعمل"] + TOKENS[pos + 1:], TOKENS[:pos] + ["ثم"] + TOKENS[pos:], TOKENS[:pos] + TOKENS[pos + 1:]):
+            for fixed in (True, False):
+                changed[fixed].append(len(set(chunks(edited, fixed)) - set(chunks(TOKENS, fixed))))
+    # sabit pencerede ekleme/silme sonraki bütün parçaları kaydırır; içerik tanımlı sınırlar hemen toparlanır
+    assert sum(changed[False]) / len(changed[False]) < 1.5
+    assert sum(n <= 2 for n in changed[False]) / len(changed[False]) > 0.9
+    assert sum(changed[True]) > 1.5 * sum(changed[False])
+
+
+def test_tts_service_reuses_cached_chunks_after_edit():
+    cache = LLMResponseCache(None, max_bytes=0)
+    fake = _FakeTransport()
+    saved = voc.default_llm_cache
+    voc.default_llm_cache = lambda: cache
+    prev = set_transport(fake)
+    try:
+        svc = tts_service.TTSService()
+        spans = stable_chunks(TOKENS, 75)
+        for s, e in spans:
+            svc.vocalize_chunk_with_retry(" ".join(TOKENS[s:e]))
+        assert len(fake.calls) == len(spans)
+
+        edited = TOKENS[:120] + ["مستعمل"] + TOKENS[121:]
+        fake.calls.clear()
+        outs = [svc.vocalize_chunk_with_retry(" ".join(edited[s:e])) for s, e in stable_chunks(edited, 75)]
+        assert 1 <= len(fake.calls) <= 2 and any("مستعمل" in c for c in fake.calls)
+        assert " ".join(outs).split()[120] == "مَسَتَعَمَلَ"
+    finally:
+        set_transport(prev)
+        voc.default_llm_cache = saved
+
+
+class _WordChangingTransport(_FakeTransport):
+    """Harekeler tamam ama son kelimeyi değiştiriyor: doğrulama düşer, geri dönüş kullanılır."""
+
+    def post(self, url, headers=None, timeout=None, **kw):
+        resp = super().post(url, headers=headers, timeout=timeout, **kw)
+        body = json.loads(resp.text)
+        words = body["choices"][0]["message"]["content"].split()
+        body["choices"][0]["message"]["content"] = " ".join(words[:-1] + ["قَالَ"])
+        return TransportResponse(200, json.dumps(body, ensure_ascii=False), {})
+
+
+def test_fallback_is_not_cached_persistently():
+    cache = LLMResponseCache(None, max_bytes=0)
+    fake = _WordChangingTransport()
+    saved = voc.default_llm_cache
+    voc.default_llm_cache = lambda: cache
+    voc._fallbacks.clear()
+    prev = set_transport(fake)
+    try:
+        svc = tts_service.TTSService()
+        text = "باب المياه الطاهرة"
+        merged = svc.vocalize_chunk_with_retry(text)
+        assert merged.split()[:2] == ["بَاَبَ", "اَلَمَيَاَهَ"] and merged.split()[2] == "الطاهرة", merged
+        assert len(fake.calls) == 1 and len(cache) == 0, "unvalidated output never reaches the LLM cache"
+        assert cached_vocalization(text, OPENAI_MODEL) is None
+
+        # kısa süre içinde tekrar: model yeniden sorulmaz; süre dolunca sorulur
+        assert svc.vocalize_chunk_with_retry(text) == merged and len(fake.calls) == 1
+        later = voc.time.monotonic() + voc.FALLBACK_TTL_S + 1
+        assert voc.cached_fallback(text, OPENAI_MODEL, now=later) is None
+        assert voc.cached_fallback(text, OPENAI_MODEL) is None, "expired entry is dropped"
+        svc.vocalize_chunk_with_retry(text)
+        assert len(fake.calls) == 2
+    finally:
+        set_transport(prev)
+        voc.default_llm_cache = saved
+        voc._fallbacks.clear()
+
+
+def test_cache_key_includes_model_and_prompt_version():
+    cache = LLMResponseCache(None, max_bytes=0)
+    store_vocalization("باب المياه", "gpt-a", "بَابُ المِيَاهِ", cache=cache)
+    assert cached_vocalization("باب  المياه ", "gpt-a", cache=cache) == "بَابُ المِيَاهِ"
+    assert cached_vocalization("باب المياه", "gpt-b", cache=cache) is None
+    saved = voc.VOCALIZE_PROMPT_VERSION
+    voc.VOCALIZE_PROMPT_VERSION = "other"
+    try:
+        assert cached_vocalization("باب المياه", "gpt-a", cache=cache) is None
+    finally:
+        voc.VOCALIZE_PROMPT_VERSION = saved
+
+
+if __name__ == "__main__":
+    test_stable_chunks_localize_single_word_edits()
+    test_tts_service_reuses_cached_chunks_after_edit()
+    test_fallback_is_not_cached_persistently()
+    test_cache_key_includes_model_and_prompt_version()
+    print("All vocalization cache tests passed.")
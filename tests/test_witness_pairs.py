@@ -0,0 +1,116 @@
+import sys
+import os
+import random
+import tempfile
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.alignment import detect_line_skips
+from src.debug_skips import generate_full_matrix
+from src.witness_pairs import WitnessPairCache, WitnessTokens
+
+VOCAB = ["كتاب", "الله", "قال", "في", "من", "على", "الحمد", "رب", "العالمين", "محمد", "العلم", "نور", "هذا", "ذلك"]
+
+
+def _witness(tokens, rnd, drop_line=None):
+    lines = []
+    i = 0
+    while i < len(tokens):
+        n = rnd.randint(5, 9)
+        if drop_line is None or len(lines) != drop_line:
+            lines.append({"line_no": len(lines) + 1, "line_image": f"{len(lines)}.png", "ocr_text": " ".join(tokens[i:i + n])})
+        else:
+            lines.append({"line_no": len(lines) + 1, "line_image": f"{len(lines)}.png", "ocr_text": ""})
+        i += n
+    return lines
+
+
+def _fixture():
+    rnd = random.Random(5)
+    tokens = [rnd.choice(VOCAB) + str(rnd.randint(0, 50)) for _ in range(600)]
+    n1 = _witness(tokens, random.Random(1))
+    n2 = _witness(tokens, random.Random(2), drop_line=10)
+    return n1, n2
+
+
+def test_both_directions_share_one_alignment():
+    n1, n2 = _fixture()
+    cache = WitnessPairCache()
+    skips_12 = detect_line_skips(n1, n2, None, pair_cache=cache)
+    skips_21 = detect_line_skips(n2, n1, None, pair_cache=cache)
+    assert cache.misses == 1 and cache.hits == 1
+    assert skips_12, "Dropped N2 line must show up as a skip in N1"
+    assert skips_21 == []
+
+
+def test_pair_cache_is_persisted():
+    n1, n2 = _fixture()
+    with tempfile.TemporaryDirectory() as tmp:
+        first = WitnessPairCache(Path(tmp))
+        counts = first.get_lines(n1, n2).line_pair_counts()
+        assert list(Path(tmp).glob("*.json"))
+
+        second = WitnessPairCache(Path(tmp))
+        view = second.get_lines(n2, n1)
+        assert second.misses == 0 and second.hits == 1
+        # Reverse view of the same stored alignment
+        assert {(b, a): c for (a, b), c in view.line_pair_counts().items()} == counts
+
+
+def test_memory_lru_and_disk_pruning():
+    witnesses = [WitnessTokens([{"ocr_text": f"{w} {i}"} for i, w in enumerate(VOCAB[k:] + VOCAB[:k])]) for k in range(5)]
+    base = WitnessTokens([{"ocr_text": " ".join(VOCAB)}])
+
+    cache = WitnessPairCache(max_entries=2)
+    for w in witnesses[:3]:
+        cache.get(base, w)
+    assert len(cache._mem) == 2 and cache.evictions == 1
+    cache.get(base, witnesses[1])  # en son kullanılan kalır
+    cache.get(base, witnesses[3])
+    assert cache.misses == 4 and cache.hits == 1
+    cache.get(base, witnesses[1])
+    assert cache.hits == 2, "recently used pair survives eviction"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        first = WitnessPairCache(Path(tmp))
+        for w in witnesses:
+            first.get(base, w)
+        sizes = [f.stat().st_size for f in Path(tmp).glob("*.json")]
+        budget = 3 * max(sizes)
+        assert 4 * min(sizes) > budget
+        for f in Path(tmp).glob("*.json"):
+            f.unlink()
+        first = WitnessPairCache(Path(tmp))
+        for w in witnesses[:3]:
+            first.get(base, w)
+        old = sorted(Path(tmp).glob("*.json"))[0]
+        os.utime(old, (1000.0, 1000.0))
+
+        bounded = WitnessPairCache(Path(tmp), max_disk_bytes=budget, max_age_s=86400)
+        bounded.get(base, witnesses[3])
+        assert not old.exists() and bounded.pruned == 1, "files older than max_age_s go first"
+        bounded.get(base, witnesses[4])
+        assert len(list(Path(tmp).glob("*.json"))) == 3 and bounded.pruned == 2, "then the oldest until under max_disk_bytes"
+        assert (Path(tmp) / f"{min(base.fingerprint, witnesses[4].fingerprint)[:16]}_{max(base.fingerprint, witnesses[4].fingerprint)[:16]}.json").exists()
+
+
+def test_full_matrix_uses_pair_cache():
+    n1, _ = _fixture()
+    cache = WitnessPairCache()
+    aligned = [dict(l, best={"raw": l["ocr_text"]}) for l in n1]
+    aligned[3]["best"] = {"raw": aligned[3]["ocr_text"] + " زائد"}
+
+    html = generate_full_matrix({"aligned": aligned}, Path(tempfile.gettempdir()), pair_cache=cache)
+    assert cache.misses == 1
+    assert 'class="anchor"' in html
+    assert '<span class="miss-tag">زائد</span>' in html
+
+
+if __name__ == "__main__":
+    test_both_directions_share_one_alignment()
+    test_pair_cache_is_persisted()
+    test_memory_lru_and_disk_pruning()
+    test_full_matrix_uses_pair_cache()
+    print("All witness pair tests passed.")
@@ -0,0 +1,74 @@
+import sys
+import random
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.alignment import align_ocr_to_tahkik_segment_dp, attach_exact_pair_links, attach_ocr_to_ocr_links, attach_span_links
+from src.witness_pairs import WitnessPairCache
+from src.witnesses import link_field, witness_indices, witness_key
+
+VOCAB = ["كتاب", "الله", "قال", "في", "من", "على", "الحمد", "رب", "العالمين", "محمد", "العلم", "نور", "هذا", "ذلك"]
+
+
+def _payload(n_witnesses=6, n_words=800):
+    rnd = random.Random(9)
+    tokens = [rnd.choice(VOCAB) + str(rnd.randint(0, 30)) for _ in range(n_words)]
+    payload = {}
+    for k in range(1, n_witnesses + 1):
+        r = random.Random(k)
+        lines = []
+        i = 0
+        while i < len(tokens):
+            n = r.randint(5, 10)
+            seg = [w for w in tokens[i:i + n] if r.random() > 0.05]
+            lines.append({"ocr_text": " ".join(seg), "line_image": f"n{k}_{len(lines)}.png", "line_index": len(lines)})
+            i += n
+        aligned = align_ocr_to_tahkik_segment_dp(
+            "test.docx", ocr_lines_override=lines, write_json=False, reference_text_override=" ".join(tokens)
+        )["aligned"]
+        payload[witness_key(k)] = aligned
+    return payload
+
+
+def test_naming_is_backward_compatible():
+    assert [witness_key(k) for k in (1, 2, 3, 4, 7)] == ["aligned", "aligned_alt", "aligned_alt3", "aligned_alt4", "aligned_alt7"]
+    assert link_field(1, 2) == "alt" and link_field(2, 1) == "alt"
+    assert link_field(3, 2) == "alt2" and link_field(2, 3) == "alt3" and link_field(4, 1) == "alt"
+    assert witness_indices({"aligned": [1], "aligned_alt": [1], "aligned_alt5": [1], "aligned_alt3": []}) == [1, 2, 5]
+
+
+def test_span_links_cover_every_pair():
+    payload = _payload()
+    attach_span_links(payload)
+    for a in range(1, 7):
+        for b in range(1, 7):
+            if a == b:
+                continue
+            field = link_field(a, b)
+            first = payload[witness_key(a)][5]
+            assert first[field] is not None
+            assert first[f"{field}_list"], f"N{a} -> N{b} overlap list missing"
+
+
+def test_exact_alignments_are_linear_and_on_demand():
+    payload = _payload()
+    cache = WitnessPairCache()
+    attach_ocr_to_ocr_links(payload, pair_cache=cache)
+    # Only pivot pairs (1, k): one alignment per extra witness
+    assert cache.misses == 5
+    assert payload["aligned_alt5"][3]["ocr_alt_list"]
+    assert "ocr_alt5_list" not in payload["aligned_alt"][3]
+
+    attach_exact_pair_links(payload, 2, 5, pair_cache=cache)
+    assert cache.misses == 6
+    assert payload["aligned_alt"][3]["ocr_alt5_list"]
+    assert payload["aligned_alt5"][3]["ocr_alt2_list"]
+
+
+if __name__ == "__main__":
+    test_naming_is_backward_compatible()
+    test_span_links_cover_every_pair()
+    test_exact_alignments_are_linear_and_on_demand()
+    print("All witness tests passed.")